@@ -11,8 +11,11 @@ from flask_wtf.csrf import CSRFProtect
 from flasgger import Swagger
 from flask_mail import Mail
 
+from app.services.db_router import RoutingSession
+
 # Inicializar extensiones
-db = SQLAlchemy()
+# RoutingSession envía las lecturas a la réplica si hay una configurada
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 bcrypt = Bcrypt()
@@ -36,9 +39,19 @@ def create_app(config_name="development"):
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
 
+    # Serialización JSON (orjson si está instalado, si no stdlib)
+    from app.utils.json_provider import init_json_provider
+    init_json_provider(app)
+
     # Aumentar límite de upload para videos (100MB)
     app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024
 
+    # Réplica de lectura: segunda bind del mismo metadata (mismas opciones de pool)
+    if app.config.get("SQLALCHEMY_REPLICA_URI"):
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds.setdefault("replica", app.config["SQLALCHEMY_REPLICA_URI"])
+        app.config["SQLALCHEMY_BINDS"] = binds
+
     # Inicializar extensiones CON LA APP
     db.init_app(app)
     migrate.init_app(app, db)
@@ -100,6 +113,65 @@ def create_app(config_name="development"):
     from app.services.storage_service import get_storage_service
     get_storage_service(app)
 
+    # ========================================================================
+    # CONTADOR DE VISTAS DEL BLOG (write-behind)
+    # ========================================================================
+    from app.services.view_counter import view_counter
+    view_counter.init_app(app)
+
+    # Enrutado primaria/réplica (sin efecto si no hay SQLALCHEMY_REPLICA_URI)
+    from app.services.db_router import db_router
+    db_router.init_app(app)
+
+    # Queries, tiempo SQL y sentencias más lentas por petición
+    from app.services.sql_profiler import sql_profiler
+    sql_profiler.init_app(app)
+
+    # Índice de búsqueda del blog (registra los eventos de mapper)
+    from app.services import blog_search  # noqa: F401
+
+    # ========================================================================
+    # CACHÉ HTTP DE PÁGINAS PÚBLICAS
+    # ========================================================================
+    from app.services.page_cache import page_cache
+    page_cache.init_app(app)
+
+    # Caché de fragmentos de plantilla ({% cache %}) con invalidación por modelo
+    from app.services.fragment_cache import fragment_cache
+    fragment_cache.init_app(app)
+
+    # Límites de ritmo y concurrencia de las llamadas a OpenAI
+    from app.services.openai_governor import openai_governor
+    openai_governor.init_app(app)
+
+    # Circuit breaker de OpenAI (respuestas degradadas mientras está abierto)
+    from app.services.openai_resilience import openai_breaker
+    openai_breaker.init_app(app)
+
+    # Herramientas del asistente (function calling): pool de hilos y memoización
+    from app.services.assistant_tools import assistant_tools
+    assistant_tools.init_app(app)
+
+    # Rotación de threads de Telegram por presupuesto de prompt tokens
+    from app.services.thread_lifecycle import thread_lifecycle
+    thread_lifecycle.init_app(app)
+
+    # Ledger de consumo de tokens con escritura diferida (volcado final al apagar)
+    from app.services.usage_recorder import usage_recorder
+    usage_recorder.init_app(app)
+
+    # Cuotas de tokens y coste por usuario (contadores en memoria + recálculo desde el ledger)
+    from app.services.llm_quota import llm_quota
+    llm_quota.init_app(app)
+
+    # Caché semántica de respuestas frecuentes del agente de Telegram
+    from app.services.answer_cache import answer_cache
+    answer_cache.init_app(app)
+
+    # Motor del agente de Telegram por usuario (Assistants o Chat Completions)
+    from app.services.completions_chat import completions_chat
+    completions_chat.init_app(app)
+
     # Configurar Flask-Login
     login_manager.login_view = "auth.login"
     login_manager.login_message = "Por favor inicia sesión para acceder a esta página."
@@ -139,6 +211,10 @@ def create_app(config_name="development"):
     from app.middleware.error_handlers import register_error_handlers
     register_error_handlers(app)
 
+    # Registrar comandos CLI de mantenimiento
+    from app.commands import register_commands
+    register_commands(app)
+
     # Jinja globals
     from datetime import datetime
     app.jinja_env.globals.update(now=datetime.now)
@@ -1,4 +1,4 @@
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 import json
 from datetime import datetime
@@ -9,7 +9,7 @@ from app.models.nutrition_plan import NutritionPlan
 from app.models.training_plan import TrainingPlan
 from app.models.user import User
 from app.models.notification import Notification
-from app.models.telegram import LLMUsageLedger, TelegramLinkToken
+from app.models.telegram import LLMUsageLedger, TelegramLinkToken, UserLLMQuota
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -23,12 +23,16 @@ def usage_dashboard():
 
     usage_records = LLMUsageLedger.query.order_by(LLMUsageLedger.created_at.desc()).limit(100).all()
     
+    # Usuarios de los registros en una sola consulta (no una por usuario)
+    user_ids = {record.user_id for record in usage_records}
+    users_by_id = {user.id: user for user in User.query.filter(User.id.in_(user_ids))} if user_ids else {}
+
     # Agrupar por usuario para resumen
     summary_dict = {}
     for record in usage_records:
         user_id = record.user_id
         if user_id not in summary_dict:
-            user = User.query.get(user_id)
+            user = users_by_id.get(user_id)
             summary_dict[user_id] = {
                 'username': user.username if user else f"User {user_id}",
                 'user_id': user_id,
@@ -47,6 +51,90 @@ def usage_dashboard():
     )
 
 
+@admin_bp.route("/cache-stats")
+@login_required
+def cache_stats():
+    """Métricas de las cachés de este worker (páginas y fragmentos)"""
+    if not current_user.is_admin:
+        return render_template("errors/403.html"), 403
+
+    from app.services.fragment_cache import fragment_cache
+    from app.services.page_cache import page_cache
+
+    page_total = page_cache.hits + page_cache.misses
+    return jsonify({
+        "page_cache": {
+            "hits": page_cache.hits,
+            "misses": page_cache.misses,
+            "hit_rate": round(page_cache.hits / page_total, 3) if page_total else None,
+        },
+        "fragment_cache": fragment_cache.stats(),
+    })
+
+
+@admin_bp.route("/openai-stats")
+@login_required
+def openai_stats():
+    """Métricas de OpenAI de este worker: gobernador, breaker, tools, rotación de threads, ledger, cuotas y caché de respuestas"""
+    if not current_user.is_admin:
+        return render_template("errors/403.html"), 403
+
+    from app.services.answer_cache import answer_cache
+    from app.services.assistant_tools import assistant_tools
+    from app.services.llm_quota import llm_quota
+    from app.services.openai_governor import openai_governor
+    from app.services.openai_resilience import openai_breaker
+    from app.services.thread_lifecycle import thread_lifecycle
+    from app.services.usage_recorder import usage_recorder
+
+    return jsonify({
+        **openai_governor.stats(),
+        "breaker": openai_breaker.stats(),
+        "tools": assistant_tools.stats(),
+        "threads": thread_lifecycle.stats(),
+        "usage": usage_recorder.stats(),
+        "quotas": llm_quota.stats(),
+        "answer_cache": answer_cache.stats(),
+    })
+
+
+@admin_bp.route("/users/<int:user_id>/llm-quota", methods=["GET", "POST"])
+@login_required
+def user_llm_quota(user_id):
+    """
+    Presupuesto de LLM de un usuario: plan, límites, consumo y restante.
+    POST (JSON o formulario): plan y límites propios; vacío o null = el del plan.
+    """
+    if not current_user.is_admin:
+        return render_template("errors/403.html"), 403
+
+    from app.services.llm_quota import LIMIT_KEYS, llm_quota
+
+    user = User.query.get_or_404(user_id)
+    if request.method == "POST":
+        data = request.get_json(silent=True) or request.form
+        quota = db.session.get(UserLLMQuota, user.id) or UserLLMQuota(user_id=user.id)
+        if "plan" in data:
+            plan = data["plan"] or None
+            if plan is not None and plan not in llm_quota.plans:
+                return jsonify({"error": f"Plan desconocido: {plan}", "plans": sorted(llm_quota.plans)}), 400
+            quota.plan = plan
+        for key in LIMIT_KEYS:
+            if key not in data:
+                continue
+            value = data[key]
+            try:
+                cast = int if key.endswith("tokens") else float
+                setattr(quota, key, None if value in (None, "") else cast(value))
+            except (TypeError, ValueError):
+                return jsonify({"error": f"Valor no válido para {key}: {value!r}"}), 400
+        db.session.add(quota)
+        db.session.commit()
+        llm_quota.invalidate(user.id)
+
+    return jsonify(llm_quota.status(user.id))
+
+
 @admin_bp.route("/users/<int:user_id>/telegram/token", methods=["POST"])
 @login_required
 def generate_telegram_token(user_id):
@@ -69,6 +157,20 @@ def generate_telegram_token(user_id):
 
 
 
+def _counts_by_user(model, user_ids, *criteria, **filters):
+    """{user_id: número de filas} de un modelo con user_id, en una sola consulta agrupada"""
+    if not user_ids:
+        return {}
+    rows = (
+        db.session.query(model.user_id, db.func.count(model.id))
+        .filter(model.user_id.in_(user_ids), *criteria)
+        .filter_by(**filters)
+        .group_by(model.user_id)
+        .all()
+    )
+    return dict(rows)
+
+
 @admin_bp.route("/users")
 @login_required
 def users():
@@ -83,57 +185,41 @@ def users():
         query = query.filter(User.last_name.ilike(f"%{last_name}%"))
     users_list = query.order_by(User.last_name.asc(), User.first_name.asc()).all()
     
-    # Calcular estadísticas para cada usuario
+    # Estadísticas de todos los usuarios en consultas agrupadas (no N consultas por usuario)
+    user_ids = [user.id for user in users_list]
+    total_analyses = _counts_by_user(BiometricAnalysis, user_ids)
+    total_nutrition = _counts_by_user(NutritionPlan, user_ids)
+    total_training = _counts_by_user(TrainingPlan, user_ids)
+    active_nutrition = _counts_by_user(NutritionPlan, user_ids, is_active=True)
+    active_training = _counts_by_user(TrainingPlan, user_ids, is_active=True)
+
+    # Análisis sin ningún plan (de nutrición ni de entrenamiento) vinculado
+    def linked(plan_model):
+        return db.session.query(plan_model.id).filter(
+            plan_model.analysis_id == BiometricAnalysis.id,
+            plan_model.user_id == BiometricAnalysis.user_id,
+        ).exists()
+
+    without_plans = _counts_by_user(
+        BiometricAnalysis, user_ids, ~linked(NutritionPlan), ~linked(TrainingPlan)
+    )
+
     users_data = []
     for user in users_list:
-        # Contar análisis totales
-        total_analyses = BiometricAnalysis.query.filter_by(user_id=user.id).count()
-        
-        # Contar planes totales
-        total_nutrition_plans = NutritionPlan.query.filter_by(user_id=user.id).count()
-        total_training_plans = TrainingPlan.query.filter_by(user_id=user.id).count()
-        
-        # Contar planes activos
-        active_nutrition_plans = NutritionPlan.query.filter_by(user_id=user.id, is_active=True).count()
-        active_training_plans = TrainingPlan.query.filter_by(user_id=user.id, is_active=True).count()
-        
-        # Obtener IDs de análisis con planes vinculados
-        nutrition_analysis_ids = set(
-            plan.analysis_id for plan in 
-            NutritionPlan.query.filter_by(user_id=user.id).filter(
-                NutritionPlan.analysis_id.isnot(None)
-            ).all()
-        )
-        training_analysis_ids = set(
-            plan.analysis_id for plan in 
-            TrainingPlan.query.filter_by(user_id=user.id).filter(
-                TrainingPlan.analysis_id.isnot(None)
-            ).all()
-        )
-        
-        # Contar análisis sin ningún plan vinculado
-        analyses_without_plans = 0
-        if total_analyses > 0:
-            all_analyses = BiometricAnalysis.query.filter_by(user_id=user.id).all()
-            for analysis in all_analyses:
-                if analysis.id not in nutrition_analysis_ids and analysis.id not in training_analysis_ids:
-                    analyses_without_plans += 1
-        
+        analyses = total_analyses.get(user.id, 0)
+        active_nutrition_plans = active_nutrition.get(user.id, 0)
+        active_training_plans = active_training.get(user.id, 0)
+
         # Determinar si requiere atención:
         # - Si tiene análisis pero NO tiene planes activos de nutrición Y entrenamiento
-        # - O si tiene análisis sin planes vinculados
-        needs_attention = False
-        if total_analyses > 0:
-            # Si no tiene ambos planes activos, requiere atención
-            if active_nutrition_plans == 0 or active_training_plans == 0:
-                needs_attention = True
-        
+        needs_attention = analyses > 0 and (active_nutrition_plans == 0 or active_training_plans == 0)
+
         users_data.append({
             'user': user,
-            'total_analyses': total_analyses,
-            'analyses_without_plans': analyses_without_plans,
-            'total_nutrition_plans': total_nutrition_plans,
-            'total_training_plans': total_training_plans,
+            'total_analyses': analyses,
+            'analyses_without_plans': without_plans.get(user.id, 0),
+            'total_nutrition_plans': total_nutrition.get(user.id, 0),
+            'total_training_plans': total_training.get(user.id, 0),
             'active_nutrition_plans': active_nutrition_plans,
             'active_training_plans': active_training_plans,
             'needs_attention': needs_attention
@@ -11,6 +11,7 @@ from app.blueprints.auth.forms import (
     ResetPasswordForm,
 )
 from app.blueprints.auth.services import AuthService
+from app.services.db_router import use_primary
 
 
 @auth_bp.route("/register", methods=["GET", "POST"])
@@ -383,6 +384,7 @@ def api_me():
 
 
 @auth_bp.route("/verify-email/<token>")
+@use_primary  # GET que escribe: el token se lee y se consume en la primaria
 def verify_email(token):
     """Verificar email con token."""
     user = AuthService.verify_email_with_token(token)
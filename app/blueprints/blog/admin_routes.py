@@ -1,7 +1,7 @@
 """
 Rutas de administración del blog (solo para admins)
 """
-from flask import render_template, redirect, url_for, flash, request, jsonify
+from flask import current_app, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from app.blueprints.blog import blog_bp
 from app.blueprints.blog.forms import BlogPostForm
@@ -9,12 +9,14 @@ from app.models.blog_post import BlogPost
 from app.models.media_file import MediaFile
 from app.utils.markdown_utils import (
     generate_slug, 
-    calculate_reading_time, 
     generate_excerpt,
     render_markdown
 )
 from app.utils.file_upload import save_uploaded_file, delete_file
 from app.services.storage_service import get_storage_service
+from app.services.fragment_cache import fragment_cache
+from app.services.related_posts import related_index
+from app.utils.pagination import keyset_paginate
 from app import db
 from datetime import datetime
 from functools import wraps
@@ -37,28 +39,32 @@ def admin_required(f):
 def admin_dashboard():
     """Dashboard de administración del blog"""
     try:
-        # Estadísticas
-        total_posts = BlogPost.query.count()
-        published_posts = BlogPost.query.filter_by(is_published=True).count()
-        draft_posts = BlogPost.query.filter_by(is_published=False).count()
-        total_views = db.session.query(db.func.sum(BlogPost.views_count)).scalar() or 0
-        
-        # Todos los posts (publicados y drafts)
-        posts = BlogPost.query.order_by(BlogPost.created_at.desc()).all()
+        # Estadísticas: un único agregado, cacheado e invalidado al guardar posts
+        stats = fragment_cache.value('blog_admin_stats', (), _blog_stats, tags=['BlogPost'])
+        
+        # Posts (publicados y drafts) por páginas keyset, del más reciente al más antiguo
+        pagination = keyset_paginate(
+            BlogPost.query,
+            (BlogPost.created_at, BlogPost.id),
+            cursor=request.args.get('cursor'),
+            per_page=25
+        )
         
         return render_template(
             'blog/admin_dashboard.html',
-            posts=posts,
-            total_posts=total_posts,
-            published_posts=published_posts,
-            draft_posts=draft_posts,
-            total_views=total_views
+            posts=pagination.items,
+            pagination=pagination,
+            total_posts=stats['total'],
+            published_posts=stats['published'],
+            draft_posts=stats['total'] - stats['published'],
+            total_views=stats['views']
         )
     except Exception as e:
         flash(f'Error al cargar el dashboard del blog: {str(e)}', 'danger')
         return render_template(
             'blog/admin_dashboard.html',
             posts=[],
+            pagination=None,
             total_posts=0,
             published_posts=0,
             draft_posts=0,
@@ -67,6 +73,25 @@ def admin_dashboard():
         )
 
 
+def _blog_stats():
+    """Totales del dashboard en una sola query"""
+    total, published, views = db.session.query(
+        db.func.count(BlogPost.id),
+        db.func.sum(db.case((BlogPost.is_published.is_(True), 1), else_=0)),
+        db.func.sum(BlogPost.views_count)
+    ).one()
+    return {'total': total, 'published': int(published or 0), 'views': int(views or 0)}
+
+
+def _update_related(post_id):
+    """Actualiza el índice de relacionados sin bloquear el guardado si falla"""
+    try:
+        related_index.update_post(post_id)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error actualizando posts relacionados de {post_id}: {e}')
+
+
 @blog_bp.route('/admin/nuevo', methods=['GET', 'POST'])
 @admin_required
 def admin_new():
@@ -82,9 +107,6 @@ def admin_new():
         if existing_post:
             slug = f"{slug}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
         
-        # Calcular tiempo de lectura
-        reading_time = calculate_reading_time(form.content.data)
-        
         # Generar excerpt si no se proporcionó
         excerpt = form.excerpt.data or generate_excerpt(form.content.data)
         
@@ -101,13 +123,18 @@ def admin_new():
             meta_keywords=form.meta_keywords.data,
             author_id=current_user.id,
             is_published=form.is_published.data,
-            published_at=datetime.utcnow() if form.is_published.data else None,
-            reading_time=reading_time
+            published_at=datetime.utcnow() if form.is_published.data else None
         )
         
+        # Pre-renderizar HTML, TOC y tiempo de lectura
+        post.render_content()
+        
         db.session.add(post)
         db.session.commit()
         
+        if post.is_published:
+            _update_related(post.id)
+        
         flash(f'Post "{post.title}" creado exitosamente!', 'success')
         return redirect(url_for('blog.admin_dashboard'))
     
@@ -138,7 +165,9 @@ def admin_edit(post_id):
         post.tags = form.tags.data
         post.meta_description = form.meta_description.data or post.excerpt
         post.meta_keywords = form.meta_keywords.data
-        post.reading_time = calculate_reading_time(form.content.data)
+        
+        # Pre-renderizar HTML, TOC y tiempo de lectura
+        post.render_content()
         
         # Si se publica por primera vez, establecer fecha
         if form.is_published.data and not post.is_published:
@@ -148,6 +177,8 @@ def admin_edit(post_id):
         
         db.session.commit()
         
+        _update_related(post.id)
+        
         flash(f'Post "{post.title}" actualizado exitosamente!', 'success')
         return redirect(url_for('blog.admin_dashboard'))
     
@@ -164,6 +195,8 @@ def admin_delete(post_id):
     db.session.delete(post)
     db.session.commit()
     
+    _update_related(post_id)
+    
     flash(f'Post "{title}" eliminado exitosamente.', 'success')
     return redirect(url_for('blog.admin_dashboard'))
 
@@ -4,12 +4,17 @@ Rutas públicas del blog
 
 import logging
 
-from flask import jsonify, render_template, request
+from flask import abort, jsonify, render_template, request
 
 from app import db
 from app.blueprints.blog import blog_bp
-from app.models.blog_post import BlogPost
-from app.utils.markdown_utils import render_markdown
+from app.models.blog_post import BlogPost, BlogPostRelated
+from app.services.blog_search import search_posts
+from app.services.fragment_cache import fragment_cache
+from app.services.page_cache import blog_content_version, page_cache
+from app.services.view_counter import view_counter
+from app.utils.pagination import keyset_paginate
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,89 +30,142 @@ def health():
         return jsonify({"status": "error", "error": str(e), "database": "error"}), 500
 
 
+@blog_bp.app_context_processor
+def blog_template_helpers():
+    """Consultas del blog que las plantillas evalúan dentro de {% cache %}"""
+    return {
+        "blog_featured_posts": featured_posts,
+        "blog_categories": categories_with_counts,
+        "blog_recent_posts": recent_posts,
+    }
+
+
+def featured_posts(limit=3):
+    """Posts destacados (los más vistos)"""
+    return (
+        BlogPost.query.filter_by(is_published=True)
+        .order_by(BlogPost.views_count.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def categories_with_counts():
+    """Categorías con número de posts publicados"""
+    return (
+        db.session.query(BlogPost.category, db.func.count(BlogPost.id).label("count"))
+        .filter_by(is_published=True)
+        .group_by(BlogPost.category)
+        .all()
+    )
+
+
+def published_count(category=None):
+    """Total de posts publicados (agregado cacheado, se invalida al guardar posts)"""
+    def count():
+        query = BlogPost.query.filter_by(is_published=True)
+        if category:
+            query = query.filter_by(category=category)
+        return query.count()
+
+    return fragment_cache.value("blog_published_count", (category,), count, tags=["BlogPost"])
+
+
+def recent_posts(limit=3):
+    """Últimos posts publicados"""
+    return (
+        BlogPost.query.filter_by(is_published=True)
+        .order_by(BlogPost.published_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
 @blog_bp.route("/")
+@page_cache.cached(blog_content_version)
 def index():
     """Listado de posts del blog"""
     try:
-        # Paginación
-        page = request.args.get("page", 1, type=int)
+        # Paginación keyset: ?cursor=... (opaco) en lugar de ?page=N
+        cursor = request.args.get("cursor")
         per_page = 12
 
         # Filtro por categoría
         category = request.args.get("category")
 
-        # Query base: solo posts publicados, ordenados por fecha
-        query = BlogPost.query.filter_by(is_published=True).order_by(BlogPost.published_at.desc())
+        # Query base: solo posts publicados (el orden lo pone keyset_paginate)
+        query = BlogPost.query.filter_by(is_published=True)
 
         # Filtrar por categoría si se especifica
         if category:
             query = query.filter_by(category=category)
 
-        # Paginación
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        posts = pagination.items
-
-        # Posts destacados (3 más vistos)
-        featured_posts = (
-            BlogPost.query.filter_by(is_published=True)
-            .order_by(BlogPost.views_count.desc())
-            .limit(3)
-            .all()
-        )
-
-        # Categorías con conteo
-        categories = (
-            db.session.query(BlogPost.category, db.func.count(BlogPost.id).label("count"))
-            .filter_by(is_published=True)
-            .group_by(BlogPost.category)
-            .all()
+        pagination = keyset_paginate(
+            query, (BlogPost.published_at, BlogPost.id), cursor=cursor, per_page=per_page
         )
+        pagination.total = published_count(category)
 
+        # Destacados y categorías se consultan desde la plantilla, dentro de
+        # {% cache %}: solo se ejecutan cuando el fragmento no está en caché
         return render_template(
             "blog/index.html",
-            posts=posts,
+            posts=pagination.items,
             pagination=pagination,
-            featured_posts=featured_posts,
-            categories=categories,
             current_category=category,
         )
     except Exception as e:
         logger.error(f"Error in blog index: {str(e)}", exc_info=True)
+        # 503: la página vacía no se guarda en la caché de páginas ni lleva validadores
         return render_template(
             "blog/index.html",
             posts=[],
             pagination=None,
-            featured_posts=[],
-            categories=[],
             current_category=None,
-            error=str(e),
-        )
+        ), 503
 
 
 @blog_bp.route("/<slug>")
 def post(slug):
     """Ver un post individual"""
-    # Buscar post por slug
-    post = BlogPost.query.filter_by(slug=slug, is_published=True).first_or_404()
+    # Solo el id: basta para contar la vista aunque la página salga de caché o sea 304
+    post_id = (
+        db.session.query(BlogPost.id).filter_by(slug=slug, is_published=True).scalar()
+    )
+    if post_id is None:
+        abort(404)
 
-    # Incrementar contador de vistas
-    post.views_count += 1
-    db.session.commit()
+    # Incrementar contador de vistas en memoria (se vuelca en lote)
+    view_counter.record(post_id)
 
-    # Renderizar Markdown a HTML
-    content_html = render_markdown(post.content)
+    return page_cache.respond(blog_content_version(), lambda: _render_post(post_id))
 
-    # Posts relacionados (misma categoría, excluyendo el actual)
-    related_posts = (
-        BlogPost.query.filter_by(category=post.category, is_published=True)
-        .filter(BlogPost.id != post.id)
-        .order_by(BlogPost.published_at.desc())
-        .limit(3)
-        .all()
-    )
+
+def _render_post(post_id):
+    post = db.session.get(BlogPost, post_id)
+
+    # Regenerar el HTML solo si lo generó otra versión del renderer
+    # (única escritura posible: la vista es de solo lectura)
+    if post.ensure_rendered():
+        db.session.commit()
+
+    # Posts relacionados: índice TF-IDF pre-calculado (una lookup por índice);
+    # si el post aún no está indexado, los últimos de su categoría
+    related_posts = BlogPostRelated.for_post(post.id, limit=3)
+    if not related_posts:
+        related_posts = (
+            BlogPost.query.filter_by(category=post.category, is_published=True)
+            .filter(BlogPost.id != post.id)
+            .order_by(BlogPost.published_at.desc())
+            .limit(3)
+            .all()
+        )
 
     return render_template(
-        "blog/post.html", post=post, content_html=content_html, related_posts=related_posts
+        "blog/post.html",
+        post=post,
+        content_html=post.content_html,
+        toc_html=post.toc_html,
+        related_posts=related_posts,
     )
 
 
@@ -120,28 +178,14 @@ def category(category):
 
 @blog_bp.route("/buscar")
 def search():
-    """Búsqueda de posts"""
-    query = request.args.get("q", "")
-    page = request.args.get("page", 1, type=int)
+    """Búsqueda de posts (texto completo, ordenada por relevancia)"""
+    query = request.args.get("q", "").strip()
+    cursor = request.args.get("cursor")
     per_page = 12
 
     if not query:
-        return render_template("blog/search.html", posts=[], query="")
-
-    # Buscar en título, excerpt y contenido
-    search_filter = db.or_(
-        BlogPost.title.ilike(f"%{query}%"),
-        BlogPost.excerpt.ilike(f"%{query}%"),
-        BlogPost.content.ilike(f"%{query}%"),
-        BlogPost.tags.ilike(f"%{query}%"),
-    )
-
-    pagination = (
-        BlogPost.query.filter(search_filter, BlogPost.is_published.is_(True))
-        .order_by(BlogPost.published_at.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
-    )
+        return render_template("blog/search.html", results=None, query="")
 
-    posts = pagination.items
+    results = search_posts(query, cursor=cursor, per_page=per_page)
 
-    return render_template("blog/search.html", posts=posts, pagination=pagination, query=query)
+    return render_template("blog/search.html", results=results, query=query)
@@ -59,7 +59,8 @@ def get_presigned_url():
             's3',
             aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
             aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
-            region_name=os.environ.get('AWS_REGION', 'eu-north-1')
+            region_name=os.environ.get('AWS_REGION', 'eu-north-1'),
+            endpoint_url=os.environ.get('S3_ENDPOINT_URL')
         )
         
         bucket = os.environ.get('S3_BUCKET') or os.environ.get('AWS_BUCKET_NAME')
@@ -5,6 +5,7 @@ Rutas para sistema de contacto
 from flask import flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from flask_wtf.csrf import CSRFProtect
+from sqlalchemy.orm import joinedload
 
 from app import csrf, db
 from . import contact_bp
@@ -69,7 +70,8 @@ def admin_messages():
     # Filtro opcional para ver solo no leídos
     show_unread = request.args.get("unread", type=int, default=0)
 
-    query = ContactMessage.query
+    # La plantilla muestra msg.user: se carga en el mismo SELECT (sin N+1)
+    query = ContactMessage.query.options(joinedload(ContactMessage.user))
 
     if show_unread:
         query = query.filter_by(is_read=False)
@@ -1,30 +1,21 @@
-from datetime import datetime
-
-from flask import make_response, render_template
+from flask import abort, make_response, render_template, request
 
+from app.services.page_cache import blog_content_version, page_cache
+from app.services.sitemap_service import sitemap_cache
 from app.utils.seo import get_landing_seo_data
 
 from . import main_bp
 
 
 @main_bp.route("/")
+@page_cache.cached(blog_content_version)
 def landing():
     """Landing page pública con propuesta de valor"""
     seo_data = get_landing_seo_data()
-    
-    # Obtener últimos 3 posts del blog (con manejo de errores)
-    recent_posts = []
-    try:
-        from app.models.blog_post import BlogPost
-        recent_posts = BlogPost.query.filter_by(is_published=True)\
-            .order_by(BlogPost.published_at.desc())\
-            .limit(3)\
-            .all()
-    except Exception as e:
-        # Si la tabla no existe o hay error, continuar sin posts
-        print(f"Warning: No se pudieron cargar posts del blog: {e}")
-    
-    return render_template("main/landing.html", seo=seo_data, recent_posts=recent_posts)
+
+    # Los últimos posts están disponibles en la plantilla como blog_recent_posts()
+    # (dentro de {% cache %}), así que la landing no consulta la BD por adelantado
+    return render_template("main/landing.html", seo=seo_data)
 
 
 @main_bp.route("/avisos-legales")
@@ -65,11 +56,28 @@ def about():
 
 @main_bp.route("/sitemap.xml")
 def sitemap():
-    """Genera sitemap.xml dinámico para SEO."""
-    sitemap_xml = render_template("sitemap.xml", now=datetime.now())
-    response = make_response(sitemap_xml)
-    response.headers["Content-Type"] = "application/xml"
-    return response
+    """Sitemap generado desde la BD (índice de sitemaps si supera 50k URLs)."""
+    return _sitemap_document("sitemap.xml")
+
+
+@main_bp.route("/sitemap-<int:page>.xml")
+def sitemap_page(page):
+    """Fragmento N del sitemap cuando el principal es un índice."""
+    return _sitemap_document(f"sitemap-{page}.xml")
+
+
+def _sitemap_document(name):
+    version = blog_content_version()
+
+    def render():
+        body = sitemap_cache.get(name, f"{request.host_url}:{version.token}")
+        if body is None:
+            abort(404)
+        response = make_response(body)
+        response.headers["Content-Type"] = "application/xml"
+        return response
+
+    return page_cache.respond(version, render)
 
 
 @main_bp.route("/robots.txt")
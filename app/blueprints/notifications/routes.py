@@ -9,6 +9,17 @@ from app.models.notification import Notification
 notifications_bp = Blueprint("notifications", __name__, url_prefix="/notificaciones")
 
 
+@notifications_bp.app_context_processor
+def notification_helpers():
+    """Contador del badge de base.html: un COUNT indexado en lugar de cargar todas las notificaciones"""
+    def unread_notifications_count():
+        if not current_user.is_authenticated:
+            return 0
+        return Notification.query.filter_by(user_id=current_user.id, is_read=False).count()
+
+    return {"unread_notifications_count": unread_notifications_count}
+
+
 @notifications_bp.route("/")
 @login_required
 def index():
@@ -0,0 +1,105 @@
+# app/commands.py
+"""
+Comandos CLI de mantenimiento (flask <comando>).
+"""
+from datetime import timedelta
+
+import click
+
+
+def register_commands(app):
+    """Registra los comandos CLI de mantenimiento en la app."""
+    _register_media_gc(app)
+    _register_blog_rerender(app)
+    _register_blog_reindex(app)
+    _register_blog_related_rebuild(app)
+
+
+def _register_media_gc(app):
+    @app.cli.command("media-gc")
+    @click.option("--execute", is_flag=True, help="Borrar de verdad (por defecto solo dry-run).")
+    @click.option("--grace-hours", default=24, show_default=True, help="Ignorar archivos más recientes.")
+    @click.option(
+        "--storage",
+        type=click.Choice(["s3", "local", "all"]),
+        default="all",
+        show_default=True,
+    )
+    def media_gc(execute, grace_hours, storage):
+        """Elimina fotos y medios huérfanos de S3 y del almacenamiento local."""
+        from app.services.media_gc_service import MediaGarbageCollector
+        from app.services.storage_service import get_storage_service
+
+        gc = MediaGarbageCollector(
+            get_storage_service(app), grace_period=timedelta(hours=grace_hours)
+        )
+        storages = ("s3", "local") if storage == "all" else (storage,)
+        report = gc.run(dry_run=not execute, storages=storages)
+
+        for name, result in report.items():
+            click.echo(
+                f"[{name}] huérfanos: {len(result['orphans'])} "
+                f"({result['bytes'] / 1024 / 1024:.1f} MB)"
+            )
+            for key in result["orphans"]:
+                click.echo(f"  - {key}")
+            if execute:
+                click.echo(f"[{name}] borrados: {len(result['deleted'])}, errores: {len(result['errors'])}")
+
+        if not execute:
+            click.echo("Dry-run: no se ha borrado nada. Usa --execute para eliminar.")
+
+
+def _register_blog_rerender(app):
+    @app.cli.command("blog-rerender")
+    @click.option("--all", "render_all", is_flag=True, help="Re-renderizar aunque la versión coincida.")
+    @click.option("--batch-size", default=100, show_default=True)
+    def blog_rerender(render_all, batch_size):
+        """Regenera el HTML pre-renderizado de los posts tras actualizar el renderer."""
+        from app import db
+        from app.models.blog_post import BlogPost
+        from app.utils.markdown_utils import RENDERER_VERSION
+
+        query = BlogPost.query.order_by(BlogPost.id)
+        if not render_all:
+            query = query.filter(
+                db.or_(
+                    BlogPost.render_version.is_(None),
+                    BlogPost.render_version != RENDERER_VERSION,
+                    BlogPost.content_html.is_(None),
+                )
+            )
+
+        # Paginar por id para no cargar todo el blog en memoria
+        rendered, last_id = 0, 0
+        while True:
+            posts = query.filter(BlogPost.id > last_id).limit(batch_size).all()
+            if not posts:
+                break
+            for post in posts:
+                post.render_content()
+            db.session.commit()
+            rendered += len(posts)
+            last_id = posts[-1].id
+
+        click.echo(f"Posts re-renderizados: {rendered} (renderer {RENDERER_VERSION})")
+
+
+def _register_blog_reindex(app):
+    @app.cli.command("blog-reindex")
+    def blog_reindex():
+        """Reconstruye el índice de búsqueda de texto completo del blog."""
+        from app.services.blog_search import reindex_all
+
+        reindex_all()
+        click.echo("Índice de búsqueda del blog reconstruido")
+
+
+def _register_blog_related_rebuild(app):
+    @app.cli.command("blog-related-rebuild")
+    def blog_related_rebuild():
+        """Recalcula el índice TF-IDF de posts relacionados."""
+        from app.services.related_posts import related_index
+
+        indexed = related_index.rebuild()
+        click.echo(f"Posts relacionados recalculados para {indexed} posts")
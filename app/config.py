@@ -7,6 +7,13 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _database_url(value):
+    """Railway/Heroku usan postgres://, SQLAlchemy exige postgresql://."""
+    if value and value.startswith("postgres://"):
+        return value.replace("postgres://", "postgresql://", 1)
+    return value
+
+
 class Config:
     """Configuración base compartida por todos los entornos."""
 
@@ -17,6 +24,16 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
 
+    # Réplica de lectura opcional: GET y queries marcadas van a ella (app/services/db_router.py)
+    SQLALCHEMY_REPLICA_URI = _database_url(os.environ.get("DATABASE_REPLICA_URL"))
+    # Segundos que un navegador sigue leyendo de la primaria tras escribir (retraso de réplica)
+    DB_REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 5))
+
+    # Instrumentación SQL por petición: log de peticiones lentas con sus sentencias
+    # (cabeceras X-SQL-* en modo debug, o forzadas con SQL_PROFILER_HEADERS)
+    SQL_PROFILER_ENABLED = os.environ.get("SQL_PROFILER_ENABLED", "true").lower() == "true"
+    SQL_SLOW_REQUEST_MS = int(os.environ.get("SQL_SLOW_REQUEST_MS", 500))
+
     # Flask-Login
     REMEMBER_COOKIE_DURATION = timedelta(days=7)
     REMEMBER_COOKIE_SECURE = True
@@ -42,6 +59,104 @@ class Config:
     AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
     AWS_REGION = os.environ.get("AWS_REGION", "eu-north-1")
     S3_BUCKET = os.environ.get("S3_BUCKET")
+    # Endpoint S3-compatible alternativo (MinIO, moto_server) para desarrollo/tests
+    S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+
+    # Blog: volcado diferido del contador de vistas (segundos, 0 = solo manual/al apagar)
+    BLOG_VIEWS_FLUSH_INTERVAL = int(os.environ.get("BLOG_VIEWS_FLUSH_INTERVAL", 30))
+    BLOG_VIEWS_TRACK_DAILY = True
+    BLOG_VIEWS_FLUSH_ON_EXIT = True  # volcado final al apagar el proceso (atexit)
+
+    # Caché de páginas públicas (anónimas): TTL por worker y max-age para navegadores/CDN
+    PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL", 300))
+    PAGE_CACHE_MAX_AGE = int(os.environ.get("PAGE_CACHE_MAX_AGE", 60))
+    PAGE_CACHE_MAX_ENTRIES = 512
+    # Cambiarlo en cada despliegue invalida los ETag emitidos por la versión anterior
+    PAGE_CACHE_SALT = os.environ.get("RELEASE_VERSION", "")
+
+    # Caché de fragmentos {% cache %}: en memoria por worker o compartida (redis://...)
+    FRAGMENT_CACHE_URL = os.environ.get("FRAGMENT_CACHE_URL")
+    FRAGMENT_CACHE_TTL = int(os.environ.get("FRAGMENT_CACHE_TTL", 300))
+    FRAGMENT_CACHE_MAX_ENTRIES = 1024
+
+    # Gobernador de OpenAI: RPM/TPM, concurrencia y plazos de cola POR WORKER
+    OPENAI_RPM_LIMIT = int(os.environ.get("OPENAI_RPM_LIMIT", 500))
+    OPENAI_TPM_LIMIT = int(os.environ.get("OPENAI_TPM_LIMIT", 200_000))
+    OPENAI_MAX_IN_FLIGHT = int(os.environ.get("OPENAI_MAX_IN_FLIGHT", 8))
+    OPENAI_MAX_QUEUE = 100
+    OPENAI_BURST_SECONDS = 10.0
+    OPENAI_QUEUE_TIMEOUT_INTERACTIVE = float(os.environ.get("OPENAI_QUEUE_TIMEOUT_INTERACTIVE", 20))
+    OPENAI_QUEUE_TIMEOUT_BACKGROUND = float(os.environ.get("OPENAI_QUEUE_TIMEOUT_BACKGROUND", 60))
+
+    # Plazos (s) de las llamadas a OpenAI: total del análisis y por petición del chat
+    # (en streaming, también entre eventos). El análisis no usa los reintentos del SDK: con
+    # OPENAI_HEDGE_AFTER > 0 lanza un segundo intento si el primer fragmento tarda más (0 = sin hedging)
+    OPENAI_ANALYSIS_TIMEOUT = float(os.environ.get("OPENAI_ANALYSIS_TIMEOUT", 60))
+    OPENAI_CHAT_TIMEOUT = float(os.environ.get("OPENAI_CHAT_TIMEOUT", 30))
+    OPENAI_HEDGE_AFTER = float(os.environ.get("OPENAI_HEDGE_AFTER", 0))
+    # Circuit breaker: fallos seguidos de OpenAI para abrirlo (0 = desactivado) y
+    # segundos en modo degradado antes de la llamada de prueba
+    OPENAI_BREAKER_FAILURES = int(os.environ.get("OPENAI_BREAKER_FAILURES", 5))
+    OPENAI_BREAKER_RESET_SECONDS = float(os.environ.get("OPENAI_BREAKER_RESET_SECONDS", 30))
+
+    # Cuotas de LLM por usuario (días y meses UTC). Límites por plan: daily_tokens,
+    # monthly_tokens, daily_cost_usd, monthly_cost_usd (ausente o None = sin límite).
+    # Plan de cada usuario: UserLLMQuota.plan, "admin" para administradores, su rol o "default"
+    LLM_QUOTAS_ENABLED = os.environ.get("LLM_QUOTAS_ENABLED", "true").lower() == "true"
+    LLM_QUOTA_PLANS = {
+        "default": {"daily_tokens": 200_000, "monthly_tokens": 2_000_000, "daily_cost_usd": 0.50, "monthly_cost_usd": 5.00},
+        "admin": {},
+    }
+    # Cada cuánto (s) se recalculan los contadores de un usuario desde el ledger
+    LLM_QUOTA_RECONCILE_SECONDS = int(os.environ.get("LLM_QUOTA_RECONCILE_SECONDS", 60))
+
+    # Caché semántica de respuestas de Telegram: embedder de las preguntas ("openai" o
+    # "hashing", local; sin cliente de OpenAI se usa el local), similitud mínima para
+    # reutilizar una respuesta (None = la del embedder: 0.92 openai, 0.85 hashing),
+    # términos mínimos de la pregunta, caducidad (s) y entradas por worker
+    ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_EMBEDDER = os.environ.get("ANSWER_CACHE_EMBEDDER", "openai")
+    ANSWER_CACHE_EMBEDDING_MODEL = "text-embedding-3-small"
+    ANSWER_CACHE_THRESHOLD = None
+    ANSWER_CACHE_MIN_TERMS = 2
+    ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", 7 * 24 * 3600))
+    ANSWER_CACHE_MAX_ENTRIES = 2000
+
+    # Tool calls del Assistant: hilos por turno y TTL (s) de resultados memoizados (0 = sin caché)
+    ASSISTANT_TOOLS_WORKERS = int(os.environ.get("ASSISTANT_TOOLS_WORKERS", 4))
+    ASSISTANT_TOOLS_CACHE_TTL = int(os.environ.get("ASSISTANT_TOOLS_CACHE_TTL", 60))
+
+    # Threads de Telegram: prompt_tokens por run a partir de los que se rota a un thread
+    # nuevo con resumen (0 = no rotar) y tamaño del resumen
+    TELEGRAM_THREAD_PROMPT_BUDGET = int(os.environ.get("TELEGRAM_THREAD_PROMPT_BUDGET", 12_000))
+    TELEGRAM_THREAD_SUMMARY_MESSAGES = 20
+    TELEGRAM_THREAD_SUMMARY_MAX_TOKENS = 400
+
+    # Motor del agente de Telegram: "assistants" (threads de OpenAI) o "completions"
+    # (historial en telegram_conversation_messages + Chat Completions en streaming).
+    # TELEGRAM_COMPLETIONS_USERS: ids (separados por comas) que usan completions aunque
+    # el motor por defecto sea assistants. La ventana de historial se acota en mensajes y caracteres
+    TELEGRAM_CHAT_ENGINE = os.environ.get("TELEGRAM_CHAT_ENGINE", "assistants")
+    TELEGRAM_COMPLETIONS_USERS = frozenset(
+        int(user_id) for user_id in os.environ.get("TELEGRAM_COMPLETIONS_USERS", "").split(",") if user_id.strip()
+    )
+    TELEGRAM_COMPLETIONS_MODEL = os.environ.get("TELEGRAM_COMPLETIONS_MODEL", "gpt-4o-mini")
+    TELEGRAM_HISTORY_MESSAGES = 20
+    TELEGRAM_HISTORY_CHARS = 12_000
+
+    # Ledger de tokens con escritura diferida: segundos entre volcados, filas que
+    # adelantan el volcado y máximo en memoria. LLM_PRICING amplía o corrige
+    # MODEL_PRICING (usage_recorder.py): {"modelo": (USD/1M prompt, USD/1M completion)}
+    USAGE_FLUSH_INTERVAL = int(os.environ.get("USAGE_FLUSH_INTERVAL", 5))
+    USAGE_FLUSH_BATCH = 200
+    USAGE_BUFFER_MAX = 10_000
+    LLM_PRICING = {}
+
+    # JSON de las respuestas: "auto" (orjson si está instalado), "orjson" o "stdlib"
+    JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+
+    # URLs por documento de sitemap (límite del protocolo: 50.000)
+    SITEMAP_MAX_URLS = 50000
 
     # Email (para futuro)
     MAIL_SERVER = os.environ.get("MAIL_SERVER")
@@ -78,13 +193,17 @@ class ProductionConfig(Config):
 
     # PostgreSQL de Railway - Usar red privada para evitar cargos de egress
     # Railway provee DATABASE_PRIVATE_URL automáticamente
-    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_PRIVATE_URL") or os.environ.get("DATABASE_URL")
+    SQLALCHEMY_DATABASE_URI = _database_url(
+        os.environ.get("DATABASE_PRIVATE_URL") or os.environ.get("DATABASE_URL")
+    )
 
-    # Si Railway usa postgres:// en lugar de postgresql://
-    if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith("postgres://"):
-        SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace(
-            "postgres://", "postgresql://", 1
-        )
+    # Pool de conexiones (se aplica a la primaria y a la réplica)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_POOL_MAX_OVERFLOW", 10)),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+    }
 
     # Logging
     SQLALCHEMY_ECHO = False
@@ -111,10 +230,42 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False
     JWT_COOKIE_CSRF_PROTECT = False
 
+    # Sin hilo de fondo: los tests vuelcan las vistas y el consumo explícitamente
+    BLOG_VIEWS_FLUSH_INTERVAL = 0
+    USAGE_FLUSH_INTERVAL = 0
+    # Sin volcado al salir: la app de los tests (y su BD en memoria) ya no existe
+    BLOG_VIEWS_FLUSH_ON_EXIT = False
+
+    # Embeddings locales: los tests no llaman a OpenAI para vectorizar preguntas
+    ANSWER_CACHE_EMBEDDER = "hashing"
+
+
+class BenchmarkConfig(Config):
+    """Configuración para los benchmarks de carga (benchmarks/run.py)."""
+
+    DEBUG = False
+    TESTING = False
+
+    # SQLite en fichero: el servidor de benchmarks atiende peticiones en varios hilos
+    SQLALCHEMY_DATABASE_URI = os.environ.get("BENCHMARK_DATABASE_URL") or "sqlite:///benchmark.db"
+    SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 30}}
+
+    WTF_CSRF_ENABLED = False
+    JWT_COOKIE_CSRF_PROTECT = False
+
+    # Los escenarios de chat repiten preguntas: sin caché de respuestas, todas llegan al stub
+    ANSWER_CACHE_ENABLED = False
+
+    # Servidor HTTP local
+    SESSION_COOKIE_SECURE = False
+    REMEMBER_COOKIE_SECURE = False
+    JWT_COOKIE_SECURE = False
+
 
 # Diccionario para seleccionar config
 config_by_name = {
     "development": DevelopmentConfig,
     "production": ProductionConfig,
     "testing": TestingConfig,
+    "benchmark": BenchmarkConfig,
 }
@@ -3,10 +3,10 @@ from app.models.biometric_analysis import BiometricAnalysis
 from app.models.contact_message import ContactMessage
 from app.models.notification import Notification
 from app.models.nutrition_plan import NutritionPlan
-from app.models.blog_post import BlogPost
+from app.models.blog_post import BlogPost, BlogPostDailyViews, BlogPostRelated
 from app.models.media_file import MediaFile
 from app.models.training_plan import TrainingPlan
-from app.models.telegram import UserTelegramLink, TelegramLinkToken, ConversationMessage, LLMUsageLedger
+from app.models.telegram import UserTelegramLink, TelegramLinkToken, ConversationMessage, LLMUsageLedger, UserLLMQuota
 from app.models.user import Permission, Role, User
 
-__all__ = ["User", "Role", "Permission", "BiometricAnalysis", "ContactMessage", "Notification", "NutritionPlan", "TrainingPlan", "BlogPost", "MediaFile", "UserTelegramLink", "TelegramLinkToken", "ConversationMessage", "LLMUsageLedger"]
+__all__ = ["User", "Role", "Permission", "BiometricAnalysis", "ContactMessage", "Notification", "NutritionPlan", "TrainingPlan", "BlogPost", "BlogPostDailyViews", "BlogPostRelated", "MediaFile", "UserTelegramLink", "TelegramLinkToken", "ConversationMessage", "LLMUsageLedger", "UserLLMQuota"]
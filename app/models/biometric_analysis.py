@@ -15,6 +15,56 @@ Principios CoachBodyFit360 aplicados:
 from datetime import datetime
 
 from app import db
+from app.utils.serialization import compile_serializer, isoformat
+
+# Fields exposed by to_dict(), in output order (keys match attribute names)
+SERIALIZED_FIELDS = (
+    "id",
+    "user_id",
+    # Input data
+    "weight",
+    "height",
+    "age",
+    "gender",
+    "neck",
+    "waist",
+    "hip",
+    # Bilateral muscle measurements
+    "biceps_left",
+    "biceps_right",
+    "thigh_left",
+    "thigh_right",
+    "calf_left",
+    "calf_right",
+    # Activity
+    "activity_factor",
+    "activity_level",
+    "goal",
+    # Calculated metrics
+    "bmi",
+    "bmr",
+    "tdee",
+    "body_fat_percentage",
+    "lean_mass",
+    "fat_mass",
+    "ffmi",
+    "body_water",
+    "waist_hip_ratio",
+    "waist_height_ratio",
+    "metabolic_age",
+    # Nutrition
+    "maintenance_calories",
+    "protein_grams",
+    "carbs_grams",
+    "fats_grams",
+    # Timestamps
+    "created_at",
+    "updated_at",
+)
+
+_serialize = compile_serializer(
+    SERIALIZED_FIELDS, converters={"created_at": isoformat, "updated_at": isoformat}
+)
 
 
 class BiometricAnalysis(db.Model):
@@ -247,6 +297,11 @@ class BiometricAnalysis(db.Model):
         comment="Last modification timestamp",
     )
 
+    # Composite index: latest analyses of a user (history, dashboard, bot)
+    __table_args__ = (
+        db.Index("ix_biometric_analyses_user_created", user_id, created_at.desc()),
+    )
+
     # ========== RELATIONSHIPS ==========
     user = db.relationship("User", back_populates="biometric_analyses")
 
@@ -271,50 +326,11 @@ class BiometricAnalysis(db.Model):
                 dict: JSON-serializable representation
 
         Principle: DRY - Reusable for APIs and templates
+
+        Column fields go through a precompiled serializer (SERIALIZED_FIELDS)
+        instead of building the dict attribute by attribute.
         """
-        data = {
-            "id": self.id,
-            "user_id": self.user_id,
-            # Input data
-            "weight": self.weight,
-            "height": self.height,
-            "age": self.age,
-            "gender": self.gender,
-            "neck": self.neck,
-            "waist": self.waist,
-            "hip": self.hip,
-            # Bilateral muscle measurements
-            "biceps_left": self.biceps_left,
-            "biceps_right": self.biceps_right,
-            "thigh_left": self.thigh_left,
-            "thigh_right": self.thigh_right,
-            "calf_left": self.calf_left,
-            "calf_right": self.calf_right,
-            # Activity
-            "activity_factor": self.activity_factor,
-            "activity_level": self.activity_level,
-            "goal": self.goal,
-            # Calculated metrics
-            "bmi": self.bmi,
-            "bmr": self.bmr,
-            "tdee": self.tdee,
-            "body_fat_percentage": self.body_fat_percentage,
-            "lean_mass": self.lean_mass,
-            "fat_mass": self.fat_mass,
-            "ffmi": self.ffmi,
-            "body_water": self.body_water,
-            "waist_hip_ratio": self.waist_hip_ratio,
-            "waist_height_ratio": self.waist_height_ratio,
-            "metabolic_age": self.metabolic_age,
-            # Nutrition
-            "maintenance_calories": self.maintenance_calories,
-            "protein_grams": self.protein_grams,
-            "carbs_grams": self.carbs_grams,
-            "fats_grams": self.fats_grams,
-            # Timestamps
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
+        data = _serialize(self)
 
         # Optionally include FitMaster data
         if include_fitmaster and self.fitmaster_data:
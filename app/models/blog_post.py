@@ -1,8 +1,9 @@
 """
 Modelo para posts del blog
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from app import db
+from app.utils.markdown_utils import RENDERER_VERSION, render_post_content
 
 
 class BlogPost(db.Model):
@@ -17,6 +18,11 @@ class BlogPost(db.Model):
     slug = db.Column(db.String(250), unique=True, nullable=False, index=True)
     excerpt = db.Column(db.String(300))  # Resumen corto para listados
     content = db.Column(db.Text, nullable=False)  # Markdown
+    
+    # Render pre-calculado al guardar (las vistas no procesan Markdown)
+    content_html = db.Column(db.Text)  # HTML sanitizado
+    toc_html = db.Column(db.Text)  # Tabla de contenidos
+    render_version = db.Column(db.String(20))  # Hash del renderer que generó el HTML
     featured_image = db.Column(db.String(500))  # URL de la imagen destacada
     
     # Categorización
@@ -43,9 +49,40 @@ class BlogPost(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Listado público: publicados por fecha (id desempata la paginación por cursor)
+    __table_args__ = (
+        db.Index('ix_blog_posts_published_date', is_published, published_at, id),
+    )
+    
     def __repr__(self):
         return f'<BlogPost {self.title}>'
     
+    @property
+    def needs_render(self):
+        """True si el HTML guardado no existe o es de otra versión del renderer"""
+        return self.render_version != RENDERER_VERSION or self.content_html is None
+    
+    def render_content(self):
+        """
+        Pre-renderiza HTML, TOC, tiempo de lectura y excerpt desde el Markdown.
+        
+        No hace commit: se llama antes de guardar el post.
+        """
+        rendered = render_post_content(self.content)
+        self.content_html = rendered['html']
+        self.toc_html = rendered['toc']
+        self.reading_time = rendered['reading_time']
+        if not self.excerpt:
+            self.excerpt = rendered['excerpt']
+        self.render_version = rendered['renderer_version']
+    
+    def ensure_rendered(self):
+        """Regenera el HTML si es de una versión anterior del renderer. Devuelve True si lo hizo."""
+        if not self.needs_render:
+            return False
+        self.render_content()
+        return True
+    
     def to_dict(self):
         """Convierte el post a diccionario para JSON"""
         return {
@@ -81,3 +118,61 @@ class BlogPost(db.Model):
     def keywords_list(self):
         """Retorna keywords como lista"""
         return [kw.strip() for kw in self.meta_keywords.split(',') if kw.strip()] if self.meta_keywords else []
+
+
+class BlogPostDailyViews(db.Model):
+    """Vistas agregadas por post y día (para 'trending')"""
+    
+    __tablename__ = 'blog_post_daily_views'
+    
+    post_id = db.Column(db.Integer, db.ForeignKey('blog_posts.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<BlogPostDailyViews post={self.post_id} day={self.day} views={self.views}>'
+    
+    @classmethod
+    def trending(cls, days=7, limit=5):
+        """Posts publicados con más vistas en los últimos `days` días"""
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        total = db.func.sum(cls.views).label('recent_views')
+        return (
+            db.session.query(BlogPost, total)
+            .join(cls, cls.post_id == BlogPost.id)
+            .filter(cls.day >= since, BlogPost.is_published.is_(True))
+            .group_by(BlogPost.id)
+            .order_by(total.desc())
+            .limit(limit)
+            .all()
+        )
+
+
+class BlogPostRelated(db.Model):
+    """Vecinos más similares de cada post (índice TF-IDF pre-calculado)"""
+    
+    __tablename__ = 'blog_post_related'
+    
+    post_id = db.Column(db.Integer, db.ForeignKey('blog_posts.id', ondelete='CASCADE'), primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey('blog_posts.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.SmallInteger, nullable=False)  # 1 = más similar
+    score = db.Column(db.Float, nullable=False)  # Similitud coseno
+    
+    __table_args__ = (
+        db.Index('ix_blog_post_related_post_rank', 'post_id', 'rank'),
+    )
+    
+    def __repr__(self):
+        return f'<BlogPostRelated post={self.post_id} related={self.related_id} score={self.score:.3f}>'
+    
+    @classmethod
+    def for_post(cls, post_id, limit=3):
+        """Posts relacionados publicados, en orden de similitud (una lookup por índice)"""
+        return (
+            BlogPost.query
+            .join(cls, cls.related_id == BlogPost.id)
+            .filter(cls.post_id == post_id, BlogPost.is_published.is_(True))
+            .order_by(cls.rank)
+            .limit(limit)
+            .all()
+        )
@@ -34,6 +34,11 @@ class Notification(db.Model):
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Badge y listado de no leídas: filtro (user_id, is_read) ya ordenado por fecha
+    __table_args__ = (
+        db.Index("ix_notifications_user_read_created", user_id, is_read, created_at),
+    )
     
     # Relaciones
     user = db.relationship("User", backref="notifications")
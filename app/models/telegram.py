@@ -3,6 +3,11 @@ from datetime import datetime, timedelta
 import secrets
 from app import db
 
+# Estados de run de la Assistants API que impiden añadir mensajes al thread
+CANCELLABLE_RUN_STATUSES = ("queued", "in_progress", "requires_action")
+LIVE_RUN_STATUSES = CANCELLABLE_RUN_STATUSES + ("cancelling",)
+RUN_EXPIRY = timedelta(minutes=10)
+
 
 class UserTelegramLink(db.Model):
     """
@@ -16,6 +21,14 @@ class UserTelegramLink(db.Model):
     telegram_chat_id = db.Column(db.String(50), nullable=True)
     openai_thread_id = db.Column(db.String(100), nullable=True)
 
+    # Último run del thread según los eventos recibidos (evita runs.list en cada mensaje)
+    openai_run_id = db.Column(db.String(100), nullable=True)
+    openai_run_status = db.Column(db.String(32), nullable=True)
+    openai_run_updated_at = db.Column(db.DateTime, nullable=True)
+
+    # prompt_tokens del último run del thread: al pasar el presupuesto se rota el thread
+    openai_thread_prompt_tokens = db.Column(db.Integer, nullable=True)
+
     status = db.Column(db.Enum("pending", "verified", "revoked", name="telegram_link_status"), default="verified")
 
     verified_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -28,6 +41,40 @@ class UserTelegramLink(db.Model):
     def __repr__(self):
         return f"<UserTelegramLink user_id={self.user_id} telegram_id={self.telegram_user_id}>"
 
+    def record_run(self, run_id, status):
+        """Anota el run actual del thread y su estado (no hace commit)."""
+        self.openai_run_id = run_id
+        self.openai_run_status = status
+        self.openai_run_updated_at = datetime.utcnow()
+
+    def clear_run(self):
+        self.openai_run_id = None
+        self.openai_run_status = None
+        self.openai_run_updated_at = None
+
+    def reset_thread(self, thread_id=None):
+        """Apunta el vínculo a un thread nuevo (o a ninguno) y olvida su run y su consumo (no hace commit)."""
+        self.openai_thread_id = thread_id
+        self.openai_thread_prompt_tokens = None
+        self.clear_run()
+
+    @property
+    def has_live_run(self):
+        """
+        True si el último run conocido puede seguir activo y bloquear el thread.
+
+        OpenAI expira los runs sin terminar a los 10 minutos: pasado ese
+        tiempo no hace falta cancelarlos.
+        """
+        if self.openai_run_status not in LIVE_RUN_STATUSES or not self.openai_run_updated_at:
+            return False
+        return datetime.utcnow() - self.openai_run_updated_at < RUN_EXPIRY
+
+    @property
+    def has_cancellable_run(self):
+        """True si el último run sigue activo y aún no se ha pedido su cancelación."""
+        return self.has_live_run and self.openai_run_status in CANCELLABLE_RUN_STATUSES
+
 
 class TelegramLinkToken(db.Model):
     """
@@ -80,6 +127,11 @@ class ConversationMessage(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Ventana de los últimos mensajes de un usuario (motor completions del agente)
+    __table_args__ = (
+        db.Index("ix_telegram_conversation_messages_user_id_id", user_id, id),
+    )
+
     def to_dict(self):
         return {
             "role": self.role,
@@ -108,3 +160,29 @@ class LLMUsageLedger(db.Model):
     cost_usd = db.Column(db.Float, default=0.0)  # Coste estimado en USD
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Consumo de un usuario en una ventana de tiempo (cuotas, dashboard)
+    __table_args__ = (
+        db.Index("ix_llm_usage_ledger_user_created", user_id, created_at),
+    )
+
+
+class UserLLMQuota(db.Model):
+    """
+    Plan y presupuesto de LLM propios de un usuario (ver app/services/llm_quota.py).
+    Los límites a NULL heredan los del plan (LLM_QUOTA_PLANS).
+    """
+    __tablename__ = "user_llm_quotas"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    plan = db.Column(db.String(50), nullable=True)
+
+    daily_tokens = db.Column(db.Integer, nullable=True)
+    monthly_tokens = db.Column(db.Integer, nullable=True)
+    daily_cost_usd = db.Column(db.Float, nullable=True)
+    monthly_cost_usd = db.Column(db.Float, nullable=True)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<UserLLMQuota user_id={self.user_id} plan={self.plan}>"
@@ -48,6 +48,11 @@ class TrainingPlan(db.Model):
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Planes activos del usuario, del más reciente al más antiguo
+    __table_args__ = (
+        db.Index('ix_training_plans_user_active_created', user_id, is_active, created_at),
+    )
     
     # Relaciones
     user = db.relationship('User', foreign_keys=[user_id])
@@ -0,0 +1,557 @@
+# app/services/answer_cache.py
+"""
+Caché semántica de respuestas del agente de Telegram.
+
+Muchas preguntas se repiten casi igual ("¿cuánta proteína debo comer?",
+"¿cuál es mi TDEE?") y cada una lanzaba un turno completo con OpenAI.
+chat_query busca antes la pregunta aquí:
+- la pregunta se convierte en un vector con un embedder intercambiable
+  (ANSWER_CACHE_EMBEDDER: embeddings de OpenAI o un hashing vectorizer
+  local, que es también el que se usa si no hay cliente de OpenAI);
+- se busca la pregunta guardada más parecida en un índice en memoria
+  (matriz NumPy de vectores normalizados: el producto es el coseno);
+- si la similitud pasa de ANSWER_CACHE_THRESHOLD, se responde con la
+  respuesta guardada sin lanzar el turno (solo se paga el embedding, que
+  pasa por la cuota, el circuit breaker y el gobernador como el resto).
+
+Solo se guardan respuestas no personales. Los datos del usuario que
+aparecen en la respuesta (peso, IMC, TDEE... de su último BiometricAnalysis,
+y su nombre) se guardan como marcadores, que al servirla se rellenan con
+los datos de quien pregunta; si le falta alguno, no hay acierto. El resto
+del contexto del prompt (objetivo, sexo y nivel de actividad, PROFILE_FIELDS)
+no se puede sustituir: cada entrada guarda el perfil con el que se generó y
+solo se sirve a quien pregunta con el mismo perfil (o sin contexto). No se
+guardan:
+- las respuestas con conversación previa en el prompt (historial del motor
+  completions, o un thread de Assistants que ya existía o se ha rotado con
+  resumen);
+- las respuestas que han usado herramientas (leen los datos del usuario);
+- las preguntas con cifras ("si peso 80 kg..."), las que siguen la
+  conversación ("¿y en gramos?") o con menos de ANSWER_CACHE_MIN_TERMS
+  términos;
+- las respuestas con números de dos o más cifras que no son datos del
+  usuario (pueden ser cálculos con sus datos, como los gramos de proteína
+  según su peso) o con un dato ambiguo (un entero corto como la edad, o
+  dos datos con el mismo valor).
+
+El índice es de cada worker y se pierde al reiniciar. Las entradas caducan
+a los ANSWER_CACHE_TTL segundos y, lleno, se descarta la usada hace más
+tiempo. Un acierto no se añade al thread de OpenAI del usuario (motor de
+Assistants); con el motor de completions sí se guarda en su historial.
+
+Aciertos, fallos, tokens ahorrados (los que costó la respuesta original) y
+motivos de descarte: `stats()`.
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app import db
+from app.services.related_posts import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Palabras de la forma de la pregunta, no de su tema
+QUESTION_STOPWORDS = frozenset("""
+cuanto cuanta cuantos cuantas cual cuales debo deberia tengo necesito puedo quiero
+dime sabes tomar comer dia diario diaria favor hola gracias
+what how much many should does can need eat take day daily per the and for your you
+""".split())
+
+# Datos del último BiometricAnalysis que se sustituyen por marcadores
+FACT_FIELDS = (
+    "weight", "height", "age", "neck", "waist", "hip",
+    "bmi", "bmr", "tdee", "body_fat_percentage", "lean_mass", "fat_mass", "ffmi", "body_water",
+    "waist_hip_ratio", "waist_height_ratio", "metabolic_age",
+    "maintenance_calories", "protein_grams", "carbs_grams", "fats_grams",
+)
+# Campos de texto del contexto que cambian la respuesta y no se pueden sustituir
+PROFILE_FIELDS = ("goal", "gender", "activity_level")
+
+_DIGIT = re.compile(r"\d")
+_FOLLOW_UP = re.compile(
+    r"^\s*[¿¡]?\s*(y|pero|entonces|and|but)\b|\b(eso|esto|lo anterior|lo mismo|that|this)\b",
+    re.IGNORECASE,
+)
+# Número con separador de miles opcional y decimales: 2450, 2.450, 22,5, 0.45
+_NUMBER = re.compile(r"(?<![\d.,])(\d{1,3}(?:([.,])\d{3})+|\d+)(?:([.,])(\d+))?(?!\d|[.,]\d)")
+# {{campo}} para textos y {{campo|decimales|separador decimal|separador de miles}} para números
+_PLACEHOLDER = re.compile(r"\{\{(\w+)(?:\|(\d)\|([.,]?)\|([.,]?))?\}\}")
+
+
+# ── Embedders ──────────────────────────────────────────────────
+def query_terms(text: str) -> List[str]:
+    """Términos de una pregunta: los del índice de posts, sin las palabras de la forma de la pregunta."""
+    return [term for term in tokenize(text) if term not in QUESTION_STOPWORDS]
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class HashingEmbedder:
+    """
+    Vectorizador local sin vocabulario ni estado: términos y trigramas de
+    caracteres (que acercan "proteína" y "proteínas") con el hashing trick.
+    """
+
+    name = "hashing"
+    default_threshold = 0.85
+
+    def __init__(self, dim: int = 1024, trigram_weight: float = 0.4):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+
+    def embed(self, texts: Sequence[str], user_id: Optional[int] = None) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text).items():
+                # crc32 y no hash(): el mismo vector en todos los procesos
+                digest = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, digest % self.dim] += weight if digest & 0x80000000 else -weight
+        return _normalize(matrix)
+
+    def _features(self, text: str) -> Counter:
+        features = Counter()
+        for term in query_terms(text):
+            features["w:" + term] += 1.0
+            padded = f"#{term}#"
+            for start in range(len(padded) - 2):
+                features["c:" + padded[start:start + 3]] += self.trigram_weight
+        return features
+
+
+class OpenAIEmbedder:
+    """Embeddings de OpenAI con el cliente de FitMaster; su consumo va al ledger del usuario."""
+
+    name = "openai"
+    default_threshold = 0.92
+
+    def __init__(self, model: str = "text-embedding-3-small", timeout: float = 5.0):
+        self.model = model
+        self.timeout = timeout
+
+    def available(self) -> bool:
+        from app.services import fitmaster_service
+
+        return fitmaster_service.client is not None
+
+    def embed(self, texts: Sequence[str], user_id: Optional[int] = None) -> np.ndarray:
+        from app.services import fitmaster_service
+        from app.services.fitmaster_service import FitMasterService
+        from app.services.openai_resilience import openai_breaker
+
+        from app.services.openai_governor import INTERACTIVE, estimate_tokens, openai_governor
+
+        with openai_breaker.guard(), openai_governor.slot(
+            INTERACTIVE, tokens=estimate_tokens(*texts), requests=1, key=user_id,
+        ):
+            response = fitmaster_service.client.with_options(timeout=self.timeout).embeddings.create(
+                model=self.model, input=list(texts),
+            )
+            if response.usage:
+                FitMasterService._record_usage(user_id, self.model, response.usage, channel="telegram")
+        return _normalize(np.array([item.embedding for item in response.data], dtype=np.float32))
+
+
+# ── Plantillas ─────────────────────────────────────────────────
+def _number_readings(match) -> List[Tuple[float, int, str, str]]:
+    """Lecturas posibles de un número del texto: (valor, decimales, separador decimal, de miles)."""
+    integer, thousands, decimal_sep, fraction = match.groups()
+    if thousands:
+        readings = [(float(integer.replace(thousands, "")), 0, "", thousands)]
+        if integer.count(thousands) == 1 and not fraction:
+            # "2.450" también puede ser 2,45 con tres decimales
+            readings.append((float(integer.replace(thousands, ".")), 3, thousands, ""))
+        if fraction:
+            readings = [(value + float("0." + fraction), len(fraction), decimal_sep, thousands)
+                        for value, _, _, thousands in readings[:1]]
+        return readings
+    if fraction:
+        return [(float(f"{integer}.{fraction}"), len(fraction), decimal_sep, "")]
+    return [(float(integer), 0, "", "")]
+
+
+def _format_number(value: float, decimals: int, decimal_sep: str, thousands_sep: str) -> str:
+    integer, _, fraction = f"{value:,.{decimals}f}".partition(".")
+    integer = integer.replace(",", thousands_sep)
+    return f"{integer}{decimal_sep}{fraction}" if fraction else integer
+
+
+def to_template(text: str, facts: Dict[str, object]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Sustituye los datos del usuario de `text` por marcadores.
+
+    Returns:
+        (plantilla, None) si la respuesta se puede reutilizar, o
+        (None, motivo) si parece personal
+    """
+    if "{{" in text:
+        return None, "braces"
+    numbers = {field: value for field, value in facts.items() if isinstance(value, (int, float))}
+    problem = None
+
+    def replace_number(match):
+        nonlocal problem
+        readings = _number_readings(match)
+        matched = {
+            (field, reading) for field, fact in numbers.items() for reading in readings
+            if abs(round(fact, reading[1]) - reading[0]) < 1e-9
+        }
+        fields = {field for field, _ in matched}
+        if not fields:
+            if max(value for value, *_ in readings) >= 10:
+                problem = problem or "free_number"
+            return match.group(0)
+        value, decimals, decimal_sep, thousands_sep = min(reading for _, reading in matched)
+        if len(fields) > 1 or (decimals == 0 and value < 100):
+            problem = problem or "ambiguous_fact"
+            return match.group(0)
+        return f"{{{{{fields.pop()}|{decimals}|{decimal_sep}|{thousands_sep}}}}}"
+
+    template = _NUMBER.sub(replace_number, text)
+    if problem:
+        return None, problem
+    name = facts.get("first_name")
+    if isinstance(name, str) and len(name) >= 3:
+        template = re.sub(rf"\b{re.escape(name)}\b", "{{first_name}}", template)
+    return template, None
+
+
+def fill_template(template: str, facts: Dict[str, object]) -> Optional[str]:
+    """Rellena los marcadores con los datos de otro usuario (None si le falta alguno)."""
+    missing = False
+
+    def replace(match):
+        nonlocal missing
+        field, decimals, decimal_sep, thousands_sep = match.groups()
+        value = facts.get(field)
+        if value is None:
+            missing = True
+            return ""
+        if decimals is None:
+            return str(value)
+        return _format_number(float(value), int(decimals), decimal_sep, thousands_sep)
+
+    text = _PLACEHOLDER.sub(replace, template)
+    return None if missing else text
+
+
+def profile_of(context: Optional[Dict]) -> Tuple:
+    """Valores de PROFILE_FIELDS en el contexto del prompt (todo None si no hay contexto)."""
+    context = context or {}
+    return tuple(context.get(field) for field in PROFILE_FIELDS)
+
+
+# ── Índice ─────────────────────────────────────────────────────
+@dataclass
+class _Entry:
+    query: str
+    template: str
+    tokens: int
+    created_at: float
+    last_used: float
+    hits: int = 0
+    profile: Tuple = ()  # valores de PROFILE_FIELDS del prompt con el que se generó
+
+
+class VectorIndex:
+    """Vectores normalizados en una matriz NumPy que crece por bloques; búsqueda por producto escalar."""
+
+    def __init__(self, embedder_name: str, capacity: int):
+        self.embedder_name = embedder_name
+        self.capacity = capacity
+        self.entries: List[_Entry] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, vector: np.ndarray, profile: Optional[Tuple] = None) -> Tuple[Optional[int], float]:
+        """(posición, similitud) de la entrada más parecida (solo entre las de `profile`, si se indica)."""
+        if not self.entries:
+            return None, 0.0
+        scores = self._matrix[:len(self.entries)] @ vector
+        if profile is not None:
+            allowed = np.fromiter((entry.profile == profile for entry in self.entries), bool, len(self.entries))
+            if not allowed.any():
+                return None, 0.0
+            scores = np.where(allowed, scores, -np.inf)
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+    def add(self, vector: np.ndarray, entry: _Entry) -> Optional[_Entry]:
+        """Añade una entrada; si el índice está lleno, descarta y devuelve la usada hace más tiempo."""
+        evicted = None
+        if len(self.entries) >= self.capacity:
+            oldest = min(range(len(self.entries)), key=lambda i: self.entries[i].last_used)
+            evicted = self.remove(oldest)
+        if self._matrix is None:
+            self._matrix = np.zeros((min(64, self.capacity), vector.shape[0]), dtype=np.float32)
+        elif len(self.entries) == self._matrix.shape[0]:
+            grown = np.zeros((min(self._matrix.shape[0] * 2, self.capacity), self._matrix.shape[1]), dtype=np.float32)
+            grown[:len(self.entries)] = self._matrix
+            self._matrix = grown
+        self._matrix[len(self.entries)] = vector
+        self.entries.append(entry)
+        return evicted
+
+    def remove(self, position: int) -> _Entry:
+        """Quita una entrada moviendo la última a su hueco."""
+        last = len(self.entries) - 1
+        entry = self.entries[position]
+        self.entries[position] = self.entries[last]
+        self._matrix[position] = self._matrix[last]
+        self.entries.pop()
+        return entry
+
+
+# ── Caché ──────────────────────────────────────────────────────
+@dataclass
+class AnswerTurn:
+    """Una pregunta de chat_query: resultado de la búsqueda y lo que se observa al responderla."""
+    query: str
+    user_id: int
+    reply: Optional[str] = None  # respuesta servida desde la caché
+    vector: Optional[np.ndarray] = None  # None si la pregunta no se puede cachear
+    embedder: Optional[str] = None
+    profile: Tuple = ()
+    tokens: int = 0
+    personal: Optional[str] = None
+
+
+_current_turn: contextvars.ContextVar[Optional[AnswerTurn]] = contextvars.ContextVar("answer_turn", default=None)
+
+
+class AnswerCache:
+    """
+    Respuestas reutilizables del agente, buscadas por similitud de la pregunta.
+
+    Uso:
+        answer_cache.init_app(app)
+        turn = answer_cache.lookup(query, user_id, context)
+        if turn.reply is not None:
+            return turn.reply
+        with answer_cache.recording(turn):      # tokens, tools e historial del turno
+            reply = ...
+        answer_cache.store(turn, reply)
+    """
+
+    def __init__(self, flask_app=None):
+        self.enabled = True
+        self.threshold: Optional[float] = None
+        self.min_terms = 2
+        self.ttl = 7 * 24 * 3600
+        self.max_entries = 2000
+        self.embedder = HashingEmbedder()
+        self.fallback = HashingEmbedder()
+        self._index = VectorIndex(self.fallback.name, self.max_entries)
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._skipped = Counter()
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Config: ANSWER_CACHE_ENABLED, ANSWER_CACHE_EMBEDDER, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_*."""
+        config = flask_app.config
+        self.enabled = config.get("ANSWER_CACHE_ENABLED", True)
+        embedder = config.get("ANSWER_CACHE_EMBEDDER", "openai")
+        if embedder == "openai":
+            embedder = OpenAIEmbedder(config.get("ANSWER_CACHE_EMBEDDING_MODEL", "text-embedding-3-small"))
+        elif embedder == "hashing":
+            embedder = HashingEmbedder()
+        elif not hasattr(embedder, "embed"):
+            raise ValueError(f"ANSWER_CACHE_EMBEDDER desconocido: {embedder}")
+        self.embedder = embedder
+        self.threshold = config.get("ANSWER_CACHE_THRESHOLD")
+        self.min_terms = config.get("ANSWER_CACHE_MIN_TERMS", 2)
+        self.ttl = config.get("ANSWER_CACHE_TTL", 7 * 24 * 3600)
+        self.max_entries = config.get("ANSWER_CACHE_MAX_ENTRIES", 2000)
+        self.clear()
+
+    # ── Búsqueda ───────────────────────────────────────────────
+    def lookup(self, query: str, user_id: int, context: Optional[Dict] = None) -> AnswerTurn:
+        """Busca una respuesta para `query` con el `context` del prompt; `turn.reply` es None si no hay acierto."""
+        turn = AnswerTurn(query=query, user_id=user_id, profile=profile_of(context))
+        if not self.enabled:
+            return turn
+        reason = self._query_problem(query)
+        if reason:
+            self._count("bypassed")
+            self._skip(reason)
+            return turn
+
+        embedder = self._embedder()
+        turn.embedder = embedder.name
+        try:
+            turn.vector = embedder.embed([query], user_id=user_id)[0]
+        except Exception as e:
+            logger.warning(f"[answer_cache] No se pudo vectorizar la pregunta de user {user_id}: {e}")
+            self._count("errors")
+            return turn
+
+        threshold = self.threshold if self.threshold is not None else embedder.default_threshold
+        now = time.monotonic()
+        with self._lock:
+            self._counters["lookups"] += 1
+            index = self._index_for(embedder)
+            position, score = index.search(turn.vector, turn.profile)
+            if position is not None and now - index.entries[position].created_at > self.ttl:
+                index.remove(position)
+                self._counters["expired"] += 1
+                position, score = index.search(turn.vector, turn.profile)
+            entry = index.entries[position] if position is not None and score >= threshold else None
+        if entry is None:
+            self._count("misses")
+            return turn
+
+        reply = fill_template(entry.template, self._facts(user_id)) if "{{" in entry.template else entry.template
+        if reply is None:
+            self._count("misses")
+            self._skip("missing_facts")
+            return turn
+        with self._lock:
+            entry.hits += 1
+            entry.last_used = now
+            self._counters["hits"] += 1
+            self._counters["saved_tokens"] += entry.tokens
+        logger.info(f"[answer_cache] Acierto para user {user_id} ({score:.3f}): {entry.query[:60]!r}")
+        turn.reply = reply
+        return turn
+
+    def _query_problem(self, query: str) -> Optional[str]:
+        if _DIGIT.search(query):
+            return "query_numbers"
+        if _FOLLOW_UP.search(query):
+            return "follow_up"
+        terms = tokenize(query)
+        if len(terms) < self.min_terms or all(term in QUESTION_STOPWORDS for term in terms):
+            return "short_query"
+        return None
+
+    # ── Registro ───────────────────────────────────────────────
+    @contextmanager
+    def recording(self, turn: AnswerTurn):
+        """Durante el bloque, note_usage() y mark_personal() se anotan en `turn`."""
+        token = _current_turn.set(turn)
+        try:
+            yield turn
+        finally:
+            _current_turn.reset(token)
+
+    def note_usage(self, tokens: int) -> None:
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.tokens += tokens
+
+    def mark_personal(self, reason: str) -> None:
+        turn = _current_turn.get()
+        if turn is not None and turn.personal is None:
+            turn.personal = reason
+
+    def store(self, turn: AnswerTurn, reply: str) -> bool:
+        """Guarda la respuesta del turno si es reutilizable. Devuelve si se ha guardado."""
+        if not self.enabled or turn.vector is None or turn.reply is not None:
+            return False
+        if turn.personal:
+            self._skip(turn.personal)
+            return False
+        if not turn.tokens:
+            self._skip("no_usage")
+            return False
+        try:
+            template, reason = to_template(reply, self._facts(turn.user_id))
+        except Exception as e:
+            logger.warning(f"[answer_cache] No se pudo preparar la respuesta de user {turn.user_id}: {e}")
+            self._count("errors")
+            return False
+        if reason:
+            self._skip(reason)
+            return False
+
+        now = time.monotonic()
+        entry = _Entry(query=turn.query, template=template, tokens=turn.tokens, created_at=now, last_used=now,
+                       profile=turn.profile)
+        with self._lock:
+            index = self._index
+            if index.embedder_name != turn.embedder:
+                return False
+            if index.add(turn.vector, entry) is not None:
+                self._counters["evicted"] += 1
+            self._counters["stored"] += 1
+        return True
+
+    # ── Mantenimiento ──────────────────────────────────────────
+    def clear(self) -> None:
+        with self._lock:
+            self._index = VectorIndex(self._embedder().name, self.max_entries)
+            self._counters = Counter()
+            self._skipped = Counter()
+
+    def stats(self) -> Dict:
+        """Aciertos, tokens ahorrados y descartes (de este worker)."""
+        with self._lock:
+            counters = dict(self._counters)
+            lookups = counters.get("lookups", 0) + counters.get("bypassed", 0)
+            return {
+                "enabled": self.enabled,
+                "embedder": self._index.embedder_name,
+                "entries": len(self._index),
+                **{key: counters.get(key, 0) for key in
+                   ("hits", "misses", "bypassed", "stored", "evicted", "expired", "errors", "saved_tokens")},
+                "hit_rate": round(counters.get("hits", 0) / lookups, 4) if lookups else None,
+                "skipped": dict(self._skipped),
+            }
+
+    def _embedder(self):
+        """El embedder configurado, o el local si el de OpenAI no tiene cliente."""
+        available = getattr(self.embedder, "available", None)
+        if available is not None and not available():
+            return self.fallback
+        return self.embedder
+
+    def _index_for(self, embedder) -> VectorIndex:
+        # Vectores de otro embedder no son comparables: se empieza de cero (con el lock tomado)
+        if self._index.embedder_name != embedder.name:
+            self._index = VectorIndex(embedder.name, self.max_entries)
+        return self._index
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] += 1
+
+    def _skip(self, reason: str) -> None:
+        with self._lock:
+            self._skipped[reason] += 1
+
+    @staticmethod
+    def _facts(user_id: int) -> Dict[str, object]:
+        """Datos del último BiometricAnalysis del usuario y su nombre."""
+        from app.models.biometric_analysis import BiometricAnalysis
+        from app.models.user import User
+
+        facts: Dict[str, object] = {}
+        record = BiometricAnalysis.query.filter_by(user_id=user_id).order_by(
+            BiometricAnalysis.created_at.desc()
+        ).first()
+        if record is not None:
+            facts.update({field: getattr(record, field) for field in FACT_FIELDS if getattr(record, field) is not None})
+        user = db.session.get(User, user_id)
+        if user is not None and user.first_name:
+            facts["first_name"] = user.first_name
+        return facts
+
+
+answer_cache = AnswerCache()
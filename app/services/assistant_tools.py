@@ -0,0 +1,377 @@
+# app/services/assistant_tools.py
+"""
+Herramientas (function calling) del asistente FitMaster.
+
+Cada herramienta se registra con un decorador; no hay que tocar ningún
+if/elif para añadir una nueva:
+
+    @assistant_tools.register("get_user_history", depends_on=("BiometricAnalysis",),
+                              description="...", parameters={...})
+    def get_user_history(user_id, arguments):
+        ...
+        return {"status": "success", "data": [...]}
+
+`execute(user_id, tool_calls)` resuelve las tool calls de un run:
+- Las llamadas repetidas dentro del mismo turno (misma herramienta y
+  argumentos) se ejecutan una sola vez.
+- Los resultados se memoizan por usuario (TTL corto). Un commit que toca
+  un modelo de `depends_on` invalida las entradas de ese usuario (o de
+  todos, si la instancia no tiene user_id). La invalidación es local al
+  worker: el TTL acota lo que otro worker pueda servir desactualizado.
+- Las llamadas distintas se ejecutan en paralelo en un pool de hilos, cada
+  una con su propio app context (y por tanto su propia sesión de BD).
+
+Tiempos, aciertos de caché y errores por herramienta: `stats()`.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.services.answer_cache import answer_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Tool:
+    name: str
+    func: Callable[[int, Dict], object]
+    depends_on: Tuple[str, ...] = ()
+    memoize: bool = True
+    description: str = ""
+    parameters: Dict = field(default_factory=lambda: {"type": "object", "properties": {}, "required": []})
+
+    def schema(self) -> Dict:
+        """Definición de la function tool para OpenAI (Assistants y Chat Completions)."""
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": self.description, "parameters": self.parameters},
+        }
+
+
+@dataclass
+class ToolMetrics:
+    calls: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    def to_dict(self) -> Dict:
+        executed = self.calls - self.cache_hits
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "errors": self.errors,
+            "avg_ms": round(self.total_time / executed * 1000, 1) if executed else None,
+            "max_ms": round(self.max_time * 1000, 1),
+        }
+
+
+@dataclass
+class _CacheEntry:
+    output: str
+    expires_at: float
+    user_id: int
+    depends_on: Tuple[str, ...] = field(default=())
+
+
+class ToolRegistry:
+    """
+    Registro de herramientas con ejecución paralela y memoización por usuario.
+
+    Uso:
+        assistant_tools.init_app(app)
+        outputs = assistant_tools.execute(user_id, run.required_action.submit_tool_outputs.tool_calls)
+    """
+
+    def __init__(self, flask_app=None):
+        self.tools: Dict[str, Tool] = {}
+        self.metrics: Dict[str, ToolMetrics] = {}
+        self.max_workers = 4
+        self.ttl = 60
+        self.max_entries = 1024
+        self._cache: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Config: ASSISTANT_TOOLS_WORKERS, ASSISTANT_TOOLS_CACHE_TTL (0 = sin memoización)."""
+        self.max_workers = flask_app.config.get("ASSISTANT_TOOLS_WORKERS", 4)
+        self.ttl = flask_app.config.get("ASSISTANT_TOOLS_CACHE_TTL", 60)
+        self.clear()
+
+    def register(self, name: str, depends_on: Iterable[str] = (), memoize: bool = True,
+                 description: str = "", parameters: Optional[Dict] = None):
+        """Decorador: registra `func(user_id, arguments) -> str | dict` como herramienta `name`."""
+        def decorator(func):
+            tool = Tool(name, func, tuple(depends_on), memoize, description)
+            if parameters is not None:
+                tool.parameters = parameters
+            self.tools[name] = tool
+            self.metrics.setdefault(name, ToolMetrics())
+            return func
+        return decorator
+
+    def schemas(self) -> List[Dict]:
+        return [tool.schema() for tool in self.tools.values()]
+
+    # ── Ejecución ──────────────────────────────────────────────
+    def call(self, user_id: int, name: str, arguments: Optional[Dict] = None) -> str:
+        """Ejecuta una herramienta (con memoización) y devuelve su salida JSON."""
+        return self._run(user_id, name, arguments or {})
+
+    def execute(self, user_id: int, tool_calls) -> List[Dict[str, str]]:
+        """
+        Ejecuta las tool calls de un run y devuelve los tool_outputs para OpenAI.
+
+        Args:
+            user_id: usuario de la conversación (las herramientas solo ven sus datos)
+            tool_calls: objetos con .id, .function.name y .function.arguments (JSON)
+        """
+        # Las herramientas leen datos del usuario: la respuesta del turno no es reutilizable
+        answer_cache.mark_personal("tools")
+        unique: Dict[tuple, Tuple[str, Dict]] = {}
+        keys = []
+        for tool_call in tool_calls:
+            name = tool_call.function.name
+            try:
+                arguments = json.loads(tool_call.function.arguments or "{}")
+            except (TypeError, ValueError):
+                arguments = {}
+            key = (name, _canonical(arguments))
+            unique.setdefault(key, (name, arguments))
+            keys.append(key)
+            logger.info(f"[tools] {name}({arguments}) para user {user_id}")
+
+        outputs = self._run_all(user_id, unique)
+        return [
+            {"tool_call_id": tool_call.id, "output": outputs[key]}
+            for tool_call, key in zip(tool_calls, keys)
+        ]
+
+    def _run_all(self, user_id: int, unique: Dict[tuple, Tuple[str, Dict]]) -> Dict[tuple, str]:
+        if len(unique) <= 1:
+            return {key: self._run(user_id, name, arguments) for key, (name, arguments) in unique.items()}
+
+        flask_app = current_app._get_current_object()
+
+        def run_in_context(name, arguments):
+            with flask_app.app_context():
+                return self._run(user_id, name, arguments)
+
+        executor = self._get_executor()
+        futures = {key: executor.submit(run_in_context, name, arguments) for key, (name, arguments) in unique.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+    def _run(self, user_id: int, name: str, arguments: Dict) -> str:
+        tool = self.tools.get(name)
+        if tool is None:
+            return json.dumps({"error": f"Unknown function: {name}"})
+
+        metrics = self.metrics[name]
+        cache_key = (user_id, name, _canonical(arguments))
+        cached = self._cache_get(cache_key) if tool.memoize else None
+        with self._lock:
+            metrics.calls += 1
+            if cached is not None:
+                metrics.cache_hits += 1
+        if cached is not None:
+            return cached
+
+        generation = self._generation
+        started = time.perf_counter()
+        failed = False
+        try:
+            output = tool.func(user_id, arguments)
+        except Exception as e:
+            logger.error(f"Error ejecutando tool {name}: {e}", exc_info=True)
+            output, failed = {"error": str(e)}, True
+        elapsed = time.perf_counter() - started
+
+        # Validar que output es string (requerido por API de OpenAI)
+        if not isinstance(output, str):
+            output = json.dumps(output, ensure_ascii=False, default=str)
+
+        with self._lock:
+            metrics.total_time += elapsed
+            metrics.max_time = max(metrics.max_time, elapsed)
+            if failed:
+                metrics.errors += 1
+            # Si hubo un commit relevante mientras se ejecutaba, el resultado puede estar desfasado
+            if tool.memoize and not failed and self.ttl and generation == self._generation:
+                self._cache[cache_key] = _CacheEntry(output, time.monotonic() + self.ttl, user_id, tool.depends_on)
+                self._cache.move_to_end(cache_key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return output
+
+    def _cache_get(self, key) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            return entry.output
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="assistant-tool")
+            return self._executor
+
+    # ── Invalidación ───────────────────────────────────────────
+    def invalidate(self, changes: Iterable[Tuple[str, Optional[int]]]) -> None:
+        """Descarta resultados que dependen de (modelo, user_id); user_id None = todos."""
+        changes = set(changes)
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key for key, entry in self._cache.items()
+                if any(model in entry.depends_on and owner in (None, entry.user_id) for model, owner in changes)
+            ]
+            for key in stale:
+                del self._cache[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._generation += 1
+            self.metrics = {name: ToolMetrics() for name in self.metrics}
+
+    def stats(self) -> Dict[str, Dict]:
+        """Llamadas, aciertos de caché, errores y tiempos por herramienta (de este worker)."""
+        with self._lock:
+            return {name: metrics.to_dict() for name, metrics in self.metrics.items()}
+
+
+def _canonical(arguments: Dict) -> str:
+    return json.dumps(arguments, sort_keys=True, default=str)
+
+
+assistant_tools = ToolRegistry()
+
+
+# ── Invalidación automática tras commit ────────────────────────
+@event.listens_for(Session, "after_flush")
+def _collect_tool_changes(session, flush_context):
+    changed = session.info.setdefault("assistant_tools_changes", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        changed.add((type(obj).__name__, getattr(obj, "user_id", None)))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_tool_results(session):
+    changed = session.info.pop("assistant_tools_changes", None)
+    if changed:
+        assistant_tools.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tool_changes(session):
+    session.info.pop("assistant_tools_changes", None)
+
+
+# ── Herramientas de FitMaster ──────────────────────────────────
+@assistant_tools.register(
+    "get_user_history",
+    depends_on=("BiometricAnalysis",),
+    description=(
+        "Retrieves the user's biometric analysis history to track progress and compare metrics over time. "
+        "Use this when the user asks about their progress, evolution, or wants to compare current vs past results."
+    ),
+    parameters={
+        "type": "object",
+        "properties": {
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of analyses to retrieve (default: 5, max: 10)",
+                "default": 5,
+            }
+        },
+        "required": [],
+    },
+)
+def get_user_history(user_id: int, arguments: Dict) -> Dict:
+    """Obtiene el historial biométrico del usuario para el agente."""
+    from app.models.biometric_analysis import BiometricAnalysis
+
+    limit = arguments.get("limit", 5)
+    analyses = (
+        BiometricAnalysis.query.filter_by(user_id=user_id)
+        .order_by(BiometricAnalysis.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    if not analyses:
+        return {"status": "no_data", "message": "El usuario no tiene análisis biométricos registrados."}
+
+    data = [
+        {
+            "id": a.id,
+            "date": a.created_at.strftime("%Y-%m-%d"),
+            "weight": a.weight,
+            "height": a.height,
+            "body_fat_percentage": a.body_fat_percentage,
+            "bmi": a.bmi,
+            "bmr": a.bmr,
+            "tdee": a.tdee,
+            "lean_mass": a.lean_mass,
+            "fat_mass": a.fat_mass,
+        }
+        for a in analyses
+    ]
+    return {"status": "success", "data": data}
+
+
+@assistant_tools.register(
+    "get_current_plans",
+    depends_on=("NutritionPlan", "TrainingPlan"),
+    description=(
+        "Retrieves the user's ACTIVE nutrition and training plans assigned by their coach/trainer. "
+        "Use this when discussing diet, meals, workouts, or exercises to reference their actual assigned plan."
+    ),
+)
+def get_current_plans(user_id: int, arguments: Dict) -> Dict:
+    """Obtiene el plan de nutrición y entrenamiento REALES asignados al usuario."""
+    from app.models.nutrition_plan import NutritionPlan
+    from app.models.training_plan import TrainingPlan
+
+    # Último plan activo de cada tipo
+    nutrition = (
+        NutritionPlan.query.filter_by(user_id=user_id, is_active=True)
+        .order_by(NutritionPlan.created_at.desc())
+        .first()
+    )
+    training = (
+        TrainingPlan.query.filter_by(user_id=user_id, is_active=True)
+        .order_by(TrainingPlan.created_at.desc())
+        .first()
+    )
+    if not nutrition and not training:
+        return {
+            "status": "no_data",
+            "message": "El usuario no tiene planes de nutrición ni entrenamiento activos asignados.",
+        }
+
+    data = {}
+    if nutrition:
+        data["nutrition_plan"] = nutrition.to_dict()
+    if training:
+        data["training_plan"] = training.to_dict()
+    return {"status": "success", "data": data}
@@ -14,6 +14,7 @@ from typing import Dict, Optional, Tuple
 from app import db
 from app.models.biometric_analysis import BiometricAnalysis
 from app.services.fitmaster_service import FitMasterService
+from app.services.llm_quota import QuotaExceededError
 
 logger = logging.getLogger(__name__)
 
@@ -192,6 +193,10 @@ def add_fitmaster_analysis(analysis_id: int, biometric_data: Dict) -> Optional[s
         logger.info(f"FitMaster analysis saved for ID={analysis_id}")
         return None
 
+    except QuotaExceededError as e:
+        # The existing interpretation (if any) is kept
+        return str(e)
+
     except Exception as e:
         db.session.rollback()
         error_msg = f"Error adding FitMaster analysis: {str(e)}"
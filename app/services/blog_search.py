@@ -0,0 +1,366 @@
+# app/services/blog_search.py
+"""
+Búsqueda de texto completo del blog.
+
+Backends:
+- PostgreSQL: columna blog_posts.search_vector (tsvector, índice GIN) con
+  stemming en español y pesos título > tags > excerpt > contenido.
+- SQLite (dev/tests): tabla virtual FTS5 blog_posts_fts con ranking bm25.
+
+Ambos ordenan por (rank DESC, id DESC) y paginan por keyset sobre esa clave.
+
+El índice se mantiene en la misma transacción que guarda el post (eventos
+de mapper after_insert/after_update/after_delete), así que cualquier ruta
+que publique o edite un post lo deja indexado. La escritura del índice va
+en un SAVEPOINT: si falla, se deshace solo ella y el post se guarda igual
+(en PostgreSQL un error abortaría la transacción entera). Los resultados
+vienen ordenados por relevancia y con los términos resaltados con <mark>.
+
+La columna search_vector la crean la migración y, en PostgreSQL, también
+db.create_all(). En una tabla creada a mano sin ella (create_blog_tables.py)
+el backend de PostgreSQL se desactiva: la búsqueda no devuelve resultados y
+los posts se guardan sin indexar.
+"""
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, bindparam, event, inspect, text
+
+from app import db
+from app.models.blog_post import BlogPost
+from app.utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "spanish"
+
+# Campos que afectan al índice (views_count, render, etc. no reindexan)
+INDEXED_FIELDS = ("title", "tags", "excerpt", "content", "is_published")
+
+# Marcadores de resaltado (Unicode de uso privado): se escapan el resto del
+# texto y luego se sustituyen por <mark> para no abrir una vía XSS
+_MARK_START = "\ue000"
+_MARK_END = "\ue001"
+
+
+@dataclass
+class SearchHit:
+    """Post encontrado con su relevancia y fragmentos resaltados."""
+
+    post: BlogPost
+    rank: float
+    title_html: Markup
+    snippet_html: Markup
+
+
+@dataclass
+class SearchPage:
+    """Página de resultados (keyset sobre (rank, id): sin COUNT ni OFFSET)."""
+
+    hits: List[SearchHit] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _highlight(value: Optional[str]) -> Markup:
+    """Escapa el fragmento y convierte los marcadores en <mark>."""
+    safe = str(escape(value or ""))
+    return Markup(safe.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>"))
+
+
+class PostgresSearchBackend:
+    """tsvector + GIN con configuración 'spanish'."""
+
+    VECTOR_SQL = (
+        "setweight(to_tsvector('spanish', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('spanish', coalesce(tags, '')), 'B') || "
+        "setweight(to_tsvector('spanish', coalesce(excerpt, '')), 'C') || "
+        "setweight(to_tsvector('spanish', coalesce(content, '')), 'D')"
+    )
+
+    def ensure_schema(self, connection) -> bool:
+        """La columna y el índice GIN los crea la migración: solo se comprueba que existan."""
+        ready = connection.info.get("blog_search_ready")
+        if ready is None:
+            ready = connection.execute(
+                text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'blog_posts' AND column_name = 'search_vector' "
+                    "AND table_schema = current_schema()"
+                )
+            ).first() is not None
+            if not ready:
+                logger.warning("blog_posts.search_vector no existe: búsqueda de PostgreSQL desactivada")
+            connection.info["blog_search_ready"] = ready
+        return ready
+
+    def index(self, connection, post_id: int) -> None:
+        connection.execute(
+            text(f"UPDATE blog_posts SET search_vector = {self.VECTOR_SQL} WHERE id = :id"),
+            {"id": post_id},
+        )
+
+    def remove(self, connection, post_id: int) -> None:
+        # El vector vive en la propia fila: se borra con ella
+        return None
+
+    def reindex_all(self, connection) -> None:
+        connection.execute(text(f"UPDATE blog_posts SET search_vector = {self.VECTOR_SQL}"))
+
+    def search(self, connection, query: str, limit: int, after=None):
+        options = (
+            f"StartSel={_MARK_START}, StopSel={_MARK_END}, "
+            "MaxFragments=2, MaxWords=30, MinWords=12, FragmentDelimiter=\" … \""
+        )
+        params = {
+            "query": query,
+            "limit": limit,
+            "opts": options,
+            "title_opts": f"StartSel={_MARK_START}, StopSel={_MARK_END}, HighlightAll=true",
+        }
+        keyset = ""
+        if after is not None:
+            keyset = "WHERE rank < :after_rank OR (rank = :after_rank AND id < :after_id)"
+            params.update(after_rank=after[0], after_id=after[1])
+
+        # Los headlines solo se calculan para las filas de la página
+        sql = text(
+            f"""
+            WITH ranked AS (
+                SELECT p.id, CAST(ts_rank_cd(p.search_vector, q) AS double precision) AS rank, q
+                FROM blog_posts p, websearch_to_tsquery('spanish', :query) q
+                WHERE p.is_published AND p.search_vector @@ q
+            ), hits AS (
+                SELECT id, rank, q FROM ranked
+                {keyset}
+                ORDER BY rank DESC, id DESC
+                LIMIT :limit
+            )
+            SELECT hits.id, hits.rank,
+                   ts_headline('spanish', p.title, hits.q, :title_opts) AS title_hl,
+                   ts_headline('spanish', coalesce(p.content, ''), hits.q, :opts) AS snippet
+            FROM hits
+            JOIN blog_posts p ON p.id = hits.id
+            ORDER BY hits.rank DESC, hits.id DESC
+            """
+        )
+        rows = connection.execute(sql, params)
+        return [(row.id, float(row.rank), row.title_hl, row.snippet) for row in rows]
+
+
+class SQLiteSearchBackend:
+    """Tabla virtual FTS5 (fallback de desarrollo y tests)."""
+
+    TABLE = "blog_posts_fts"
+
+    def ensure_schema(self, connection) -> bool:
+        if connection.info.get("blog_search_ready"):
+            return True
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": self.TABLE},
+        ).first()
+        if not exists:
+            connection.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE {self.TABLE} USING fts5("
+                    "title, tags, excerpt, content, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            )
+            self.reindex_all(connection)
+        connection.info["blog_search_ready"] = True
+        return True
+
+    def index(self, connection, post_id: int) -> None:
+        self.remove(connection, post_id)
+        connection.execute(
+            text(
+                f"INSERT INTO {self.TABLE} (rowid, title, tags, excerpt, content) "
+                "SELECT id, title, coalesce(tags, ''), coalesce(excerpt, ''), content "
+                "FROM blog_posts WHERE id = :id AND is_published"
+            ),
+            {"id": post_id},
+        )
+
+    def remove(self, connection, post_id: int) -> None:
+        connection.execute(text(f"DELETE FROM {self.TABLE} WHERE rowid = :id"), {"id": post_id})
+
+    def reindex_all(self, connection) -> None:
+        connection.execute(text(f"DELETE FROM {self.TABLE}"))
+        connection.execute(
+            text(
+                f"INSERT INTO {self.TABLE} (rowid, title, tags, excerpt, content) "
+                "SELECT id, title, coalesce(tags, ''), coalesce(excerpt, ''), content "
+                "FROM blog_posts WHERE is_published"
+            )
+        )
+
+    @staticmethod
+    def build_match(query: str) -> str:
+        """Convierte la consulta del usuario en una expresión FTS5 segura (AND + prefijo)."""
+        tokens = re.findall(r"\w+", query)
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def search(self, connection, query: str, limit: int, after=None):
+        match = self.build_match(query)
+        if not match:
+            return []
+        params = {"match": match, "limit": limit}
+        keyset = ""
+        if after is not None:
+            keyset = "WHERE rank < :after_rank OR (rank = :after_rank AND id < :after_id)"
+            params.update(after_rank=after[0], after_id=after[1])
+
+        # bm25 es negativo (más negativo = más relevante): se invierte el signo
+        # para ordenar siempre por rank DESC, id DESC como en PostgreSQL
+        ranked = connection.execute(
+            text(
+                f"""
+                SELECT id, rank FROM (
+                    SELECT rowid AS id, -bm25({self.TABLE}, 10.0, 5.0, 2.0, 1.0) AS rank
+                    FROM {self.TABLE}
+                    WHERE {self.TABLE} MATCH :match
+                )
+                {keyset}
+                ORDER BY rank DESC, id DESC
+                LIMIT :limit
+                """
+            ),
+            params,
+        ).all()
+        if not ranked:
+            return []
+
+        # highlight()/snippet() solo para las filas de la página
+        fragments = {
+            row.id: (row.title_hl, row.snippet)
+            for row in connection.execute(
+                text(
+                    f"""
+                    SELECT rowid AS id,
+                           highlight({self.TABLE}, 0, :start, :end) AS title_hl,
+                           snippet({self.TABLE}, 3, :start, :end, ' … ', 24) AS snippet
+                    FROM {self.TABLE}
+                    WHERE {self.TABLE} MATCH :match AND rowid IN :ids
+                    """
+                ).bindparams(bindparam("ids", expanding=True)),
+                {"match": match, "start": _MARK_START, "end": _MARK_END, "ids": [r.id for r in ranked]},
+            )
+        }
+        return [(r.id, float(r.rank)) + fragments.get(r.id, (None, None)) for r in ranked]
+
+
+_BACKENDS = {
+    "postgresql": PostgresSearchBackend(),
+    "sqlite": SQLiteSearchBackend(),
+}
+
+
+def get_backend(dialect_name: str):
+    """Backend de búsqueda para el dialecto de la conexión (None si no hay soporte)."""
+    return _BACKENDS.get(dialect_name)
+
+
+def search_posts(query: str, cursor: Optional[str] = None, per_page: int = 12) -> SearchPage:
+    """
+    Busca posts publicados ordenados por relevancia.
+
+    Args:
+        query: Texto introducido por el usuario
+        cursor: Cursor de la página anterior (None = primera página)
+        per_page: Resultados por página
+
+    Returns:
+        SearchPage con los hits de la página y el cursor siguiente
+    """
+    result = SearchPage()
+    connection = db.session.connection()
+    backend = get_backend(connection.dialect.name)
+    if backend is None or not query.strip():
+        return result
+
+    after, _ = decode_cursor(cursor, 2)
+    if not backend.ensure_schema(connection):
+        return result
+    # Pedimos uno extra para saber si hay página siguiente sin COUNT(*)
+    rows = backend.search(connection, query, per_page + 1, after=after)
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    if has_next:
+        result.next_cursor = encode_cursor([rows[-1][1], rows[-1][0]])
+
+    posts = {p.id: p for p in BlogPost.query.filter(BlogPost.id.in_([r[0] for r in rows]))}
+    result.hits = [
+        SearchHit(
+            post=posts[post_id],
+            rank=rank,
+            title_html=_highlight(title_hl),
+            snippet_html=_highlight(snippet),
+        )
+        for post_id, rank, title_hl, snippet in rows
+        if post_id in posts
+    ]
+    return result
+
+
+def reindex_all() -> None:
+    """Reconstruye el índice completo (tras migrar o cambiar la configuración)."""
+    connection = db.session.connection()
+    backend = get_backend(connection.dialect.name)
+    if backend is None or not backend.ensure_schema(connection):
+        return
+    backend.reindex_all(connection)
+    db.session.commit()
+
+
+# ── Mantenimiento del índice ───────────────────────────────────
+def _sync(connection, post_id: int, remove: bool = False) -> None:
+    backend = get_backend(connection.dialect.name)
+    if backend is None:
+        return
+    try:
+        # SAVEPOINT: un fallo del índice no debe impedir guardar el post
+        with connection.begin_nested():
+            if not backend.ensure_schema(connection):
+                return
+            if remove:
+                backend.remove(connection, post_id)
+            else:
+                backend.index(connection, post_id)
+    except Exception as e:
+        logger.error(f"Error actualizando índice de búsqueda para post {post_id}: {e}")
+
+
+# db.create_all() en PostgreSQL crea también la columna del índice (como la migración)
+event.listen(
+    BlogPost.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE blog_posts ADD COLUMN search_vector tsvector; "
+        "CREATE INDEX ix_blog_posts_search_vector ON blog_posts USING GIN (search_vector)"
+    ).execute_if(dialect="postgresql"),
+)
+
+
+@event.listens_for(BlogPost, "after_insert")
+def _index_after_insert(mapper, connection, target):
+    _sync(connection, target.id)
+
+
+@event.listens_for(BlogPost, "after_update")
+def _index_after_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in INDEXED_FIELDS):
+        _sync(connection, target.id)
+
+
+@event.listens_for(BlogPost, "after_delete")
+def _index_after_delete(mapper, connection, target):
+    _sync(connection, target.id, remove=True)
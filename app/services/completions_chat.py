@@ -0,0 +1,230 @@
+# app/services/completions_chat.py
+"""
+Motor alternativo del agente de Telegram: historial local + Chat Completions.
+
+Con la Assistants API cada turno añade idas y vueltas antes del primer
+token (mensaje al thread, creación del run, cola del run). Este motor:
+- guarda cada turno (pregunta y respuesta) en ConversationMessage;
+- construye el contexto en local: instrucciones del agente
+  (fitmaster_agent_prompt.txt), contexto biométrico y una ventana de los
+  últimos mensajes, acotada en número (TELEGRAM_HISTORY_MESSAGES) y en
+  caracteres (TELEGRAM_HISTORY_CHARS);
+- llama a Chat Completions en streaming con las mismas herramientas
+  (assistant_tools) y resuelve las tool calls en bucle.
+
+No tiene file_search: la base de conocimiento del Assistant (vector store)
+solo está disponible en el motor de threads.
+
+Qué motor usa cada usuario: TELEGRAM_CHAT_ENGINE ("assistants" o
+"completions") y TELEGRAM_COMPLETIONS_USERS (ids que usan completions
+aunque el motor por defecto sea assistants).
+"""
+import functools
+import json
+import logging
+import os
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from app import db
+from app.services.answer_cache import answer_cache
+from app.services.assistant_tools import assistant_tools
+from app.services.thread_lifecycle import CONTEXT_HEADER
+
+logger = logging.getLogger(__name__)
+
+ASSISTANTS = "assistants"
+COMPLETIONS = "completions"
+
+
+@functools.lru_cache(maxsize=1)
+def agent_instructions() -> str:
+    """Instrucciones del agente (las mismas que scripts/update_assistant.py sube al Assistant)."""
+    prompt_path = os.path.join(os.path.dirname(__file__), "fitmaster_agent_prompt.txt")
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+class CompletionsChat:
+    """
+    Conversación del agente sobre ConversationMessage y Chat Completions.
+
+    Uso:
+        completions_chat.init_app(app)
+        if completions_chat.uses_completions(user_id):
+            reply = completions_chat.chat(client, query, user_id, context, stream_callback)
+    """
+
+    def __init__(self, flask_app=None):
+        self.default_engine = ASSISTANTS
+        self.completions_users = frozenset()
+        self.model = "gpt-4o-mini"
+        self.history_messages = 20
+        self.history_chars = 12_000
+        self.max_tool_rounds = 3
+        self.max_tokens = 800
+        self.temperature = 0.7
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Config: TELEGRAM_CHAT_ENGINE, TELEGRAM_COMPLETIONS_USERS, TELEGRAM_COMPLETIONS_MODEL, TELEGRAM_HISTORY_*."""
+        config = flask_app.config
+        self.default_engine = config.get("TELEGRAM_CHAT_ENGINE", ASSISTANTS)
+        if self.default_engine not in (ASSISTANTS, COMPLETIONS):
+            raise ValueError(f"TELEGRAM_CHAT_ENGINE desconocido: {self.default_engine}")
+        self.completions_users = frozenset(config.get("TELEGRAM_COMPLETIONS_USERS", ()))
+        self.model = config.get("TELEGRAM_COMPLETIONS_MODEL", "gpt-4o-mini")
+        self.history_messages = config.get("TELEGRAM_HISTORY_MESSAGES", 20)
+        self.history_chars = config.get("TELEGRAM_HISTORY_CHARS", 12_000)
+
+    def uses_completions(self, user_id: int) -> bool:
+        return self.default_engine == COMPLETIONS or user_id in self.completions_users
+
+    # ── Conversación ───────────────────────────────────────────
+    def chat(self, client, query: str, user_id: int, context: Optional[Dict] = None, stream_callback=None) -> str:
+        """
+        Responde a `query` (en streaming si hay callback) y guarda el turno.
+        Los errores de OpenAI se propagan: chat_query los anota en el breaker.
+        """
+        from app.services.fitmaster_service import FitMasterService
+
+        messages = self.build_messages(user_id, query, context)
+        tools = assistant_tools.schemas()
+        reply = ""
+        for round_number in range(self.max_tool_rounds + 1):
+            # En la última vuelta no se ofrecen tools: tiene que responder
+            offer_tools = tools if round_number < self.max_tool_rounds else None
+            text, tool_calls, usage = self._complete(client, messages, offer_tools, stream_callback)
+            if usage:
+                FitMasterService._record_usage(user_id, self.model, usage, channel="telegram")
+            if not tool_calls:
+                reply = text.strip()
+                break
+            messages.append({
+                "role": "assistant",
+                "content": text or None,
+                "tool_calls": [
+                    {"id": call.id, "type": "function",
+                     "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                    for call in tool_calls
+                ],
+            })
+            for output in assistant_tools.execute(user_id, tool_calls):
+                messages.append({"role": "tool", "tool_call_id": output["tool_call_id"], "content": output["output"]})
+
+        if not reply:
+            return "No obtuve una respuesta válida."
+        self.save_turn(user_id, query, reply)
+        return reply
+
+    def _complete(self, client, messages: List[Dict], tools, stream_callback):
+        """Una llamada en streaming: (texto, tool calls, usage)."""
+        kwargs = {}
+        if tools:
+            kwargs["tools"] = tools
+        stream = client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs,
+        )
+
+        text_parts: List[str] = []
+        calls: Dict[int, Dict[str, str]] = {}
+        usage = None
+        for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            for choice in chunk.choices:
+                self._apply_delta(choice.delta, text_parts, calls, stream_callback)
+
+        tool_calls = [
+            SimpleNamespace(id=call["id"], function=SimpleNamespace(name=call["name"], arguments=call["arguments"]))
+            for _, call in sorted(calls.items())
+        ]
+        return "".join(text_parts), tool_calls, usage
+
+    @staticmethod
+    def _apply_delta(delta, text_parts: List[str], calls: Dict[int, Dict[str, str]], stream_callback) -> None:
+        """Acumula el texto y los trozos de tool calls de un delta."""
+        if delta.content:
+            text_parts.append(delta.content)
+            if stream_callback:
+                try:
+                    stream_callback(delta.content)
+                except Exception as cb_err:
+                    logger.error(f"Error en stream_callback: {cb_err}")
+        # Las tool calls llegan troceadas: id y nombre primero, argumentos por partes
+        for part in delta.tool_calls or ():
+            call = calls.setdefault(part.index, {"id": "", "name": "", "arguments": ""})
+            if part.id:
+                call["id"] = part.id
+            if part.function:
+                call["name"] += part.function.name or ""
+                call["arguments"] += part.function.arguments or ""
+
+    # ── Historial ──────────────────────────────────────────────
+    def build_messages(self, user_id: int, query: str, context: Optional[Dict] = None) -> List[Dict]:
+        messages = [{"role": "system", "content": agent_instructions()}]
+        if context:
+            messages.append({
+                "role": "system",
+                "content": CONTEXT_HEADER + json.dumps(context, ensure_ascii=False, default=str),
+            })
+        history = self.history(user_id)
+        if history:
+            # Con conversación previa en el prompt la respuesta no es reutilizable
+            answer_cache.mark_personal("history")
+        messages.extend(history)
+        messages.append({"role": "user", "content": query})
+        return messages
+
+    def history(self, user_id: int) -> List[Dict[str, str]]:
+        """Últimos mensajes del usuario, en orden, dentro de los límites de la ventana."""
+        from app.models.telegram import ConversationMessage
+
+        rows = db.session.execute(
+            db.select(ConversationMessage.role, ConversationMessage.content)
+            .where(ConversationMessage.user_id == user_id)
+            .order_by(ConversationMessage.id.desc())
+            .limit(self.history_messages)
+        ).all()
+
+        window, chars = [], 0
+        for role, content in rows:
+            chars += len(content)
+            if chars > self.history_chars:
+                break
+            window.append({"role": role, "content": content})
+        window.reverse()
+        # La ventana empieza siempre con una pregunta del usuario
+        while window and window[0]["role"] != "user":
+            window.pop(0)
+        return window
+
+    def save_turn(self, user_id: int, query: str, reply: str) -> None:
+        from app.models.telegram import ConversationMessage
+
+        try:
+            db.session.add_all([
+                ConversationMessage(user_id=user_id, role="user", content=query),
+                ConversationMessage(user_id=user_id, role="assistant", content=reply),
+            ])
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"No se pudo guardar el turno de user {user_id}: {e}")
+            db.session.rollback()
+
+    @staticmethod
+    def forget(user_id: int) -> None:
+        """Borra el historial local del usuario (no hace commit)."""
+        from app.models.telegram import ConversationMessage
+
+        ConversationMessage.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+
+completions_chat = CompletionsChat()
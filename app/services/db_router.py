@@ -0,0 +1,156 @@
+# app/services/db_router.py
+"""
+Enrutado de lecturas a la réplica de la base de datos.
+
+Con SQLALCHEMY_REPLICA_URI configurada, la sesión decide en cada query a
+qué engine va:
+
+- Escrituras (flush) → siempre primaria.
+- Peticiones de solo lectura (GET/HEAD/OPTIONS) → réplica.
+- Tras la primera escritura de una petición, el resto de la petición queda
+  fijada a la primaria (lee lo que acaba de escribir). Además se marca la
+  sesión del navegador durante DB_REPLICA_PIN_SECONDS, para que la redirección
+  posterior al POST tampoco lea de una réplica con retraso.
+- Marcado explícito:
+      Model.query.execution_options(replica=True)    # esta query, a la réplica
+      with db_router.replica(): ...                  # este bloque, a la réplica
+      with db_router.primary(): ...                  # este bloque, a la primaria
+      @use_primary                                   # esta vista GET, a la primaria
+
+Sin réplica configurada todo va a la primaria y nada de esto tiene efecto.
+
+Ojo: los objetos leídos de la réplica comparten identity map con los de la
+primaria. Si tras escribir se necesita el valor actual de un objeto ya
+cargado, usar db.session.refresh(obj).
+
+Este módulo no importa `app`: RoutingSession se usa al crear `db`.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = "replica"
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_FORCE_KEY = "db_router_force"  # Pila de "replica"/"primary" (context managers)
+_PINNED_KEY = "db_router_pinned"  # Esta petición ya escribió
+_PIN_COOKIE_KEY = "_db_primary_until"  # Clave en la sesión de Flask
+
+
+class DatabaseRouter:
+    """
+    Decide si una lectura puede ir a la réplica.
+
+    Uso:
+        db_router.init_app(app)
+    """
+
+    def __init__(self, flask_app=None):
+        self.enabled = False
+        self.pin_seconds = 5
+
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Activa el enrutado si hay réplica (bind 'replica' en SQLALCHEMY_BINDS)."""
+        self.enabled = REPLICA_BIND in (flask_app.config.get("SQLALCHEMY_BINDS") or {})
+        self.pin_seconds = flask_app.config.get("DB_REPLICA_PIN_SECONDS", 5)
+        flask_app.extensions["db_router"] = self
+
+        if self.enabled:
+            flask_app.before_request(self._start_request)
+            logger.info("Réplica de lectura activada")
+
+    # ── Estado por petición ────────────────────────────────────
+    def _start_request(self):
+        from app import db
+
+        # La sesión puede sobrevivir entre peticiones dentro de un mismo app context (tests)
+        info = db.session().info
+        info.pop(_FORCE_KEY, None)
+        until = flask_session.get(_PIN_COOKIE_KEY)
+        if until and until > time.time():
+            info[_PINNED_KEY] = True
+        else:
+            info.pop(_PINNED_KEY, None)
+            if until:
+                flask_session.pop(_PIN_COOKIE_KEY, None)
+
+    def pin(self, session) -> None:
+        """Fija la sesión (y las próximas peticiones del navegador) a la primaria."""
+        session.info[_PINNED_KEY] = True
+        if has_request_context() and self.pin_seconds:
+            flask_session[_PIN_COOKIE_KEY] = time.time() + self.pin_seconds
+
+    def use_replica(self, session, clause=None) -> bool:
+        """True si la lectura en curso puede ir a la réplica."""
+        if not self.enabled or session._flushing or session.info.get(_PINNED_KEY):
+            return False
+
+        forced = session.info.get(_FORCE_KEY)
+        if forced:
+            return forced[-1] == "replica"
+
+        options = getattr(clause, "_execution_options", None) or {}
+        if "replica" in options:
+            return bool(options["replica"])
+
+        return has_request_context() and request.method in READ_ONLY_METHODS
+
+    # ── Marcado explícito ──────────────────────────────────────
+    @contextmanager
+    def _force(self, target):
+        from app import db
+
+        stack = db.session().info.setdefault(_FORCE_KEY, [])
+        stack.append(target)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def replica(self):
+        """Context manager: las lecturas del bloque van a la réplica."""
+        return self._force("replica")
+
+    def primary(self):
+        """Context manager: todo el bloque va a la primaria."""
+        return self._force("primary")
+
+
+db_router = DatabaseRouter()
+
+
+def use_primary(view):
+    """Decorador para vistas GET que escriben o necesitan leer lo último escrito."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with db_router.primary():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(FlaskSession):
+    """Sesión de Flask-SQLAlchemy que envía las lecturas a la réplica cuando procede."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engines = self._db.engines
+        # Solo se enrutan las tablas de la bind por defecto
+        if bind is None and engine is engines.get(None) and db_router.use_replica(self, clause):
+            return engines[REPLICA_BIND]
+        return engine
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_after_write(session, flush_context):
+    if db_router.enabled:
+        db_router.pin(session)
@@ -1,10 +1,35 @@
+import itertools
 import json
 import logging
 import os
 import re
-from typing import Dict, Optional
-from openai import OpenAI
+import time
+from types import SimpleNamespace
+from typing import Dict, Optional, Tuple
+from flask import current_app, has_app_context
+from openai import BadRequestError, OpenAI
 from app import db
+from app.models.telegram import CANCELLABLE_RUN_STATUSES
+from app.services.answer_cache import answer_cache
+from app.services.assistant_tools import assistant_tools
+from app.services.completions_chat import completions_chat
+from app.services.thread_lifecycle import thread_lifecycle
+from app.services.llm_quota import QuotaExceededError, llm_quota
+from app.services.usage_recorder import usage_recorder
+from app.services.openai_resilience import (
+    CircuitOpenError,
+    hedged,
+    is_upstream_failure,
+    openai_breaker,
+)
+from app.services.openai_governor import (
+    BACKGROUND,
+    INTERACTIVE,
+    OpenAIBusyError,
+    estimate_tokens,
+    openai_governor,
+)
+from app.utils.streaming_json import StreamingJSONParser
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -25,7 +50,12 @@ def _get_openai_client() -> Optional[OpenAI]:
 
     try:
         logger.info("Inicializando cliente OpenAI...")
-        return OpenAI(api_key=api_key)
+        # Valores por defecto; análisis y chat fijan su propio plazo por llamada
+        return OpenAI(
+            api_key=api_key,
+            timeout=float(os.getenv("OPENAI_TIMEOUT", "60")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "2")),
+        )
     except Exception as e:
         logger.error(f"Error al inicializar cliente OpenAI: {e}")
         return None
@@ -33,20 +63,44 @@ def _get_openai_client() -> Optional[OpenAI]:
 
 client = _get_openai_client()
 
+# model_version de las respuestas que no vienen de OpenAI (errores y modo degradado)
+FALLBACK_MODEL_VERSION = "fitmaster-fallback"
+FALLBACK_PREFIX = "No se pudo conectar con FitMaster AI."
+# Respuesta de chat cuando el modelo no devuelve texto (no se guarda en answer_cache)
+NO_REPLY_PREFIX = "No obtuve una respuesta válida"
+
+# Campos del análisis que usan las interpretaciones locales (build_interpretations_for_record)
+INTERPRETATION_FIELDS = (
+    "gender", "age", "bmi", "ffmi", "body_fat_percentage",
+    "waist_hip_ratio", "waist_height_ratio", "metabolic_age",
+)
+
+
+def _setting(name: str, default):
+    """Valor de configuración de la app, o `default` fuera de contexto de aplicación."""
+    return current_app.config.get(name, default) if has_app_context() else default
+
 
 class FitMasterService:
     """
     Servicio para analizar resultados biométricos con GPT-4o (FitMaster AI)
     """
 
+    # Tokens máximos de la respuesta del análisis (también cuentan para el TPM)
+    ANALYSIS_MAX_TOKENS = 2600
+
     @staticmethod
-    def analyze_bio_results(bio_payload: Dict) -> Optional[Dict]:
+    def analyze_bio_results(bio_payload: Dict, priority: str = BACKGROUND, on_field=None) -> Optional[Dict]:
         """
         Envía los resultados del análisis biométrico a GPT-4o y devuelve la interpretación, plan de nutrición y entrenamiento.
         Args:
             bio_payload: Diccionario con los datos biométricos del usuario
+            priority: Clase de prioridad en el gobernador de OpenAI
+            on_field: Callback opcional (nombre, valor) por cada campo de la respuesta en cuanto se cierra
         Returns:
             Dict con interpretación, nutrition_plan y training_plan, o None si hay error
+        Raises:
+            QuotaExceededError: el usuario ha agotado su presupuesto de LLM (no se llama a OpenAI)
         """
         if not client:
             logger.error("Cliente OpenAI no está disponible")
@@ -59,81 +113,171 @@ class FitMasterService:
             return FitMasterService._get_fallback_response(
                 "Datos biométricos no válidos"
             )
+        llm_quota.check(bio_payload.get("user_id"))
         prompt = FitMasterService._build_prompt(bio_payload)
 
         try:
             modelo_usado = "gpt-4o-mini"
             logger.info(f"Enviando solicitud a OpenAI. Modelo: {modelo_usado}")
-            response = client.chat.completions.create(
-                model=modelo_usado,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Eres FitMaster, IA experta en fitness y nutrición.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.7,
-                max_tokens=2600,
-            )
-
-            # Registrar consumo si hay usage disponible
-            logger.info(f"Verificando registro de tokens - hasattr(response, 'usage'): {hasattr(response, 'usage')}")
-            if hasattr(response, 'usage'):
-                logger.info(f"response.usage existe: {response.usage}")
-            
-            if hasattr(response, 'usage') and response.usage:
-                # Extraemos user_id del payload biométrico si existe para poder vincularlo
-                user_id = bio_payload.get('user_id', 0)
-                logger.info(f"user_id extraído del bio_payload: {user_id}")
-                if user_id > 0:
-                    logger.info(f"Registrando uso de tokens para user_id={user_id}, model={modelo_usado}")
-                    FitMasterService._record_usage(user_id, modelo_usado, response.usage, channel="web")
-                    logger.info("✓ Tokens registrados exitosamente")
-                else:
-                    logger.warning(f"⚠️ user_id no válido en bio_payload: {user_id}")
-            else:
-                logger.warning("⚠️ response.usage no disponible o vacío")
-
-            # Extraer y normalizar respuesta
-            message = response.choices[0].message.content
-            logger.info("Respuesta recibida de OpenAI")
-            logger.info(f"Respuesta cruda de OpenAI: {message[:200]}...")
+            system_prompt = "Eres FitMaster, IA experta en fitness y nutrición."
+            with openai_breaker.guard(), openai_governor.slot(
+                priority,
+                tokens=estimate_tokens(system_prompt, prompt) + FitMasterService.ANALYSIS_MAX_TOKENS,
+                key=bio_payload.get("user_id"),
+            ):
+                parser, usage = FitMasterService._stream_analysis(
+                    on_field,
+                    model=modelo_usado,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": system_prompt,
+                        },
+                        {"role": "user", "content": prompt},
+                    ],
+                    temperature=0.7,
+                    max_tokens=FitMasterService.ANALYSIS_MAX_TOKENS,
+                )
 
-            # Limpiar respuesta de OpenAI
-            cleaned_message = FitMasterService._clean_json_response(message)
+                FitMasterService._record_analysis_usage(bio_payload.get('user_id', 0), modelo_usado, usage)
 
-            # Intentar parsear JSON
-            try:
-                data = json.loads(cleaned_message)
+            # Normalizar respuesta: JSON completo, campos recuperados o texto tal cual
+            data = parser.close()
+            logger.info(f"Respuesta cruda de OpenAI: {parser.text[:200]}...")
+            if parser.complete:
                 logger.info("Respuesta JSON parseada correctamente")
                 return FitMasterService._validate_response(data)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Error al parsear JSON de OpenAI: {e}")
-                logger.warning(f"Respuesta que causó el error: {message[:500]}")
-                return {
-                    "interpretation": (
-                        message if message else "No se recibió respuesta de OpenAI"
-                    ),
-                    "nutrition_plan": None,
-                    "training_plan": None,
-                }
+            if data.get("interpretation"):
+                logger.warning(f"JSON de OpenAI incompleto o malformado; campos recuperados: {', '.join(data)}")
+                return FitMasterService._validate_response(data)
+
+            logger.warning(f"Respuesta de OpenAI sin JSON utilizable: {parser.text[:500]}")
+            message = re.sub(r"```(?:json)?", "", parser.text).strip()
+            return {
+                "interpretation": (
+                    message if message else "No se recibió respuesta de OpenAI"
+                ),
+                "nutrition_plan": None,
+                "training_plan": None,
+            }
+        except CircuitOpenError as exc:
+            logger.warning(f"Análisis FitMaster en modo degradado: {exc}")
+            return FitMasterService._degraded_analysis(bio_payload)
+        except OpenAIBusyError as exc:
+            logger.warning(f"Análisis FitMaster no encolado: {exc}")
+            return FitMasterService._get_fallback_response(
+                "FitMaster tiene mucha demanda ahora mismo; vuelve a solicitar el análisis en unos minutos"
+            )
         except Exception as exc:
             logger.error(f"Error en la conexión con OpenAI: {exc}")
             logger.error(f"Tipo de excepción: {type(exc)}")
+            if is_upstream_failure(exc):
+                return FitMasterService._degraded_analysis(bio_payload)
             return FitMasterService._get_fallback_response(
                 f"Error de conexión: {str(exc)}"
             )
 
+    @staticmethod
+    def _record_analysis_usage(user_id: int, model: str, usage) -> None:
+        """Registra el consumo del análisis (último fragmento del stream, con include_usage)."""
+        if not usage:
+            logger.warning("⚠️ usage no disponible en el stream del análisis")
+        elif user_id > 0:
+            logger.info(f"Registrando uso de tokens para user_id={user_id}, model={model}")
+            FitMasterService._record_usage(user_id, model, usage, channel="web")
+        else:
+            logger.warning(f"⚠️ user_id no válido en bio_payload: {user_id}")
+
+    @staticmethod
+    def _stream_analysis(on_field=None, **kwargs) -> Tuple[StreamingJSONParser, object]:
+        """
+        Pide el análisis en streaming y pasa los deltas por StreamingJSONParser;
+        `on_field(nombre, valor)` recibe cada campo de primer nivel en cuanto se
+        cierra (la interpretación antes de que terminen los planes).
+
+        Todo dentro de OPENAI_ANALYSIS_TIMEOUT segundos y sin reintentos del SDK:
+        si OPENAI_HEDGE_AFTER > 0 y el primer fragmento tarda más, un segundo
+        intento cubre al primero (ver openai_resilience.hedged). Si el plazo vence
+        a mitad del stream, se devuelve lo recibido y el parser recupera lo que
+        pueda.
+
+        Returns:
+            (parser, usage)
+        """
+        api = client
+        deadline = _setting("OPENAI_ANALYSIS_TIMEOUT", 60)
+        started = time.monotonic()
+
+        def attempt(timeout: float):
+            stream = api.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                stream=True, stream_options={"include_usage": True}, **kwargs
+            )
+            try:
+                return stream, next(stream, None)
+            except BaseException:
+                stream.close()
+                raise
+
+        stream, first = hedged(
+            attempt,
+            deadline=deadline,
+            hedge_after=_setting("OPENAI_HEDGE_AFTER", 0),
+            discard=lambda result: result[0].close(),
+        )
+        with stream:
+            return FitMasterService._read_analysis_stream(
+                itertools.chain((first,) if first else (), stream), on_field, started, deadline
+            )
+
+    @staticmethod
+    def _read_analysis_stream(chunks, on_field, started: float, deadline: float) -> Tuple[StreamingJSONParser, object]:
+        """Pasa los fragmentos por el parser hasta el final del stream o hasta vencer el plazo."""
+        parser, usage = StreamingJSONParser(), None
+        for chunk in chunks:
+            if chunk.usage:
+                usage = chunk.usage
+            for choice in chunk.choices:
+                FitMasterService._emit_fields(parser.feed(choice.delta.content or ""), on_field)
+            if time.monotonic() - started > deadline:
+                if not parser.fields and not parser.text:
+                    raise TimeoutError(f"El análisis superó el plazo de {deadline:.0f} s")
+                logger.warning(f"Análisis cortado al vencer el plazo de {deadline:.0f} s")
+                break
+        return parser, usage
+
+    @staticmethod
+    def _emit_fields(fields, on_field) -> None:
+        if not on_field:
+            return
+        for name, value in fields:
+            try:
+                on_field(name, value)
+            except Exception as cb_err:
+                logger.error(f"Error en on_field: {cb_err}")
+
     # ── Assistants API config ──────────────────────────────────
     ASSISTANT_ID = os.getenv(
         "OPENAI_ASSISTANT_ID", "asst_h2VGSmUO36ONu9Wf8am36oBT"
     )
 
+    # Estimaciones para el gobernador: el run lee el historial del thread y
+    # los resultados de file_search, así que se reserva más que la consulta;
+    # el consumo real se corrige al registrar el usage del run.
+    CHAT_TOKENS_ESTIMATE = 4000
+    # Peticiones por turno (sin contar cancelaciones, tools ni la creación del thread):
+    # messages.create + runs.stream; en polling, create_and_poll sondea con al menos
+    # un retrieve y la respuesta se lee con messages.list; el motor completions
+    # hace una petición por ronda.
+    CHAT_REQUESTS_ESTIMATE = 2
+    CHAT_POLLING_REQUESTS_ESTIMATE = 4
+    COMPLETIONS_REQUESTS_ESTIMATE = 1
+
     @staticmethod
     def chat_query(query: str, user_id: int, context: Optional[Dict] = None, stream_callback=None) -> str:
         """
-        Maneja consultas via Assistants API con threads persistentes y RAG.
+        Maneja consultas via Assistants API con threads persistentes y RAG, o
+        con historial local y Chat Completions si el usuario usa ese motor
+        (TELEGRAM_CHAT_ENGINE / TELEGRAM_COMPLETIONS_USERS).
         
         Args:
             query: Consulta del usuario
@@ -150,184 +294,210 @@ class FitMasterService:
             return "No se encontró tu vinculación de Telegram."
 
         try:
-            # 1. Obtener o crear Thread
-            thread_id = link.openai_thread_id
-            if not thread_id:
-                thread = client.beta.threads.create()
-                thread_id = thread.id
-                link.openai_thread_id = thread_id
-                db.session.commit()
-                logger.info(f"Nuevo thread creado para user {user_id}: {thread_id}")
-
-                # Inyectar contexto biométrico como primer mensaje del thread
-                # NO ejecutar un run aquí — el asistente lo leerá con el run principal
-                if context:
-                    context_msg = (
-                        "CONTEXTO DEL BACKEND CoachBodyFit360 — "
-                        "Estos son los datos biométricos actuales del cliente. "
-                        "Úsalos como referencia. Para planes de nutrición y "
-                        "entrenamiento SIEMPRE usa las herramientas get_current_plans() "
-                        "y get_user_history().\n\n"
-                        f"{json.dumps(context, ensure_ascii=False, indent=2)}"
-                    )
-                    client.beta.threads.messages.create(
-                        thread_id=thread_id,
-                        role="user",
-                        content=context_msg,
-                    )
-                    logger.info(f"Contexto biométrico inyectado en thread {thread_id}")
+            llm_quota.check(user_id)
+        except QuotaExceededError as e:
+            return str(e)
+
+        # Pregunta frecuente con respuesta reutilizable: sin lanzar el turno
+        turn = answer_cache.lookup(query, user_id, context)
+        if turn.reply is not None:
+            if completions_chat.uses_completions(user_id):
+                completions_chat.save_turn(user_id, query, turn.reply)
+            return turn.reply
+
+        # Hueco interactivo para toda la conversación (thread, mensajes y run)
+        context_text = json.dumps(context, ensure_ascii=False) if context else ""
+        # Plazo por petición (en streaming, también entre eventos del stream)
+        api = client.with_options(timeout=_setting("OPENAI_CHAT_TIMEOUT", 30))
+        try:
+            with openai_breaker.guard(), openai_governor.slot(
+                INTERACTIVE,
+                tokens=estimate_tokens(query, context_text) + FitMasterService.CHAT_TOKENS_ESTIMATE,
+                requests=FitMasterService._chat_requests_estimate(user_id, stream_callback),
+                key=user_id,
+            ), answer_cache.recording(turn):
+                if completions_chat.uses_completions(user_id):
+                    reply = completions_chat.chat(api, query, user_id, context, stream_callback)
+                else:
+                    reply = FitMasterService._run_chat_query(api, query, user_id, link, context, stream_callback)
+            FitMasterService._save_run_state(link)
+            if not reply.startswith(NO_REPLY_PREFIX):
+                answer_cache.store(turn, reply)
+            return reply
+        except CircuitOpenError as e:
+            logger.warning(f"Chat de user {user_id} en modo degradado: {e}")
+            return FitMasterService._degraded_chat_reply(user_id)
+        except OpenAIBusyError as e:
+            logger.warning(f"Consulta de chat no encolada para user {user_id}: {e}")
+            return "FitMaster está atendiendo muchas consultas ahora mismo. Inténtalo de nuevo en un minuto."
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error en FitMaster chat_query: {type(e).__name__}: {e}", exc_info=True)
+            if is_upstream_failure(e):
+                return FitMasterService._degraded_chat_reply(user_id)
+            return f"Lo siento, tuve un problema al procesar tu consulta. Error: {type(e).__name__}"
 
-            # 2. Cancelar runs activos/fallidos para evitar BadRequestError
+    @staticmethod
+    def _chat_requests_estimate(user_id: int, stream_callback) -> int:
+        """Peticiones a OpenAI que se reservan en el gobernador para un turno de chat."""
+        if completions_chat.uses_completions(user_id):
+            return FitMasterService.COMPLETIONS_REQUESTS_ESTIMATE
+        if stream_callback:
+            return FitMasterService.CHAT_REQUESTS_ESTIMATE
+        return FitMasterService.CHAT_POLLING_REQUESTS_ESTIMATE
+
+    @staticmethod
+    def _run_chat_query(api: OpenAI, query: str, user_id: int, link, context: Optional[Dict], stream_callback) -> str:
+        """Cuerpo de chat_query con la Assistants API, ya con hueco concedido por el gobernador."""
+        # 1. Obtener o crear Thread (rotándolo si el último run pasó del presupuesto de prompt)
+        thread_id = link.openai_thread_id
+        if thread_id:
+            # Turnos previos (o su resumen, al rotar) en el prompt: respuesta no reutilizable
+            answer_cache.mark_personal("history")
+        if thread_lifecycle.should_roll_over(link):
+            thread_id = thread_lifecycle.roll_over(api, link, context)
+        elif not thread_id:
+            # El contexto biométrico va como primer mensaje del thread, en la misma petición
+            # NO ejecutar un run aquí — el asistente lo leerá con el run principal
+            thread_id = thread_lifecycle.open_thread(api, link, context)
+            logger.info(f"Nuevo thread creado para user {user_id}: {thread_id}")
+
+        # 2. Cancelar el run anterior solo si sabemos que sigue activo (y no se pidió ya)
+        if link.has_cancellable_run:
             try:
-                runs = client.beta.threads.runs.list(thread_id=thread_id, limit=5)
-                for r in runs.data:
-                    if r.status in ('in_progress', 'requires_action', 'queued'):
-                        logger.warning(f"Cancelando run {r.id} en estado {r.status}")
-                        client.beta.threads.runs.cancel(thread_id=thread_id, run_id=r.id)
+                logger.warning(f"Cancelando run {link.openai_run_id} en estado {link.openai_run_status}")
+                api.beta.threads.runs.cancel(thread_id=thread_id, run_id=link.openai_run_id)
             except Exception as cancel_err:
-                logger.warning(f"Error cancelando runs previos: {cancel_err}")
+                logger.warning(f"Error cancelando run previo: {cancel_err}")
+            FitMasterService._track_run(link, link.openai_run_id, "cancelling")
 
-            # 3. Enviar mensaje del usuario al thread
-            client.beta.threads.messages.create(
+        # 3. Enviar mensaje del usuario al thread
+        try:
+            api.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=query,
+            )
+        except BadRequestError as busy_err:
+            # Run activo que no registramos (worker caído a mitad de run, estado previo
+            # a este registro...): se buscan y cancelan como antes y se reintenta una vez
+            logger.warning(f"Thread {thread_id} ocupado ({busy_err}); cancelando runs activos")
+            FitMasterService._cancel_active_runs(api, thread_id)
+            api.beta.threads.messages.create(
                 thread_id=thread_id,
                 role="user",
                 content=query,
             )
 
-            # 4. Ejecutar el Assistant con streaming si hay callback
-            if stream_callback:
-                return FitMasterService._handle_streaming_run(
-                    thread_id, user_id, stream_callback
+        # 4. Ejecutar el Assistant con streaming si hay callback
+        if stream_callback:
+            return FitMasterService._handle_streaming_run(
+                api, thread_id, user_id, stream_callback, link=link
+            )
+        else:
+            # Modo sin streaming (polling)
+            run = api.beta.threads.runs.create_and_poll(
+                thread_id=thread_id,
+                assistant_id=FitMasterService.ASSISTANT_ID,
+                timeout=60,
+            )
+            FitMasterService._track_run(link, run.id, run.status)
+
+            # 3.5. Manejar tool calls (FASE 3: Agent Tools)
+            while run.status == 'requires_action':
+                # Tools registradas en assistant_tools (en paralelo y memoizadas)
+                tool_outputs = assistant_tools.execute(
+                    user_id, run.required_action.submit_tool_outputs.tool_calls
                 )
-            else:
-                # Modo sin streaming (polling)
-                run = client.beta.threads.runs.create_and_poll(
+
+                # Enviar los resultados de las tools al Assistant
+                run = api.beta.threads.runs.submit_tool_outputs_and_poll(
                     thread_id=thread_id,
-                    assistant_id=FitMasterService.ASSISTANT_ID,
-                    timeout=60,
+                    run_id=run.id,
+                    tool_outputs=tool_outputs,
                 )
+                FitMasterService._track_run(link, run.id, run.status)
 
-                # 3.5. Manejar tool calls (FASE 3: Agent Tools)
-                while run.status == 'requires_action':
-                    tool_calls = run.required_action.submit_tool_outputs.tool_calls
-                    tool_outputs = []
-                    
-                    for tool_call in tool_calls:
-                        function_name = tool_call.function.name
-                        arguments = json.loads(tool_call.function.arguments)
-                        
-                        logger.info(f"Asistente llamando a función: {function_name} con argumentos: {arguments}")
-                        
-                        try:
-                            # Despachador de funciones
-                            if function_name == "get_user_history":
-                                output = FitMasterService._tool_get_user_history(user_id, arguments)
-                            elif function_name == "get_current_plans":
-                                output = FitMasterService._tool_get_current_plans(user_id)
-                            else:
-                                output = json.dumps({"error": f"Unknown function: {function_name}"})
-                                
-                        except Exception as e:
-                            logger.error(f"Error ejecutando tool {function_name}: {e}", exc_info=True)
-                            output = json.dumps({"error": str(e)})
-                            
-                        # Validar que output es string (requerido por API de OpenAI)
-                        if not isinstance(output, str):
-                            output = json.dumps(output)
-                            
-                        tool_outputs.append({
-                            "tool_call_id": tool_call.id,
-                            "output": output
-                        })
-                    
-                    # Enviar los resultados de las tools al Assistant
-                    run = client.beta.threads.runs.submit_tool_outputs_and_poll(
-                        thread_id=thread_id,
-                        run_id=run.id,
-                        tool_outputs=tool_outputs,
-                    )
+            if run.status != "completed":
+                logger.error(f"Assistant run failed: {run.status} — {run.last_error}")
+                return "Lo siento, tuve un problema al procesar tu consulta."
 
-                if run.status != "completed":
-                    logger.error(f"Assistant run failed: {run.status} — {run.last_error}")
-                    return "Lo siento, tuve un problema al procesar tu consulta."
+            # 4. Extraer el último mensaje del asistente
+            messages = api.beta.threads.messages.list(
+                thread_id=thread_id, order="desc", limit=1
+            )
+            reply = ""
+            for msg in messages.data:
+                if msg.role == "assistant":
+                    for block in msg.content:
+                        if block.type == "text":
+                            reply = block.text.value
+                    break
 
-                # 4. Extraer el último mensaje del asistente
-                messages = client.beta.threads.messages.list(
-                    thread_id=thread_id, order="desc", limit=1
-                )
-                reply = ""
-                for msg in messages.data:
-                    if msg.role == "assistant":
-                        for block in msg.content:
-                            if block.type == "text":
-                                reply = block.text.value
-                        break
+            if not reply:
+                reply = f"{NO_REPLY_PREFIX}. Intenta de nuevo."
 
-                if not reply:
-                    reply = "No obtuve una respuesta válida. Intenta de nuevo."
+            # 5. Limpiar anotaciones de file_search (citas [0†source])
+            import re
+            reply = re.sub(r'【\d+[:\u2020†].*?】', '', reply).strip()
 
-                # 5. Limpiar anotaciones de file_search (citas [0†source])
-                import re
-                reply = re.sub(r'【\d+[:\u2020†].*?】', '', reply).strip()
+            # 6. Registrar consumo
+            if run.usage:
+                thread_lifecycle.observe(link, run.usage.prompt_tokens or 0)
+                FitMasterService._record_usage(user_id, "assistants-api", run.usage)
 
-                # 6. Registrar consumo
-                if run.usage:
-                    FitMasterService._record_usage(user_id, "assistants-api", run.usage)
+            return reply
 
-                return reply
+    @staticmethod
+    def _track_run(link, run_id: str, status: str) -> None:
+        """Anota el run actual del thread en el vínculo; se guarda al final del turno (_save_run_state)."""
+        link.record_run(run_id, status)
 
+    @staticmethod
+    def _save_run_state(link) -> None:
+        """Un solo commit por turno con el último run y el consumo del thread, si cambiaron."""
+        if not db.session.is_modified(link):
+            return
+        try:
+            db.session.commit()
         except Exception as e:
-            logger.error(f"Error en FitMaster Assistants chat_query: {type(e).__name__}: {e}", exc_info=True)
-            return f"Lo siento, tuve un problema al procesar tu consulta. Error: {type(e).__name__}"
+            logger.warning(f"No se pudo guardar el estado del run {link.openai_run_id}: {e}")
+            db.session.rollback()
 
     @staticmethod
-    def _handle_streaming_run(thread_id: str, user_id: int, stream_callback) -> str:
+    def _cancel_active_runs(api: OpenAI, thread_id: str) -> None:
+        """Busca runs activos del thread en OpenAI y los cancela (camino lento)."""
+        try:
+            runs = api.beta.threads.runs.list(thread_id=thread_id, limit=5)
+            for r in runs.data:
+                if r.status in CANCELLABLE_RUN_STATUSES:
+                    logger.warning(f"Cancelando run {r.id} en estado {r.status}")
+                    api.beta.threads.runs.cancel(thread_id=thread_id, run_id=r.id)
+        except Exception as cancel_err:
+            logger.warning(f"Error cancelando runs previos: {cancel_err}")
+
+    @staticmethod
+    def _handle_streaming_run(api: OpenAI, thread_id: str, user_id: int, stream_callback, link=None) -> str:
         """
         Maneja la ejecución del assistant con streaming.
         Usa submit_tool_outputs_stream para continuar el stream tras tool calls.
         El texto acumulado se comparte entre el stream principal y los sub-streams.
+        Los eventos thread.run.* actualizan el estado del run en `link`.
         """
-        full_response_container = {"text": "", "run_id": None}
-
-        def _execute_tools(tool_calls) -> list:
-            """Ejecuta las tool calls y devuelve los outputs."""
-            tool_outputs = []
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                try:
-                    arguments = json.loads(tool_call.function.arguments)
-                except Exception:
-                    arguments = {}
-
-                logger.info(f"[Stream] Tool call: {function_name}")
-
-                try:
-                    if function_name == "get_user_history":
-                        output = FitMasterService._tool_get_user_history(user_id, arguments)
-                    elif function_name == "get_current_plans":
-                        output = FitMasterService._tool_get_current_plans(user_id)
-                    else:
-                        output = json.dumps({"error": f"Unknown function: {function_name}"})
-                except Exception as e:
-                    logger.error(f"Error en tool {function_name}: {e}", exc_info=True)
-                    output = json.dumps({"error": str(e)})
-
-                if not isinstance(output, str):
-                    output = json.dumps(output)
-
-                tool_outputs.append({
-                    "tool_call_id": tool_call.id,
-                    "output": output
-                })
-            return tool_outputs
+        full_response_container = {"text": "", "run_id": None, "usage": None}
 
         def _process_stream(stream_obj):
             """Procesa un stream de eventos, manejando tool calls recursivamente."""
             for event in stream_obj:
-                # Capturar run_id para obtener usage después
-                if hasattr(event, 'data') and hasattr(event.data, 'id'):
+                # Estado del run (thread.run.created, .requires_action, .completed...); el
+                # evento terminal trae el usage del run, sin pedirlo luego con runs.retrieve
+                if event.event.startswith('thread.run.') and not event.event.startswith('thread.run.step.'):
                     full_response_container["run_id"] = event.data.id
-                
+                    if link is not None:
+                        FitMasterService._track_run(link, event.data.id, event.data.status)
+                    if event.data.usage:
+                        full_response_container["usage"] = event.data.usage
+
                 if event.event == 'thread.message.delta':
                     for content in event.data.delta.content:
                         if hasattr(content, 'text') and hasattr(content.text, 'value'):
@@ -341,12 +511,11 @@ class FitMasterService:
 
                 elif event.event == 'thread.run.requires_action':
                     run_id = event.data.id
-                    full_response_container["run_id"] = run_id
                     tool_calls = event.data.required_action.submit_tool_outputs.tool_calls
-                    tool_outputs = _execute_tools(tool_calls)
+                    tool_outputs = assistant_tools.execute(user_id, tool_calls)
 
                     # Abrir un nuevo stream para continuar tras las tool calls
-                    with client.beta.threads.runs.submit_tool_outputs_stream(
+                    with api.beta.threads.runs.submit_tool_outputs_stream(
                         thread_id=thread_id,
                         run_id=run_id,
                         tool_outputs=tool_outputs,
@@ -354,7 +523,7 @@ class FitMasterService:
                         _process_stream(tool_stream)
 
         try:
-            with client.beta.threads.runs.stream(
+            with api.beta.threads.runs.stream(
                 thread_id=thread_id,
                 assistant_id=FitMasterService.ASSISTANT_ID,
             ) as stream:
@@ -363,21 +532,16 @@ class FitMasterService:
             final_text = re.sub(r'【\d+[:\u2020†].*?】', '', full_response_container["text"]).strip()
             
             # Registrar consumo de tokens después del streaming
-            run_id = full_response_container.get("run_id")
-            if run_id:
-                try:
-                    run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
-                    if run.usage:
-                        logger.info(f"[Streaming] Registrando tokens para run_id={run_id}")
-                        FitMasterService._record_usage(user_id, "gpt-4o-mini", run.usage, channel="telegram")
-                    else:
-                        logger.warning(f"[Streaming] run.usage no disponible para run_id={run_id}")
-                except Exception as usage_err:
-                    logger.error(f"[Streaming] Error obteniendo usage: {usage_err}", exc_info=True)
+            usage = full_response_container["usage"]
+            if usage:
+                if link is not None:
+                    thread_lifecycle.observe(link, usage.prompt_tokens or 0)
+                logger.info(f"[Streaming] Registrando tokens para run_id={full_response_container['run_id']}")
+                FitMasterService._record_usage(user_id, "gpt-4o-mini", usage, channel="telegram")
             else:
-                logger.warning("[Streaming] No se capturó run_id, no se puede registrar consumo")
-            
-            return final_text if final_text else "No obtuve una respuesta válida."
+                logger.warning(f"[Streaming] El run {full_response_container['run_id']} terminó sin usage")
+
+            return final_text if final_text else f"{NO_REPLY_PREFIX}."
 
         except Exception as e:
             logger.error(f"Error crítico en streaming: {type(e).__name__}: {e}", exc_info=True)
@@ -385,56 +549,19 @@ class FitMasterService:
 
     @staticmethod
     def _record_usage(user_id: int, model: str, usage_obj, channel: str = "telegram") -> None:
-        """Registra el consumo de tokens en el ledger."""
-        from app.models.telegram import LLMUsageLedger
+        """Encola el consumo de tokens para el ledger (se escribe en segundo plano) y lo suma a la cuota."""
         try:
-            logger.info(f"[_record_usage] Iniciando registro - user_id={user_id}, model={model}, channel={channel}")
-            logger.info(f"[_record_usage] Tipo de usage_obj: {type(usage_obj)}")
-            
-            if isinstance(usage_obj, dict):
-                prompt_tokens = usage_obj.get('prompt_tokens', 0) or 0
-                completion_tokens = usage_obj.get('completion_tokens', 0) or 0
-                total_tokens = usage_obj.get('total_tokens', 0) or 0
-            else:
-                prompt_tokens = getattr(usage_obj, 'prompt_tokens', 0) or 0
-                completion_tokens = getattr(usage_obj, 'completion_tokens', 0) or 0
-                total_tokens = getattr(usage_obj, 'total_tokens', 0) or 0
-
-            logger.info(f"[_record_usage] Tokens extraídos - prompt: {prompt_tokens}, completion: {completion_tokens}, total: {total_tokens}")
-
-            # Costes estimados gpt-4o-mini
-            prompt_cost = (prompt_tokens / 1_000_000) * 0.15
-            completion_cost = (completion_tokens / 1_000_000) * 0.60
-
-            logger.info(f"[_record_usage] Costes calculados - prompt: ${prompt_cost:.6f}, completion: ${completion_cost:.6f}")
-
-            entry = LLMUsageLedger(
-                user_id=user_id,
-                model_name=model,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                total_tokens=total_tokens,
-                cost_usd=prompt_cost + completion_cost,
-                channel=channel
-            )
-            logger.info(f"[_record_usage] Añadiendo entry a la sesión...")
-            db.session.add(entry)
-            
-            logger.info(f"[_record_usage] Ejecutando flush...")
-            db.session.flush()
-            
-            logger.info(f"[_record_usage] Ejecutando commit...")
-            db.session.commit()
-            
-            logger.info(f"[_record_usage] ✓✓✓ Registro guardado en BD exitosamente - ID: {entry.id}")
+            total_tokens = (
+                usage_obj.get("total_tokens") if isinstance(usage_obj, dict)
+                else getattr(usage_obj, "total_tokens", 0)
+            ) or 0
+            # Consumo real frente a lo reservado en el gobernador
+            openai_governor.settle(total_tokens)
+            row = usage_recorder.record(user_id, model, usage_obj, channel=channel)
+            llm_quota.add(user_id, row["total_tokens"], row["cost_usd"])
+            answer_cache.note_usage(row["total_tokens"])
         except Exception as e:
-            logger.error(f"[_record_usage] ❌ Error registrando uso de tokens: {e}", exc_info=True)
-            try:
-                db.session.rollback()
-                logger.info(f"[_record_usage] Rollback ejecutado")
-            except Exception as rb_err:
-                logger.error(f"[_record_usage] Error en rollback: {rb_err}")
-
+            logger.error(f"[_record_usage] Error registrando uso de tokens: {e}", exc_info=True)
 
     @staticmethod
     def _build_prompt(bio_payload: Dict) -> str:
@@ -452,36 +579,6 @@ class FitMasterService:
             "{bio_payload}", json.dumps(bio_payload, ensure_ascii=False, indent=2)
         )
 
-    @staticmethod
-    def _clean_json_response(message: str) -> str:
-        """
-        Limpia la respuesta de OpenAI eliminando bloques de código markdown.
-
-        Args:
-            message: Respuesta cruda de OpenAI
-
-        Returns:
-            str: JSON limpio sin bloques de código markdown
-        """
-        if not message:
-            return message
-
-        # Patrón para capturar JSON dentro de bloques de código
-        patterns = [
-            r"```json\s*(.*?)\s*```",  # ```json { ... } ```
-            r"```\s*(.*?)\s*```",  # ``` { ... } ```
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, message, re.DOTALL)
-            if match:
-                cleaned = match.group(1).strip()
-                logger.info("JSON extraído de bloque markdown")
-                return cleaned
-
-        # Si no hay bloques markdown, devolver el mensaje tal cual
-        return message.strip()
-
     @staticmethod
     def _validate_response(data: Dict) -> Dict:
         """Validar y normalizar la respuesta de OpenAI."""
@@ -499,70 +596,87 @@ class FitMasterService:
     def _get_fallback_response(error_msg: str) -> Dict:
         """Respuesta de respaldo cuando hay errores."""
         return {
-            "interpretation": f"No se pudo conectar con FitMaster AI. {error_msg}"
+            "interpretation": f"{FALLBACK_PREFIX} {error_msg}",
+            "model_version": FALLBACK_MODEL_VERSION,
         }
 
-    # ── Agent Tools (Fase 3) ───────────────────────────────────
+    # ── Modo degradado (breaker abierto u OpenAI sin responder) ─
+    DEGRADED_NOTICE = "FitMaster AI no está disponible en este momento; vuelve a intentarlo en unos minutos."
+
     @staticmethod
-    def _tool_get_user_history(user_id: int, arguments: Dict) -> str:
-        """Obtiene el historial biométrico del usuario para el agente."""
-        try:
+    def _degraded_analysis(bio_payload: Dict) -> Dict:
+        """
+        Análisis sin OpenAI: interpretaciones locales de las métricas del
+        payload y, si existe, la última interpretación de FitMaster del usuario.
+        """
+        sections = [FitMasterService.DEGRADED_NOTICE]
+        local = FitMasterService._local_interpretations(bio_payload)
+        if local:
+            sections.append(f"Interpretación provisional de tus métricas:\n{local}")
+        cached = FitMasterService._cached_interpretation(bio_payload.get("user_id"))
+        if cached:
+            record, text = cached
+            sections.append(f"Tu última interpretación de FitMaster ({FitMasterService._format_date(record)}):\n{text}")
+        return {"interpretation": "\n\n".join(sections), "model_version": FALLBACK_MODEL_VERSION}
+
+    @staticmethod
+    def _degraded_chat_reply(user_id: int, max_chars: int = 3000) -> str:
+        """Respuesta de chat sin OpenAI a partir del último análisis del usuario."""
+        cached = FitMasterService._cached_interpretation(user_id)
+        if cached:
+            record, text = cached
+            summary = f"Mientras tanto, esta es tu última interpretación ({FitMasterService._format_date(record)}):"
+        else:
             from app.models.biometric_analysis import BiometricAnalysis
-            limit = arguments.get("limit", 5)
-            analyses = BiometricAnalysis.query.filter_by(user_id=user_id).order_by(BiometricAnalysis.created_at.desc()).limit(limit).all()
-            
-            if not analyses:
-                return json.dumps({"status": "no_data", "message": "El usuario no tiene análisis biométricos registrados."})
-            
-            data = []
-            for a in analyses:
-                data.append({
-                    "id": a.id,
-                    "date": a.created_at.strftime("%Y-%m-%d"),
-                    "weight": a.weight,
-                    "height": a.height,
-                    "body_fat_percentage": a.body_fat_percentage,
-                    "bmi": a.bmi,
-                    "bmr": a.bmr,
-                    "tdee": a.tdee,
-                    "lean_mass": a.lean_mass,
-                    "fat_mass": a.fat_mass
-                })
-            return json.dumps({"status": "success", "data": data})
+
+            record = BiometricAnalysis.query.filter_by(user_id=user_id).order_by(
+                BiometricAnalysis.created_at.desc()
+            ).first()
+            text = FitMasterService._local_interpretations(record) if record else ""
+            summary = f"Mientras tanto, esto dicen tus métricas del último análisis ({FitMasterService._format_date(record)}):"
+        if not text:
+            return FitMasterService.DEGRADED_NOTICE
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit(" ", 1)[0] + "…"
+        return f"{FitMasterService.DEGRADED_NOTICE}\n\n{summary}\n\n{text}"
+
+    @staticmethod
+    def _cached_interpretation(user_id: Optional[int]) -> Optional[Tuple[object, str]]:
+        """(análisis, texto) de la última interpretación real de FitMaster del usuario."""
+        if not user_id:
+            return None
+        from app.models.biometric_analysis import BiometricAnalysis
+
+        try:
+            records = BiometricAnalysis.query.filter(
+                BiometricAnalysis.user_id == user_id,
+                BiometricAnalysis.fitmaster_data.isnot(None),
+            ).order_by(BiometricAnalysis.created_at.desc()).limit(10)
+            for record in records:
+                data = record.fitmaster_data or {}
+                text = (data.get("interpretation") or "").strip()
+                if text and data.get("model_version") != FALLBACK_MODEL_VERSION \
+                        and not text.startswith(FALLBACK_PREFIX):
+                    return record, text
         except Exception as e:
-            logger.error(f"Error en _tool_get_user_history: {e}")
-            return json.dumps({"error": str(e)})
+            logger.warning(f"No se pudo leer la última interpretación de user {user_id}: {e}")
+        return None
 
     @staticmethod
-    def _tool_get_current_plans(user_id: int) -> str:
-        """Obtiene el plan de nutrición y entrenamiento REALES asignados al usuario."""
+    def _local_interpretations(metrics) -> str:
+        """Textos de `interpretaciones` (sin IA) para un BiometricAnalysis o un bio_payload."""
+        from app.blueprints.bioanalyze.services import build_interpretations_for_record
+
+        if isinstance(metrics, dict):
+            metrics = SimpleNamespace(**{field: metrics.get(field) for field in INTERPRETATION_FIELDS})
         try:
-            from app.models.nutrition_plan import NutritionPlan
-            from app.models.training_plan import TrainingPlan
-            
-            # Buscar el último plan de nutrición activo
-            nutrition = NutritionPlan.query.filter_by(
-                user_id=user_id, 
-                is_active=True
-            ).order_by(NutritionPlan.created_at.desc()).first()
-            
-            # Buscar el último plan de entrenamiento activo
-            training = TrainingPlan.query.filter_by(
-                user_id=user_id, 
-                is_active=True
-            ).order_by(TrainingPlan.created_at.desc()).first()
-            
-            if not nutrition and not training:
-                return json.dumps({"status": "no_data", "message": "El usuario no tiene planes de nutrición ni entrenamiento activos asignados."})
-            
-            data = {}
-            if nutrition:
-                data["nutrition_plan"] = nutrition.to_dict()
-                
-            if training:
-                data["training_plan"] = training.to_dict()
-                
-            return json.dumps({"status": "success", "data": data})
+            interpretaciones = build_interpretations_for_record(metrics)
         except Exception as e:
-            logger.error(f"Error en _tool_get_current_plans: {e}")
-            return json.dumps({"error": str(e)})
+            logger.warning(f"No se pudieron calcular las interpretaciones locales: {e}")
+            return ""
+        return "\n".join(f"- {text}" for text in interpretaciones.values() if text)
+
+    @staticmethod
+    def _format_date(record) -> str:
+        created_at = getattr(record, "created_at", None)
+        return created_at.strftime("%d/%m/%Y") if created_at else "sin fecha"
@@ -0,0 +1,245 @@
+# app/services/fragment_cache.py
+"""
+Caché de fragmentos de plantilla con invalidación por tags.
+
+En las plantillas:
+
+    {% cache "blog_sidebar", current_category, ttl=600, tags=["BlogPost"] %}
+        {% for cat, count in blog_categories() %} ... {% endfor %}
+    {% endcache %}
+
+La clave es el nombre + los argumentos, más la versión actual de cada tag.
+Invalidar un tag solo incrementa su versión: las claves antiguas dejan de
+usarse y caducan por TTL. Así funciona igual con un backend en memoria del
+worker que con uno compartido (Redis) entre workers.
+
+Los tags son nombres de modelo; tras cada commit que inserta, modifica o borra
+instancias de un modelo (BlogPost, NutritionPlan, ...) se invalida su tag.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_TAG_PREFIX = "fragtag:"
+_KEY_PREFIX = "frag:"
+
+
+class MemoryBackend:
+    """Backend en memoria del worker (LRU acotado + TTL)."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                item = self._data.get(key)
+                if item is None or (item[1] is not None and item[1] <= now):
+                    values.append(None)
+                    continue
+                self._data.move_to_end(key)
+                values.append(item[0])
+        return values
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._data.get(key, ("0", None))[0]) + 1
+            self._data[key] = (str(value), None)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisBackend:
+    """Backend compartido entre workers (requiere el paquete `redis`)."""
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("FRAGMENT_CACHE_URL requiere el paquete 'redis' instalado") from e
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return self.client.mget(keys)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        self.client.set(key, value, ex=ttl or None)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(key)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=f"{_KEY_PREFIX}*"):
+            self.client.delete(key)
+
+
+class FragmentCache:
+    """
+    Caché de fragmentos con métricas de aciertos por fragmento.
+
+    Uso:
+        fragment_cache.init_app(app)
+        fragment_cache.invalidate("BlogPost")
+    """
+
+    def __init__(self, flask_app=None):
+        self.backend = MemoryBackend()
+        self.default_ttl = 300
+        self.enabled = True
+        self.hits = Counter()
+        self.misses = Counter()
+
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Configura el backend (FRAGMENT_CACHE_URL) y registra la etiqueta {% cache %}."""
+        url = flask_app.config.get("FRAGMENT_CACHE_URL")
+        if url:
+            self.backend = RedisBackend(url)
+        else:
+            self.backend = MemoryBackend(flask_app.config.get("FRAGMENT_CACHE_MAX_ENTRIES", 1024))
+        self.default_ttl = flask_app.config.get("FRAGMENT_CACHE_TTL", 300)
+        self.enabled = flask_app.config.get("FRAGMENT_CACHE_ENABLED", True)
+        self.hits.clear()
+        self.misses.clear()
+
+        flask_app.jinja_env.add_extension(FragmentCacheExtension)
+        flask_app.extensions["fragment_cache"] = self
+
+    # ── Claves y tags ──────────────────────────────────────────
+    def _build_key(self, name: str, args: Iterable, tags: Iterable[str]) -> str:
+        tags = sorted(tags)
+        versions = self.backend.get_many([_TAG_PREFIX + tag for tag in tags]) if tags else []
+        raw = "|".join(
+            [repr(name), repr(tuple(args))] + [f"{tag}={version or 0}" for tag, version in zip(tags, versions)]
+        )
+        return _KEY_PREFIX + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def invalidate(self, *tags: str) -> None:
+        """Invalida todos los fragmentos que dependen de alguno de los tags."""
+        for tag in tags:
+            try:
+                self.backend.incr(_TAG_PREFIX + tag)
+            except Exception as e:
+                logger.error(f"No se pudo invalidar el tag de caché '{tag}': {e}")
+
+    # ── Lectura/escritura ──────────────────────────────────────
+    def fetch(self, name: str, args: Iterable, render: Callable[[], str],
+              ttl: Optional[int] = None, tags: Iterable[str] = ()) -> str:
+        """Devuelve el fragmento cacheado o lo renderiza y lo guarda."""
+        if not self.enabled:
+            return render()
+
+        try:
+            key = self._build_key(name, args, tags)
+            cached = self.backend.get_many([key])[0]
+        except Exception as e:
+            # Un backend caído no debe romper la página
+            logger.error(f"Caché de fragmentos no disponible: {e}")
+            return render()
+
+        if cached is not None:
+            self.hits[name] += 1
+            return cached
+
+        self.misses[name] += 1
+        value = render()
+        try:
+            self.backend.set(key, str(value), ttl or self.default_ttl)
+        except Exception as e:
+            logger.error(f"No se pudo guardar el fragmento '{name}': {e}")
+        return value
+
+    def value(self, name: str, args: Iterable, compute: Callable[[], object],
+              ttl: Optional[int] = None, tags: Iterable[str] = ()):
+        """Como fetch, para valores serializables en JSON (p. ej. agregados)."""
+        return json.loads(self.fetch(name, args, lambda: json.dumps(compute()), ttl=ttl, tags=tags))
+
+    def stats(self) -> Dict[str, dict]:
+        """Aciertos, fallos y tasa de acierto por fragmento (de este worker)."""
+        result = {}
+        for name in set(self.hits) | set(self.misses):
+            hits, misses = self.hits[name], self.misses[name]
+            result[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 3),
+            }
+        return result
+
+
+fragment_cache = FragmentCache()
+
+
+class FragmentCacheExtension(Extension):
+    """Etiqueta Jinja {% cache nombre[, args...][, ttl=N][, tags=[...]] %}...{% endcache %}."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        args = []
+        kwargs = []
+        while parser.stream.skip_if("comma"):
+            if parser.stream.current.type == "name" and parser.stream.look().type == "assign":
+                key = next(parser.stream).value
+                next(parser.stream)
+                kwargs.append(nodes.Keyword(key, parser.parse_expression()))
+            else:
+                args.append(parser.parse_expression())
+
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render_fragment", [name, nodes.List(args)], kwargs)
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_fragment(self, name, args, caller, ttl=None, tags=()):
+        return Markup(fragment_cache.fetch(name, args, caller, ttl=ttl, tags=tags))
+
+
+# ── Invalidación automática tras commit ────────────────────────
+@event.listens_for(Session, "after_flush")
+def _collect_changed_models(session, flush_context):
+    changed = session.info.setdefault("fragment_cache_tags", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        changed.add(type(obj).__name__)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_models(session):
+    changed = session.info.pop("fragment_cache_tags", None)
+    if changed:
+        fragment_cache.invalidate(*changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_models(session):
+    session.info.pop("fragment_cache_tags", None)
@@ -0,0 +1,281 @@
+# app/services/llm_quota.py
+"""
+Cuotas de consumo de LLM por usuario: tokens y coste (USD), por día y por mes.
+
+Límites (LIMIT_KEYS): LLM_QUOTA_PLANS define los de cada plan. El plan de un
+usuario es el de su fila UserLLMQuota; si no tiene, "admin" para los
+administradores, el nombre de su rol si hay un plan con ese nombre y, si no,
+"default". Los límites no nulos de UserLLMQuota sustituyen a los del plan.
+Un límite ausente o None es "sin límite".
+
+Contadores: `check()` compara con contadores en memoria del usuario (de este
+worker) sin consultar el ledger, y `add()` los incrementa con cada consumo
+registrado. Cada LLM_QUOTA_RECONCILE_SECONDS, y al cambiar de día, se
+recalculan desde LLMUsageLedger con una consulta por rango del índice
+(user_id, created_at), tras volcar el buffer de usage_recorder. Así se
+incorpora el consumo de los otros workers y los cambios de plan o límites.
+
+Días y meses en UTC, como created_at del ledger. La llamada que cruza el
+límite termina; se rechazan las siguientes.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, select
+
+from app import db
+from app.services.usage_recorder import usage_recorder
+
+logger = logging.getLogger(__name__)
+
+LIMIT_KEYS = ("daily_tokens", "monthly_tokens", "daily_cost_usd", "monthly_cost_usd")
+
+DEFAULT_PLANS: Dict[str, Dict[str, Optional[float]]] = {
+    "default": {
+        "daily_tokens": 200_000,
+        "monthly_tokens": 2_000_000,
+        "daily_cost_usd": 0.50,
+        "monthly_cost_usd": 5.00,
+    },
+    "admin": {},
+}
+
+
+def _next_day(day: date) -> date:
+    return day + timedelta(days=1)
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+class QuotaExceededError(RuntimeError):
+    """El usuario ha agotado un presupuesto: no se ha llamado a OpenAI."""
+
+    def __init__(self, user_id: int, limit_key: str, used: float, limit: float, resets_on: date):
+        if limit_key.startswith("daily"):
+            message = "Has alcanzado tu límite diario de FitMaster AI. Se renueva a las 00:00 (UTC)."
+        else:
+            message = (f"Has alcanzado tu límite mensual de FitMaster AI. "
+                       f"Se renueva el {resets_on.strftime('%d/%m/%Y')} (UTC).")
+        super().__init__(message)
+        self.user_id = user_id
+        self.limit_key = limit_key
+        self.used = used
+        self.limit = limit
+        self.resets_on = resets_on
+
+
+@dataclass
+class _Budget:
+    plan: str
+    limits: Dict[str, Optional[float]]
+    day: date
+    used: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(LIMIT_KEYS, 0))
+    reconciled_at: float = 0.0
+
+    def add(self, tokens: int, cost: float) -> None:
+        self.used["daily_tokens"] += tokens
+        self.used["monthly_tokens"] += tokens
+        self.used["daily_cost_usd"] += cost
+        self.used["monthly_cost_usd"] += cost
+
+    def exceeded(self) -> Optional[str]:
+        for key in LIMIT_KEYS:
+            limit = self.limits.get(key)
+            if limit is not None and self.used[key] >= limit:
+                return key
+        return None
+
+
+class LLMQuota:
+    """
+    Presupuestos de LLM por usuario con contadores en memoria.
+
+    Uso:
+        llm_quota.init_app(app)
+        llm_quota.check(user_id)               # QuotaExceededError antes de llamar a OpenAI
+        llm_quota.add(user_id, tokens, cost)   # al registrar el consumo
+    """
+
+    def __init__(self, flask_app=None):
+        self.enabled = True
+        self.plans = dict(DEFAULT_PLANS)
+        self.reconcile_seconds = 60
+        self._budgets: Dict[int, _Budget] = {}
+        # Consumo registrado mientras se recalcula un usuario (se suma a lo leído del ledger)
+        self._reconciling: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+        self._counters = {"checks": 0, "rejected": 0, "reconciliations": 0, "failed_reconciliations": 0}
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Config: LLM_QUOTAS_ENABLED, LLM_QUOTA_PLANS, LLM_QUOTA_RECONCILE_SECONDS."""
+        self.enabled = flask_app.config.get("LLM_QUOTAS_ENABLED", True)
+        self.plans = {**DEFAULT_PLANS, **flask_app.config.get("LLM_QUOTA_PLANS", {})}
+        self.reconcile_seconds = flask_app.config.get("LLM_QUOTA_RECONCILE_SECONDS", 60)
+        self.clear()
+
+    # ── Comprobación y consumo ─────────────────────────────────
+    def check(self, user_id: Optional[int]) -> None:
+        """
+        Raises:
+            QuotaExceededError: el usuario ha agotado algún presupuesto
+        """
+        if not self.enabled or not user_id:
+            return
+        budget = self._budget(user_id)
+        with self._lock:
+            self._counters["checks"] += 1
+            limit_key = budget.exceeded()
+            if limit_key is None:
+                return
+            self._counters["rejected"] += 1
+            used, limit = budget.used[limit_key], budget.limits[limit_key]
+        resets_on = _next_day(budget.day) if limit_key.startswith("daily") else _next_month(budget.day)
+        logger.info(f"[quota] user {user_id} sin presupuesto ({limit_key}: {used:g}/{limit:g})")
+        raise QuotaExceededError(user_id, limit_key, used, limit, resets_on)
+
+    def add(self, user_id: int, tokens: int, cost: float) -> None:
+        """Suma un consumo a los contadores del usuario (si se están siguiendo en este worker)."""
+        with self._lock:
+            pending = self._reconciling.get(user_id)
+            if pending is not None:
+                pending[0] += tokens
+                pending[1] += cost
+            budget = self._budgets.get(user_id)
+            if budget is not None:
+                budget.add(tokens, cost)
+
+    # ── Consulta (admin) ───────────────────────────────────────
+    def status(self, user_id: int) -> Dict:
+        """Plan, límites, consumo y restante del usuario, recalculados desde el ledger."""
+        budget = self._budget(user_id, force=True)
+        with self._lock:
+            used = dict(budget.used)
+        return {
+            "user_id": user_id,
+            "plan": budget.plan,
+            "enabled": self.enabled,
+            "limits": dict(budget.limits),
+            "used": {key: round(value, 6) for key, value in used.items()},
+            "remaining": {
+                key: None if budget.limits.get(key) is None else round(max(0, budget.limits[key] - used[key]), 6)
+                for key in LIMIT_KEYS
+            },
+            "resets": {
+                "daily": _next_day(budget.day).isoformat(),
+                "monthly": _next_month(budget.day).isoformat(),
+            },
+        }
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Fuerza el recálculo de un usuario (o de todos) en la próxima comprobación."""
+        with self._lock:
+            if user_id is None:
+                self._budgets.clear()
+            else:
+                self._budgets.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._budgets.clear()
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    def stats(self) -> Dict:
+        """Comprobaciones, rechazos y recálculos (de este worker)."""
+        with self._lock:
+            return {**self._counters, "enabled": self.enabled, "tracked_users": len(self._budgets)}
+
+    # ── Recálculo desde el ledger ──────────────────────────────
+    def _budget(self, user_id: int, force: bool = False) -> _Budget:
+        today = datetime.utcnow().date()
+        with self._lock:
+            budget = self._budgets.get(user_id)
+        if force or budget is None or budget.day != today \
+                or time.monotonic() - budget.reconciled_at >= self.reconcile_seconds:
+            budget = self._reconcile(user_id, today, budget)
+        return budget
+
+    def _reconcile(self, user_id: int, today: date, previous: Optional[_Budget]) -> _Budget:
+        from app.models.telegram import LLMUsageLedger
+
+        try:
+            # Lo pendiente de este worker tiene que estar en el ledger antes de sumarlo; la ventana
+            # se abre después para no contar dos veces lo que ya entra en la consulta
+            usage_recorder.flush()
+            with self._lock:
+                self._reconciling[user_id] = [0, 0.0]
+            plan, limits = self._limits(user_id)
+            day_start = datetime.combine(today, datetime.min.time())
+            is_today = LLMUsageLedger.created_at >= day_start
+            month_tokens, month_cost, day_tokens, day_cost = db.session.execute(
+                select(
+                    func.coalesce(func.sum(LLMUsageLedger.total_tokens), 0),
+                    func.coalesce(func.sum(LLMUsageLedger.cost_usd), 0.0),
+                    func.coalesce(func.sum(case((is_today, LLMUsageLedger.total_tokens), else_=0)), 0),
+                    func.coalesce(func.sum(case((is_today, LLMUsageLedger.cost_usd), else_=0.0)), 0.0),
+                ).where(
+                    LLMUsageLedger.user_id == user_id,
+                    LLMUsageLedger.created_at >= day_start.replace(day=1),
+                )
+            ).one()
+            budget = _Budget(plan=plan, limits=limits, day=today, used={
+                "daily_tokens": day_tokens, "monthly_tokens": month_tokens,
+                "daily_cost_usd": day_cost, "monthly_cost_usd": month_cost,
+            })
+        except Exception as e:
+            # Sin BD no se bloquea a nadie: se siguen los contadores que hubiera
+            logger.error(f"[quota] No se pudo recalcular el consumo de user {user_id}: {e}")
+            db.session.rollback()
+            budget = previous if previous is not None and previous.day == today else \
+                _Budget(plan="default", limits=dict(self.plans.get("default", {})), day=today)
+            with self._lock:
+                self._counters["failed_reconciliations"] += 1
+        else:
+            with self._lock:
+                self._counters["reconciliations"] += 1
+
+        with self._lock:
+            tokens, cost = self._reconciling.pop(user_id, (0, 0.0))
+            if budget is not previous:
+                budget.add(tokens, cost)
+            budget.reconciled_at = time.monotonic()
+            self._budgets[user_id] = budget
+        return budget
+
+    def _limits(self, user_id: int):
+        """(plan, límites) del usuario: plan asignado, admin, rol o default; y sus límites propios."""
+        from app.models.telegram import UserLLMQuota
+        from app.models.user import User
+
+        override = db.session.get(UserLLMQuota, user_id)
+        plan = override.plan if override is not None and override.plan else None
+        if plan is None:
+            user = db.session.get(User, user_id)
+            role = user.role.name if user is not None and user.role is not None else None
+            if user is not None and user.is_admin:
+                plan = "admin"
+            elif role in self.plans:
+                plan = role
+            else:
+                plan = "default"
+        if plan not in self.plans:
+            logger.warning(f"[quota] Plan {plan} de user {user_id} no está en LLM_QUOTA_PLANS; se usa default")
+            plan = "default"
+
+        limits = {key: self.plans[plan].get(key) for key in LIMIT_KEYS}
+        if override is not None:
+            for key in LIMIT_KEYS:
+                value = getattr(override, key)
+                if value is not None:
+                    limits[key] = value
+        return plan, limits
+
+
+llm_quota = LLMQuota()
@@ -0,0 +1,174 @@
+# app/services/media_gc_service.py
+"""
+Garbage collector de archivos multimedia huérfanos (S3 y almacenamiento local).
+
+Al borrar análisis, usuarios o posts del blog sus fotos y medios quedan en el
+bucket. Este servicio:
+- Lista los prefijos del bucket (paginado) o las carpetas locales de uploads
+- Recoge todas las referencias vivas en BD (MediaFile, fotos de
+  BiometricAnalysis, contenido e imagen destacada de BlogPost)
+- Borra los huérfanos en lotes de hasta 1000 keys (delete_objects)
+
+Respeta un periodo de gracia para no borrar archivos recién subidos cuyo
+registro en BD todavía no se ha confirmado (p. ej. uploads presigned).
+"""
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import unquote, urlparse
+
+from app.models.biometric_analysis import BiometricAnalysis
+from app.models.blog_post import BlogPost
+from app.models.media_file import MediaFile
+
+logger = logging.getLogger(__name__)
+
+# Prefijos del bucket que gestiona la aplicación
+S3_PREFIXES = ("blog/", "media/", "biometric_photos/")
+
+# Subcarpetas de UPLOAD_FOLDER usadas por StorageService._save_to_local
+LOCAL_PREFIXES = ("images", "media")
+
+DEFAULT_GRACE_PERIOD = timedelta(hours=24)
+
+# URLs absolutas y rutas /uploads/... embebidas en Markdown o HTML
+_URL_PATTERN = re.compile(r"""(?:https?://|/uploads/)[^\s)"'<>\]]+""")
+
+_PHOTO_COLUMNS = (
+    BiometricAnalysis.front_photo_url,
+    BiometricAnalysis.back_photo_url,
+    BiometricAnalysis.side_photo_url,
+)
+
+
+def url_to_key(url: Optional[str]) -> Optional[str]:
+    """
+    Convierte una URL pública (S3, CloudFront o /uploads/...) en su key relativa.
+
+    >>> url_to_key("https://bucket.s3.eu-north-1.amazonaws.com/blog/a.webp")
+    'blog/a.webp'
+    >>> url_to_key("/uploads/images/a.webp")
+    'uploads/images/a.webp'
+    """
+    if not url:
+        return None
+    path = unquote(urlparse(url.strip()).path).lstrip("/")
+    return path or None
+
+
+class MediaGarbageCollector:
+    """
+    Detecta y elimina archivos sin referencias en la base de datos.
+
+    Uso:
+        gc = MediaGarbageCollector(get_storage_service())
+        report = gc.run(dry_run=True)
+    """
+
+    def __init__(self, storage, grace_period: timedelta = DEFAULT_GRACE_PERIOD):
+        self.storage = storage
+        self.grace_period = grace_period
+
+    # ── Referencias vivas ──────────────────────────────────────
+    def collect_references(self) -> Set[str]:
+        """Devuelve el conjunto de keys/rutas referenciadas desde la BD."""
+        refs: Set[str] = set()
+
+        for file_path, file_url in MediaFile.query.with_entities(
+            MediaFile.file_path, MediaFile.file_url
+        ).yield_per(1000):
+            refs.add(file_path)
+            refs.add(os.path.abspath(file_path))
+            refs.add(url_to_key(file_url))
+
+        for row in BiometricAnalysis.query.with_entities(*_PHOTO_COLUMNS).yield_per(1000):
+            refs.update(url_to_key(url) for url in row)
+
+        for content, featured_image in BlogPost.query.with_entities(
+            BlogPost.content, BlogPost.featured_image
+        ).yield_per(200):
+            refs.add(url_to_key(featured_image))
+            for url in _URL_PATTERN.findall(content or ""):
+                refs.add(url_to_key(url))
+
+        refs.discard(None)
+        return refs
+
+    # ── Detección de huérfanos ─────────────────────────────────
+    def find_orphans(self, storage: str = "s3", references: Optional[Set[str]] = None) -> List[Dict]:
+        """
+        Lista los archivos huérfanos más antiguos que el periodo de gracia.
+
+        Args:
+            storage: 's3' o 'local'
+            references: Referencias precalculadas (se calculan si es None)
+        """
+        if references is None:
+            references = self.collect_references()
+
+        cutoff = datetime.now(timezone.utc) - self.grace_period
+        orphans = []
+        for obj in self._iter_stored(storage):
+            if self._is_referenced(obj["key"], storage, references):
+                continue
+            if obj["last_modified"] > cutoff:
+                continue
+            orphans.append(obj)
+        return orphans
+
+    def _iter_stored(self, storage: str) -> Iterable[Dict]:
+        prefixes = S3_PREFIXES if storage == "s3" else LOCAL_PREFIXES
+        for prefix in prefixes:
+            yield from self.storage.list_files(prefix, storage=storage)
+
+    def _is_referenced(self, key: str, storage: str, references: Set[str]) -> bool:
+        if key in references:
+            return True
+        if storage == "local":
+            # Los archivos locales se referencian por ruta absoluta o por /uploads/<carpeta>/<nombre>
+            relative = os.path.relpath(key, self.storage.upload_folder).replace(os.sep, "/")
+            return os.path.abspath(key) in references or f"uploads/{relative}" in references
+        return False
+
+    # ── Ejecución ──────────────────────────────────────────────
+    def run(self, dry_run: bool = True, storages: Iterable[str] = ("s3", "local")) -> Dict:
+        """
+        Ejecuta una pasada del GC.
+
+        Args:
+            dry_run: Si es True solo informa, no borra nada
+            storages: Backends a revisar
+
+        Returns:
+            dict por backend con 'orphans', 'bytes', 'deleted' y 'errors'
+        """
+        references = self.collect_references()
+        report = {}
+
+        for storage in storages:
+            if storage == "s3" and not self.storage.use_s3:
+                continue
+
+            orphans = self.find_orphans(storage, references)
+            keys = [obj["key"] for obj in orphans]
+            result = {
+                "orphans": keys,
+                "bytes": sum(obj["size"] for obj in orphans),
+                "deleted": [],
+                "errors": [],
+            }
+
+            if keys and not dry_run:
+                outcome = self.storage.delete_files(keys, storage=storage)
+                result["deleted"] = outcome["deleted"]
+                result["errors"] = outcome["errors"]
+
+            logger.info(
+                f"Media GC [{storage}] huérfanos={len(keys)} bytes={result['bytes']} "
+                f"borrados={len(result['deleted'])} errores={len(result['errors'])} dry_run={dry_run}"
+            )
+            report[storage] = result
+
+        return report
@@ -0,0 +1,309 @@
+# app/services/openai_governor.py
+"""
+Gobernador de llamadas a OpenAI: límites de ritmo y concurrencia por proceso.
+
+Toda operación contra OpenAI pide antes un hueco:
+
+    with openai_governor.slot(INTERACTIVE, tokens=estimate, requests=4, key=user_id):
+        ...llamadas al cliente...
+
+Un hueco se concede cuando:
+- hay saldo en los dos token buckets, peticiones (RPM) y tokens estimados
+  (TPM), que se rellenan de forma continua hasta `burst_seconds` de saldo;
+- hay menos de `max_in_flight` operaciones en curso en este proceso;
+- es el primero de la cola. La cola ordena por clase de prioridad
+  (INTERACTIVE, Telegram, antes que BACKGROUND, análisis del formulario) y,
+  dentro de cada clase, por turno justo entre claves (usuarios): quien tiene
+  muchas peticiones en cola no adelanta a quien llega con la primera.
+
+Cada petición tiene un plazo (`timeout` o el de su clase). Si vence en cola,
+o si ya se sabe que el saldo no llegará a tiempo, se rechaza con
+OpenAIBusyError en vez de esperar para acabar recibiendo un 429. Cuando se
+conoce el consumo real (`_record_usage`), `settle()` corrige en el bucket
+de tokens la diferencia con lo estimado.
+
+Los límites son por proceso: con varios workers, repartir el límite de la
+organización entre ellos (OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT).
+Métricas de espera y rechazos: `stats()` y /admin/openai-stats.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+_WAIT_SAMPLES = 1000
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Estimación barata de tokens (~4 caracteres por token en español/inglés)."""
+    return sum(len(text or "") for text in texts) // 4 + 1
+
+
+class OpenAIBusyError(RuntimeError):
+    """No se pudo obtener hueco para llamar a OpenAI dentro del plazo."""
+
+    def __init__(self, reason: str, priority: str, waited: float):
+        super().__init__(f"OpenAI saturado ({reason}) tras {waited:.1f} s en cola [{priority}]")
+        self.reason = reason
+        self.priority = priority
+        self.waited = waited
+
+
+class TokenBucket:
+    """Bucket con recarga continua de `rate_per_minute` y saldo máximo `capacity`."""
+
+    def __init__(self, rate_per_minute: float, capacity: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(capacity, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Segundos hasta que haya saldo para `amount` (0 si ya lo hay)."""
+        self._refill(now)
+        # Una petición mayor que el bucket entero pasa cuando está lleno
+        missing = min(amount, self.capacity) - self.level
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+    def adjust(self, delta: float) -> None:
+        """Devuelve (delta > 0) o cobra (delta < 0) saldo; puede quedar en negativo."""
+        self.level = min(self.capacity, self.level + delta)
+
+
+@dataclass(order=True)
+class _Ticket:
+    priority: int
+    virtual_start: int
+    seq: int
+    tokens: int = field(compare=False)
+    requests: int = field(compare=False)
+    deadline: float = field(compare=False)
+
+
+@dataclass
+class Slot:
+    """Hueco concedido: guarda lo estimado para poder corregirlo con el consumo real."""
+
+    priority: str
+    tokens: int
+    waited: float
+    used: int = 0  # consumo real acumulado (settle)
+    charged: Optional[int] = None  # lo cobrado al bucket hasta ahora (al conceder, la estimación)
+
+    def __post_init__(self):
+        if self.charged is None:
+            self.charged = self.tokens
+
+
+_current_slot: ContextVar[Optional[Slot]] = ContextVar("openai_slot", default=None)
+
+
+class OpenAIGovernor:
+    """
+    Admisión de llamadas a OpenAI por proceso.
+
+    Uso:
+        openai_governor.init_app(app)
+        with openai_governor.slot(BACKGROUND, tokens=3000):
+            client.chat.completions.create(...)
+    """
+
+    def __init__(self, flask_app=None):
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._virtual_time = {name: 0 for name in PRIORITIES}
+        self._last_finish: Dict[tuple, int] = {}
+        self.in_flight = 0
+        self.configure()
+        if flask_app:
+            self.init_app(flask_app)
+
+    def configure(self, rpm: int = 500, tpm: int = 200_000, max_in_flight: int = 8, max_queue: int = 100,
+                  burst_seconds: float = 10.0, timeouts: Optional[Dict[str, float]] = None,
+                  enabled: bool = True) -> None:
+        with self._cond:
+            self.enabled = enabled
+            self.max_in_flight = max_in_flight
+            self.max_queue = max_queue
+            self.timeouts = {INTERACTIVE: 20.0, BACKGROUND: 60.0, **(timeouts or {})}
+            self.requests_bucket = TokenBucket(rpm, rpm * burst_seconds / 60)
+            self.tokens_bucket = TokenBucket(tpm, tpm * burst_seconds / 60)
+            self.admitted = Counter()
+            self.rejected = {name: Counter() for name in PRIORITIES}
+            self.waits = {name: deque(maxlen=_WAIT_SAMPLES) for name in PRIORITIES}
+            self.max_wait = {name: 0.0 for name in PRIORITIES}
+            self._cond.notify_all()
+
+    def init_app(self, flask_app):
+        """Lee los límites de la config (OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, ...)."""
+        config = flask_app.config
+        self.configure(
+            rpm=config.get("OPENAI_RPM_LIMIT", 500),
+            tpm=config.get("OPENAI_TPM_LIMIT", 200_000),
+            max_in_flight=config.get("OPENAI_MAX_IN_FLIGHT", 8),
+            max_queue=config.get("OPENAI_MAX_QUEUE", 100),
+            burst_seconds=config.get("OPENAI_BURST_SECONDS", 10.0),
+            timeouts={
+                INTERACTIVE: config.get("OPENAI_QUEUE_TIMEOUT_INTERACTIVE", 20.0),
+                BACKGROUND: config.get("OPENAI_QUEUE_TIMEOUT_BACKGROUND", 60.0),
+            },
+            enabled=config.get("OPENAI_GOVERNOR_ENABLED", True),
+        )
+
+    # ── Admisión ───────────────────────────────────────────────
+    @contextmanager
+    def slot(self, priority: str = BACKGROUND, tokens: int = 0, requests: int = 1,
+             key: Hashable = None, timeout: Optional[float] = None) -> Iterator[Slot]:
+        """
+        Espera turno y saldo; libera el hueco al salir del bloque.
+
+        Raises:
+            OpenAIBusyError: cola llena o plazo vencido (no se ha llamado a OpenAI)
+        """
+        if not self.enabled:
+            yield Slot(priority, tokens, 0.0)
+            return
+
+        slot = self._acquire(priority, tokens, requests, key, timeout)
+        token = _current_slot.set(slot)
+        try:
+            yield slot
+        finally:
+            _current_slot.reset(token)
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def _acquire(self, priority, tokens, requests, key, timeout) -> Slot:
+        rank = PRIORITIES.index(priority)
+        started = time.monotonic()
+        deadline = started + (self.timeouts[priority] if timeout is None else timeout)
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                raise self._reject(priority, "queue_full", 0.0)
+
+            # Turno justo por clave: cada clave avanza su propio reloj virtual
+            fair_key = (priority, key)
+            virtual_start = max(self._virtual_time[priority], self._last_finish.get(fair_key, 0))
+            self._last_finish[fair_key] = virtual_start + 1
+            ticket = _Ticket(rank, virtual_start, next(self._seq), tokens, requests, deadline)
+            heapq.heappush(self._queue, ticket)
+
+            while True:
+                now = time.monotonic()
+                wait = None
+                if self._queue[0] is ticket and self.in_flight < self.max_in_flight:
+                    wait = max(self.requests_bucket.wait_time(requests, now),
+                               self.tokens_bucket.wait_time(tokens, now))
+                    if wait == 0:
+                        self._admit(ticket, priority)
+                        break
+
+                remaining = deadline - now
+                if remaining <= 0 or (wait is not None and wait > remaining):
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                    raise self._reject(priority, "deadline", now - started)
+                self._cond.wait(timeout=remaining if wait is None else wait)
+
+        waited = time.monotonic() - started
+        self._record_wait(priority, waited)
+        return Slot(priority, tokens, waited)
+
+    def _admit(self, ticket: _Ticket, priority: str) -> None:
+        heapq.heappop(self._queue)
+        self.requests_bucket.take(ticket.requests)
+        self.tokens_bucket.take(ticket.tokens)
+        self.in_flight += 1
+        self.admitted[priority] += 1
+        self._virtual_time[priority] = ticket.virtual_start
+        if len(self._last_finish) > 10 * self.max_queue:
+            self._last_finish = {
+                fair_key: finish for fair_key, finish in self._last_finish.items()
+                if finish > self._virtual_time[fair_key[0]]
+            }
+        # El siguiente de la cola puede tener ya saldo y hueco
+        self._cond.notify_all()
+
+    def _reject(self, priority: str, reason: str, waited: float) -> OpenAIBusyError:
+        self.rejected[priority][reason] += 1
+        logger.warning(f"[openai_governor] Rechazo {priority}: {reason} tras {waited:.2f} s "
+                       f"(en curso={self.in_flight}, en cola={len(self._queue)})")
+        return OpenAIBusyError(reason, priority, waited)
+
+    def _record_wait(self, priority: str, waited: float) -> None:
+        with self._cond:
+            self.waits[priority].append(waited)
+            self.max_wait[priority] = max(self.max_wait[priority], waited)
+
+    def settle(self, actual_tokens: int) -> None:
+        """
+        Suma un consumo real al hueco actual y corrige el bucket de tokens.
+
+        Un hueco puede hacer varias llamadas (rondas de tools, resumen del
+        thread + run): el bucket acaba cobrando el total real, no la estimación.
+        """
+        slot = _current_slot.get()
+        if slot is None or not self.enabled:
+            return
+        with self._cond:
+            slot.used += actual_tokens
+            self.tokens_bucket.adjust(slot.charged - slot.used)
+            slot.charged = slot.used
+            self._cond.notify_all()
+
+    # ── Métricas ───────────────────────────────────────────────
+    def stats(self) -> Dict:
+        """Huecos concedidos, rechazos y espera en cola por prioridad (de este worker)."""
+        with self._cond:
+            now = time.monotonic()
+            for bucket in (self.requests_bucket, self.tokens_bucket):
+                bucket.wait_time(0, now)  # recarga hasta ahora
+            result = {
+                "in_flight": self.in_flight,
+                "queued": len(self._queue),
+                "requests_available": round(self.requests_bucket.level, 1),
+                "tokens_available": round(self.tokens_bucket.level),
+                "priorities": {},
+            }
+            for name in PRIORITIES:
+                waits = sorted(self.waits[name])
+                result["priorities"][name] = {
+                    "admitted": self.admitted[name],
+                    "rejected": dict(self.rejected[name]),
+                    "wait_ms_p50": _percentile_ms(waits, 0.50),
+                    "wait_ms_p95": _percentile_ms(waits, 0.95),
+                    "wait_ms_max": round(self.max_wait[name] * 1000, 1),
+                }
+            return result
+
+
+def _percentile_ms(ordered, fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 1)
+
+
+openai_governor = OpenAIGovernor()
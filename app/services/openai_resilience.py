@@ -0,0 +1,249 @@
+# app/services/openai_resilience.py
+"""
+Circuit breaker y reintentos con cobertura (hedging) para las llamadas a OpenAI.
+
+Breaker (uno por proceso, compartido por análisis y chat):
+- CLOSED: las llamadas pasan. Tras OPENAI_BREAKER_FAILURES fallos de OpenAI
+  seguidos (timeouts, errores de conexión, 5xx, 429) se abre.
+- OPEN: no se llama a OpenAI (CircuitOpenError al instante) y FitMaster
+  responde con su respuesta degradada. Pasados
+  OPENAI_BREAKER_RESET_SECONDS deja pasar una llamada de prueba.
+- HALF_OPEN: solo la llamada de prueba; si sale bien se cierra, si falla
+  vuelve a abrirse.
+Los errores que no son de OpenAI (4xx, cola llena del gobernador, fallos
+propios) no cuentan como fallo.
+
+`hedged()` cubre la espera hasta la primera respuesta (en el análisis en
+streaming, hasta el primer fragmento): si el primer intento no responde en
+`hedge_after` segundos (o falla con un error de OpenAI), lanza otro en
+paralelo y se queda con la primera respuesta, siempre dentro del plazo
+total. El intento perdedor se descarta al terminar y su consumo no se
+registra.
+
+Estado, aperturas y llamadas cortocircuitadas: `stats()` y /admin/openai-stats.
+"""
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+from openai import APIConnectionError, APIStatusError, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """El breaker está abierto: no se ha llamado a OpenAI."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuito {name} abierto; siguiente prueba en {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """True si el error indica que OpenAI no está respondiendo bien (cuenta para el breaker)."""
+    if isinstance(exc, (APIConnectionError, RateLimitError, TimeoutError)):
+        return True  # APITimeoutError es un APIConnectionError
+    if isinstance(exc, APIStatusError):
+        return exc.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Breaker por fallos consecutivos.
+
+    Uso:
+        openai_breaker.init_app(app)
+        with openai_breaker.guard():
+            client.chat.completions.create(...)
+    """
+
+    def __init__(self, name: str = "openai", flask_app=None):
+        self.name = name
+        self._lock = threading.Lock()
+        self.configure()
+        if flask_app:
+            self.init_app(flask_app)
+
+    def configure(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        with self._lock:
+            self.failure_threshold = failure_threshold
+            self.reset_timeout = reset_timeout
+            self._state = CLOSED
+            self._opened_at = 0.0
+            self._probe_in_flight = False
+            self.consecutive_failures = 0
+            self.trips = 0
+            self.short_circuited = 0
+            self.last_error: Optional[str] = None
+
+    def init_app(self, flask_app):
+        """Config: OPENAI_BREAKER_FAILURES (0 = sin breaker), OPENAI_BREAKER_RESET_SECONDS."""
+        self.configure(
+            failure_threshold=flask_app.config.get("OPENAI_BREAKER_FAILURES", 5),
+            reset_timeout=flask_app.config.get("OPENAI_BREAKER_RESET_SECONDS", 30.0),
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    # ── Admisión ───────────────────────────────────────────────
+    @contextmanager
+    def guard(self):
+        """
+        Deja pasar la llamada si el circuito lo permite y anota el resultado.
+
+        Raises:
+            CircuitOpenError: circuito abierto (o prueba ya en curso)
+        """
+        self._acquire()
+        try:
+            yield
+        except Exception as exc:
+            if is_upstream_failure(exc):
+                self.record_failure(exc)
+            elif isinstance(exc, APIStatusError):
+                self.record_success()  # 4xx: OpenAI responde
+            else:
+                self._release_probe()
+            raise
+        else:
+            self.record_success()
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if not self.failure_threshold or self._state == CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                logger.info(f"[breaker] {self.name}: llamada de prueba")
+                return
+            self.short_circuited += 1
+            retry_after = max(0.0, self._opened_at + self.reset_timeout - now)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def _release_probe(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            if self._state != CLOSED:
+                self._state = CLOSED
+                logger.warning(f"[breaker] {self.name}: cerrado, OpenAI vuelve a responder")
+
+    def record_failure(self, exc: BaseException) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = f"{type(exc).__name__}: {exc}"[:300]
+            self._probe_in_flight = False
+            if not self.failure_threshold:
+                return
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self.trips += 1
+                logger.error(f"[breaker] {self.name}: abierto tras {self.consecutive_failures} fallos "
+                             f"seguidos ({self.last_error}); respuestas degradadas durante "
+                             f"{self.reset_timeout:.0f} s")
+
+    # ── Métricas ───────────────────────────────────────────────
+    def stats(self) -> Dict:
+        """Estado, fallos seguidos, aperturas y llamadas cortocircuitadas (de este worker)."""
+        with self._lock:
+            retry_after = None
+            if self._state == OPEN:
+                retry_after = round(max(0.0, self._opened_at + self.reset_timeout - time.monotonic()), 1)
+            return {
+                "state": self._state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "trips": self.trips,
+                "short_circuited": self.short_circuited,
+                "retry_after_s": retry_after,
+                "last_error": self.last_error,
+            }
+
+
+# ── Hedging ────────────────────────────────────────────────────
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="openai-hedge")
+
+
+def hedged(call: Callable[[float], T], deadline: float, hedge_after: float = 0, max_attempts: int = 2,
+           discard: Optional[Callable[[T], None]] = None) -> T:
+    """
+    Ejecuta `call(timeout)` con un plazo total de `deadline` segundos.
+
+    Con `hedge_after` > 0, si el intento en curso no ha respondido en ese
+    tiempo (o ha fallado con un error de OpenAI) se lanza otro, hasta
+    `max_attempts`, y gana la primera respuesta correcta. `discard` recibe
+    los resultados de los intentos perdedores (p. ej. para cerrar un stream).
+
+    Raises:
+        TimeoutError: ningún intento respondió dentro del plazo
+        La excepción del último intento si todos fallaron antes del plazo
+    """
+    if not hedge_after:
+        return call(deadline)
+
+    started = time.monotonic()
+    end = started + deadline
+    pending = {_hedge_pool.submit(call, deadline)}
+    attempts, next_hedge = 1, started + hedge_after
+    last_error: Optional[BaseException] = None
+
+    while pending:
+        now = time.monotonic()
+        if now >= end:
+            raise TimeoutError(f"Sin respuesta de OpenAI en {deadline:.0f} s ({attempts} intentos)")
+        until = min(end, next_hedge) if attempts < max_attempts else end
+        done, pending = wait(pending, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                if discard:
+                    for loser in pending:
+                        loser.add_done_callback(functools.partial(_discard_result, discard))
+                return future.result()
+            if not is_upstream_failure(error):
+                raise error  # repetir una petición inválida no sirve de nada
+            last_error = error
+
+        now = time.monotonic()
+        if attempts < max_attempts and (now >= next_hedge or not pending) and now < end:
+            logger.info(f"[hedge] Intento {attempts + 1} tras {now - started:.1f} s")
+            pending.add(_hedge_pool.submit(call, end - now))
+            attempts += 1
+            next_hedge = now + hedge_after
+
+    raise last_error
+
+
+def _discard_result(discard: Callable, future) -> None:
+    if future.exception() is None:
+        try:
+            discard(future.result())
+        except Exception as e:
+            logger.warning(f"[hedge] No se pudo descartar un intento perdedor: {e}")
+
+
+openai_breaker = CircuitBreaker()
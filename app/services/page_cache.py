@@ -0,0 +1,224 @@
+# app/services/page_cache.py
+"""
+Caché HTTP de páginas públicas para tráfico anónimo.
+
+Dos niveles:
+1. Validadores condicionales: el ETag y Last-Modified se calculan a partir de
+   la versión del contenido (p. ej. max(updated_at) de los posts publicados)
+   ANTES de renderizar, así que un If-None-Match/If-Modified-Since válido se
+   responde con 304 sin tocar plantillas ni queries pesadas.
+2. Caché de página completa por worker (LRU + TTL) indexada por ruta y
+   versión: si cambia el contenido cambia la clave, por lo que los demás
+   workers nunca sirven una versión antigua aunque no reciban la invalidación.
+
+Los usuarios autenticados y las respuestas con mensajes flash no se cachean.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import Response, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event
+
+from app import db
+from app.models.blog_post import BlogPost
+from app.utils.markdown_utils import RENDERER_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ContentVersion:
+    """Versión del contenido de una página (token opaco + fecha de modificación)."""
+
+    token: str
+    last_modified: Optional[datetime] = None
+
+
+@dataclass
+class _Entry:
+    body: bytes
+    status: int
+    mimetype: str
+    etag: str
+    last_modified: Optional[datetime]
+    expires_at: float
+
+
+class PageCache:
+    """
+    Caché de páginas por worker.
+
+    Uso:
+        page_cache.init_app(app)
+
+        @page_cache.cached(blog_content_version)
+        def index(): ...
+    """
+
+    def __init__(self, flask_app=None):
+        self.ttl = 300
+        self.max_age = 60
+        self.max_entries = 512
+        self.salt = ""
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Lee la configuración (PAGE_CACHE_*) y vacía la caché del worker."""
+        self.ttl = flask_app.config.get("PAGE_CACHE_TTL", 300)
+        self.max_age = flask_app.config.get("PAGE_CACHE_MAX_AGE", 60)
+        self.max_entries = flask_app.config.get("PAGE_CACHE_MAX_ENTRIES", 512)
+        self.salt = flask_app.config.get("PAGE_CACHE_SALT", "")
+        flask_app.extensions["page_cache"] = self
+        self.clear()
+
+    # ── Invalidación ───────────────────────────────────────────
+    def clear(self) -> None:
+        """Vacía la caché de este worker (p. ej. al publicar un post)."""
+        with self._lock:
+            self._entries.clear()
+
+    # ── Respuesta ──────────────────────────────────────────────
+    @staticmethod
+    def is_cacheable_request() -> bool:
+        """Solo GET/HEAD anónimos y sin mensajes flash pendientes."""
+        if request.method not in ("GET", "HEAD"):
+            return False
+        if session.get("_flashes"):
+            return False
+        return not current_user.is_authenticated
+
+    def _etag(self, version: ContentVersion) -> str:
+        raw = f"{self.salt}:{request.full_path}:{version.token}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    @staticmethod
+    def _not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(etag)
+        if request.if_modified_since and last_modified:
+            return last_modified.replace(microsecond=0) <= request.if_modified_since
+        return False
+
+    def _finalize(self, response: Response, etag: str, last_modified: Optional[datetime]) -> Response:
+        response.set_etag(etag, weak=True)
+        if last_modified:
+            response.last_modified = last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        response.vary.add("Cookie")
+        return response
+
+    def respond(self, version: Optional[ContentVersion], render: Callable[[], object]) -> Response:
+        """
+        Sirve una página con validadores y caché de página completa.
+
+        Args:
+            version: Versión actual del contenido (None = no cachear)
+            render: Función que genera la respuesta si no hay acierto
+
+        Returns:
+            Response: 304, copia cacheada o respuesta recién renderizada (solo
+            las 200 se cachean y llevan validadores; un error sale tal cual)
+        """
+        if version is None or not self.is_cacheable_request():
+            return make_response(render())
+
+        last_modified = version.last_modified
+        if last_modified is not None and last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        etag = self._etag(version)
+
+        if self._not_modified(etag, last_modified):
+            self.hits += 1
+            return self._finalize(Response(status=304), etag, last_modified)
+
+        key = (request.full_path, etag)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at > now:
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+
+        if entry is not None:
+            self.hits += 1
+            response = Response(entry.body, status=entry.status, mimetype=entry.mimetype)
+            return self._finalize(response, entry.etag, entry.last_modified)
+
+        self.misses += 1
+        response = make_response(render())
+        if response.status_code != 200:
+            return response
+        if self.ttl:
+            self._store(key, response, etag, last_modified, now)
+        return self._finalize(response, etag, last_modified)
+
+    def _store(self, key, response, etag, last_modified, now) -> None:
+        entry = _Entry(
+            body=response.get_data(),
+            status=response.status_code,
+            mimetype=response.mimetype,
+            etag=etag,
+            last_modified=last_modified,
+            expires_at=now + self.ttl,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def cached(self, version_func: Callable[..., Optional[ContentVersion]]):
+        """Decorador: la vista se renderiza solo si no hay 304 ni copia en caché."""
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                try:
+                    version = version_func(**kwargs)
+                except Exception as e:
+                    # Sin versión no hay validadores, pero la página se sirve igual
+                    logger.warning(f"No se pudo calcular la versión de {request.path}: {e}")
+                    version = None
+                return self.respond(version, lambda: view(*args, **kwargs))
+
+            return wrapper
+
+        return decorator
+
+
+page_cache = PageCache()
+
+
+def blog_content_version(**kwargs) -> ContentVersion:
+    """Versión de las páginas que muestran posts: cambia al publicar, editar o borrar."""
+    last_update, published = (
+        db.session.query(db.func.max(BlogPost.updated_at), db.func.count(BlogPost.id))
+        .filter(BlogPost.is_published.is_(True))
+        .one()
+    )
+    stamp = last_update.isoformat() if last_update else "none"
+    return ContentVersion(token=f"{stamp}:{published}:{RENDERER_VERSION}", last_modified=last_update)
+
+
+# ── Invalidación al guardar posts ──────────────────────────────
+@event.listens_for(BlogPost, "after_insert")
+@event.listens_for(BlogPost, "after_update")
+@event.listens_for(BlogPost, "after_delete")
+def _invalidate_on_change(mapper, connection, target):
+    page_cache.clear()
@@ -0,0 +1,287 @@
+# app/services/related_posts.py
+"""
+Índice de posts relacionados (similitud TF-IDF pre-calculada).
+
+Cada post publicado se representa como un vector TF-IDF sobre título (peso 3),
+tags (peso 2) y contenido; la similitud coseno entre vectores decide los
+top-k vecinos, que se guardan en blog_post_related. La vista del post solo
+lee esa tabla (una lookup por índice).
+
+- rebuild(): recalcula el índice completo (comando `flask blog-related-rebuild`).
+- update_post(id): al publicar/editar/borrar un post reescribe solo sus
+  vecinos y los de los posts cuyo top-k cambia por él.
+
+La matriz TF-IDF, el vocabulario y el IDF se guardan en memoria por proceso.
+update_post() solo lee (id, updated_at) de los posts publicados y re-vectoriza
+las filas que cambiaron con el vocabulario ya ajustado; el corpus completo se
+vuelve a ajustar cuando los cambios acumulados superan REFIT_RATIO (el IDF y
+los términos nuevos se quedan algo atrasados hasta entonces) o en rebuild().
+"""
+import logging
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app import db
+from app.models.blog_post import BlogPost, BlogPostRelated
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 6  # Se guardan más de los que se muestran (3) por si alguno se despublica
+MAX_FEATURES = 5000
+REFIT_RATIO = 0.2  # Fracción de filas cambiadas desde el último ajuste que obliga a reajustar el vocabulario
+
+FIELD_WEIGHTS = (("title", 3), ("tags", 2), ("content", 1))
+
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes asi aun bajo bien cada casi como con
+contra cual cuales cuando de del desde donde dos el ella ellas ello ellos en entre era eran es
+esa esas ese eso esos esta estaba estan estar estas este esto estos fue fueron ha hace hacer
+han hasta hay la las le les lo los mas me mi mis mismo mucho muy nada ni no nos nosotros o otra
+otras otro otros para pero poco por porque puede pueden que quien se sea ser si sin sobre solo
+son su sus tambien tan tanto te tiene tienen todo todos tu tus un una unas uno unos y ya yo
+http https www com
+""".split())
+
+_MARKDOWN_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Minúsculas, sin acentos ni stopwords, y sin URLs de Markdown."""
+    if not text:
+        return []
+    text = _MARKDOWN_LINK.sub(r"\1", text)
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [t for t in _TOKEN.findall(text) if len(t) > 2 and t not in STOPWORDS]
+
+
+def _document(row) -> Counter:
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        value = getattr(row, field) or ""
+        if field == "tags":
+            value = value.replace(",", " ")
+        for token in tokenize(value):
+            counts[token] += weight
+    return counts
+
+
+def fit_vocabulary(documents: Sequence[Counter],
+                   max_features: int = MAX_FEATURES) -> Tuple[Dict[str, int], np.ndarray]:
+    """
+    Vocabulario (término -> columna) e IDF suavizado de cada columna.
+
+    Solo se usan términos presentes en al menos 2 documentos: los que
+    aparecen en uno solo no aportan similitud entre posts.
+    """
+    n_docs = len(documents)
+    df = Counter()
+    for doc in documents:
+        df.update(doc.keys())
+
+    terms = [term for term, freq in df.items() if freq >= 2]
+    terms.sort(key=lambda term: (-df[term], term))
+    vocabulary = {term: i for i, term in enumerate(terms[:max_features])}
+    idf = np.array([math.log((1 + n_docs) / (1 + df[term])) + 1.0 for term in vocabulary], dtype=np.float32)
+    return vocabulary, idf
+
+
+def vectorize(documents: Sequence[Counter], vocabulary: Dict[str, int], idf: np.ndarray) -> np.ndarray:
+    """Vectores TF-IDF normalizados (L2), uno por fila, con un vocabulario ya ajustado."""
+    matrix = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+    for row, doc in enumerate(documents):
+        for term, count in doc.items():
+            col = vocabulary.get(term)
+            if col is not None:
+                # TF sublineal * IDF suavizado
+                matrix[row, col] = (1.0 + math.log(count)) * idf[col]
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def tfidf_matrix(documents: Sequence[Counter], max_features: int = MAX_FEATURES) -> np.ndarray:
+    """Ajusta el vocabulario sobre `documents` y devuelve sus vectores."""
+    return vectorize(documents, *fit_vocabulary(documents, max_features))
+
+
+@dataclass
+class _Corpus:
+    """Matriz TF-IDF en memoria y la versión (updated_at) de cada fila."""
+    ids: np.ndarray
+    matrix: np.ndarray
+    vocabulary: Dict[str, int]
+    idf: np.ndarray
+    stamps: Dict[int, datetime]
+    drift: int = 0  # Filas re-vectorizadas o quitadas desde el último ajuste
+
+
+class RelatedPostsIndex:
+    """Construye y mantiene la tabla blog_post_related."""
+
+    def __init__(self, top_k: int = DEFAULT_TOP_K):
+        self.top_k = top_k
+        self._corpus: Optional[_Corpus] = None
+        self._lock = threading.Lock()
+
+    # ── Vectores ───────────────────────────────────────────────
+    @staticmethod
+    def _rows(post_ids: Optional[Sequence[int]] = None):
+        query = (
+            db.session.query(BlogPost.id, BlogPost.updated_at, BlogPost.title, BlogPost.tags, BlogPost.content)
+            .filter(BlogPost.is_published.is_(True))
+        )
+        if post_ids is not None:
+            query = query.filter(BlogPost.id.in_(post_ids))
+        return query.order_by(BlogPost.id).all()
+
+    def _fit(self) -> _Corpus:
+        rows = self._rows()
+        documents = [_document(row) for row in rows]
+        vocabulary, idf = fit_vocabulary(documents)
+        self._corpus = _Corpus(
+            ids=np.array([row.id for row in rows], dtype=np.int64),
+            matrix=vectorize(documents, vocabulary, idf),
+            vocabulary=vocabulary,
+            idf=idf,
+            stamps={row.id: row.updated_at for row in rows},
+        )
+        return self._corpus
+
+    def _load(self) -> _Corpus:
+        """Sincroniza la matriz en memoria con los posts publicados, re-vectorizando solo los cambiados."""
+        corpus = self._corpus
+        if corpus is None:
+            return self._fit()
+
+        stamps = dict(
+            db.session.query(BlogPost.id, BlogPost.updated_at).filter(BlogPost.is_published.is_(True)).all()
+        )
+        changed = [pid for pid, stamp in stamps.items() if corpus.stamps.get(pid) != stamp]
+        removed = [pid for pid in corpus.stamps if pid not in stamps]
+        if not changed and not removed:
+            return corpus
+        drift = corpus.drift + len(changed) + len(removed)
+        if drift > len(stamps) * REFIT_RATIO:
+            return self._fit()
+
+        skip = set(changed) | set(removed)
+        keep = [row for row, pid in enumerate(corpus.ids) if int(pid) not in skip]
+        rows = self._rows(changed)
+        stamps = {pid: stamp for pid, stamp in corpus.stamps.items() if pid not in skip}
+        stamps.update((row.id, row.updated_at) for row in rows)
+        self._corpus = _Corpus(
+            ids=np.concatenate([corpus.ids[keep], np.array([row.id for row in rows], dtype=np.int64)]),
+            matrix=np.vstack([
+                corpus.matrix[keep],
+                vectorize([_document(row) for row in rows], corpus.vocabulary, corpus.idf),
+            ]),
+            vocabulary=corpus.vocabulary,
+            idf=corpus.idf,
+            stamps=stamps,
+            drift=drift,
+        )
+        return self._corpus
+
+    def _neighbours(self, ids: np.ndarray, matrix: np.ndarray, row: int) -> List[Tuple[int, float]]:
+        scores = matrix @ matrix[row]
+        scores[row] = -1.0
+        k = min(self.top_k, len(ids) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+    def _write(self, neighbours: Dict[int, List[Tuple[int, float]]]) -> None:
+        if not neighbours:
+            return
+        BlogPostRelated.query.filter(BlogPostRelated.post_id.in_(list(neighbours))).delete(
+            synchronize_session=False
+        )
+        db.session.bulk_insert_mappings(
+            BlogPostRelated,
+            [
+                {"post_id": post_id, "related_id": related_id, "rank": rank, "score": score}
+                for post_id, items in neighbours.items()
+                for rank, (related_id, score) in enumerate(items, start=1)
+            ],
+        )
+
+    # ── API ────────────────────────────────────────────────────
+    def rebuild(self) -> int:
+        """Recalcula el índice completo. Devuelve el número de posts indexados."""
+        with self._lock:
+            corpus = self._fit()
+        ids, matrix = corpus.ids, corpus.matrix
+        BlogPostRelated.query.delete(synchronize_session=False)
+        self._write({int(post_id): self._neighbours(ids, matrix, row) for row, post_id in enumerate(ids)})
+        db.session.commit()
+        logger.info(f"Índice de posts relacionados reconstruido: {len(ids)} posts")
+        return len(ids)
+
+    def update_post(self, post_id: int) -> int:
+        """
+        Actualiza el índice tras publicar, editar, despublicar o borrar un post.
+
+        Returns:
+            int: Número de posts cuyas filas se reescribieron
+        """
+        with self._lock:
+            corpus = self._load()
+        ids, matrix = corpus.ids, corpus.matrix
+        positions = {int(pid): row for row, pid in enumerate(ids)}
+
+        # Posts que ya apuntaban a este (su lista puede cambiar o quedar obsoleta)
+        affected = {
+            pid for (pid,) in db.session.query(BlogPostRelated.post_id)
+            .filter(BlogPostRelated.related_id == post_id)
+        }
+
+        row = positions.get(post_id)
+        if row is None:
+            # Despublicado o borrado: fuera del índice
+            BlogPostRelated.query.filter(
+                db.or_(BlogPostRelated.post_id == post_id, BlogPostRelated.related_id == post_id)
+            ).delete(synchronize_session=False)
+        else:
+            affected.add(post_id)
+            # Posts en los que este post entra ahora en el top-k
+            scores = matrix @ matrix[row]
+            floor = self._score_floors()
+            for other, other_row in positions.items():
+                if other != post_id and scores[other_row] > floor.get(other, 0.0):
+                    affected.add(other)
+
+        neighbours = {
+            pid: self._neighbours(ids, matrix, positions[pid]) for pid in affected if pid in positions
+        }
+        self._write(neighbours)
+        db.session.commit()
+        return len(neighbours)
+
+    def _score_floors(self) -> Dict[int, float]:
+        """Puntuación mínima para entrar en el top-k de cada post (0 si no está lleno)."""
+        rows = (
+            db.session.query(
+                BlogPostRelated.post_id,
+                db.func.min(BlogPostRelated.score),
+                db.func.count(BlogPostRelated.related_id),
+            )
+            .group_by(BlogPostRelated.post_id)
+            .all()
+        )
+        return {post_id: score for post_id, score, count in rows if count >= self.top_k}
+
+
+related_index = RelatedPostsIndex()
@@ -0,0 +1,182 @@
+# app/services/sitemap_service.py
+"""
+Generador de sitemap.xml a partir de la base de datos.
+
+Incluye las páginas estáticas y todos los posts publicados con su lastmod
+real (updated_at), de modo que los crawlers solo vuelven a descargar lo que
+ha cambiado. Los posts se leen en streaming (yield_per) y, si se superan los
+50.000 URLs del protocolo, el documento principal pasa a ser un índice que
+apunta a /sitemap-<n>.xml.
+
+Los documentos generados se cachean por worker junto con la versión del
+contenido del blog: solo se regeneran cuando se publica, edita o borra un post.
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+from xml.sax.saxutils import escape
+
+from flask import current_app, url_for
+
+from app import db
+from app.models.blog_post import BlogPost
+
+logger = logging.getLogger(__name__)
+
+# Límite de URLs por documento del protocolo sitemaps.org
+SITEMAP_MAX_URLS = 50000
+
+# (endpoint, changefreq, priority, usa lastmod del blog)
+STATIC_PAGES = (
+    ("main.landing", "weekly", "1.0", True),
+    ("blog.index", "daily", "0.9", True),
+    ("auth.register", "monthly", "0.9", False),
+    ("auth.login", "monthly", "0.8", False),
+    ("main.about", "monthly", "0.5", False),
+    ("main.legal_notices", "yearly", "0.3", False),
+    ("main.privacy_policy", "yearly", "0.3", False),
+    ("main.terms_of_service", "yearly", "0.3", False),
+)
+
+_URLSET_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_URLSET_CLOSE = "</urlset>\n"
+_INDEX_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_INDEX_CLOSE = "</sitemapindex>\n"
+
+
+@dataclass
+class SitemapEntry:
+    loc: str
+    lastmod: Optional[datetime] = None
+    changefreq: Optional[str] = None
+    priority: Optional[str] = None
+
+
+def _w3c(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _url_xml(entry: SitemapEntry) -> str:
+    parts = [f"  <url>\n    <loc>{escape(entry.loc)}</loc>\n"]
+    if entry.lastmod:
+        parts.append(f"    <lastmod>{_w3c(entry.lastmod)}</lastmod>\n")
+    if entry.changefreq:
+        parts.append(f"    <changefreq>{entry.changefreq}</changefreq>\n")
+    if entry.priority:
+        parts.append(f"    <priority>{entry.priority}</priority>\n")
+    parts.append("  </url>\n")
+    return "".join(parts)
+
+
+def _external(endpoint: str, **values) -> str:
+    return url_for(endpoint, _external=True, _scheme="https", **values)
+
+
+class SitemapBuilder:
+    """Genera los documentos del sitemap (requiere contexto de request para url_for)."""
+
+    def __init__(self, max_urls: int = SITEMAP_MAX_URLS, batch_size: int = 1000):
+        self.max_urls = max_urls
+        self.batch_size = batch_size
+
+    def entries(self) -> Iterator[SitemapEntry]:
+        """Páginas estáticas + posts publicados, leídos en lotes."""
+        blog_lastmod = (
+            db.session.query(db.func.max(BlogPost.updated_at))
+            .filter(BlogPost.is_published.is_(True))
+            .scalar()
+        )
+        for endpoint, changefreq, priority, uses_blog in STATIC_PAGES:
+            yield SitemapEntry(
+                loc=_external(endpoint),
+                lastmod=blog_lastmod if uses_blog else None,
+                changefreq=changefreq,
+                priority=priority,
+            )
+
+        rows = (
+            db.session.query(BlogPost.slug, BlogPost.updated_at, BlogPost.published_at)
+            .filter(BlogPost.is_published.is_(True))
+            .order_by(BlogPost.id)
+            .execution_options(yield_per=self.batch_size)
+        )
+        for slug, updated_at, published_at in rows:
+            yield SitemapEntry(
+                loc=_external("blog.post", slug=slug),
+                lastmod=updated_at or published_at,
+                changefreq="monthly",
+                priority="0.7",
+            )
+
+    def build(self) -> Dict[str, bytes]:
+        """
+        Genera todos los documentos.
+
+        Returns:
+            dict: {"sitemap.xml": ..., "sitemap-1.xml": ...}; con un solo
+            documento, sitemap.xml es directamente el urlset
+        """
+        chunks: List[bytes] = []
+        chunk_lastmods: List[Optional[datetime]] = []
+        buffer: List[str] = []
+        lastmod: Optional[datetime] = None
+
+        def close_chunk():
+            chunks.append((_URLSET_OPEN + "".join(buffer) + _URLSET_CLOSE).encode("utf-8"))
+            chunk_lastmods.append(lastmod)
+
+        for entry in self.entries():
+            if len(buffer) == self.max_urls:
+                close_chunk()
+                buffer, lastmod = [], None
+            buffer.append(_url_xml(entry))
+            if entry.lastmod and (lastmod is None or entry.lastmod > lastmod):
+                lastmod = entry.lastmod
+        close_chunk()
+
+        if len(chunks) == 1:
+            return {"sitemap.xml": chunks[0]}
+
+        documents = {f"sitemap-{i}.xml": body for i, body in enumerate(chunks, start=1)}
+        index = [_INDEX_OPEN]
+        for i, chunk_lastmod in enumerate(chunk_lastmods, start=1):
+            index.append(f"  <sitemap>\n    <loc>{escape(_external('main.sitemap_page', page=i))}</loc>\n")
+            if chunk_lastmod:
+                index.append(f"    <lastmod>{_w3c(chunk_lastmod)}</lastmod>\n")
+            index.append("  </sitemap>\n")
+        index.append(_INDEX_CLOSE)
+        documents["sitemap.xml"] = "".join(index).encode("utf-8")
+        return documents
+
+
+class SitemapCache:
+    """Documentos generados por worker, invalidados por la versión del contenido."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = None
+        self._documents: Dict[str, bytes] = {}
+        self.builds = 0
+
+    def get(self, name: str, token: str) -> Optional[bytes]:
+        """Documento `name` para la versión `token` (regenera si cambió)."""
+        with self._lock:
+            if self._token != token:
+                max_urls = current_app.config.get("SITEMAP_MAX_URLS", SITEMAP_MAX_URLS)
+                self._documents = SitemapBuilder(max_urls=max_urls).build()
+                self._token = token
+                self.builds += 1
+                logger.info(f"Sitemap regenerado: {len(self._documents)} documento(s)")
+            return self._documents.get(name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._token = None
+            self._documents = {}
+
+
+sitemap_cache = SitemapCache()
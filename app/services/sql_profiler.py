@@ -0,0 +1,208 @@
+# app/services/sql_profiler.py
+"""
+Instrumentación SQL por petición y detector de N+1.
+
+Los eventos de SQLAlchemy (before/after_cursor_execute) registran cada
+sentencia en los colectores activos:
+
+- Uno por petición: número de queries, tiempo total y las más lentas.
+  Las peticiones lentas (SQL_SLOW_REQUEST_MS) se registran en el log con
+  sus sentencias, y en modo debug (o con SQL_PROFILER_HEADERS) la respuesta
+  lleva las cabeceras X-SQL-Queries / X-SQL-Time-Ms / X-SQL-Max-Repeats.
+- Los abiertos con capture_queries() (tests, scripts).
+
+La "forma" de una sentencia es el SQL sin valores: un N+1 aparece como la
+misma forma repetida N veces en una petición.
+
+    with assert_query_budget(max_queries=6, max_repeats=2):
+        client.get("/admin/users")
+"""
+import heapq
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_collectors: ContextVar[tuple] = ContextVar("sql_collectors", default=())
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL normalizado: sin literales, listas IN colapsadas y espacios compactados."""
+    shape = _STRING.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryStats:
+    """Sentencias ejecutadas durante una petición o un bloque capture_queries()."""
+
+    keep_slowest: int = 5
+    count: int = 0
+    total_time: float = 0.0  # segundos
+    shapes: Counter = field(default_factory=Counter)
+    _slowest: List[Tuple[float, int, str]] = field(default_factory=list)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.shapes[statement_shape(statement)] += 1
+        item = (duration, self.count, statement)
+        if len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heappushpop(self._slowest, item)
+
+    def slowest(self) -> List[Tuple[float, str]]:
+        """(duración, sentencia) de las más lentas, de mayor a menor."""
+        return [(duration, statement) for duration, _, statement in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        """Formas ejecutadas al menos `threshold` veces (candidatas a N+1)."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    @property
+    def max_repeats(self) -> int:
+        return max(self.shapes.values(), default=0)
+
+    def report(self, limit: int = 5) -> str:
+        """Resumen legible para logs y mensajes de fallo."""
+        lines = [f"{self.count} queries en {self.total_time * 1000:.1f} ms"]
+        for shape, n in self.repeated()[:limit]:
+            lines.append(f"  x{n}: {shape[:300]}")
+        for duration, statement in self.slowest()[:limit]:
+            lines.append(f"  {duration * 1000:.1f} ms: {_WHITESPACE.sub(' ', statement)[:300]}")
+        return "\n".join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Una vista superó su presupuesto de queries o repite la misma sentencia."""
+
+
+@contextmanager
+def capture_queries(keep_slowest: int = 5):
+    """Registra las sentencias ejecutadas dentro del bloque."""
+    stats = QueryStats(keep_slowest=keep_slowest)
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+@contextmanager
+def assert_query_budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+    """
+    Falla si el bloque ejecuta más de `max_queries` sentencias o alguna forma
+    de sentencia más de `max_repeats` veces.
+    """
+    with capture_queries() as stats:
+        yield stats
+
+    problems = []
+    if max_queries is not None and stats.count > max_queries:
+        problems.append(f"{stats.count} queries (presupuesto: {max_queries})")
+    if max_repeats is not None and stats.max_repeats > max_repeats:
+        problems.append(f"sentencia repetida {stats.max_repeats} veces (máximo: {max_repeats})")
+    if problems:
+        raise QueryBudgetExceeded("; ".join(problems) + "\n" + stats.report())
+
+
+# ── Eventos de SQLAlchemy ──────────────────────────────────────
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors.get():
+        conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors.get()
+    starts = conn.info.get("sql_profiler_start")
+    if not collectors or not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    for stats in collectors:
+        stats.record(statement, duration)
+
+
+class SQLProfiler:
+    """
+    Colector por petición con log de peticiones lentas.
+
+    Uso:
+        sql_profiler.init_app(app)
+    """
+
+    def __init__(self, flask_app=None):
+        self.enabled = True
+        self.slow_request_ms = 500
+        self.headers = False
+        self.keep_slowest = 5
+
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Registra los hooks de petición según SQL_PROFILER_* / SQL_SLOW_REQUEST_MS."""
+        self.enabled = flask_app.config.get("SQL_PROFILER_ENABLED", True)
+        self.slow_request_ms = flask_app.config.get("SQL_SLOW_REQUEST_MS", 500)
+        self.headers = flask_app.config.get("SQL_PROFILER_HEADERS", flask_app.debug)
+        self.keep_slowest = flask_app.config.get("SQL_PROFILER_SLOWEST", 5)
+        flask_app.extensions["sql_profiler"] = self
+
+        if self.enabled:
+            flask_app.before_request(self._start_request)
+            flask_app.after_request(self._finish_request)
+            flask_app.teardown_request(self._teardown_request)
+
+    def _start_request(self):
+        stats = QueryStats(keep_slowest=self.keep_slowest)
+        g.sql_stats = stats
+        g.sql_started_at = time.perf_counter()
+        g.sql_token = _collectors.set(_collectors.get() + (stats,))
+
+    def _finish_request(self, response):
+        stats = g.get("sql_stats")
+        if stats is None:
+            return response
+
+        elapsed_ms = (time.perf_counter() - g.sql_started_at) * 1000
+        if self.slow_request_ms and elapsed_ms >= self.slow_request_ms:
+            logger.warning(
+                f"Petición lenta {request.method} {request.path}: {elapsed_ms:.0f} ms, {stats.report()}"
+            )
+
+        if self.headers:
+            response.headers["X-SQL-Queries"] = str(stats.count)
+            response.headers["X-SQL-Time-Ms"] = f"{stats.total_time * 1000:.1f}"
+            response.headers["X-SQL-Max-Repeats"] = str(stats.max_repeats)
+        return response
+
+    def _teardown_request(self, exc=None):
+        token = g.pop("sql_token", None)
+        if token is not None:
+            try:
+                _collectors.reset(token)
+            except ValueError:
+                # Token creado en otro contexto (no debería ocurrir): se descarta el colector
+                _collectors.set(())
+
+
+sql_profiler = SQLProfiler()
@@ -6,12 +6,15 @@ Maneja correctamente FileStorage con PIL
 """
 import os
 import io
-from datetime import datetime
+from datetime import datetime, timezone
 from werkzeug.utils import secure_filename
 from PIL import Image
 import boto3
 from botocore.exceptions import ClientError
 
+# Límite de keys por llamada a delete_objects impuesto por S3
+S3_DELETE_BATCH_SIZE = 1000
+
 
 class StorageService:
     """
@@ -43,6 +46,8 @@ class StorageService:
         aws_key = os.environ.get('AWS_ACCESS_KEY_ID')
         aws_secret = os.environ.get('AWS_SECRET_ACCESS_KEY')
         aws_region = os.environ.get('AWS_REGION', 'eu-north-1')
+        # Endpoint alternativo (MinIO, moto_server...) para entornos locales
+        endpoint_url = os.environ.get('S3_ENDPOINT_URL')
 
         if aws_bucket and aws_key and aws_secret:
             try:
@@ -50,7 +55,8 @@ class StorageService:
                     's3',
                     aws_access_key_id=aws_key,
                     aws_secret_access_key=aws_secret,
-                    region_name=aws_region
+                    region_name=aws_region,
+                    endpoint_url=endpoint_url
                     )
                 self.s3_bucket = aws_bucket
                 self.cloudfront_domain = os.environ.get('CLOUDFRONT_DOMAIN')
@@ -362,6 +368,86 @@ class StorageService:
             print(f"❌ Error al eliminar archivo: {e}")
             raise
 
+    def list_files(self, prefix, storage='s3'):
+        """
+        Lista los archivos almacenados bajo un prefijo (paginado)
+
+        Args:
+            prefix: Prefijo S3 ('blog/') o subcarpeta local ('images')
+            storage: 's3' o 'local'
+
+        Yields:
+            dict con 'key', 'size' y 'last_modified' (datetime UTC)
+        """
+        if storage == 's3':
+            if not self.use_s3:
+                return
+            kwargs = {'Bucket': self.s3_bucket, 'Prefix': prefix}
+            while True:
+                page = self.s3_client.list_objects_v2(**kwargs)
+                for obj in page.get('Contents', []):
+                    yield {
+                        'key': obj['Key'],
+                        'size': obj.get('Size', 0),
+                        'last_modified': obj['LastModified']
+                        }
+                if not page.get('IsTruncated'):
+                    break
+                kwargs['ContinuationToken'] = page['NextContinuationToken']
+        else:
+            root = os.path.join(self.upload_folder, prefix)
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    stat = os.stat(path)
+                    yield {
+                        'key': path,
+                        'size': stat.st_size,
+                        'last_modified': datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+                        }
+
+    def delete_files(self, file_paths, storage='local'):
+        """
+        Elimina varios archivos en lote
+
+        En S3 usa delete_objects con hasta 1000 keys por llamada en lugar
+        de una petición por archivo.
+
+        Args:
+            file_paths: Iterable de rutas locales o keys S3
+            storage: 'local' o 's3'
+
+        Returns:
+            dict con 'deleted' (lista de keys) y 'errors' (lista de dicts)
+        """
+        deleted, errors = [], []
+        file_paths = list(file_paths)
+
+        if storage == 's3' and self.use_s3:
+            for start in range(0, len(file_paths), S3_DELETE_BATCH_SIZE):
+                batch = file_paths[start:start + S3_DELETE_BATCH_SIZE]
+                response = self.s3_client.delete_objects(
+                    Bucket=self.s3_bucket,
+                    Delete={
+                        'Objects': [{'Key': key} for key in batch],
+                        'Quiet': True
+                        }
+                    )
+                failed = {err['Key'] for err in response.get('Errors', [])}
+                errors.extend(response.get('Errors', []))
+                deleted.extend(key for key in batch if key not in failed)
+        else:
+            for path in file_paths:
+                try:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    deleted.append(path)
+                except OSError as e:
+                    errors.append({'Key': path, 'Message': str(e)})
+
+        print(f"✅ Eliminados {len(deleted)} archivos ({storage}), errores: {len(errors)}")
+        return {'deleted': deleted, 'errors': errors}
+
 
 # ============================================================================
 # INSTANCIA GLOBAL (Singleton)
@@ -7,6 +7,7 @@ from app import db
 from app.models.telegram import TelegramLinkToken, UserTelegramLink
 from app.models.user import User
 from app.services.fitmaster_service import FitMasterService
+from app.services.completions_chat import completions_chat
 import requests
 
 logger = logging.getLogger(__name__)
@@ -20,7 +21,9 @@ class TelegramIntegrationService:
     """
     
     SECRET_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-    API_URL = f"https://api.telegram.org/bot{SECRET_TOKEN}"
+    # Servidor Bot API alternativo (local o stub de benchmarks)
+    API_BASE_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+    API_URL = f"{API_BASE_URL}/bot{SECRET_TOKEN}"
 
     @classmethod
     def process_webhook_data(cls, data: Dict) -> None:
@@ -50,7 +53,8 @@ class TelegramIntegrationService:
     @classmethod
     def handle_reset_command(cls, chat_id: int, telegram_user_id: int) -> None:
         """
-        Borra el thread_id actual para forzar al agente a crear una nueva conversación limpia.
+        Borra el thread_id actual (y el historial local del motor completions) para forzar
+        al agente a crear una nueva conversación limpia.
         """
         link = UserTelegramLink.query.filter_by(telegram_user_id=str(telegram_user_id), status="verified").first()
         if not link:
@@ -60,7 +64,8 @@ class TelegramIntegrationService:
         try:
             # Borrar el thread_id forzará la creación de uno nuevo en el próximo mensaje
             old_thread = link.openai_thread_id
-            link.openai_thread_id = None
+            link.reset_thread()
+            completions_chat.forget(link.user_id)
             db.session.commit()
             
             logger.info(f"Thread reseteado para usuario {link.user_id} (viejo: {old_thread})")
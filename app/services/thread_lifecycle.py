@@ -0,0 +1,202 @@
+# app/services/thread_lifecycle.py
+"""
+Ciclo de vida de los threads de la Assistants API en Telegram.
+
+Cada run vuelve a leer el thread entero, así que en conversaciones largas
+los prompt_tokens (y con ellos latencia y coste) crecen turno a turno. Tras
+cada run se anota en el vínculo el prompt_tokens del run; cuando supera
+TELEGRAM_THREAD_PROMPT_BUDGET, el siguiente mensaje se envía a un thread
+nuevo sembrado con:
+- el contexto biométrico actual, como en cualquier thread nuevo;
+- un resumen compacto de los últimos mensajes del thread anterior
+  (Chat Completions con pocos tokens; si falla, un extracto literal).
+
+El thread anterior no se borra: solo deja de usarse.
+Rotaciones y fallos del resumen: `stats()` y /admin/openai-stats.
+"""
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_HEADER = (
+    "CONTEXTO DEL BACKEND CoachBodyFit360 — "
+    "Estos son los datos biométricos actuales del cliente. "
+    "Úsalos como referencia. Para planes de nutrición y "
+    "entrenamiento SIEMPRE usa las herramientas get_current_plans() "
+    "y get_user_history().\n\n"
+)
+
+SUMMARY_HEADER = (
+    "RESUMEN DE LA CONVERSACIÓN ANTERIOR — La conversación con este cliente "
+    "continúa desde un thread anterior. Tenlo en cuenta como memoria, sin "
+    "mencionarlo salvo que el cliente pregunte.\n\n"
+)
+
+SUMMARY_PROMPT = (
+    "Resume la conversación entre un cliente y su coach FitMaster en español, en "
+    "viñetas breves: objetivos, datos personales relevantes, acuerdos, dudas abiertas "
+    "y preferencias del cliente. No incluyas saludos ni relleno."
+)
+
+# Caracteres por mensaje que se envían al resumen (o al extracto si falla)
+_MESSAGE_CHARS = 1500
+_EXCERPT_CHARS = 3000
+
+
+class ThreadLifecycle:
+    """
+    Decide cuándo rotar el thread de un vínculo de Telegram y crea el nuevo.
+
+    Uso:
+        thread_lifecycle.init_app(app)
+        if thread_lifecycle.should_roll_over(link):
+            thread_id = thread_lifecycle.roll_over(client, link, context)
+        ...
+        thread_lifecycle.observe(link, run.usage.prompt_tokens)
+    """
+
+    def __init__(self, flask_app=None):
+        self.prompt_budget = 12_000
+        self.summary_messages = 20
+        self.summary_max_tokens = 400
+        self.summary_model = "gpt-4o-mini"
+        self._lock = threading.Lock()
+        self.counters = Counter()
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Config: TELEGRAM_THREAD_PROMPT_BUDGET (0 = no rotar), TELEGRAM_THREAD_SUMMARY_*."""
+        config = flask_app.config
+        self.prompt_budget = config.get("TELEGRAM_THREAD_PROMPT_BUDGET", 12_000)
+        self.summary_messages = config.get("TELEGRAM_THREAD_SUMMARY_MESSAGES", 20)
+        self.summary_max_tokens = config.get("TELEGRAM_THREAD_SUMMARY_MAX_TOKENS", 400)
+        self.summary_model = config.get("TELEGRAM_THREAD_SUMMARY_MODEL", "gpt-4o-mini")
+        with self._lock:
+            self.counters.clear()
+
+    # ── Decisión ───────────────────────────────────────────────
+    def should_roll_over(self, link) -> bool:
+        return bool(
+            self.prompt_budget
+            and link.openai_thread_id
+            and (link.openai_thread_prompt_tokens or 0) >= self.prompt_budget
+        )
+
+    def observe(self, link, prompt_tokens: int) -> None:
+        """
+        Anota los prompt_tokens del último run del thread.
+
+        Solo hace commit al pasar el presupuesto (lo único que decide algo);
+        por debajo, el valor viaja con el siguiente commit de la sesión.
+        """
+        link.openai_thread_prompt_tokens = prompt_tokens
+        if not self.should_roll_over(link):
+            return
+        logger.info(f"[threads] Thread {link.openai_thread_id} de user {link.user_id} en "
+                    f"{prompt_tokens} prompt tokens (presupuesto {self.prompt_budget}); se rotará")
+        try:
+            db.session.commit()
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el consumo del thread {link.openai_thread_id}: {e}")
+            db.session.rollback()
+
+    # ── Threads ────────────────────────────────────────────────
+    def open_thread(self, client, link, context: Optional[Dict] = None, summary: Optional[str] = None) -> str:
+        """Crea un thread (en una sola petición, con sus mensajes semilla) y lo asigna al vínculo."""
+        messages = []
+        if context:
+            messages.append({
+                "role": "user",
+                "content": CONTEXT_HEADER + json.dumps(context, ensure_ascii=False, indent=2),
+            })
+        if summary:
+            messages.append({"role": "user", "content": SUMMARY_HEADER + summary})
+
+        thread = client.beta.threads.create(messages=messages) if messages else client.beta.threads.create()
+        link.reset_thread(thread.id)
+        db.session.commit()
+        return thread.id
+
+    def roll_over(self, client, link, context: Optional[Dict] = None) -> str:
+        """Sustituye el thread del vínculo por uno nuevo con resumen y contexto."""
+        old_thread_id = link.openai_thread_id
+        prompt_tokens = link.openai_thread_prompt_tokens
+        summary = self.summarize(client, old_thread_id, link.user_id)
+        thread_id = self.open_thread(client, link, context, summary)
+        with self._lock:
+            self.counters["rollovers"] += 1
+        logger.info(f"[threads] Rotado thread de user {link.user_id}: {old_thread_id} → {thread_id} "
+                    f"({prompt_tokens} prompt tokens en el último run)")
+        return thread_id
+
+    def summarize(self, client, thread_id: str, user_id: int) -> Optional[str]:
+        """Resumen compacto de los últimos mensajes del thread (None si no hay mensajes)."""
+        try:
+            page = client.beta.threads.messages.list(
+                thread_id=thread_id, order="desc", limit=self.summary_messages
+            )
+            transcript = _transcript(reversed(page.data))
+        except Exception as e:
+            logger.warning(f"No se pudieron leer los mensajes del thread {thread_id}: {e}")
+            with self._lock:
+                self.counters["summary_failures"] += 1
+            return None
+        if not transcript:
+            return None
+
+        try:
+            response = client.chat.completions.create(
+                model=self.summary_model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": transcript},
+                ],
+                temperature=0.2,
+                max_tokens=self.summary_max_tokens,
+            )
+            if response.usage:
+                # Se liquida en el hueco del turno junto al run que sigue (settle acumula)
+                from app.services.fitmaster_service import FitMasterService
+                FitMasterService._record_usage(user_id, self.summary_model, response.usage, channel="telegram")
+            summary = (response.choices[0].message.content or "").strip()
+            if summary:
+                return summary
+        except Exception as e:
+            logger.warning(f"No se pudo resumir el thread {thread_id}: {e}")
+
+        # Sin resumen: los últimos mensajes literales, recortados
+        with self._lock:
+            self.counters["summary_failures"] += 1
+        return transcript[-_EXCERPT_CHARS:]
+
+    def stats(self) -> Dict[str, int]:
+        """Rotaciones y resúmenes fallidos (de este worker)."""
+        with self._lock:
+            return {
+                "prompt_budget": self.prompt_budget,
+                "rollovers": self.counters["rollovers"],
+                "summary_failures": self.counters["summary_failures"],
+            }
+
+
+def _transcript(messages) -> str:
+    lines: List[str] = []
+    for message in messages:
+        text = " ".join(
+            block.text.value for block in message.content if block.type == "text"
+        ).strip()
+        # El contexto biométrico se vuelve a sembrar actualizado: no se resume
+        if text and not text.startswith(CONTEXT_HEADER):
+            speaker = "Cliente" if message.role == "user" else "FitMaster"
+            lines.append(f"{speaker}: {text[:_MESSAGE_CHARS]}")
+    return "\n".join(lines)
+
+
+thread_lifecycle = ThreadLifecycle()
@@ -0,0 +1,224 @@
+# app/services/usage_recorder.py
+"""
+Registro de consumo de tokens (LLMUsageLedger) con escritura diferida.
+
+`record()` solo calcula el coste y encola la fila en memoria: el request o
+el stream de Telegram no abren transacción ni hacen commit de cambios
+ajenos de la sesión del request. Un hilo en segundo plano vuelca el buffer
+cada USAGE_FLUSH_INTERVAL segundos (o antes, al llegar a USAGE_FLUSH_BATCH
+filas) con un INSERT masivo en una sesión propia.
+
+Como en el contador de vistas del blog, lo pendiente se vuelca al parar el
+proceso (atexit) y un volcado fallido devuelve las filas al buffer, que está
+acotado a USAGE_BUFFER_MAX filas: si la BD no responde durante mucho
+tiempo se descartan las más antiguas (y se cuentan en `stats()`).
+
+Precios: MODEL_PRICING (USD por millón de tokens), ampliable o corregible
+con la config LLM_PRICING sin tocar código.
+"""
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# USD por millón de tokens: (prompt, completion)
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    # Runs del Assistant en modo polling (el Assistant usa gpt-4o-mini)
+    "assistants-api": (0.15, 0.60),
+    # Embeddings de las preguntas (answer_cache con ANSWER_CACHE_EMBEDDER="openai")
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+
+def _usage_tokens(usage_obj) -> Tuple[int, int, int]:
+    """(prompt, completion, total) de un usage del SDK o de un dict."""
+    if isinstance(usage_obj, dict):
+        get = usage_obj.get
+    else:
+        def get(name, default=None):
+            return getattr(usage_obj, name, default)
+    prompt = get("prompt_tokens", 0) or 0
+    completion = get("completion_tokens", 0) or 0
+    return prompt, completion, get("total_tokens", 0) or prompt + completion
+
+
+class UsageRecorder:
+    """
+    Buffer de filas de LLMUsageLedger por worker.
+
+    Uso:
+        usage_recorder.init_app(app)
+        usage_recorder.record(user_id, "gpt-4o-mini", response.usage, channel="web")
+    """
+
+    def __init__(self, flask_app=None):
+        self.app = None
+        self.interval = 5
+        self.batch_size = 200
+        self.max_pending = 10_000
+        self.pricing = dict(MODEL_PRICING)
+        self._pending = deque()
+        self._counters = {"recorded": 0, "flushed": 0, "failed_flushes": 0, "dropped": 0}
+        self._unpriced = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._atexit_registered = False
+
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Lee la configuración (USAGE_*, LLM_PRICING) y registra el volcado final al apagar el proceso."""
+        self.app = flask_app
+        self.interval = flask_app.config.get("USAGE_FLUSH_INTERVAL", 5)
+        self.batch_size = flask_app.config.get("USAGE_FLUSH_BATCH", 200)
+        self.max_pending = flask_app.config.get("USAGE_BUFFER_MAX", 10_000)
+        self.pricing = {**MODEL_PRICING, **flask_app.config.get("LLM_PRICING", {})}
+        flask_app.extensions["usage_recorder"] = self
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    # ── Precios ────────────────────────────────────────────────
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Coste en USD; los modelos con fecha (gpt-4o-mini-2024-07-18) usan el precio de su familia."""
+        rates = self.pricing.get(model)
+        if rates is None:
+            # Prefijo más largo: "gpt-4o-mini-2024-07-18" → "gpt-4o-mini", no "gpt-4o"
+            family = max((name for name in self.pricing if model.startswith(name)), key=len, default=None)
+            rates = self.pricing.get(family)
+        if rates is None:
+            if model not in self._unpriced:
+                self._unpriced.add(model)
+                logger.warning(f"[usage] Modelo {model} sin precio en LLM_PRICING; se registra con coste 0")
+            return 0.0
+        prompt_rate, completion_rate = rates
+        return (prompt_tokens * prompt_rate + completion_tokens * completion_rate) / 1_000_000
+
+    # ── Registro ───────────────────────────────────────────────
+    def record(self, user_id: int, model: str, usage_obj, channel: str = "telegram") -> Dict:
+        """Encola una fila del ledger (sin tocar la BD) y la devuelve."""
+        prompt, completion, total = _usage_tokens(usage_obj)
+        row = {
+            "user_id": user_id,
+            "model_name": model,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": total,
+            "channel": channel,
+            "cost_usd": self.cost(model, prompt, completion),
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            self._pending.append(row)
+            self._counters["recorded"] += 1
+            self._trim()
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+        self._ensure_thread()
+        return row
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _trim(self) -> None:
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            for _ in range(overflow):
+                self._pending.popleft()
+            self._counters["dropped"] += overflow
+            logger.error(f"[usage] Buffer del ledger lleno: descartadas {overflow} filas antiguas")
+
+    # ── Volcado ────────────────────────────────────────────────
+    def flush(self) -> int:
+        """
+        Inserta las filas pendientes en una sola transacción de una sesión propia.
+
+        Returns:
+            int: Número de filas insertadas
+        """
+        from app import db
+        from app.models.telegram import LLMUsageLedger
+
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = list(self._pending), deque()
+            if not batch:
+                return 0
+
+            try:
+                with self.app.app_context():
+                    with Session(db.engine) as session:
+                        session.execute(insert(LLMUsageLedger), batch)
+                        session.commit()
+            except Exception as e:
+                logger.error(f"Error volcando consumo de tokens, se reintentará: {e}", exc_info=True)
+                with self._lock:
+                    # Las filas fallidas van delante de las llegadas durante el volcado
+                    self._pending.extendleft(reversed(batch))
+                    self._counters["failed_flushes"] += 1
+                    self._trim()
+                return 0
+
+            with self._lock:
+                self._counters["flushed"] += len(batch)
+            logger.debug(f"Consumo de tokens volcado: {len(batch)} filas")
+            return len(batch)
+
+    def clear(self) -> None:
+        """Descarta lo pendiente sin escribirlo y reinicia las métricas."""
+        with self._lock:
+            self._pending.clear()
+            self._counters = dict.fromkeys(self._counters, 0)
+
+    def stats(self) -> Dict[str, int]:
+        """Filas registradas, volcadas, descartadas y pendientes (de este worker)."""
+        with self._lock:
+            return {**self._counters, "pending": len(self._pending)}
+
+    # ── Hilo de fondo ──────────────────────────────────────────
+    def _ensure_thread(self) -> None:
+        # El hilo se crea en el primer registro para que cada worker
+        # (post-fork) tenga el suyo
+        if not self.interval or (self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="llm-usage-recorder", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def shutdown(self) -> None:
+        """Detiene el hilo y vuelca lo pendiente (apagado ordenado)."""
+        self._stop.set()
+        self._wake.set()
+        if self.app is not None:
+            self.flush()
+
+
+usage_recorder = UsageRecorder()
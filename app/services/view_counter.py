@@ -0,0 +1,187 @@
+# app/services/view_counter.py
+"""
+Contador de vistas del blog con escritura diferida (write-behind).
+
+Cada vista de un post solo incrementa un contador en memoria del worker.
+Un hilo en segundo plano vuelca los incrementos periódicamente con un único
+UPDATE masivo (y un upsert en blog_post_daily_views), de modo que las
+lecturas del blog no abren transacciones de escritura ni compiten por el
+lock de fila de los posts populares.
+
+Los incrementos pendientes se vuelcan también al parar el proceso (atexit,
+salvo con BLOG_VIEWS_FLUSH_ON_EXIT = False), y si un volcado falla se reincorporan al buffer para no perder vistas. Las
+vistas de posts que ya no existen (borrados tras verse) se descartan: no
+llegan a blog_post_daily_views ni bloquean los volcados siguientes.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import case, select, update
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Buffer de vistas por worker.
+
+    Uso:
+        view_counter.init_app(app)
+        view_counter.record(post.id)
+    """
+
+    def __init__(self, flask_app=None):
+        self.app = None
+        self.interval = 30
+        self.track_daily = True
+        self.flush_on_exit = True
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._atexit_registered = False
+
+        if flask_app:
+            self.init_app(flask_app)
+
+    def init_app(self, flask_app):
+        """Lee la configuración y registra el volcado final al apagar el proceso."""
+        self.app = flask_app
+        self.interval = flask_app.config.get("BLOG_VIEWS_FLUSH_INTERVAL", 30)
+        self.track_daily = flask_app.config.get("BLOG_VIEWS_TRACK_DAILY", True)
+        self.flush_on_exit = flask_app.config.get("BLOG_VIEWS_FLUSH_ON_EXIT", True)
+        flask_app.extensions["view_counter"] = self
+        if not self._atexit_registered:
+            atexit.register(self._at_exit)
+            self._atexit_registered = True
+
+    # ── Registro ───────────────────────────────────────────────
+    def record(self, post_id: int, count: int = 1) -> None:
+        """Acumula vistas en memoria (sin tocar la BD)."""
+        with self._lock:
+            self._pending[post_id] += count
+        self._ensure_thread()
+
+    def pending(self, post_id: int) -> int:
+        """Vistas aún no volcadas para un post."""
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    # ── Volcado ────────────────────────────────────────────────
+    def flush(self) -> int:
+        """
+        Vuelca los incrementos pendientes en una sola transacción.
+
+        Returns:
+            int: Número de vistas volcadas
+        """
+        from app import db
+
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, Counter()
+            if not batch:
+                return 0
+
+            try:
+                with self.app.app_context():
+                    written = self._write(db, batch)
+                    db.session.commit()
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Error volcando vistas del blog, se reintentará: {e}", exc_info=True)
+                with self._lock:
+                    self._pending.update(batch)
+                return 0
+
+            dropped = set(batch) - set(written)
+            if dropped:
+                logger.info(f"Vistas descartadas de posts que ya no existen: {sorted(dropped)}")
+            total = sum(written.values())
+            logger.debug(f"Vistas del blog volcadas: {total} en {len(written)} posts")
+            return total
+
+    def _write(self, db, batch: Counter) -> Counter:
+        """Aplica el lote y devuelve las vistas de los posts que existían."""
+        from app.models.blog_post import BlogPost
+
+        stmt = (
+            update(BlogPost)
+            .where(BlogPost.id.in_(list(batch)))
+            .values(
+                views_count=db.func.coalesce(BlogPost.views_count, 0)
+                + case(dict(batch), value=BlogPost.id, else_=0),
+                # Una vista no es una edición: no tocar updated_at (versiona la caché HTTP)
+                updated_at=BlogPost.updated_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if db.engine.dialect.update_returning:
+            existing = db.session.execute(stmt.returning(BlogPost.id)).scalars().all()
+        else:
+            existing = db.session.execute(select(BlogPost.id).where(BlogPost.id.in_(list(batch)))).scalars().all()
+            db.session.execute(stmt)
+        written = Counter({post_id: batch[post_id] for post_id in existing})
+
+        if self.track_daily and written:
+            self._write_daily(db, written)
+        return written
+
+    def _write_daily(self, db, batch: Counter) -> None:
+        from app.models.blog_post import BlogPostDailyViews
+
+        dialect = db.engine.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return
+
+        today = datetime.utcnow().date()
+        stmt = insert(BlogPostDailyViews).values(
+            [{"post_id": post_id, "day": today, "views": views} for post_id, views in batch.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["post_id", "day"],
+            set_={"views": BlogPostDailyViews.views + stmt.excluded.views},
+        )
+        db.session.execute(stmt)
+
+    # ── Hilo de fondo ──────────────────────────────────────────
+    def _ensure_thread(self) -> None:
+        # El hilo se crea en el primer registro para que cada worker
+        # (post-fork) tenga el suyo
+        if not self.interval or (self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="blog-view-counter", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def _at_exit(self) -> None:
+        if self.flush_on_exit:
+            self.shutdown()
+        else:
+            self._stop.set()
+
+    def shutdown(self) -> None:
+        """Detiene el hilo y vuelca lo pendiente (apagado ordenado)."""
+        self._stop.set()
+        if self.app is not None:
+            self.flush()
+
+
+view_counter = ViewCounter()
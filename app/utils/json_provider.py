@@ -0,0 +1,81 @@
+# app/utils/json_provider.py
+"""
+Proveedor JSON de Flask con backend intercambiable (orjson o stdlib).
+
+`jsonify`, `request.get_json` y los `return dict` de las vistas pasan por
+`app.json`. Con JSON_BACKEND = "auto" (por defecto) se usa orjson si está
+instalado y, si no, el `json` de la stdlib con el comportamiento de Flask.
+
+La salida es equivalente a la del proveedor por defecto: claves ordenadas,
+fechas en formato HTTP, Decimal/UUID/dataclasses y objetos con __html__
+pasan por el mismo `default` de Flask. La única diferencia es que orjson
+emite UTF-8 en lugar de escapar a \\uXXXX. Si orjson rechaza un valor
+(enteros de más de 64 bits, por ejemplo) se reintenta con la stdlib.
+"""
+import typing as t
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+BACKENDS = ("auto", "orjson", "stdlib")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider que serializa con orjson cuando está disponible."""
+
+    def __init__(self, app, backend: str = "auto"):
+        super().__init__(app)
+        if backend not in BACKENDS:
+            raise ValueError(f"JSON_BACKEND desconocido: {backend!r} (opciones: {', '.join(BACKENDS)})")
+        if backend == "orjson" and orjson is None:
+            raise RuntimeError("JSON_BACKEND=orjson requiere el paquete 'orjson' instalado")
+        self.backend = "orjson" if backend != "stdlib" and orjson is not None else "stdlib"
+
+    def _orjson_options(self, indent: bool, newline: bool) -> int:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        if newline:
+            options |= orjson.OPT_APPEND_NEWLINE
+        return options
+
+    def dumps_bytes(self, obj: t.Any, indent: bool = False, newline: bool = False) -> bytes:
+        """Serializa a bytes UTF-8 sin pasar por str (lo que escribe la respuesta)."""
+        if self.backend == "orjson":
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent, newline))
+            except orjson.JSONEncodeError:
+                pass
+        kwargs = {"indent": 2} if indent else {"separators": (",", ":")}
+        return (super().dumps(obj, **kwargs) + ("\n" if newline else "")).encode()
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        if self.backend == "orjson" and set(kwargs) <= {"indent"}:
+            return self.dumps_bytes(obj, indent=bool(kwargs.get("indent"))).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: t.Any) -> t.Any:
+        if self.backend == "orjson" and not kwargs:
+            # orjson.JSONDecodeError hereda de json.JSONDecodeError (ValueError)
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        if self.backend != "orjson":
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent, newline=True), mimetype=self.mimetype)
+
+
+def init_json_provider(flask_app) -> FastJSONProvider:
+    """Instala FastJSONProvider en `flask_app.json` según JSON_BACKEND."""
+    provider = FastJSONProvider(flask_app, backend=flask_app.config.get("JSON_BACKEND", "auto"))
+    flask_app.json = provider
+    return provider
@@ -1,12 +1,11 @@
 """
 Utilidades para procesar Markdown y generar contenido del blog
 """
+import hashlib
+import json
 import re
+import threading
 import markdown
-from markdown.extensions.codehilite import CodeHiliteExtension
-from markdown.extensions.fenced_code import FencedCodeExtension
-from markdown.extensions.tables import TableExtension
-from markdown.extensions.toc import TocExtension
 import bleach
 from slugify import slugify
 
@@ -20,9 +19,13 @@ MARKDOWN_EXTENSIONS = [
     'nl2br',  # Newline to <br>
     'sane_lists',  # Listas más inteligentes
     'md_in_html',  # Permite HTML dentro de Markdown
-    TocExtension(toc_depth='2-3'),  # Tabla de contenidos
+    'toc',  # Tabla de contenidos
 ]
 
+MARKDOWN_EXTENSION_CONFIGS = {
+    'toc': {'toc_depth': '2-3'},
+}
+
 # Tags HTML permitidos (seguridad)
 ALLOWED_TAGS = [
     'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
@@ -36,6 +39,8 @@ ALLOWED_TAGS = [
 ]
 
 ALLOWED_ATTRIBUTES = {
+    'h2': ['id'],  # Anclas de la tabla de contenidos
+    'h3': ['id'],
     'a': ['href', 'title', 'target', 'rel'],
     'img': ['src', 'alt', 'title', 'width', 'height'],
     'video': ['controls', 'width', 'height', 'poster', 'preload', 'autoplay', 'loop', 'muted'],
@@ -48,58 +53,147 @@ ALLOWED_ATTRIBUTES = {
 }
 
 
-def render_markdown(content):
+# Incrementar cuando cambie la lógica de render no recogida en la config
+# (p. ej. replace_youtube) para forzar el re-render de los posts guardados
+RENDERER_REVISION = 1
+
+YOUTUBE_PATTERN = re.compile(r'!\[video:([^\]]+)\]\(([^)]+youtube[^)]+)\)')
+
+# Tags permitidos en la tabla de contenidos generada por la extensión toc
+TOC_ALLOWED_TAGS = ['div', 'ul', 'li', 'a', 'span']
+TOC_ALLOWED_ATTRIBUTES = {'div': ['class'], 'a': ['href', 'title'], 'span': ['class']}
+
+_thread_local = threading.local()
+
+
+def _compute_renderer_version():
+    """Hash estable de todo lo que influye en el HTML generado"""
+    fingerprint = json.dumps({
+        'revision': RENDERER_REVISION,
+        'extensions': MARKDOWN_EXTENSIONS,
+        'extension_configs': MARKDOWN_EXTENSION_CONFIGS,
+        'tags': ALLOWED_TAGS,
+        'attributes': ALLOWED_ATTRIBUTES,
+        'markdown': markdown.__version__,
+        'bleach': bleach.__version__,
+    }, sort_keys=True)
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:12]
+
+
+RENDERER_VERSION = _compute_renderer_version()
+
+
+def _get_markdown():
     """
-    Convierte Markdown a HTML seguro
-    
-    Args:
-        content (str): Contenido en Markdown
-        
-    Returns:
-        str: HTML renderizado y sanitizado
+    Devuelve una instancia Markdown reutilizable por hilo
+
+    Construir markdown.Markdown con todas las extensiones es caro, así que
+    se crea una vez por hilo y se resetea entre documentos.
     """
-    if not content:
-        return ''
-    
+    md = getattr(_thread_local, 'md', None)
+    if md is None:
+        md = markdown.Markdown(
+            extensions=MARKDOWN_EXTENSIONS,
+            extension_configs=MARKDOWN_EXTENSION_CONFIGS
+        )
+        _thread_local.md = md
+    return md.reset()
+
+
+def _replace_youtube(match):
+    """Convierte ![video:titulo](url de YouTube) en un iframe embebido"""
+    url = match.group(2)
+
+    # Extraer video ID
+    video_id = None
+    if 'youtube.com/watch?v=' in url:
+        video_id = url.split('watch?v=')[1].split('&')[0]
+    elif 'youtube.com/embed/' in url:
+        video_id = url.split('embed/')[1].split('?')[0]
+    elif 'youtu.be/' in url:
+        video_id = url.split('youtu.be/')[1].split('?')[0]
+
+    if video_id:
+        return f'<div class="video-container" style="position: relative; padding-bottom: 56.25%; height: 0; overflow: hidden; max-width: 100%; margin: 2rem 0;"><iframe src="https://www.youtube.com/embed/{video_id}" style="position: absolute; top: 0; left: 0; width: 100%; height: 100%;" frameborder="0" allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture" allowfullscreen></iframe></div>'
+    return match.group(0)
+
+
+def _render(content):
+    """Renderiza Markdown y devuelve (html_sanitizado, toc_sanitizado)"""
     # Procesar videos de YouTube ANTES de markdown
     # Detectar: ![video:titulo](https://www.youtube.com/watch?v=ID) o ![video:titulo](https://youtube.com/embed/ID)
-    def replace_youtube(match):
-        title = match.group(1)
-        url = match.group(2)
-        
-        # Extraer video ID
-        video_id = None
-        if 'youtube.com/watch?v=' in url:
-            video_id = url.split('watch?v=')[1].split('&')[0]
-        elif 'youtube.com/embed/' in url:
-            video_id = url.split('embed/')[1].split('?')[0]
-        elif 'youtu.be/' in url:
-            video_id = url.split('youtu.be/')[1].split('?')[0]
-        
-        if video_id:
-            return f'<div class="video-container" style="position: relative; padding-bottom: 56.25%; height: 0; overflow: hidden; max-width: 100%; margin: 2rem 0;"><iframe src="https://www.youtube.com/embed/{video_id}" style="position: absolute; top: 0; left: 0; width: 100%; height: 100%;" frameborder="0" allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture" allowfullscreen></iframe></div>'
-        return match.group(0)
-    
-    content = re.sub(r'!\[video:([^\]]+)\]\(([^)]+youtube[^)]+)\)', replace_youtube, content)
-    
+    content = YOUTUBE_PATTERN.sub(_replace_youtube, content)
+
     # Convertir Markdown a HTML
-    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    md = _get_markdown()
     html = md.convert(content)
-    
+    toc = getattr(md, 'toc', '')
+
     # Sanitizar HTML (seguridad) - Agregar iframe a tags permitidos
     allowed_tags = ALLOWED_TAGS + ['iframe']
     allowed_attrs = ALLOWED_ATTRIBUTES.copy()
     allowed_attrs['iframe'] = ['src', 'frameborder', 'allow', 'allowfullscreen', 'style']
     allowed_attrs['div'] = ['class', 'style']
-    
+
     clean_html = bleach.clean(
         html,
         tags=allowed_tags,
         attributes=allowed_attrs,
         strip=True
     )
+    clean_toc = bleach.clean(
+        toc,
+        tags=TOC_ALLOWED_TAGS,
+        attributes=TOC_ALLOWED_ATTRIBUTES,
+        strip=True
+    ) if toc else ''
+
+    return clean_html, clean_toc
+
+
+def render_markdown(content):
+    """
+    Convierte Markdown a HTML seguro
     
-    return clean_html
+    Args:
+        content (str): Contenido en Markdown
+        
+    Returns:
+        str: HTML renderizado y sanitizado
+    """
+    if not content:
+        return ''
+
+    html, _ = _render(content)
+    return html
+
+
+def render_post_content(content):
+    """
+    Pre-renderiza todo lo derivado del Markdown de un post
+
+    Se llama al guardar el post para que las vistas públicas no hagan
+    ningún trabajo de Markdown.
+
+    Args:
+        content (str): Contenido en Markdown
+
+    Returns:
+        dict: html, toc, reading_time, excerpt y renderer_version
+    """
+    html, toc = _render(content) if content else ('', '')
+
+    # Un TOC sin entradas no aporta nada
+    if '<li' not in toc:
+        toc = ''
+
+    return {
+        'html': html,
+        'toc': toc,
+        'reading_time': calculate_reading_time(content),
+        'excerpt': generate_excerpt(content),
+        'renderer_version': RENDERER_VERSION,
+    }
 
 
 def calculate_reading_time(content):
@@ -0,0 +1,116 @@
+"""
+Paginación keyset (seek) con cursores opacos.
+
+En lugar de OFFSET + COUNT(*), cada página filtra por la clave ordenada del
+último elemento visto, p. ej. WHERE (published_at, id) < (:p, :id). Con un
+índice sobre esas columnas, la página N cuesta lo mismo que la página 1.
+"""
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import tuple_
+
+
+@dataclass
+class KeysetPage:
+    """Página de resultados con cursores hacia delante y hacia atrás."""
+
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    total: Optional[int] = None  # Aproximado (agregado cacheado), solo informativo
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any], direction: str = "next") -> str:
+    """Codifica la clave de un elemento como cursor opaco para la URL."""
+    payload = json.dumps({"k": [_encode_value(v) for v in values], "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int):
+    """
+    Decodifica un cursor.
+
+    Returns:
+        (valores, dirección) o (None, "next") si el cursor falta o es inválido
+    """
+    if not cursor:
+        return None, "next"
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(v) for v in payload["k"]]
+        direction = payload.get("d", "next")
+    except (ValueError, KeyError, TypeError):
+        return None, "next"
+    if len(values) != size or direction not in ("next", "prev") or any(v is None for v in values):
+        return None, "next"
+    return values, direction
+
+
+def keyset_paginate(query, columns, cursor: Optional[str] = None, per_page: int = 12) -> KeysetPage:
+    """
+    Pagina una query por las columnas dadas en orden descendente.
+
+    Args:
+        query: Query SQLAlchemy (sin order_by)
+        columns: Columnas de la clave, la última debe ser única (p. ej. id)
+        cursor: Cursor recibido en la URL (None = primera página)
+        per_page: Elementos por página
+
+    Returns:
+        KeysetPage con los elementos y los cursores vecinos
+    """
+    values, direction = decode_cursor(cursor, len(columns))
+    key = tuple_(*columns)
+
+    if values is None:
+        query = query.order_by(*[c.desc() for c in columns])
+    elif direction == "next":
+        query = query.filter(key < tuple_(*values)).order_by(*[c.desc() for c in columns])
+    else:
+        # Hacia atrás: se recorre en orden ascendente y se invierte
+        query = query.filter(key > tuple_(*values)).order_by(*[c.asc() for c in columns])
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == "prev" and values is not None:
+        rows.reverse()
+
+    def key_of(row):
+        return [getattr(row, c.key) for c in columns]
+
+    page = KeysetPage(items=rows)
+    if rows:
+        more_after = has_more if direction == "next" or values is None else True
+        more_before = values is not None and (direction == "next" or has_more)
+        if more_after:
+            page.next_cursor = encode_cursor(key_of(rows[-1]), "next")
+        if more_before:
+            page.prev_cursor = encode_cursor(key_of(rows[0]), "prev")
+    return page
@@ -0,0 +1,205 @@
+"""
+Planes de ejecución de las queries calientes.
+
+HOT_QUERIES registra, con un nombre, la forma de cada query frecuente de la
+app (mismos filtros y orden que en su vista/servicio). explain() obtiene su
+plan con EXPLAIN y plan_problems() detecta las regresiones que importan:
+
+- recorrido secuencial de la tabla (SQLite: "SCAN tabla";
+  PostgreSQL: "Seq Scan")
+- ordenación en memoria/disco en lugar de leer el índice ya ordenado
+  (SQLite: "USE TEMP B-TREE FOR ORDER BY"; PostgreSQL: nodo "Sort")
+
+En PostgreSQL se desactivan enable_seqscan/enable_sort durante el EXPLAIN:
+con pocas filas el planner prefiere un Seq Scan aunque el índice exista, y
+lo que se quiere comprobar es que exista un índice utilizable.
+
+Los tests (tests/test_query_plans.py) recorren el registro sobre una base de
+datos sembrada y fallan si alguna query regresa.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from sqlalchemy import event, tuple_
+
+from app import db
+from app.models import BiometricAnalysis, BlogPost, LLMUsageLedger, Notification, NutritionPlan, TrainingPlan
+
+HOT_QUERIES: Dict[str, Callable] = {}
+
+# Valores representativos para los parámetros de las queries
+SAMPLE_USER_ID = 1
+SAMPLE_SINCE = datetime(2025, 1, 1)
+
+_SQLITE_TEMP_SORT = re.compile(r"USE TEMP B-TREE FOR (?:(?:RIGHT PART OF|LAST TERM OF) )?ORDER BY")
+_PG_SEQ_SCAN = re.compile(r"Seq Scan on (\S+)")
+_PG_SORT = re.compile(r"(?:^|->)\s*(?:Incremental )?Sort\s+\(")
+
+
+def hot_query(name: str):
+    """Registra una función que construye una query caliente (sin ejecutarla)."""
+    def decorator(func):
+        HOT_QUERIES[name] = func
+        return func
+    return decorator
+
+
+def explain(query) -> List[str]:
+    """
+    Plan de ejecución de una Query/Select, una línea por nodo.
+
+    La query se ejecuta normalmente; un listener lanza el EXPLAIN sobre la
+    misma sentencia SQL y los mismos parámetros ya procesados por el driver.
+    """
+    statement = getattr(query, "statement", query)
+    engine = db.session.get_bind()
+    plan: List[str] = []
+
+    def _explain(conn, cursor, sql, parameters, context, executemany):
+        if plan or not sql.lstrip().upper().startswith("SELECT"):
+            return
+        explain_cursor = conn.connection.cursor()
+        try:
+            if conn.dialect.name == "postgresql":
+                explain_cursor.execute("SET enable_seqscan = off")
+                explain_cursor.execute("SET enable_sort = off")
+                try:
+                    explain_cursor.execute("EXPLAIN " + sql, parameters)
+                    plan.extend(row[0] for row in explain_cursor.fetchall())
+                finally:
+                    explain_cursor.execute("RESET enable_seqscan")
+                    explain_cursor.execute("RESET enable_sort")
+            else:
+                explain_cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+                plan.extend(row[-1] for row in explain_cursor.fetchall())
+        finally:
+            explain_cursor.close()
+
+    event.listen(engine, "before_cursor_execute", _explain)
+    try:
+        db.session.execute(statement).all()
+    finally:
+        event.remove(engine, "before_cursor_execute", _explain)
+    return plan
+
+
+def _is_sqlite_table_scan(line: str) -> bool:
+    # "SCAN t USING INDEX ..." recorre el índice (ya ordenado), no la tabla
+    return (
+        line.startswith("SCAN ")
+        and " USING " not in line
+        and "VIRTUAL TABLE" not in line
+        and "CONSTANT ROW" not in line
+    )
+
+
+def plan_problems(plan: List[str], dialect: str) -> List[str]:
+    """Líneas del plan que indican un recorrido secuencial o una ordenación."""
+    problems = []
+    for line in plan:
+        if dialect == "postgresql":
+            if _PG_SEQ_SCAN.search(line) or _PG_SORT.search(line):
+                problems.append(line.strip())
+        elif _is_sqlite_table_scan(line) or _SQLITE_TEMP_SORT.search(line):
+            problems.append(line.strip())
+    return problems
+
+
+def check_hot_queries() -> Dict[str, List[str]]:
+    """Ejecuta EXPLAIN sobre todo el registro. Devuelve {nombre: problemas} de las que regresan."""
+    dialect = db.session.get_bind().dialect.name
+    failures = {}
+    for name, build in HOT_QUERIES.items():
+        problems = plan_problems(explain(build()), dialect)
+        if problems:
+            failures[name] = problems
+    return failures
+
+
+# ── Registro ───────────────────────────────────────────────────
+@hot_query("biometric.user_history")
+def _biometric_user_history():
+    """Historial del usuario (api/bioanalyze, admin, bot de Telegram)."""
+    return (
+        BiometricAnalysis.query.filter_by(user_id=SAMPLE_USER_ID)
+        .order_by(BiometricAnalysis.created_at.desc())
+        .limit(10)
+    )
+
+
+@hot_query("notifications.unread_count")
+def _notifications_unread_count():
+    """Contador del badge de notificaciones."""
+    return db.session.query(db.func.count(Notification.id)).filter_by(
+        user_id=SAMPLE_USER_ID, is_read=False
+    )
+
+
+@hot_query("notifications.recent_unread")
+def _notifications_recent_unread():
+    """Últimas notificaciones sin leer del usuario."""
+    return (
+        Notification.query.filter_by(user_id=SAMPLE_USER_ID, is_read=False)
+        .order_by(Notification.created_at.desc())
+        .limit(5)
+    )
+
+
+@hot_query("nutrition.active_plans")
+def _nutrition_active_plans():
+    """Mis planes de nutrición / último plan activo (FitMaster)."""
+    return (
+        NutritionPlan.query.filter_by(user_id=SAMPLE_USER_ID, is_active=True)
+        .order_by(NutritionPlan.created_at.desc())
+    )
+
+
+@hot_query("training.active_plans")
+def _training_active_plans():
+    """Mis planes de entrenamiento / último plan activo (FitMaster)."""
+    return (
+        TrainingPlan.query.filter_by(user_id=SAMPLE_USER_ID, is_active=True)
+        .order_by(TrainingPlan.created_at.desc())
+    )
+
+
+@hot_query("llm_usage.user_window")
+def _llm_usage_user_window():
+    """Consumo de tokens de un usuario en una ventana de tiempo."""
+    return db.session.query(db.func.sum(LLMUsageLedger.total_tokens)).filter(
+        LLMUsageLedger.user_id == SAMPLE_USER_ID,
+        LLMUsageLedger.created_at >= SAMPLE_SINCE,
+    )
+
+
+@hot_query("blog.index_first_page")
+def _blog_index_first_page():
+    """Primera página del blog (keyset_paginate sin cursor)."""
+    return (
+        BlogPost.query.filter_by(is_published=True)
+        .order_by(BlogPost.published_at.desc(), BlogPost.id.desc())
+        .limit(13)
+    )
+
+
+@hot_query("blog.index_next_page")
+def _blog_index_next_page():
+    """Páginas siguientes del blog (keyset_paginate con cursor)."""
+    key = tuple_(BlogPost.published_at, BlogPost.id)
+    return (
+        BlogPost.query.filter_by(is_published=True)
+        .filter(key < tuple_(SAMPLE_SINCE + timedelta(days=30), 1000))
+        .order_by(BlogPost.published_at.desc(), BlogPost.id.desc())
+        .limit(13)
+    )
+
+
+@hot_query("blog.recent_posts")
+def _blog_recent_posts():
+    """Sidebar: últimos posts publicados."""
+    return (
+        BlogPost.query.filter_by(is_published=True)
+        .order_by(BlogPost.published_at.desc())
+        .limit(3)
+    )
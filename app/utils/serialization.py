@@ -0,0 +1,57 @@
+# app/utils/serialization.py
+"""
+Serializadores precompilados de modelos a dict.
+
+Un `to_dict` escrito a mano construye el dict clave a clave y cada
+`self.campo` pasa por el descriptor de SQLAlchemy. `compile_serializer`
+resuelve una sola vez qué atributos se leen y devuelve una función que:
+
+- lee todos los valores de golpe con `operator.itemgetter` sobre el
+  `__dict__` de la instancia (el estado ya cargado, sin descriptores);
+- si falta alguno (instancia expirada tras un commit o columna diferida)
+  usa `operator.attrgetter`, que deja que SQLAlchemy lo cargue;
+- aplica conversores solo a los campos que los necesitan (fechas a ISO 8601).
+
+    serialize = compile_serializer(("id", "created_at"), converters={"created_at": isoformat})
+    serialize(analysis)  # {"id": 1, "created_at": "2025-01-01T00:00:00"}
+"""
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence
+
+
+def isoformat(value) -> str:
+    return value.isoformat()
+
+
+def compile_serializer(
+    fields: Sequence[str],
+    converters: Optional[Mapping[str, Callable[[Any], Any]]] = None,
+) -> Callable[[Any], Dict[str, Any]]:
+    """
+    Devuelve una función instancia -> dict con `fields` como claves (en orden).
+
+    Args:
+        fields: nombres de atributo, que son también las claves del dict
+        converters: campo -> función aplicada al valor cuando no es None
+    """
+    keys = tuple(fields)
+    if len(keys) < 2:
+        raise ValueError("compile_serializer necesita al menos dos campos")
+    from_state = itemgetter(*keys)
+    from_attributes = attrgetter(*keys)
+    conversions = tuple((key, converters[key]) for key in keys if key in (converters or {}))
+
+    def serialize(obj) -> Dict[str, Any]:
+        try:
+            values = from_state(obj.__dict__)
+        except KeyError:
+            values = from_attributes(obj)
+        data = dict(zip(keys, values))
+        for key, convert in conversions:
+            value = data[key]
+            if value is not None:
+                data[key] = convert(value)
+        return data
+
+    serialize.fields = keys
+    return serialize
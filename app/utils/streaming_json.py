@@ -0,0 +1,203 @@
+# app/utils/streaming_json.py
+"""
+Parser incremental de un objeto JSON que llega por trozos (deltas de un LLM).
+
+En lugar de esperar a la respuesta completa, limpiar las vallas de código y
+hacer `json.loads` al final:
+- ignora lo que llegue antes de la primera `{` (```json, texto suelto) y lo
+  que llegue después de la `}` que la cierra;
+- emite cada campo de primer nivel en cuanto su valor se cierra: `feed()`
+  devuelve los campos nuevos como pares (clave, valor);
+- si la salida se corta o deja de ser JSON válido, `close()` devuelve lo
+  recuperable: los campos ya cerrados, el texto parcial del campo en curso
+  si es una cadena y, si es un objeto o lista, lo que ya se había cerrado
+  dentro de él.
+
+Las cadenas admiten caracteres de control sin escapar (saltos de línea
+literales), que los modelos emiten a menudo.
+
+Uso:
+    parser = StreamingJSONParser()
+    for delta in deltas:
+        for name, value in parser.feed(delta):
+            ...
+    data = parser.close()
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_START = "-0123456789tfn"
+_SCALAR_CHARS = frozenset("+-.0123456789eEtruefalsn")
+_CLOSERS = {"{": "}", "[": "]"}
+# Escape a medias al final de una cadena cortada: "\" o "\u12"
+_DANGLING_ESCAPE = re.compile(r"(?<!\\)((?:\\\\)*)\\(u[0-9a-fA-F]{0,3})?$")
+
+
+class StreamingJSONParser:
+    """Parser de un único objeto JSON con emisión de sus campos de primer nivel."""
+
+    def __init__(self):
+        self.text = ""  # todo lo recibido, tal cual
+        self.fields: Dict[str, Any] = {}
+        self.complete = False  # se cerró el objeto de primer nivel
+        self.broken = False  # la entrada dejó de ser JSON válido
+        self._buf = ""  # desde la `{` inicial
+        self._stack: List[List[str]] = []  # [tipo de contenedor, qué se espera]
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._scalar_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        # Último punto del valor en curso donde cortar y cerrar da JSON válido
+        self._cut: Optional[Tuple[int, str]] = None
+
+    # ── Entrada ────────────────────────────────────────────────
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Procesa un trozo y devuelve los campos de primer nivel que se han cerrado."""
+        self.text += chunk
+        if self.complete or self.broken or not chunk:
+            return []
+        if not self._stack:
+            start = chunk.find("{")
+            if start < 0:
+                return []
+            chunk = chunk[start:]
+
+        emitted: List[Tuple[str, Any]] = []
+        offset = len(self._buf)
+        self._buf += chunk
+        for index, char in enumerate(chunk, offset):
+            self._step(index, char, emitted)
+            if self.complete or self.broken:
+                break
+        return emitted
+
+    def close(self) -> Dict[str, Any]:
+        """Fin de la entrada: campos cerrados más lo recuperable del campo en curso."""
+        if self.complete or self._value_start is None or self._key is None:
+            return dict(self.fields)
+        partial = self._recover()
+        if partial is not _MISSING:
+            self.fields[self._key] = partial
+        return dict(self.fields)
+
+    # ── Máquina de estados ─────────────────────────────────────
+    def _step(self, index: int, char: str, emitted: List) -> None:
+        if self._in_string:
+            self._string_char(index, char, emitted)
+        elif self._scalar_start is None or self._scalar_char(index, char, emitted):
+            self._structural_char(index, char, emitted)
+
+    def _string_char(self, index: int, char: str, emitted: List) -> None:
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            if not self._string_is_key:
+                self._value_done(index + 1, emitted)
+                return
+            if len(self._stack) == 1:
+                self._key = json.loads(self._buf[self._string_start:index + 1], strict=False)
+            self._stack[-1][1] = "colon"
+
+    def _scalar_char(self, index: int, char: str, emitted: List) -> bool:
+        """Número o literal en curso. Devuelve True si `char` lo cierra y hay que procesarlo."""
+        if char in _SCALAR_CHARS:
+            return False
+        try:
+            json.loads(self._buf[self._scalar_start:index])
+        except ValueError:
+            self.broken = True
+            return False
+        self._scalar_start = None
+        self._value_done(index, emitted)
+        return True
+
+    def _structural_char(self, index: int, char: str, emitted: List) -> None:
+        if not self._stack:  # la `{` inicial
+            self._stack.append(["{", "key_or_end"])
+            return
+        if char in _WHITESPACE:
+            return
+
+        frame = self._stack[-1]
+        kind, expect = frame
+        if expect in ("key", "key_or_end") and char == '"':
+            self._open_string(index, is_key=True)
+        elif expect == "colon" and char == ":":
+            frame[1] = "value"
+        elif expect in ("value", "value_or_end") and char not in "]}":
+            self._open_value(index, char)
+        elif expect == "next" and char == ",":
+            frame[1] = "key" if kind == "{" else "value"
+        elif char == _CLOSERS[kind] and expect in ("next", "key_or_end", "value_or_end"):
+            self._close(index, emitted)
+        else:
+            self.broken = True
+
+    def _close(self, index: int, emitted: List) -> None:
+        self._stack.pop()
+        if self._stack:
+            self._value_done(index + 1, emitted)
+        else:
+            self.complete = True
+
+    def _open_string(self, index: int, is_key: bool) -> None:
+        self._in_string = True
+        self._escape = False
+        self._string_start = index
+        self._string_is_key = is_key
+
+    def _open_value(self, index: int, char: str) -> None:
+        if len(self._stack) == 1:
+            self._value_start = index
+            self._cut = None
+        if char == '"':
+            self._open_string(index, is_key=False)
+        elif char in _CLOSERS:
+            self._stack.append([char, "key_or_end" if char == "{" else "value_or_end"])
+            self._cut = (index + 1, self._closers())
+        elif char in _SCALAR_START:
+            self._scalar_start = index
+        else:
+            self.broken = True
+
+    def _value_done(self, end: int, emitted: List) -> None:
+        """Se ha cerrado un valor dentro del contenedor de arriba de la pila."""
+        self._stack[-1][1] = "next"
+        if len(self._stack) > 1:
+            self._cut = (end, self._closers())
+            return
+        value = json.loads(self._buf[self._value_start:end], strict=False)
+        self.fields[self._key] = value
+        emitted.append((self._key, value))
+        self._key = self._value_start = self._cut = None
+
+    def _closers(self) -> str:
+        return "".join(_CLOSERS[kind] for kind, _ in reversed(self._stack[1:]))
+
+    # ── Recuperación ───────────────────────────────────────────
+    def _recover(self) -> Any:
+        raw = self._buf[self._value_start:]
+        try:
+            if raw.startswith('"') and len(self._stack) == 1:
+                if not self._in_string:
+                    return json.loads(raw, strict=False)
+                return json.loads(_DANGLING_ESCAPE.sub(lambda m: m.group(1) or "", raw) + '"', strict=False)
+            if raw[:1] in _CLOSERS:
+                if self._cut is None:
+                    return _MISSING
+                end, closers = self._cut
+                return json.loads(self._buf[self._value_start:end] + closers, strict=False)
+            return json.loads(raw.strip())  # número o literal sin delimitador detrás
+        except ValueError:
+            return _MISSING
+
+
+_MISSING = object()
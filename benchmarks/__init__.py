@@ -0,0 +1 @@
+"""Benchmarks de carga con stubs locales de OpenAI, Telegram y S3 (python -m benchmarks.run)."""
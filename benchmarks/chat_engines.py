@@ -0,0 +1,90 @@
+# benchmarks/chat_engines.py
+"""
+Tiempo hasta el primer token del agente de Telegram: Assistants frente a completions.
+
+    python -m benchmarks.chat_engines
+    python -m benchmarks.chat_engines --turns 50 --rtt 0.05 --latency 0.4
+
+Ambos motores hablan con el mismo stub local de OpenAI (benchmarks.stubs),
+con `rtt` de red en cada petición y `latency` hasta el primer token del
+modelo. Cada turno llama a FitMasterService.chat_query con un callback de
+streaming, como el webhook de Telegram, y mide:
+- ttft: desde la llamada hasta el primer fragmento de texto;
+- total: hasta que chat_query devuelve (incluye registrar el consumo).
+
+El stub no modela la cola de los runs en OpenAI (queued → in_progress), así
+que la diferencia medida es solo la de idas y vueltas y trabajo local: en
+producción la ventaja del motor completions es mayor.
+"""
+import argparse
+import statistics
+import time
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_engine(engine, user_id, turns):
+    """[(ttft_ms, total_ms)] de `turns` turnos con el motor indicado."""
+    from app.services.completions_chat import completions_chat
+    from app.services.fitmaster_service import FitMasterService
+
+    completions_chat.completions_users = frozenset({user_id}) if engine == "completions" else frozenset()
+    context = {"weight": 78.0, "height": 178.0, "body_fat_percentage": 18.5}
+    timings = []
+    for turn in range(turns):
+        first = []
+        started = time.perf_counter()
+        FitMasterService.chat_query(
+            f"Pregunta {turn}: ¿cómo ajusto mi entrenamiento esta semana?", user_id,
+            context=context, stream_callback=lambda chunk: first or first.append(time.perf_counter()),
+        )
+        finished = time.perf_counter()
+        timings.append(((first[0] - started) * 1000 if first else float("nan"), (finished - started) * 1000))
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TTFT del agente de Telegram por motor")
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--rtt", type=float, default=0.03, help="ida y vuelta por petición a OpenAI (s)")
+    parser.add_argument("--latency", type=float, default=0.3, help="tiempo hasta el primer token del modelo (s)")
+    parser.add_argument("--tokens-per-second", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    from openai import OpenAI
+
+    from app import create_app, db
+    from app.models import User, UserTelegramLink
+    from app.services import fitmaster_service
+    from benchmarks.stubs import StubServer, openai_stub
+
+    flask_app = create_app("testing")
+    stub = openai_stub(latency=args.latency, rtt=args.rtt, tokens_per_second=args.tokens_per_second)
+    with StubServer(stub) as server, flask_app.app_context():
+        fitmaster_service.client = OpenAI(api_key="sk-bench", base_url=f"{server.url}/v1")
+        db.create_all()
+        results = {}
+        for engine in ("assistants", "completions"):
+            user = User(username=f"bench-{engine}", email=f"bench-{engine}@example.com")
+            user.password = "Secret123!"
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(UserTelegramLink(user_id=user.id, telegram_user_id=f"bench-{engine}"))
+            db.session.commit()
+            results[engine] = run_engine(engine, user.id, args.turns)
+
+    print(f"{args.turns} turnos por motor, rtt {args.rtt * 1000:.0f} ms, "
+          f"primer token del modelo a {args.latency * 1000:.0f} ms\n")
+    print(f"{'motor':<13}{'ttft p50':>10}{'ttft p95':>10}{'total p50':>11}{'total p95':>11}")
+    for engine, timings in results.items():
+        ttft = [t for t, _ in timings]
+        total = [t for _, t in timings]
+        print(f"{engine:<13}{statistics.median(ttft):>10.0f}{_percentile(ttft, 0.95):>10.0f}"
+              f"{statistics.median(total):>11.0f}{_percentile(total, 0.95):>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,561 @@
+# benchmarks/dataset.py
+"""
+Generador de datos sintéticos para benchmarks a escala.
+
+    python -m benchmarks.dataset --users 20000 --database-url sqlite:///big.db
+    python -m benchmarks.dataset --users 1000 --seed 7 --posts 0   # sobre la BD de la config
+
+Crea N usuarios (synth<N>@example.com) con:
+- Historial de BiometricAnalysis: cada usuario tiene un perfil (sexo, altura,
+  IMC de partida, objetivo, actividad) y sus medidas evolucionan semana a
+  semana según el objetivo. Cada fila pasa por run_biometric_analysis, el
+  mismo cálculo que el formulario, así que las métricas guardadas cumplen
+  las restricciones de `calculos` (cintura > cuello, cadera en mujeres...).
+- Planes de nutrición y entrenamiento (el último activo), notificaciones,
+  filas de LLMUsageLedger y vínculos de Telegram para una parte de ellos.
+- Posts del blog publicados (synth-post-<N>), indexados para búsqueda y
+  posts relacionados.
+
+Determinista: cada usuario usa su propio Random derivado de (seed, índice),
+de modo que un dataset pequeño es prefijo exacto de uno grande con la misma
+semilla, y las fechas se calculan desde una fecha fija (DATASET_EPOCH).
+Las filas se insertan con INSERT masivos (executemany) por lotes, con ids
+asignados de antemano para enlazar claves foráneas sin leer de vuelta.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+DATASET_EPOCH = datetime(2025, 6, 1, 12, 0)
+USER_PREFIX = "synth"
+SYNTH_PASSWORD = "Synth-Secret-123"
+TELEGRAM_ID_BASE = 5_000_000_000
+
+# Cambio de peso semanal medio (kg) según el objetivo del formulario
+GOAL_DRIFT = {"perder grasa": -0.35, "mantener peso": 0.0, "ganar masa muscular": 0.15}
+GOAL_WEIGHTS = (0.55, 0.2, 0.25)
+ACTIVITY_LEVELS = {1.2: "sedentary", 1.375: "light", 1.55: "moderate", 1.725: "active", 1.9: "very_active"}
+ACTIVITY_WEIGHTS = (0.15, 0.3, 0.35, 0.15, 0.05)
+
+FIRST_NAMES = {
+    "h": ("Carlos", "Javier", "Miguel", "Andrés", "Pablo", "Diego", "Sergio", "Luis", "Marcos", "Tomás"),
+    "m": ("Lucía", "María", "Sofía", "Carmen", "Elena", "Paula", "Laura", "Marta", "Sara", "Julia"),
+}
+LAST_NAMES = ("García", "Fernández", "López", "Martínez", "Sánchez", "Pérez", "Gómez", "Díaz", "Ruiz", "Techera")
+BLOG_TOPICS = (
+    ("Entrenamiento", "fuerza", "progresión de cargas, técnica y series efectivas"),
+    ("Entrenamiento", "hipertrofia", "volumen semanal, rango de repeticiones y descanso entre series"),
+    ("Nutrición", "proteína", "reparto diario, fuentes de calidad y timing alrededor del entrenamiento"),
+    ("Nutrición", "déficit calórico", "pérdida de grasa sostenible sin perder masa muscular"),
+    ("Salud", "descanso", "sueño, recuperación y gestión del estrés"),
+    ("Salud", "movilidad", "rango de movimiento, calentamiento y prevención de lesiones"),
+)
+NOTIFICATION_TEMPLATES = (
+    ("info", "Nuevo análisis disponible", "Tu análisis biométrico ya tiene interpretación de FitMaster."),
+    ("success", "Objetivo semanal cumplido", "Has registrado tus medidas esta semana. ¡Sigue así!"),
+    ("warning", "Te echamos de menos", "Hace tiempo que no registras un análisis. Actualiza tus medidas."),
+)
+LLM_MODELS = (("gpt-4o-mini", "telegram"), ("assistants-api", "telegram"), ("gpt-4o-mini", "web"))
+
+
+@dataclass
+class DatasetSpec:
+    """Tamaño y forma del dataset."""
+
+    users: int
+    seed: int = 360
+    analyses_per_user: float = 12.0  # media; la distribución tiene cola larga
+    posts: int = 60
+    telegram_ratio: float = 0.4
+    fitmaster_ratio: float = 0.6  # análisis con interpretación de FitMaster guardada
+    batch_size: int = 2000  # usuarios por lote de INSERT
+    epoch: datetime = DATASET_EPOCH
+
+
+# ── Perfiles y medidas ─────────────────────────────────────────
+def _profile(rng: random.Random) -> dict:
+    """Rasgos estables de un usuario; el IMC de partida sigue una log-normal (mediana ≈ 26)."""
+    gender = "h" if rng.random() < 0.55 else "m"
+    height = rng.gauss(176, 7) if gender == "h" else rng.gauss(163, 6.5)
+    bmi = min(max(math.exp(rng.gauss(math.log(26), 0.14)), 18.5), 40)
+    height = min(max(height, 150), 205)
+    goal = rng.choices(tuple(GOAL_DRIFT), GOAL_WEIGHTS)[0]
+    return {
+        "gender": gender,
+        "height": round(height, 1),
+        "age": rng.randint(18, 65),
+        "weight": bmi * (height / 100) ** 2,
+        "neck": rng.gauss(38.5, 1.8) if gender == "h" else rng.gauss(32.5, 1.4),
+        "activity_factor": rng.choices(tuple(ACTIVITY_LEVELS), ACTIVITY_WEIGHTS)[0],
+        "goal": goal,
+        "tracks_muscles": rng.random() < 0.4,
+    }
+
+
+def _waist(profile: dict, weight: float, rng: random.Random) -> float:
+    """Cintura coherente con el IMC: ratio cintura/altura ≈ 0.50 (hombres) / 0.47 (mujeres) con IMC 25."""
+    bmi = weight / (profile["height"] / 100) ** 2
+    if profile["gender"] == "h":
+        ratio = 0.50 + 0.012 * (bmi - 25)
+    else:
+        ratio = 0.47 + 0.011 * (bmi - 25)
+    return profile["height"] * ratio + rng.gauss(0, 2)
+
+
+def _form(profile: dict, weight: float, age: int, rng: random.Random, extra_waist: float = 0.0) -> dict:
+    waist = max(_waist(profile, weight, rng), profile["neck"] + 22) + extra_waist
+    form = {
+        "peso": f"{weight:.1f}",
+        "altura": f"{profile['height']:.1f}",
+        "edad": str(age),
+        "genero": profile["gender"],
+        "cuello": f"{profile['neck'] + rng.gauss(0, 0.2):.1f}",
+        "cintura": f"{waist:.1f}",
+        "factor_actividad": str(profile["activity_factor"]),
+        "objetivo": profile["goal"],
+    }
+    if profile["gender"] == "m":
+        form["cadera"] = f"{waist * rng.uniform(1.2, 1.4):.1f}"
+    return form
+
+
+_MUSCLE_COLUMNS = tuple(f"{name}_{side}" for name in ("biceps", "thigh", "calf") for side in ("left", "right"))
+
+
+def _muscles(profile: dict, weight: float, rng: random.Random) -> dict:
+    if not profile["tracks_muscles"]:
+        return {}
+    scale = weight / 75
+    base = {"biceps": 33, "thigh": 56, "calf": 37} if profile["gender"] == "h" else {"biceps": 28, "thigh": 54, "calf": 35}
+    values = {}
+    for name, size in base.items():
+        center = size * scale ** 0.5
+        values[f"{name}_left"] = round(center + rng.gauss(0, 0.4), 1)
+        values[f"{name}_right"] = round(center + rng.gauss(0.2, 0.4), 1)  # lado dominante algo mayor
+    return values
+
+
+def _fitmaster(results: dict, goal: str, created_at: datetime) -> dict:
+    macros = results["macronutrientes"]
+    return {
+        "interpretation": (
+            f"IMC {results['imc']}, grasa corporal {results['porcentaje_grasa']}%. "
+            f"Objetivo: {goal}. Mantén la constancia en el registro de medidas."
+        ),
+        "nutrition_plan": {
+            "calories": results["calorias_diarias"],
+            "macros": {"protein": macros["proteinas"], "carbs": macros["carbohidratos"], "fats": macros["grasas"]},
+        },
+        "training_plan": {"days_per_week": 4, "focus": "fuerza" if goal != "perder grasa" else "fuerza + cardio"},
+        "generated_at": created_at.isoformat(),
+        "model_version": "fitmaster-synthetic",
+    }
+
+
+def analysis_row(user_id: int, form: dict, created_at: datetime) -> dict:
+    """Columnas de BiometricAnalysis a partir del formulario, con el cálculo del formulario web."""
+    from werkzeug.datastructures import MultiDict
+
+    from app.blueprints.bioanalyze.services import run_biometric_analysis
+
+    payload = run_biometric_analysis(MultiDict(form))
+    inputs, results = payload.inputs, payload.results
+    macros = results["macronutrientes"]
+    return {
+        "user_id": user_id,
+        "weight": inputs["peso"],
+        "height": inputs["altura"],
+        "age": inputs["edad"],
+        "gender": "male" if inputs["genero"] == "h" else "female",
+        "neck": inputs["cuello"],
+        "waist": inputs["cintura"],
+        "hip": inputs.get("cadera"),
+        "activity_factor": inputs["factor_actividad"],
+        "activity_level": ACTIVITY_LEVELS.get(inputs["factor_actividad"], "moderate"),
+        "goal": inputs["objetivo"],
+        "bmi": results["imc"],
+        "bmr": results["tmb"],
+        "tdee": results["tdee"],
+        "body_fat_percentage": results["porcentaje_grasa"],
+        "lean_mass": results["masa_magra"],
+        "fat_mass": results["masa_grasa"],
+        "ffmi": results["ffmi"],
+        "body_water": results["agua_total"],
+        "waist_hip_ratio": results.get("rcc"),
+        "waist_height_ratio": results["ratio_cintura_altura"],
+        "metabolic_age": results.get("edad_metabolica"),
+        "maintenance_calories": results["calorias_diarias"],
+        "protein_grams": macros.get("proteinas"),
+        "carbs_grams": macros.get("carbohidratos"),
+        "fats_grams": macros.get("grasas"),
+        # executemany exige las mismas claves en todas las filas
+        **dict.fromkeys(_MUSCLE_COLUMNS),
+        "fitmaster_data": None,
+        "created_at": created_at,
+        "updated_at": created_at,
+        "_results": results,
+    }
+
+
+# Grasa corporal fisiológicamente plausible (fórmula de la Marina)
+BODY_FAT_RANGE = {"h": (5.0, 45.0), "m": (12.0, 55.0)}
+
+
+def _plausible_row(user_id: int, profile: dict, weight: float, age: int, at: datetime, rng: random.Random) -> dict:
+    """Fila de análisis; si la grasa corporal sale fuera de rango se corrige la cintura."""
+    low, high = BODY_FAT_RANGE[profile["gender"]]
+    extra_waist = 0.0
+    for _ in range(20):
+        row = analysis_row(user_id, _form(profile, weight, age, rng, extra_waist), at)
+        if row["body_fat_percentage"] < low:
+            extra_waist += 2
+        elif row["body_fat_percentage"] > high:
+            extra_waist -= 2
+        else:
+            break
+    return row
+
+
+# ── Generación por usuario ─────────────────────────────────────
+class _Ids:
+    """Siguiente id libre por tabla (se asignan antes de insertar)."""
+
+    def __init__(self, session, models):
+        from sqlalchemy import func, select
+
+        self._next = {
+            model.__tablename__: (session.scalar(select(func.max(model.id))) or 0) + 1 for model in models
+        }
+
+    def take(self, table: str) -> int:
+        value = self._next[table]
+        self._next[table] += 1
+        return value
+
+
+def _user_rows(index: int, spec: DatasetSpec, ids: _Ids, coach_id: int, password_hash: str, rows: dict) -> None:
+    rng = random.Random(f"{spec.seed}:{index}")
+    profile = _profile(rng)
+    user_id = ids.take("users")
+
+    analyses, start_at, last_at = _analysis_rows(user_id, profile, spec, ids, rng)
+    rows["biometric_analyses"].extend(analyses)
+
+    first = FIRST_NAMES[profile["gender"]][rng.randrange(10)]
+    rows["users"].append({
+        "id": user_id,
+        "email": f"{USER_PREFIX}{index}@example.com",
+        "username": f"{USER_PREFIX}{index}",
+        "password_hash": password_hash,
+        "first_name": first,
+        "last_name": rng.choice(LAST_NAMES),
+        "gender": "male" if profile["gender"] == "h" else "female",
+        "date_of_birth": (spec.epoch - timedelta(days=365.25 * profile["age"] + rng.randrange(365))).date(),
+        "is_active": True,
+        "is_verified": rng.random() < 0.9,
+        "is_admin": False,
+        "created_at": start_at - timedelta(days=rng.uniform(0, 10)),
+        "updated_at": last_at,
+        "last_login": last_at + timedelta(hours=rng.uniform(0, 72)),
+    })
+
+    plan_ids = _plan_rows(user_id, coach_id, analyses, ids, rng, rows)
+    _notification_rows(user_id, plan_ids, start_at, last_at, ids, rng, rows)
+
+    linked = rng.random() < spec.telegram_ratio
+    _usage_rows(user_id, analyses, linked, start_at, last_at, ids, rng, rows)
+
+    if linked:
+        rows["user_telegram_links"].append({
+            "id": ids.take("user_telegram_links"), "user_id": user_id,
+            "telegram_user_id": str(TELEGRAM_ID_BASE + index), "telegram_chat_id": str(TELEGRAM_ID_BASE + index),
+            "openai_thread_id": f"thread_synth_{index}" if rng.random() < 0.8 else None,
+            "status": "verified", "verified_at": start_at, "created_at": start_at, "updated_at": last_at,
+        })
+
+
+def _analysis_rows(user_id: int, profile: dict, spec: DatasetSpec, ids: _Ids, rng: random.Random):
+    """Historial: nº de análisis con cola larga, separados 1-4 semanas, el último cerca de la fecha fija."""
+    count = max(1, min(int(rng.expovariate(1 / spec.analyses_per_user)) + 1, 156))
+    gaps = [rng.choice((1, 1, 2, 2, 3, 4)) for _ in range(count - 1)]
+    last_at = spec.epoch - timedelta(days=rng.uniform(0, 30), minutes=rng.randrange(1440))
+    start_at = last_at - timedelta(weeks=sum(gaps))
+    drift = GOAL_DRIFT[profile["goal"]]
+
+    weight, at = profile["weight"], start_at
+    height_m2 = (profile["height"] / 100) ** 2
+    analyses = []
+    for step in range(count):
+        if step:
+            weeks = gaps[step - 1]
+            # La tendencia del objetivo se detiene en los extremos de IMC 18.5-42
+            weight = min(max(weight + drift * weeks + rng.gauss(0, 0.5), 18.5 * height_m2), 42 * height_m2)
+            at += timedelta(weeks=weeks, hours=rng.uniform(-36, 36))
+        age = max(profile["age"] - int((spec.epoch - at).days / 365.25), 16)
+        row = _plausible_row(user_id, profile, weight, age, at, rng)
+        row.update(_muscles(profile, weight, rng))
+        row["id"] = ids.take("biometric_analyses")
+        results = row.pop("_results")
+        if rng.random() < spec.fitmaster_ratio:
+            row["fitmaster_data"] = _fitmaster(results, profile["goal"], at)
+        analyses.append(row)
+    return analyses, start_at, last_at
+
+
+def _plan_rows(user_id: int, coach_id: int, analyses: list, ids: _Ids, rng: random.Random, rows: dict) -> dict:
+    """Planes: los crea el entrenador sobre un análisis; solo el más reciente de cada tipo queda activo."""
+    plan_ids = {}
+    for table, chance in (("nutrition_plans", 0.7), ("training_plans", 0.6)):
+        if rng.random() >= chance:
+            continue
+        for position, analysis in enumerate(sorted(rng.sample(analyses, min(len(analyses), rng.randint(1, 3))),
+                                                   key=lambda a: a["created_at"])):
+            plan = _plan_row(table, ids.take(table), user_id, coach_id, analysis, rng)
+            plan["is_active"] = False
+            rows[table].append(plan)
+        plan["is_active"] = True
+        plan_ids[table] = plan["id"]
+    return plan_ids
+
+
+def _notification_rows(user_id: int, plan_ids: dict, start_at: datetime, last_at: datetime, ids: _Ids,
+                       rng: random.Random, rows: dict) -> None:
+    for _ in range(min(int(rng.expovariate(1 / 6)), 60)):
+        kind, title, message = rng.choice(NOTIFICATION_TEMPLATES)
+        created_at = start_at + (last_at - start_at) * rng.random()
+        is_read = rng.random() < 0.7
+        rows["notifications"].append({
+            "id": ids.take("notifications"), "user_id": user_id, "title": title, "message": message,
+            "notification_type": kind, "is_read": is_read,
+            "read_at": created_at + timedelta(hours=rng.uniform(1, 96)) if is_read else None,
+            "created_at": created_at,
+            "nutrition_plan_id": None, "training_plan_id": None,
+        })
+    if plan_ids:
+        table = rng.choice(sorted(plan_ids))
+        rows["notifications"].append({
+            "id": ids.take("notifications"), "user_id": user_id,
+            "title": "Nuevo plan asignado", "message": "Tu entrenador ha publicado un plan nuevo.",
+            "notification_type": "success", "is_read": False, "read_at": None, "created_at": last_at,
+            "nutrition_plan_id": plan_ids[table] if table == "nutrition_plans" else None,
+            "training_plan_id": plan_ids[table] if table == "training_plans" else None,
+        })
+
+
+def _usage_rows(user_id: int, analyses: list, linked: bool, start_at: datetime, last_at: datetime, ids: _Ids,
+                rng: random.Random, rows: dict) -> None:
+    """Consumo de LLM: una fila por análisis con FitMaster (web) y conversaciones de Telegram."""
+    from app.services.usage_recorder import usage_recorder
+
+    usage = [(a["created_at"], "gpt-4o-mini", "web") for a in analyses if a["fitmaster_data"]]
+    if linked:
+        for _ in range(min(int(rng.expovariate(1 / 25)), 400)):
+            model, channel = rng.choice(LLM_MODELS[:2])
+            usage.append((start_at + (last_at - start_at) * rng.random(), model, channel))
+    for created_at, model, channel in usage:
+        prompt = int(math.exp(rng.gauss(math.log(900), 0.5)))
+        completion = int(math.exp(rng.gauss(math.log(350), 0.6)))
+        rows["llm_usage_ledger"].append({
+            "id": ids.take("llm_usage_ledger"), "user_id": user_id, "model_name": model,
+            "prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion,
+            "channel": channel, "cost_usd": usage_recorder.cost(model, prompt, completion),
+            "created_at": created_at,
+        })
+
+
+def _plan_row(table: str, plan_id: int, user_id: int, coach_id: int, analysis: dict, rng: random.Random) -> dict:
+    created_at = analysis["created_at"] + timedelta(days=rng.uniform(0.5, 4))
+    row = {
+        "id": plan_id, "user_id": user_id, "analysis_id": analysis["id"], "created_by": coach_id,
+        "goal": analysis["goal"], "start_date": created_at.date(),
+        "end_date": (created_at + timedelta(weeks=8)).date(), "created_at": created_at, "updated_at": created_at,
+    }
+    if table == "nutrition_plans":
+        calories = int(analysis["maintenance_calories"])
+        row.update({
+            "title": f"Plan {analysis['goal']} {created_at:%B %Y}",
+            "daily_calories": calories,
+            "protein_grams": int(analysis["protein_grams"] or 0),
+            "carbs_grams": int(analysis["carbs_grams"] or 0),
+            "fats_grams": int(analysis["fats_grams"] or 0),
+            "meals": [
+                {"name": name, "time": hour, "calories": int(calories * share)}
+                for name, hour, share in (("Desayuno", "08:00", 0.25), ("Comida", "14:00", 0.4),
+                                          ("Merienda", "18:00", 0.1), ("Cena", "21:00", 0.25))
+            ],
+        })
+    else:
+        days = rng.choice((3, 4, 5))
+        row.update({
+            "title": f"Rutina {days} días",
+            "frequency": f"{days} días/semana",
+            "routine_type": {3: "Full Body", 4: "Torso/Pierna", 5: "PPL"}[days],
+            "duration_weeks": 8,
+            "workouts": [{"day": day + 1, "exercises": rng.randint(5, 8)} for day in range(days)],
+        })
+    return row
+
+
+# ── Inserción ──────────────────────────────────────────────────
+_TABLE_ORDER = (
+    "users", "biometric_analyses", "nutrition_plans", "training_plans",
+    "notifications", "llm_usage_ledger", "user_telegram_links",
+)
+
+
+def _flush(session, tables: dict, rows: dict, counts: Counter) -> None:
+    from sqlalchemy import insert
+
+    for name in _TABLE_ORDER:
+        if rows[name]:
+            session.execute(insert(tables[name]), rows[name])
+            counts[name] += len(rows[name])
+            rows[name].clear()
+    session.commit()
+
+
+def _coach(session, password_hash: str, epoch: datetime) -> int:
+    from sqlalchemy import insert, select
+
+    from app.models import User
+
+    coach_id = session.scalar(select(User.id).filter_by(username=f"{USER_PREFIX}-coach"))
+    if coach_id is None:
+        coach_id = session.execute(insert(User.__table__).values(
+            email=f"{USER_PREFIX}-coach@example.com", username=f"{USER_PREFIX}-coach", password_hash=password_hash,
+            first_name="Coach", last_name="Sintético", is_active=True, is_verified=True, is_admin=True,
+            created_at=epoch - timedelta(days=3 * 365), updated_at=epoch,
+        )).inserted_primary_key[0]
+    return coach_id
+
+
+def _posts(spec: DatasetSpec, author_id: int) -> int:
+    from app import db
+    from app.models import BlogPost
+    from app.services.related_posts import related_index
+
+    rng = random.Random(f"{spec.seed}:posts")
+    for index in range(spec.posts):
+        category, topic, angle = BLOG_TOPICS[index % len(BLOG_TOPICS)]
+        sections = "\n\n".join(
+            f"## {title}\n\n" + " ".join(
+                f"Sobre {topic}: {angle}." for _ in range(rng.randint(3, 8))
+            )
+            for title in ("Introducción", "Qué dice la evidencia", "Cómo aplicarlo", "Errores comunes")
+        )
+        published_at = spec.epoch - timedelta(days=index * 3, hours=rng.randrange(24))
+        # Fechas explícitas: los valores por defecto del modelo (utcnow) cambiarían en cada ejecución
+        post = BlogPost(
+            title=f"Guía de {topic} #{index}", slug=f"{USER_PREFIX}-post-{index}",
+            content=f"# Guía de {topic}\n\n{sections}", category=category, tags=f"{topic},{category.lower()}",
+            author_id=author_id, is_published=True, published_at=published_at,
+            created_at=published_at - timedelta(days=1), updated_at=published_at,
+            views_count=int(rng.paretovariate(1.2) * 50),
+        )
+        post.render_content()
+        db.session.add(post)
+    db.session.commit()
+    related_index.rebuild()
+    return spec.posts
+
+
+def generate(spec: DatasetSpec, progress=None) -> Counter:
+    """
+    Inserta el dataset en la base de datos de la app actual.
+
+    Args:
+        spec: tamaño y semilla
+        progress: callable(usuarios_generados, total) opcional, llamado tras cada lote
+
+    Returns:
+        Counter con las filas insertadas por tabla
+    """
+    from sqlalchemy import select
+
+    from app import db
+    from app.models import (
+        BiometricAnalysis,
+        LLMUsageLedger,
+        Notification,
+        NutritionPlan,
+        TrainingPlan,
+        User,
+        UserTelegramLink,
+    )
+
+    models = (User, BiometricAnalysis, NutritionPlan, TrainingPlan, Notification, LLMUsageLedger, UserTelegramLink)
+    session = db.session
+    if session.scalar(select(User.id).filter_by(username=f"{USER_PREFIX}0")) is not None:
+        raise ValueError(f"Ya existe un dataset sintético ({USER_PREFIX}0) en esta base de datos")
+
+    # Un solo hash bcrypt para todos: hashear un millón de contraseñas llevaría horas
+    password_hash = User(username="_", email="_")
+    password_hash.password = SYNTH_PASSWORD
+    password_hash = password_hash._password_hash
+
+    coach_id = _coach(session, password_hash, spec.epoch)
+    session.commit()
+
+    ids = _Ids(session, models)
+    tables = {model.__tablename__: model.__table__ for model in models}
+    rows = {name: [] for name in _TABLE_ORDER}
+    counts = Counter(users=0)
+    for index in range(spec.users):
+        _user_rows(index, spec, ids, coach_id, password_hash, rows)
+        if len(rows["users"]) >= spec.batch_size:
+            _flush(session, tables, rows, counts)
+            if progress:
+                progress(index + 1, spec.users)
+    _flush(session, tables, rows, counts)
+    if progress:
+        progress(spec.users, spec.users)
+
+    if spec.posts:
+        counts["blog_posts"] = _posts(spec, coach_id)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético determinista")
+    parser.add_argument("--users", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=360)
+    parser.add_argument("--analyses-per-user", type=float, default=12.0)
+    parser.add_argument("--posts", type=int, default=60)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--config", default="benchmark", help="Config de la app (development, benchmark...)")
+    parser.add_argument("--database-url", help="BD destino (config benchmark); se crean las tablas si faltan")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["BENCHMARK_DATABASE_URL"] = args.database_url
+
+    from app import create_app, db
+
+    flask_app = create_app(args.config)
+    spec = DatasetSpec(users=args.users, seed=args.seed, analyses_per_user=args.analyses_per_user,
+                       posts=args.posts, batch_size=args.batch_size)
+    started = time.perf_counter()
+
+    def progress(done, total):
+        elapsed = time.perf_counter() - started
+        print(f"  {done}/{total} usuarios ({elapsed:.0f} s)", file=sys.stderr)
+
+    with flask_app.app_context():
+        db.create_all()
+        counts = generate(spec, progress=progress)
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(json.dumps(dict(counts), indent=2))
+    print(f"{total} filas en {elapsed:.1f} s ({total / elapsed:.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/report.py
+"""
+Resultados de un benchmark: percentiles, tabla y comparación con la línea base.
+
+La línea base (benchmarks/baseline.json) guarda, por escenario, el throughput
+y los percentiles de latencia de una ejecución de referencia. Un escenario
+regresa si su p95 crece o su throughput cae más que la tolerancia.
+"""
+import json
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil con interpolación lineal entre los dos rangos más cercanos."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return ordered[int(rank)]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+@dataclass
+class ScenarioResult:
+    """Latencias (segundos) y errores de un escenario."""
+
+    name: str
+    wall_time: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + len(self.errors)
+
+    @property
+    def throughput(self) -> float:
+        """Iteraciones por segundo (incluye las fallidas)."""
+        return self.requests / self.wall_time if self.wall_time else 0.0
+
+    def summary(self) -> Dict:
+        data = {
+            "requests": self.requests,
+            "errors": len(self.errors),
+            "throughput": round(self.throughput, 2),
+        }
+        for pct in PERCENTILES:
+            data[f"p{pct}_ms"] = round(percentile(self.latencies, pct) * 1000, 1)
+        return data
+
+
+def format_table(results: List[ScenarioResult]) -> str:
+    header = f"{'escenario':<22}{'peticiones':>11}{'errores':>9}{'req/s':>9}" + "".join(
+        f"{f'p{pct} ms':>10}" for pct in PERCENTILES
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        summary = result.summary()
+        lines.append(
+            f"{result.name:<22}{summary['requests']:>11}{summary['errors']:>9}{summary['throughput']:>9.1f}"
+            + "".join(f"{summary[f'p{pct}_ms']:>10.1f}" for pct in PERCENTILES)
+        )
+    return "\n".join(lines)
+
+
+def load_baseline(path) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results: List[ScenarioResult], settings: Dict) -> None:
+    data = {
+        "settings": settings,
+        "scenarios": {result.name: result.summary() for result in results},
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2, ensure_ascii=False)
+        fh.write("\n")
+
+
+def compare(results: List[ScenarioResult], baseline: Dict, tolerance: float = 0.25) -> List[str]:
+    """
+    Regresiones respecto a la línea base: p95 más de `tolerance` por encima,
+    throughput más de `tolerance` por debajo, o errores donde no los había.
+    """
+    regressions = []
+    scenarios = baseline.get("scenarios", {})
+    for result in results:
+        reference = scenarios.get(result.name)
+        if not reference:
+            continue
+        current = result.summary()
+        if reference["p95_ms"] and current["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{result.name}: p95 {current['p95_ms']:.1f} ms (línea base {reference['p95_ms']:.1f} ms)"
+            )
+        if reference["throughput"] and current["throughput"] < reference["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{result.name}: {current['throughput']:.1f} req/s (línea base {reference['throughput']:.1f} req/s)"
+            )
+        if current["errors"] and not reference["errors"]:
+            regressions.append(f"{result.name}: {current['errors']} errores (línea base sin errores)")
+    return regressions
+
+
+def to_json(results: List[ScenarioResult]) -> str:
+    return json.dumps({result.name: {**result.summary(), "sample_errors": result.errors[:5]} for result in results},
+                      indent=2, ensure_ascii=False)
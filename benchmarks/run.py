@@ -0,0 +1,276 @@
+# benchmarks/run.py
+"""
+Benchmark de carga de la app contra stubs locales de OpenAI, Telegram y S3.
+
+    python -m benchmarks.run                                   # todos los escenarios
+    python -m benchmarks.run -s form_submit -s telegram_message -c 8 -n 200
+    python -m benchmarks.run --openai-latency 0.8 --openai-tokens-per-second 40
+    python -m benchmarks.run -s form_submit --openai-tpm 200000   # gobernador con límites reales
+    python -m benchmarks.run --save-baseline                   # nueva línea base
+
+Arranca los stubs, apunta la app a ellos con variables de entorno (antes de
+importar `app`: el cliente de OpenAI y la URL de Telegram se leen al
+importar), siembra una base SQLite temporal (cuentas bench<N> más
+`--dataset-users` usuarios de fondo de benchmarks/dataset.py) y sirve la app en un servidor
+WSGI con hilos. Cada escenario se ejecuta con `--concurrency` usuarios
+virtuales en paralelo; al final se imprime throughput y p50/p95/p99 y se
+compara con benchmarks/baseline.json (sale con código 1 si hay regresión).
+"""
+import argparse
+import contextlib
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks import report
+from benchmarks.dataset import DatasetSpec, generate
+from benchmarks.scenarios import (
+    BENCH_PASSWORD,
+    BLOG_POSTS,
+    SCENARIOS,
+    TELEGRAM_ID_OFFSET,
+    VirtualUser,
+    admin_email,
+    user_email,
+)
+from benchmarks.stubs import StubServer, openai_stub, s3_stub, telegram_stub
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+BENCH_BUCKET = "bench-media"
+BENCH_TELEGRAM_TOKEN = "123456:bench"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga con stubs locales")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), dest="scenarios",
+                        help="Escenario a ejecutar (repetible; por defecto todos)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Usuarios virtuales en paralelo")
+    parser.add_argument("-n", "--iterations", type=int, default=60, help="Iteraciones por escenario")
+    parser.add_argument("--seed", type=int, default=360, help="Semilla de los datos y los escenarios")
+    parser.add_argument("--dataset-users", type=int, default=500,
+                        help="Usuarios sintéticos de fondo (benchmarks/dataset.py)")
+    parser.add_argument("--openai-latency", type=float, default=0.05, help="Segundos hasta la primera respuesta")
+    parser.add_argument("--openai-rtt", type=float, default=0.02,
+                        help="Ida y vuelta de red en cada llamada a OpenAI (segundos)")
+    parser.add_argument("--openai-tokens-per-second", type=float, default=400, help="Ritmo del streaming (0 = sin pausa)")
+    parser.add_argument("--openai-rpm", type=int, default=100_000,
+                        help="OPENAI_RPM_LIMIT del gobernador (por defecto no limita: el stub no tiene cuotas)")
+    parser.add_argument("--openai-tpm", type=int, default=100_000_000, help="OPENAI_TPM_LIMIT del gobernador")
+    parser.add_argument("--telegram-latency", type=float, default=0.01)
+    parser.add_argument("--s3-latency", type=float, default=0.01)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar esta ejecución como línea base")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Margen antes de considerar regresión")
+    parser.add_argument("--json", action="store_true", help="Imprimir también el resumen en JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="No silenciar logs ni prints de la app")
+    return parser.parse_args(argv)
+
+
+def configure_environment(openai_url, telegram_url, s3_url, database_path, openai_rpm, openai_tpm):
+    """Apunta la app a los stubs. Debe ejecutarse antes de importar `app`."""
+    os.environ.update({
+        "OPENAI_RPM_LIMIT": str(openai_rpm),
+        "OPENAI_TPM_LIMIT": str(openai_tpm),
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"{openai_url}/v1",
+        "TELEGRAM_BOT_TOKEN": BENCH_TELEGRAM_TOKEN,
+        "TELEGRAM_API_URL": telegram_url,
+        "S3_BUCKET": BENCH_BUCKET,
+        "S3_ENDPOINT_URL": s3_url,
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "BENCHMARK_DATABASE_URL": f"sqlite:///{database_path}",
+    })
+    os.environ.pop("CLOUDFRONT_DOMAIN", None)
+
+
+def seed(flask_app, users, dataset_users, seed_value):
+    """Cuentas bench<N>/bench-admin<N> con historial y Telegram, más el dataset sintético."""
+    from app import db
+    from app.body_analysis.calculos import calcular_imc, calcular_porcentaje_grasa, calcular_tmb
+    from app.body_analysis.model import Sexo
+    from app.models import BiometricAnalysis, User, UserTelegramLink
+
+    rng = random.Random(seed_value)
+    with flask_app.app_context():
+        db.create_all()
+        now = datetime.utcnow()
+        for index in range(users):
+            user = User(username=f"bench{index}", email=user_email(index), first_name="Bench", last_name=str(index))
+            admin = User(username=f"bench-admin{index}", email=admin_email(index), is_admin=True)
+            for account in (user, admin):
+                account.password = BENCH_PASSWORD
+                account.is_verified = True
+            db.session.add_all([user, admin])
+            db.session.flush()
+
+            for weeks in range(10):
+                weight, waist = round(rng.uniform(65, 90), 1), round(rng.uniform(78, 92), 1)
+                db.session.add(BiometricAnalysis(
+                    user_id=user.id, weight=weight, height=178, age=35, gender="male", neck=38, waist=waist,
+                    bmi=calcular_imc(weight, 178), bmr=calcular_tmb(weight, 178, 35, Sexo.HOMBRE),
+                    body_fat_percentage=calcular_porcentaje_grasa(waist, 38, 178, Sexo.HOMBRE),
+                    created_at=now - timedelta(weeks=weeks),
+                ))
+            db.session.add(UserTelegramLink(
+                user_id=user.id,
+                telegram_user_id=str(TELEGRAM_ID_OFFSET + index),
+                telegram_chat_id=str(TELEGRAM_ID_OFFSET + index),
+                status="verified",
+            ))
+
+        db.session.commit()
+
+        # Volumen de fondo y posts del blog (synth-post-<N>) del generador sintético
+        generate(DatasetSpec(users=dataset_users, seed=seed_value, posts=BLOG_POSTS))
+
+
+def run_scenario(name, base_url, concurrency, iterations, seed_value):
+    """Ejecuta `iterations` iteraciones repartidas entre `concurrency` usuarios virtuales."""
+    scenario = SCENARIOS[name]
+    result = report.ScenarioResult(name)
+    users = [
+        VirtualUser(base_url, index, random.Random(f"{seed_value}-{name}-{index}"))
+        for index in range(concurrency)
+    ]
+    shares = [iterations // concurrency + (1 if index < iterations % concurrency else 0) for index in range(concurrency)]
+
+    # Calentamiento (login y primera petición de cada usuario) fuera de la medición
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda vu: _warmup(scenario, vu, result), users))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda args: _measure(scenario, *args, result), zip(users, shares)))
+    result.wall_time = time.perf_counter() - started
+
+    for vu in users:
+        vu.close()
+    return result
+
+
+def _warmup(scenario, vu, result):
+    try:
+        scenario(vu)
+    except Exception as exc:
+        result.errors.append(f"warmup: {type(exc).__name__}: {exc}")
+
+
+def _measure(scenario, vu, count, result):
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            scenario(vu)
+        except Exception as exc:
+            result.errors.append(f"{type(exc).__name__}: {exc}")
+        else:
+            result.latencies.append(time.perf_counter() - started)
+
+
+@contextlib.contextmanager
+def _quiet(verbose):
+    """La app imprime y registra mucho por petición: se silencia durante la medición."""
+    if verbose:
+        yield
+        return
+    previous = logging.root.manager.disable
+    logging.disable(logging.WARNING)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            yield
+        finally:
+            logging.disable(previous)
+
+
+def _shutdown_write_behind():
+    """Vuelca vistas y consumo pendientes antes de borrar bench.db (su atexit llegaría tarde)."""
+    from app.services.usage_recorder import usage_recorder
+    from app.services.view_counter import view_counter
+
+    view_counter.shutdown()
+    usage_recorder.shutdown()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = args.scenarios or list(SCENARIOS)
+    settings = {
+        "concurrency": args.concurrency,
+        "iterations": args.iterations,
+        "dataset_users": args.dataset_users,
+        "openai_latency": args.openai_latency,
+        "openai_rtt": args.openai_rtt,
+        "openai_tokens_per_second": args.openai_tokens_per_second,
+        "openai_rpm": args.openai_rpm,
+        "openai_tpm": args.openai_tpm,
+        "telegram_latency": args.telegram_latency,
+        "s3_latency": args.s3_latency,
+    }
+
+    openai_app = openai_stub(latency=args.openai_latency, tokens_per_second=args.openai_tokens_per_second,
+                             rtt=args.openai_rtt)
+    telegram_app = telegram_stub(latency=args.telegram_latency)
+    storage_app = s3_stub(latency=args.s3_latency)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmpdir, \
+            StubServer(openai_app) as openai_server, \
+            StubServer(telegram_app) as telegram_server, \
+            StubServer(storage_app) as s3_server:
+        configure_environment(openai_server.url, telegram_server.url, s3_server.url, Path(tmpdir, "bench.db"),
+                              args.openai_rpm, args.openai_tpm)
+
+        with _quiet(args.verbose):
+            from app import create_app
+
+            flask_app = create_app("benchmark")
+            seed(flask_app, args.concurrency, args.dataset_users, args.seed)
+
+        with StubServer(flask_app) as app_server:
+            for name in names:
+                with _quiet(args.verbose):
+                    results.append(run_scenario(name, app_server.url, args.concurrency, args.iterations, args.seed))
+
+        _shutdown_write_behind()
+
+    print(report.format_table(results))
+    print()
+    print("Llamadas a los stubs:")
+    print(f"  OpenAI:   {dict(openai_app.config['calls'])}")
+    print(f"  Telegram: {dict(telegram_app.config['calls'])}")
+    print(f"  S3:       {dict(storage_app.config['calls'])}")
+    for result in results:
+        for error in result.errors[:3]:
+            print(f"  [{result.name}] {error}")
+    if args.json:
+        print(report.to_json(results))
+
+    if args.save_baseline:
+        report.save_baseline(args.baseline, results, settings)
+        print(f"\nLínea base guardada en {args.baseline}")
+        return 0
+
+    baseline = report.load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nSin línea base en {args.baseline} (usa --save-baseline)")
+        return 0
+    if baseline.get("settings") != settings:
+        print(f"\nAviso: la línea base se midió con otros parámetros: {baseline.get('settings')}")
+
+    regressions = report.compare(results, baseline, tolerance=args.tolerance)
+    if regressions:
+        print(f"\nRegresiones (tolerancia {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print(f"\nSin regresiones respecto a la línea base (tolerancia {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# benchmarks/scenarios.py
+"""
+Escenarios de carga: cada uno es una iteración de un usuario virtual.
+
+Un usuario virtual (VirtualUser) tiene su cuenta sembrada por run.py
+(bench<N>@example.com, con historial y Telegram vinculado; los posts del
+blog vienen del dataset sintético) y sesiones HTTP
+propias: anónima, de usuario y de administrador. Las latencias se miden por
+iteración completa, redirecciones incluidas.
+"""
+import io
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict
+
+import requests
+from PIL import Image
+
+BENCH_PASSWORD = "Bench-Secret-123"
+TELEGRAM_ID_OFFSET = 900_000
+BLOG_POSTS = 60
+SEARCH_TERMS = ("proteína", "fuerza", "grasa corporal", "descanso", "hipertrofia")
+
+
+def user_email(index: int) -> str:
+    return f"bench{index}@example.com"
+
+
+def admin_email(index: int) -> str:
+    return f"bench-admin{index}@example.com"
+
+
+class ScenarioError(Exception):
+    """Respuesta inesperada de la app durante un escenario."""
+
+
+def _check(response: requests.Response, expected: int = 200) -> requests.Response:
+    if response.status_code != expected:
+        raise ScenarioError(f"{response.request.method} {response.url} → {response.status_code}")
+    return response
+
+
+@dataclass
+class VirtualUser:
+    """Usuario sembrado con sus sesiones HTTP (una por rol, creadas al usarse)."""
+
+    base_url: str
+    index: int
+    rng: random.Random
+    _sessions: Dict[str, requests.Session] = field(default_factory=dict)
+
+    @property
+    def telegram_id(self) -> int:
+        return TELEGRAM_ID_OFFSET + self.index
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def session(self, role: str = "user") -> requests.Session:
+        if role not in self._sessions:
+            session = requests.Session()
+            if role != "anonymous":
+                email = admin_email(self.index) if role == "admin" else user_email(self.index)
+                response = _check(session.post(
+                    self.url("/auth/login"), data={"email": email, "password": BENCH_PASSWORD},
+                ))
+                if "/auth/login" in response.url:
+                    raise ScenarioError(f"Login fallido para {email}")
+            self._sessions[role] = session
+        return self._sessions[role]
+
+    def close(self) -> None:
+        for session in self._sessions.values():
+            session.close()
+
+
+# ── Escenarios ─────────────────────────────────────────────────
+def form_submit(vu: VirtualUser) -> None:
+    """Formulario biométrico: cálculo, análisis de FitMaster (OpenAI) y página de resultado."""
+    form = {
+        "peso": f"{vu.rng.uniform(60, 95):.1f}",
+        "altura": f"{vu.rng.uniform(160, 190):.1f}",
+        "edad": str(vu.rng.randint(20, 60)),
+        "genero": vu.rng.choice("hm"),
+        "cuello": f"{vu.rng.uniform(33, 40):.1f}",
+        "cintura": f"{vu.rng.uniform(70, 95):.1f}",
+        "cadera": f"{vu.rng.uniform(90, 105):.1f}",
+        "factor_actividad": "1.55",
+        "objetivo": vu.rng.choice(("perder grasa", "ganar masa muscular", "mantener peso")),
+    }
+    response = _check(vu.session().post(vu.url("/nuevo"), data=form))
+    if not response.history:
+        # Sin redirección: el formulario se volvió a mostrar con un error de validación
+        raise ScenarioError("El formulario no redirigió al resultado")
+
+
+def history(vu: VirtualUser) -> None:
+    """Historial de análisis del usuario."""
+    _check(vu.session().get(vu.url("/historial")))
+
+
+def blog_browsing(vu: VirtualUser) -> None:
+    """Lector anónimo: índice, un post o una búsqueda."""
+    session = vu.session("anonymous")
+    page = vu.rng.random()
+    if page < 0.3:
+        _check(session.get(vu.url("/blog/")))
+    elif page < 0.8:
+        _check(session.get(vu.url(f"/blog/synth-post-{vu.rng.randrange(BLOG_POSTS)}")))
+    else:
+        _check(session.get(vu.url("/blog/buscar"), params={"q": vu.rng.choice(SEARCH_TERMS)}))
+
+
+def telegram_message(vu: VirtualUser) -> None:
+    """Mensaje de un usuario vinculado: webhook → FitMaster en streaming → Bot API."""
+    update = {
+        "update_id": vu.rng.randrange(1, 2**31),
+        "message": {
+            "message_id": vu.rng.randrange(1, 2**31),
+            "chat": {"id": vu.telegram_id, "type": "private"},
+            "from": {"id": vu.telegram_id, "is_bot": False, "first_name": "Bench"},
+            "text": vu.rng.choice(("¿Cómo voy?", "¿Qué ceno hoy?", "Dame una rutina de pierna")),
+        },
+    }
+    _check(vu.session("anonymous").post(vu.url("/integrations/telegram/webhook"), json=update))
+
+
+def _png(rng: random.Random) -> bytes:
+    image = Image.new("RGB", (640, 480), tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def media_upload(vu: VirtualUser) -> None:
+    """Subida de una imagen desde el admin del blog (optimización + S3)."""
+    # Nombre distinto en cada subida: el almacenamiento añade una marca de tiempo por segundo
+    filename = f"bench-{vu.index}-{vu.rng.randrange(16**8):08x}.png"
+    files = {"file": (filename, _png(vu.rng), "image/png")}
+    response = _check(vu.session("admin").post(vu.url("/blog/admin/upload"), files=files))
+    if not response.json().get("success"):
+        raise ScenarioError(f"Subida fallida: {response.text[:200]}")
+
+
+SCENARIOS: Dict[str, Callable[[VirtualUser], None]] = {
+    "form_submit": form_submit,
+    "history": history,
+    "blog_browsing": blog_browsing,
+    "telegram_message": telegram_message,
+    "media_upload": media_upload,
+}
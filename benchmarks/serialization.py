@@ -0,0 +1,143 @@
+# benchmarks/serialization.py
+"""
+Microbenchmark de serialización: 1.000 análisis a dict y a JSON.
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --analyses 5000 --repeat 20
+    JSON_BACKEND=stdlib python -m benchmarks.serialization   # sin orjson
+
+Compara el camino anterior (to_dict construido a mano + proveedor JSON por
+defecto de Flask) con el actual (serializador precompilado + FastJSONProvider)
+sobre el mismo payload que /api/v1/history. Los análisis se generan con
+benchmarks.dataset en una base SQLite en memoria y se cargan con una
+consulta normal, como en las vistas.
+
+Por cada fase se imprime la mediana del tiempo y el pico de memoria
+reservada (tracemalloc) en una pasada.
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+from flask.json.provider import DefaultJSONProvider
+
+
+def legacy_to_dict(analysis, include_fitmaster=True):
+    """BiometricAnalysis.to_dict antes del serializador precompilado (referencia)."""
+    data = {
+        "id": analysis.id,
+        "user_id": analysis.user_id,
+        "weight": analysis.weight,
+        "height": analysis.height,
+        "age": analysis.age,
+        "gender": analysis.gender,
+        "neck": analysis.neck,
+        "waist": analysis.waist,
+        "hip": analysis.hip,
+        "biceps_left": analysis.biceps_left,
+        "biceps_right": analysis.biceps_right,
+        "thigh_left": analysis.thigh_left,
+        "thigh_right": analysis.thigh_right,
+        "calf_left": analysis.calf_left,
+        "calf_right": analysis.calf_right,
+        "activity_factor": analysis.activity_factor,
+        "activity_level": analysis.activity_level,
+        "goal": analysis.goal,
+        "bmi": analysis.bmi,
+        "bmr": analysis.bmr,
+        "tdee": analysis.tdee,
+        "body_fat_percentage": analysis.body_fat_percentage,
+        "lean_mass": analysis.lean_mass,
+        "fat_mass": analysis.fat_mass,
+        "ffmi": analysis.ffmi,
+        "body_water": analysis.body_water,
+        "waist_hip_ratio": analysis.waist_hip_ratio,
+        "waist_height_ratio": analysis.waist_height_ratio,
+        "metabolic_age": analysis.metabolic_age,
+        "maintenance_calories": analysis.maintenance_calories,
+        "protein_grams": analysis.protein_grams,
+        "carbs_grams": analysis.carbs_grams,
+        "fats_grams": analysis.fats_grams,
+        "created_at": analysis.created_at.isoformat() if analysis.created_at else None,
+        "updated_at": analysis.updated_at.isoformat() if analysis.updated_at else None,
+    }
+    if include_fitmaster and analysis.fitmaster_data:
+        data["fitmaster_data"] = analysis.fitmaster_data
+    return data
+
+
+def _payload(analyses, to_dict):
+    return {"status": "success", "count": len(analyses), "data": [to_dict(a) for a in analyses]}
+
+
+def measure(func, repeat):
+    """(mediana en ms, pico de memoria en KiB) de `func()`."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak / 1024
+
+
+def run(flask_app, analyses, repeat):
+    from app.models import BiometricAnalysis
+
+    stdlib = DefaultJSONProvider(flask_app)
+    fast = flask_app.json  # FastJSONProvider según JSON_BACKEND
+    before_payload = _payload(analyses, legacy_to_dict)
+    after_payload = _payload(analyses, BiometricAnalysis.to_dict)
+    assert before_payload == after_payload, "el serializador precompilado cambió la salida"
+
+    return fast.backend, {
+        "to_dict": (
+            measure(lambda: _payload(analyses, legacy_to_dict), repeat),
+            measure(lambda: _payload(analyses, BiometricAnalysis.to_dict), repeat),
+        ),
+        "json": (
+            measure(lambda: stdlib.response(before_payload).get_data(), repeat),
+            measure(lambda: fast.response(after_payload).get_data(), repeat),
+        ),
+        "total": (
+            measure(lambda: stdlib.response(_payload(analyses, legacy_to_dict)).get_data(), repeat),
+            measure(lambda: fast.response(_payload(analyses, BiometricAnalysis.to_dict)).get_data(), repeat),
+        ),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de análisis")
+    parser.add_argument("--analyses", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    from app import create_app, db
+    from app.models import BiometricAnalysis
+    from benchmarks.dataset import DatasetSpec, generate
+
+    flask_app = create_app("testing")
+    flask_app.config["DEBUG"] = False  # respuestas compactas, como en producción
+    with flask_app.app_context():
+        db.create_all()
+        users = args.analyses // 10 + 10
+        generate(DatasetSpec(users=users, posts=0))
+        analyses = BiometricAnalysis.query.order_by(BiometricAnalysis.id).limit(args.analyses).all()
+        if len(analyses) < args.analyses:
+            sys.exit(f"Solo se generaron {len(analyses)} análisis")
+
+        backend, results = run(flask_app, analyses, args.repeat)
+
+    print(f"{len(analyses)} análisis, backend JSON: {backend}, mediana de {args.repeat} pasadas\n")
+    print(f"{'fase':<10}{'antes ms':>10}{'después ms':>12}{'mejora':>9}{'antes KiB':>12}{'después KiB':>13}")
+    for phase, ((old_ms, old_kib), (new_ms, new_kib)) in results.items():
+        print(f"{phase:<10}{old_ms:>10.2f}{new_ms:>12.2f}{old_ms / new_ms:>8.1f}x{old_kib:>12.0f}{new_kib:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
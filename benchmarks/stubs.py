@@ -0,0 +1,449 @@
+# benchmarks/stubs.py
+"""
+Servidores locales que sustituyen a las APIs externas durante los benchmarks.
+
+- OpenAI: Chat Completions (con y sin stream), embeddings y el subconjunto de la
+  Assistants API que usa FitMasterService (threads, messages, runs con
+  streaming SSE, retrieve/list/cancel).
+- Telegram Bot API: /bot<token>/<método> (sendMessage, editMessageText,
+  sendChatAction...).
+- S3: PUT/GET/HEAD/DELETE de objetos y ListObjectsV2 en memoria, con
+  direcciones path-style (las que usa boto3 con un endpoint_url local).
+
+Cada stub es una app Flask servida en un hilo con un puerto libre:
+
+    with StubServer(openai_stub(latency=0.3, tokens_per_second=40)) as server:
+        os.environ["OPENAI_BASE_URL"] = f"{server.url}/v1"
+
+La latencia simula el tiempo hasta la primera respuesta; tokens_per_second,
+la velocidad de generación (cada palabra de la respuesta es un token).
+"""
+import hashlib
+import itertools
+import json
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from email.utils import formatdate
+from xml.sax.saxutils import escape
+
+from flask import Flask, Response, abort, jsonify, request
+from werkzeug.serving import make_server
+
+DEFAULT_CHAT_REPLY = (
+    "Tu progreso es constante. Mantén la ingesta de proteína, prioriza el descanso "
+    "y añade una sesión de fuerza a la semana para consolidar la masa magra."
+)
+
+EMBEDDING_DIM = 64
+
+DEFAULT_ANALYSIS = {
+    "interpretation": "Composición corporal dentro de rangos saludables (respuesta simulada).",
+    "nutrition_plan": {
+        "calories": 2400,
+        "meals": [{"name": "Desayuno", "items": ["Avena", "Yogur", "Fruta"]}],
+    },
+    "training_plan": {
+        "days_per_week": 4,
+        "sessions": [{"day": "Lunes", "focus": "Fuerza tren superior"}],
+    },
+}
+
+
+class StubServer:
+    """Sirve una app WSGI en un hilo de fondo (127.0.0.1, puerto libre)."""
+
+    def __init__(self, wsgi_app, host="127.0.0.1", port=0):
+        self._server = make_server(host, port, wsgi_app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self.url = f"http://{host}:{self._server.server_port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _tokens(text):
+    """Trocea el texto en "tokens" (palabras con su espacio) para el streaming."""
+    words = text.split(" ")
+    return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+
+def _usage(prompt_text, completion_text):
+    prompt_tokens = max(1, len(prompt_text) // 4)
+    completion_tokens = len(_tokens(completion_text))
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+# ── OpenAI ─────────────────────────────────────────────────────
+def _sse(event, data):
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {payload}\n\n"
+
+
+def _run_object(thread_id, run_id, status, usage=None, assistant_id="asst_stub"):
+    return {
+        "id": run_id,
+        "object": "thread.run",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "assistant_id": assistant_id,
+        "status": status,
+        "required_action": None,
+        "last_error": None,
+        "model": "gpt-4o-mini",
+        "instructions": "",
+        "tools": [],
+        "usage": usage,
+    }
+
+
+def _message_object(thread_id, message_id, role, text, status="completed"):
+    return {
+        "id": message_id,
+        "object": "thread.message",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "role": role,
+        "status": status,
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}] if text else [],
+        "attachments": [],
+        "metadata": {},
+    }
+
+
+class _OpenAIHandlers:
+    """Estado compartido y un handler por endpoint de la API de OpenAI simulada."""
+
+    def __init__(self, app, latency, tokens_per_second, chat_reply, analysis, rtt, agent_tool):
+        self.app = app
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.chat_reply = chat_reply
+        self.rtt = rtt
+        self.agent_tool = agent_tool
+        self.calls = app.config["calls"]
+        self.threads = app.config["threads"]
+        self.completion_text = json.dumps(analysis or DEFAULT_ANALYSIS, ensure_ascii=False)
+        self.runs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_id(self, prefix):
+        with self._lock:
+            return f"{prefix}_{next(self._ids)}"
+
+    def wait_first_byte(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def wait_token(self):
+        if self.tokens_per_second:
+            time.sleep(1.0 / self.tokens_per_second)
+
+    def count_call(self):
+        self.calls[f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"] += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+        with self._lock:
+            failing = self.app.config["fail_next"] > 0
+            if failing:
+                self.app.config["fail_next"] -= 1
+        if failing:
+            return jsonify({"error": {"message": "stub: servicio no disponible", "type": "server_error"}}), 503
+
+    # ── Chat Completions ───────────────────────────────────────
+    def chat_completions(self):
+        body = request.get_json(force=True)
+        messages = body.get("messages", [])
+        prompt = " ".join(str(m.get("content", "")) for m in messages)
+        chunk = {"id": self.new_id("chatcmpl"), "object": "chat.completion.chunk",
+                 "created": int(time.time()), "model": body.get("model", "gpt-4o-mini")}
+        agent = bool(body.get("tools"))
+        text = self.chat_reply if agent else self.completion_text
+        usage = _usage(prompt, text)
+
+        if agent and self.agent_tool and body.get("stream") and not any(m.get("role") == "tool" for m in messages):
+            return Response(self._tool_call_stream(chunk, usage), mimetype="text/event-stream")
+        if not body.get("stream"):
+            return self._completion(chunk, text, usage)
+        return Response(self._completion_stream(chunk, text, usage), mimetype="text/event-stream")
+
+    def _tool_call_stream(self, chunk, usage):
+        self.wait_first_byte()
+        call = {"index": 0, "id": self.new_id("call"), "type": "function",
+                "function": {"name": self.agent_tool, "arguments": ""}}
+        yield _sse(None, {**chunk, "choices": [{"index": 0, "delta": {"role": "assistant", "tool_calls": [call]},
+                                                "finish_reason": None}]})
+        for part in ('{"li', 'mit": 2}'):
+            delta = {"tool_calls": [{"index": 0, "function": {"arguments": part}}]}
+            yield _sse(None, {**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        yield _sse(None, {**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}]})
+        yield _sse(None, {**chunk, "choices": [], "usage": usage})
+        yield _sse(None, "[DONE]")
+
+    def _completion(self, chunk, text, usage):
+        self.wait_first_byte()
+        for _ in _tokens(text):
+            self.wait_token()
+        return jsonify({
+            "id": chunk["id"],
+            "object": "chat.completion",
+            "created": chunk["created"],
+            "model": chunk["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _completion_stream(self, chunk, text, usage):
+        self.wait_first_byte()
+        for token in _tokens(text):
+            self.wait_token()
+            yield _sse(None, {**chunk, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+        yield _sse(None, {**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        yield _sse(None, {**chunk, "choices": [], "usage": usage})
+        yield _sse(None, "[DONE]")
+
+    # ── Embeddings ─────────────────────────────────────────────
+    def embeddings(self):
+        """Vectores deterministas (palabras con el hashing trick): textos con las mismas palabras coinciden."""
+        body = request.get_json(force=True)
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for index, text in enumerate(texts):
+            vector = [0.0] * EMBEDDING_DIM
+            for word in text.lower().split():
+                vector[zlib.crc32(word.strip("¿?¡!.,").encode("utf-8")) % EMBEDDING_DIM] += 1.0
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        tokens = sum(len(_tokens(text)) for text in texts)
+        return jsonify({"object": "list", "data": data, "model": body.get("model", "text-embedding-3-small"),
+                        "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    # ── Assistants: threads y mensajes ─────────────────────────
+    def create_thread(self):
+        body = request.get_json(silent=True) or {}
+        thread_id = self.new_id("thread")
+        self.threads[thread_id] = [str(m.get("content", "")) for m in body.get("messages") or []]
+        return jsonify({"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}})
+
+    def create_message(self, thread_id):
+        body = request.get_json(force=True)
+        self.threads.setdefault(thread_id, []).append(str(body.get("content", "")))
+        return jsonify(_message_object(thread_id, self.new_id("msg"), body.get("role", "user"),
+                                       body.get("content", "")))
+
+    def list_messages(self, thread_id):
+        message = _message_object(thread_id, self.new_id("msg"), "assistant", self.chat_reply)
+        return jsonify({"object": "list", "data": [message], "first_id": message["id"],
+                        "last_id": message["id"], "has_more": False})
+
+    # ── Assistants: runs ───────────────────────────────────────
+    def list_runs(self, thread_id):
+        return jsonify({"object": "list", "data": [], "first_id": None, "last_id": None, "has_more": False})
+
+    def cancel_run(self, thread_id, run_id):
+        return jsonify(_run_object(thread_id, run_id, "cancelled"))
+
+    def retrieve_run(self, thread_id, run_id):
+        if run_id not in self.runs:
+            abort(404)
+        return jsonify(_run_object(thread_id, run_id, "completed", usage=self.runs[run_id]))
+
+    def create_run(self, thread_id):
+        body = request.get_json(force=True)
+        run_id = self.new_id("run")
+        assistant_id = body.get("assistant_id", "asst_stub")
+        history = self.threads.setdefault(thread_id, [])
+        usage = _usage(" ".join([assistant_id, *history]), self.chat_reply)
+        history.append(self.chat_reply)
+        self.runs[run_id] = usage
+
+        if not body.get("stream"):
+            self.wait_first_byte()
+            for _ in _tokens(self.chat_reply):
+                self.wait_token()
+            return jsonify(_run_object(thread_id, run_id, "completed", usage, assistant_id))
+        return Response(self._run_stream(thread_id, run_id, assistant_id, usage), mimetype="text/event-stream")
+
+    def _run_stream(self, thread_id, run_id, assistant_id, usage):
+        message_id = self.new_id("msg")
+        created = _run_object(thread_id, run_id, "queued", None, assistant_id)
+        yield _sse("thread.run.created", created)
+        self.wait_first_byte()
+        yield _sse("thread.run.in_progress", {**created, "status": "in_progress"})
+        yield _sse("thread.message.created",
+                   _message_object(thread_id, message_id, "assistant", "", status="in_progress"))
+        for token in _tokens(self.chat_reply):
+            self.wait_token()
+            yield _sse("thread.message.delta", {
+                "id": message_id,
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": token, "annotations": []}}]},
+            })
+        yield _sse("thread.message.completed", _message_object(thread_id, message_id, "assistant", self.chat_reply))
+        yield _sse("thread.run.completed", _run_object(thread_id, run_id, "completed", usage, assistant_id))
+        yield _sse("done", "[DONE]")
+
+
+def openai_stub(latency=0.0, tokens_per_second=0, chat_reply=DEFAULT_CHAT_REPLY, analysis=None, rtt=0.0,
+                agent_tool=None):
+    """
+    API de OpenAI simulada.
+
+    Args:
+        latency: segundos hasta la primera respuesta (o el primer evento del stream)
+        rtt: ida y vuelta de red añadida a TODAS las peticiones (threads, runs.list...)
+        tokens_per_second: ritmo de los deltas en streaming (0 = sin pausa)
+        chat_reply: texto del asistente en los runs
+        analysis: JSON que devuelve Chat Completions (por defecto DEFAULT_ANALYSIS)
+        agent_tool: herramienta que pide el agente de Chat Completions antes de responder
+
+    Las peticiones de Chat Completions con `tools` son del agente de Telegram
+    (motor completions): responden `chat_reply`, tras pedir `agent_tool` si se indica.
+    """
+    app = Flask("openai_stub")
+    app.config["calls"] = Counter()
+    app.config["threads"] = {}  # thread_id -> textos de sus mensajes (el prompt de cada run crece con el thread)
+    app.config["fail_next"] = 0  # las próximas N peticiones responden 503 (OpenAI caído)
+    handlers = _OpenAIHandlers(app, latency, tokens_per_second, chat_reply, analysis, rtt, agent_tool)
+
+    app.before_request(handlers.count_call)
+    app.post("/v1/chat/completions")(handlers.chat_completions)
+    app.post("/v1/embeddings")(handlers.embeddings)
+    app.post("/v1/threads")(handlers.create_thread)
+    app.post("/v1/threads/<thread_id>/messages")(handlers.create_message)
+    app.get("/v1/threads/<thread_id>/messages")(handlers.list_messages)
+    app.get("/v1/threads/<thread_id>/runs")(handlers.list_runs)
+    app.post("/v1/threads/<thread_id>/runs/<run_id>/cancel")(handlers.cancel_run)
+    app.get("/v1/threads/<thread_id>/runs/<run_id>")(handlers.retrieve_run)
+    app.post("/v1/threads/<thread_id>/runs")(handlers.create_run)
+    return app
+
+
+# ── Telegram ───────────────────────────────────────────────────
+def telegram_stub(latency=0.0):
+    """Bot API de Telegram simulada: cualquier método responde ok con un message_id."""
+    app = Flask("telegram_stub")
+    app.config["calls"] = calls = Counter()
+    message_ids = itertools.count(1)
+
+    @app.post("/bot<token>/<method>")
+    def bot_method(token, method):
+        calls[method] += 1
+        if latency:
+            time.sleep(latency)
+        body = request.get_json(silent=True) or {}
+        if method == "sendChatAction":
+            return jsonify({"ok": True, "result": True})
+        return jsonify({
+            "ok": True,
+            "result": {
+                "message_id": body.get("message_id") or next(message_ids),
+                "date": int(time.time()),
+                "chat": {"id": body.get("chat_id"), "type": "private"},
+                "text": body.get("text", ""),
+            },
+        })
+
+    return app
+
+
+# ── S3 ─────────────────────────────────────────────────────────
+def _decode_aws_chunked(data):
+    """Cuerpo de una subida con Content-Encoding aws-chunked → bytes del objeto."""
+    out = bytearray()
+    pos = 0
+    while True:
+        header_end = data.index(b"\r\n", pos)
+        size = int(data[pos:header_end].split(b";")[0], 16)
+        if size == 0:
+            return bytes(out)
+        start = header_end + 2
+        out += data[start:start + size]
+        pos = start + size + 2
+
+
+def s3_stub(latency=0.0):
+    """Almacén S3 en memoria (path-style: /<bucket>/<key>)."""
+    app = Flask("s3_stub")
+    app.config["calls"] = calls = Counter()
+    app.config["objects"] = objects = {}  # (bucket, key) → (bytes, content_type, etag, headers)
+
+    @app.before_request
+    def simulate_latency():
+        calls[request.method] += 1
+        if latency:
+            time.sleep(latency)
+
+    @app.route("/<bucket>", methods=["PUT", "HEAD"])
+    def bucket_ops(bucket):
+        return Response(status=200)
+
+    @app.get("/<bucket>")
+    def list_objects(bucket):
+        prefix = request.args.get("prefix", "")
+        keys = sorted(key for b, key in objects if b == bucket and key.startswith(prefix))
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><Size>{len(objects[(bucket, key)][0])}</Size>"
+            f"<ETag>{objects[(bucket, key)][2]}</ETag><StorageClass>STANDARD</StorageClass></Contents>"
+            for key in keys
+        )
+        xml = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+            f"<KeyCount>{len(keys)}</KeyCount><MaxKeys>1000</MaxKeys><IsTruncated>false</IsTruncated>"
+            f"{contents}</ListBucketResult>"
+        )
+        return Response(xml, mimetype="application/xml")
+
+    @app.put("/<bucket>/<path:key>")
+    def put_object(bucket, key):
+        data = request.get_data()
+        if "aws-chunked" in request.headers.get("Content-Encoding", ""):
+            data = _decode_aws_chunked(data)
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        headers = {name: value for name, value in request.headers.items() if name.lower() == "cache-control"}
+        objects[(bucket, key)] = (data, request.content_type or "binary/octet-stream", etag, headers)
+        return Response(status=200, headers={"ETag": etag})
+
+    @app.route("/<bucket>/<path:key>", methods=["GET", "HEAD"])
+    def get_object(bucket, key):
+        if (bucket, key) not in objects:
+            return Response(
+                f"<Error><Code>NoSuchKey</Code><Key>{escape(key)}</Key><RequestId>{uuid.uuid4().hex}</RequestId></Error>",
+                status=404, mimetype="application/xml",
+            )
+        data, content_type, etag, headers = objects[(bucket, key)]
+        body = b"" if request.method == "HEAD" else data
+        return Response(body, content_type=content_type, headers={
+            **headers, "ETag": etag, "Content-Length": str(len(data)), "Last-Modified": formatdate(usegmt=True),
+        })
+
+    @app.delete("/<bucket>/<path:key>")
+    def delete_object(bucket, key):
+        objects.pop((bucket, key), None)
+        return Response(status=204)
+
+    return app
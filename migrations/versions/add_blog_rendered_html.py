@@ -0,0 +1,30 @@
+"""add pre-rendered html columns to blog_posts
+
+Revision ID: add_blog_rendered_html
+Revises: add_thread_id
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_blog_rendered_html'
+down_revision = 'add_thread_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('blog_posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_html', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('toc_html', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('render_version', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('blog_posts', schema=None) as batch_op:
+        batch_op.drop_column('render_version')
+        batch_op.drop_column('toc_html')
+        batch_op.drop_column('content_html')
@@ -0,0 +1,58 @@
+"""add full-text search index to blog_posts
+
+Revision ID: add_blog_search_index
+Revises: create_blog_daily_views
+Create Date: 2026-10-19 12:00:00.000000
+
+PostgreSQL: columna tsvector ponderada (configuración 'spanish') + índice GIN.
+SQLite: tabla virtual FTS5 equivalente (sin stemming, con plegado de acentos).
+La aplicación mantiene ambos índices en app/services/blog_search.py.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_blog_search_index'
+down_revision = 'create_blog_daily_views'
+branch_labels = None
+depends_on = None
+
+
+VECTOR_SQL = (
+    "setweight(to_tsvector('spanish', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('spanish', coalesce(excerpt, '')), 'C') || "
+    "setweight(to_tsvector('spanish', coalesce(content, '')), 'D')"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("ALTER TABLE blog_posts ADD COLUMN search_vector tsvector")
+        op.execute(f"UPDATE blog_posts SET search_vector = {VECTOR_SQL}")
+        op.execute(
+            "CREATE INDEX ix_blog_posts_search_vector ON blog_posts USING GIN (search_vector)"
+        )
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS blog_posts_fts USING fts5("
+            "title, tags, excerpt, content, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "INSERT INTO blog_posts_fts (rowid, title, tags, excerpt, content) "
+            "SELECT id, title, coalesce(tags, ''), coalesce(excerpt, ''), content "
+            "FROM blog_posts WHERE is_published"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_blog_posts_search_vector")
+        op.execute("ALTER TABLE blog_posts DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS blog_posts_fts")
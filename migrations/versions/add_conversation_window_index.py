@@ -0,0 +1,25 @@
+"""add (user_id, id) index to telegram_conversation_messages
+
+Revision ID: add_conversation_window_index
+Revises: add_thread_prompt_tokens
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_conversation_window_index'
+down_revision = 'add_thread_prompt_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('telegram_conversation_messages', schema=None) as batch_op:
+        batch_op.create_index('ix_telegram_conversation_messages_user_id_id', ['user_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('telegram_conversation_messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_telegram_conversation_messages_user_id_id')
@@ -0,0 +1,56 @@
+"""add composite indexes for hot queries
+
+Revision ID: add_hot_query_indexes
+Revises: create_blog_post_related
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_query_indexes'
+down_revision = 'create_blog_post_related'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('biometric_analyses', schema=None) as batch_op:
+        batch_op.create_index('ix_biometric_analyses_user_created', ['user_id', sa.text('created_at DESC')], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_read_created', ['user_id', 'is_read', 'created_at'], unique=False)
+
+    with op.batch_alter_table('nutrition_plans', schema=None) as batch_op:
+        batch_op.create_index('ix_nutrition_plans_user_active_created', ['user_id', 'is_active', 'created_at'], unique=False)
+
+    with op.batch_alter_table('training_plans', schema=None) as batch_op:
+        batch_op.create_index('ix_training_plans_user_active_created', ['user_id', 'is_active', 'created_at'], unique=False)
+
+    with op.batch_alter_table('llm_usage_ledger', schema=None) as batch_op:
+        batch_op.create_index('ix_llm_usage_ledger_user_created', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('blog_posts', schema=None) as batch_op:
+        batch_op.create_index('ix_blog_posts_published_date', ['is_published', 'published_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blog_posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_blog_posts_published_date')
+
+    with op.batch_alter_table('llm_usage_ledger', schema=None) as batch_op:
+        batch_op.drop_index('ix_llm_usage_ledger_user_created')
+
+    with op.batch_alter_table('training_plans', schema=None) as batch_op:
+        batch_op.drop_index('ix_training_plans_user_active_created')
+
+    with op.batch_alter_table('nutrition_plans', schema=None) as batch_op:
+        batch_op.drop_index('ix_nutrition_plans_user_active_created')
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_read_created')
+
+    with op.batch_alter_table('biometric_analyses', schema=None) as batch_op:
+        batch_op.drop_index('ix_biometric_analyses_user_created')
@@ -0,0 +1,30 @@
+"""add openai run state to user_telegram_links
+
+Revision ID: add_telegram_run_state
+Revises: add_hot_query_indexes
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_telegram_run_state'
+down_revision = 'add_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_telegram_links', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('openai_run_id', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('openai_run_status', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('openai_run_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user_telegram_links', schema=None) as batch_op:
+        batch_op.drop_column('openai_run_updated_at')
+        batch_op.drop_column('openai_run_status')
+        batch_op.drop_column('openai_run_id')
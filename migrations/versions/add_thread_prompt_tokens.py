@@ -0,0 +1,26 @@
+"""add openai_thread_prompt_tokens to user_telegram_links
+
+Revision ID: add_thread_prompt_tokens
+Revises: add_telegram_run_state
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_thread_prompt_tokens'
+down_revision = 'add_telegram_run_state'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_telegram_links', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('openai_thread_prompt_tokens', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user_telegram_links', schema=None) as batch_op:
+        batch_op.drop_column('openai_thread_prompt_tokens')
@@ -0,0 +1,35 @@
+"""create blog_post_daily_views table
+
+Revision ID: create_blog_daily_views
+Revises: add_blog_rendered_html
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'create_blog_daily_views'
+down_revision = 'add_blog_rendered_html'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('blog_post_daily_views',
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('views', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id', 'day')
+    )
+    with op.batch_alter_table('blog_post_daily_views', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_blog_post_daily_views_day'), ['day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blog_post_daily_views', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blog_post_daily_views_day'))
+
+    op.drop_table('blog_post_daily_views')
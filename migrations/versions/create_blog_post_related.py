@@ -0,0 +1,37 @@
+"""create blog_post_related table
+
+Revision ID: create_blog_post_related
+Revises: add_blog_search_index
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'create_blog_post_related'
+down_revision = 'add_blog_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('blog_post_related',
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('related_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.SmallInteger(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['related_id'], ['blog_posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id', 'related_id')
+    )
+    with op.batch_alter_table('blog_post_related', schema=None) as batch_op:
+        batch_op.create_index('ix_blog_post_related_post_rank', ['post_id', 'rank'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blog_post_related', schema=None) as batch_op:
+        batch_op.drop_index('ix_blog_post_related_post_rank')
+
+    op.drop_table('blog_post_related')
@@ -0,0 +1,34 @@
+"""create user_llm_quotas
+
+Revision ID: create_user_llm_quotas
+Revises: add_conversation_window_index
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'create_user_llm_quotas'
+down_revision = 'add_conversation_window_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_llm_quotas',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('plan', sa.String(length=50), nullable=True),
+    sa.Column('daily_tokens', sa.Integer(), nullable=True),
+    sa.Column('monthly_tokens', sa.Integer(), nullable=True),
+    sa.Column('daily_cost_usd', sa.Float(), nullable=True),
+    sa.Column('monthly_cost_usd', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_llm_quotas')
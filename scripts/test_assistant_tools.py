@@ -6,7 +6,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
 
 from app import create_app
-from app.services.fitmaster_service import FitMasterService
+from app.services.assistant_tools import assistant_tools
 
 class Config:
     TESTING = True
@@ -18,8 +18,11 @@ app.config.from_object(Config)
 app.config['UPLOAD_FOLDER'] = '/tmp/uploads'
 
 with app.app_context():
-    print("Probando _tool_get_user_history (user_id=1):")
-    print(FitMasterService._tool_get_user_history(1, {"limit": 2}))
+    print("Probando get_user_history (user_id=1):")
+    print(assistant_tools.call(1, "get_user_history", {"limit": 2}))
     
-    print("\nProbando _tool_get_current_plans (user_id=1):")
-    print(FitMasterService._tool_get_current_plans(1))
+    print("\nProbando get_current_plans (user_id=1):")
+    print(assistant_tools.call(1, "get_current_plans"))
+
+    print("\nMétricas:")
+    print(assistant_tools.stats())
@@ -0,0 +1,24 @@
+import pytest
+
+from app.services.sql_profiler import assert_query_budget
+
+# Una misma sentencia más veces que esto en una vista se considera N+1
+DEFAULT_MAX_REPEATS = 3
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Presupuesto de queries para una vista:
+
+        def test_users_page(client, query_budget):
+            with query_budget(max_queries=10):
+                client.get("/admin/users")
+
+    Falla si el bloque supera max_queries o repite una forma de sentencia
+    más de max_repeats veces.
+    """
+    def budget(max_queries=None, max_repeats=DEFAULT_MAX_REPEATS):
+        return assert_query_budget(max_queries=max_queries, max_repeats=max_repeats)
+
+    return budget
@@ -0,0 +1,219 @@
+import unittest
+from datetime import date
+from unittest import mock
+
+import numpy as np
+from openai import OpenAI
+
+from app import create_app, db
+from app.models import BiometricAnalysis, ConversationMessage, User, UserTelegramLink
+from app.services import fitmaster_service
+from app.services.answer_cache import (
+    HashingEmbedder,
+    OpenAIEmbedder,
+    VectorIndex,
+    _Entry,
+    answer_cache,
+    fill_template,
+    to_template,
+)
+from app.services.completions_chat import completions_chat
+from app.services.fitmaster_service import FitMasterService
+from app.services.llm_quota import QuotaExceededError, llm_quota
+from app.services.openai_governor import INTERACTIVE, openai_governor
+from app.services.usage_recorder import usage_recorder
+from benchmarks.stubs import StubServer, openai_stub
+
+CHAT_COMPLETIONS = "POST /v1/chat/completions"
+EMBEDDINGS = "POST /v1/embeddings"
+PROTEIN_REPLY = "Con tus 72,5 kg, apunta a 1,6-2,2 g de proteína por kilo repartidos en 3 o 4 comidas."
+
+
+class TestTemplates(unittest.TestCase):
+
+    def test_user_facts_become_placeholders_and_are_filled_for_another_user(self):
+        template, reason = to_template("Ana, tu TDEE es de 2.450 kcal y tu IMC de 22,5.",
+                                       {"tdee": 2450.3, "bmi": 22.48, "first_name": "Ana"})
+        self.assertIsNone(reason)
+        self.assertEqual(template, "{{first_name}}, tu TDEE es de {{tdee|0||.}} kcal y tu IMC de {{bmi|1|,|}}.")
+        self.assertEqual(fill_template(template, {"tdee": 1980.6, "bmi": 19.96, "first_name": "Luis"}),
+                         "Luis, tu TDEE es de 1.981 kcal y tu IMC de 20,0.")
+        self.assertIsNone(fill_template(template, {"tdee": 1980.6}))
+
+    def test_personal_or_ambiguous_answers_are_rejected(self):
+        facts = {"weight": 72.5, "age": 30, "bmi": 22.5, "body_water": 22.5}
+        self.assertEqual(to_template("Unos 145 g de proteína al día.", facts), (None, "free_number"))
+        self.assertEqual(to_template("A tus 30 años...", facts), (None, "ambiguous_fact"))
+        self.assertEqual(to_template("Un IMC de 22.5 es normal.", facts), (None, "ambiguous_fact"))
+        self.assertEqual(to_template("Entre 1.6 y 2.2 g por kilo.", facts), ("Entre 1.6 y 2.2 g por kilo.", None))
+
+
+class TestIndex(unittest.TestCase):
+
+    def test_paraphrases_match_and_different_questions_do_not(self):
+        embedder = HashingEmbedder()
+        vectors = embedder.embed([
+            "¿Cuánta proteína debo comer al día?",
+            "cuanta proteina tengo que tomar",
+            "¿Cuántos carbohidratos debo comer?",
+            "¿Qué comer después de entrenar?",
+            "¿Qué comer antes de entrenar?",
+        ])
+        self.assertGreaterEqual(vectors[0] @ vectors[1], embedder.default_threshold)
+        self.assertLess(vectors[0] @ vectors[2], embedder.default_threshold)
+        self.assertLess(vectors[3] @ vectors[4], embedder.default_threshold)
+
+    def test_full_index_evicts_the_least_recently_used(self):
+        index = VectorIndex("hashing", capacity=3)
+        vectors = np.eye(4, dtype=np.float32)
+        for position in range(3):
+            index.add(vectors[position], _Entry(f"q{position}", "r", 1, created_at=0, last_used=position))
+        index.entries[0].last_used = 10
+        evicted = index.add(vectors[3], _Entry("q3", "r", 1, created_at=0, last_used=11))
+
+        self.assertEqual(evicted.query, "q1")
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.entries[index.search(vectors[2])[0]].query, "q2")
+        self.assertEqual(index.search(vectors[1])[1], 0.0)
+
+
+class TestAnswerCacheChat(unittest.TestCase):
+    """chat_query (motor completions) con la caché de respuestas contra el stub de OpenAI."""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.users = []
+        for index, (name, weight) in enumerate((("ana", 72.5), ("luis", 80.25), ("sara", None))):
+            user = User(username=name, email=f"{name}@example.com")
+            user.password = "Secret123!"
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(UserTelegramLink(user_id=user.id, telegram_user_id=str(60 + index)))
+            if weight:
+                db.session.add(BiometricAnalysis(user_id=user.id, weight=weight, height=175.0, age=30,
+                                                 gender="female", neck=32.0, waist=72.0))
+            self.users.append(user.id)
+        db.session.commit()
+        completions_chat.completions_users = frozenset(self.users)
+        usage_recorder.clear()
+
+        self._client = fitmaster_service.client
+        self.server = None
+
+    def tearDown(self):
+        fitmaster_service.client = self._client
+        if self.server:
+            self.server.stop()
+        completions_chat.completions_users = frozenset()
+        answer_cache.init_app(self.app)
+        usage_recorder.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _start_stub(self, **kwargs):
+        self.stub = openai_stub(**kwargs)
+        self.server = StubServer(self.stub).start()
+        fitmaster_service.client = OpenAI(api_key="sk-test", base_url=f"{self.server.url}/v1")
+
+    def test_near_duplicate_is_served_with_the_askers_facts(self):
+        self._start_stub(chat_reply=PROTEIN_REPLY)
+        ana, luis, sara = self.users
+
+        self.assertEqual(FitMasterService.chat_query("¿Cuánta proteína debo comer al día?", ana), PROTEIN_REPLY)
+        reply = FitMasterService.chat_query("cuanta proteina tengo que tomar", luis)
+        self.assertEqual(reply, PROTEIN_REPLY.replace("72,5", "80,2"))
+        self.assertEqual(self.stub.config["calls"][CHAT_COMPLETIONS], 1)
+        self.assertEqual(
+            [(m.role, m.content) for m in ConversationMessage.query.filter_by(user_id=luis)],
+            [("user", "cuanta proteina tengo que tomar"), ("assistant", reply)],
+        )
+
+        # Sin análisis no hay peso que poner: se pregunta a OpenAI
+        self.assertEqual(FitMasterService.chat_query("¿Cuánta proteína debo comer?", sara), PROTEIN_REPLY)
+        self.assertEqual(self.stub.config["calls"][CHAT_COMPLETIONS], 2)
+
+        stats = answer_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["stored"]), (1, 2, 1))
+        self.assertEqual(stats["hit_rate"], round(1 / 3, 4))
+        self.assertGreater(stats["saved_tokens"], 0)
+        # Su respuesta trae un peso que no es suyo: no se guarda
+        self.assertEqual(stats["skipped"], {"missing_facts": 1, "free_number": 1})
+
+    def _context(self, user_id, **changes):
+        """Contexto del prompt como lo arma el bot de Telegram (último análisis)."""
+        analysis = BiometricAnalysis.query.filter_by(user_id=user_id).one()
+        for field, value in changes.items():
+            setattr(analysis, field, value)
+        db.session.commit()
+        return analysis.to_dict(include_fitmaster=False)
+
+    def test_answers_are_only_served_to_the_same_profile(self):
+        self._start_stub(chat_reply=PROTEIN_REPLY)
+        ana, luis, _ = self.users
+        question = "¿Cuánta proteína debo comer al día?"
+
+        FitMasterService.chat_query(question, ana, self._context(ana, goal="lose_weight"))
+        FitMasterService.chat_query(question, luis, self._context(luis, goal="gain_muscle"))
+        self.assertEqual(self.stub.config["calls"][CHAT_COMPLETIONS], 2)
+
+        # Con el mismo objetivo que ana sí se le sirve la respuesta de ana
+        reply = FitMasterService.chat_query(question, luis, self._context(luis, goal="lose_weight"))
+        self.assertEqual(reply, PROTEIN_REPLY.replace("72,5", "80,2"))
+        self.assertEqual(self.stub.config["calls"][CHAT_COMPLETIONS], 2)
+
+    def test_turns_with_earlier_conversation_are_not_stored(self):
+        self._start_stub(chat_reply="Depende de tu objetivo y de cómo descanses.")
+        ana, luis, _ = self.users
+        completions_chat.completions_users = frozenset({ana})  # luis usa la Assistants API
+
+        FitMasterService.chat_query("¿Qué es la creatina monohidrato?", ana)
+        FitMasterService.chat_query("¿Cuántas horas conviene dormir para recuperar?", ana)
+        FitMasterService.chat_query("¿Cuántas horas conviene dormir para recuperar?", luis)  # thread nuevo
+        FitMasterService.chat_query("¿Cómo mejoro la técnica de sentadilla?", luis)
+
+        stats = answer_cache.stats()
+        self.assertEqual((stats["hits"], stats["stored"]), (0, 2))
+        self.assertEqual(stats["skipped"], {"history": 2})
+
+    def test_embedding_lookup_is_governed_and_checked_against_the_quota(self):
+        self._start_stub(chat_reply=PROTEIN_REPLY)
+        answer_cache.embedder = OpenAIEmbedder()
+        answer_cache.clear()
+        ana, luis, _ = self.users
+        question = "¿Cuánta proteína debo comer al día?"
+
+        with mock.patch.object(openai_governor, "slot", wraps=openai_governor.slot) as slot:
+            FitMasterService.chat_query(question, ana)
+            FitMasterService.chat_query(question, luis)
+        # Dos embeddings y un turno, todos con hueco interactivo
+        self.assertEqual([call.args[0] for call in slot.call_args_list], [INTERACTIVE] * 3)
+        self.assertEqual(self.stub.config["calls"][EMBEDDINGS], 2)
+        self.assertEqual(self.stub.config["calls"][CHAT_COMPLETIONS], 1)
+
+        exhausted = QuotaExceededError(luis, "daily_tokens", 1_000, 1_000, date.today())
+        with mock.patch.object(llm_quota, "check", side_effect=exhausted):
+            reply = FitMasterService.chat_query(question, luis)
+        self.assertIn("límite diario", reply)
+        self.assertEqual(self.stub.config["calls"][EMBEDDINGS], 2)
+
+    def test_personal_turns_are_not_stored(self):
+        self._start_stub(agent_tool="get_user_history")
+        ana, luis, _ = self.users
+
+        FitMasterService.chat_query("¿Cómo ha ido mi progreso muscular?", ana)
+        FitMasterService.chat_query("¿Cómo ha ido mi progreso muscular?", luis)
+        FitMasterService.chat_query("¿Y la grasa?", ana)
+        FitMasterService.chat_query("Peso 80 kg, ¿cuánta proteína?", ana)
+
+        self.assertEqual(self.stub.config["calls"][CHAT_COMPLETIONS], 8)  # tool call + respuesta por pregunta
+        stats = answer_cache.stats()
+        self.assertEqual((stats["hits"], stats["stored"], stats["bypassed"]), (0, 0, 2))
+        self.assertEqual(stats["skipped"], {"tools": 2, "follow_up": 1, "query_numbers": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from app import create_app, db
+from app.models import BiometricAnalysis, User
+from app.services.assistant_tools import ToolRegistry, assistant_tools
+
+
+def tool_call(call_id, name, arguments=None):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(arguments or {})))
+
+
+class TestToolRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.registry = ToolRegistry(self.app)
+        self.calls = []
+
+        @self.registry.register("echo")
+        def echo(user_id, arguments):
+            self.calls.append(arguments)
+            return {"user_id": user_id, **arguments}
+
+        @self.registry.register("boom", memoize=False)
+        def boom(user_id, arguments):
+            raise ValueError("sin datos")
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_outputs_keep_call_order_and_ids(self):
+        outputs = self.registry.execute(7, [tool_call("a", "echo", {"x": 1}), tool_call("b", "nope")])
+        self.assertEqual([o["tool_call_id"] for o in outputs], ["a", "b"])
+        self.assertEqual(json.loads(outputs[0]["output"]), {"user_id": 7, "x": 1})
+        self.assertEqual(json.loads(outputs[1]["output"]), {"error": "Unknown function: nope"})
+
+    def test_duplicate_calls_in_a_turn_run_once(self):
+        outputs = self.registry.execute(7, [
+            tool_call("a", "echo", {"x": 1, "y": 2}),
+            tool_call("b", "echo", {"y": 2, "x": 1}),
+        ])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(outputs[0]["output"], outputs[1]["output"])
+
+    def test_results_are_memoized_per_user(self):
+        self.registry.call(7, "echo", {"x": 1})
+        self.registry.call(7, "echo", {"x": 1})
+        self.registry.call(8, "echo", {"x": 1})
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.registry.stats()["echo"]["cache_hits"], 1)
+
+    def test_errors_are_returned_and_counted(self):
+        output = json.loads(self.registry.call(7, "boom"))
+        self.assertEqual(output, {"error": "sin datos"})
+        self.assertEqual(self.registry.stats()["boom"]["errors"], 1)
+
+    def test_distinct_calls_run_in_parallel_with_app_context(self):
+        barrier = threading.Barrier(2, timeout=2)
+
+        @self.registry.register("wait", memoize=False)
+        def wait(user_id, arguments):
+            barrier.wait()  # solo pasa si las dos llamadas están en curso a la vez
+            from flask import current_app
+            return {"app": current_app.name, "n": arguments["n"]}
+
+        started = time.monotonic()
+        outputs = self.registry.execute(7, [tool_call("a", "wait", {"n": 1}), tool_call("b", "wait", {"n": 2})])
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual([json.loads(o["output"])["n"] for o in outputs], [1, 2])
+
+    def test_ttl_zero_disables_memoization(self):
+        self.registry.ttl = 0
+        self.registry.call(7, "echo")
+        self.registry.call(7, "echo")
+        self.assertEqual(len(self.calls), 2)
+
+
+class TestToolInvalidation(unittest.TestCase):
+    """Las tools reales con la BD: un commit del usuario invalida su resultado."""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.users = []
+        for name in ("ana", "luis"):
+            user = User(username=name, email=f"{name}@example.com")
+            user.password = "Secret123!"
+            db.session.add(user)
+            self.users.append(user)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _add_analysis(self, user, weight):
+        db.session.add(BiometricAnalysis(
+            user_id=user.id, weight=weight, height=170.0, age=30, gender="female",
+            neck=32.0, waist=72.0, hip=96.0, bmi=24.2,
+        ))
+        db.session.commit()
+
+    def _history(self, user):
+        return json.loads(assistant_tools.call(user.id, "get_user_history", {"limit": 1}))
+
+    def test_commit_invalidates_only_the_owner(self):
+        ana, luis = self.users
+        self.assertEqual(self._history(ana)["status"], "no_data")
+        self.assertEqual(self._history(luis)["status"], "no_data")
+
+        self._add_analysis(ana, 70.0)
+        self.assertEqual(self._history(ana)["data"][0]["weight"], 70.0)
+        self._history(luis)
+        self.assertEqual(assistant_tools.stats()["get_user_history"]["cache_hits"], 1)
+
+    def test_rollback_keeps_cached_results(self):
+        ana = self.users[0]
+        self._history(ana)
+        db.session.add(BiometricAnalysis(
+            user_id=ana.id, weight=80.0, height=170.0, age=30, gender="female",
+            neck=32.0, waist=72.0, hip=96.0, bmi=27.7,
+        ))
+        db.session.flush()
+        db.session.rollback()
+        self._history(ana)
+        self.assertEqual(assistant_tools.stats()["get_user_history"]["cache_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
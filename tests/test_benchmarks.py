@@ -0,0 +1,126 @@
+import io
+import unittest
+
+import boto3
+import requests
+from openai import OpenAI
+
+from app import create_app, db
+from app.models import BiometricAnalysis
+from benchmarks.dataset import BODY_FAT_RANGE, DatasetSpec, generate
+from benchmarks.report import ScenarioResult, compare, percentile
+from benchmarks.stubs import DEFAULT_CHAT_REPLY, StubServer, openai_stub, s3_stub, telegram_stub
+
+
+class TestReport(unittest.TestCase):
+
+    def test_percentile_interpolates(self):
+        values = [0.1, 0.2, 0.3, 0.4, 0.5]
+        self.assertAlmostEqual(percentile(values, 50), 0.3)
+        self.assertAlmostEqual(percentile(values, 95), 0.48)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_compare_flags_latency_and_throughput_regressions(self):
+        baseline = {"scenarios": {"history": {"p95_ms": 50.0, "throughput": 80.0, "errors": 0}}}
+
+        fast = ScenarioResult("history", wall_time=1.0, latencies=[0.04] * 80)
+        self.assertEqual(compare([fast], baseline), [])
+
+        slow = ScenarioResult("history", wall_time=2.0, latencies=[0.09] * 80, errors=["500"])
+        regressions = compare([slow], baseline)
+        self.assertEqual(len(regressions), 3)
+        self.assertIn("p95 90.0 ms", regressions[0])
+
+
+class TestStubs(unittest.TestCase):
+    """Los stubs hablan el protocolo que esperan los SDK reales."""
+
+    def test_openai_chat_and_assistant_stream(self):
+        with StubServer(openai_stub(tokens_per_second=0)) as server:
+            client = OpenAI(api_key="sk-test", base_url=f"{server.url}/v1")
+
+            completion = client.chat.completions.create(
+                model="gpt-4o-mini", messages=[{"role": "user", "content": "hola"}],
+            )
+            self.assertIn("interpretation", completion.choices[0].message.content)
+            self.assertGreater(completion.usage.total_tokens, 0)
+
+            thread = client.beta.threads.create()
+            text, run_id = "", None
+            with client.beta.threads.runs.stream(thread_id=thread.id, assistant_id="asst_test") as stream:
+                for event in stream:
+                    if event.event == "thread.message.delta":
+                        text += event.data.delta.content[0].text.value
+                    elif event.event == "thread.run.completed":
+                        run_id = event.data.id
+
+            self.assertEqual(text, DEFAULT_CHAT_REPLY)
+            run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run_id)
+            self.assertGreater(run.usage.completion_tokens, 0)
+
+    def test_s3_round_trip(self):
+        with StubServer(s3_stub()) as server:
+            s3 = boto3.client(
+                "s3", endpoint_url=server.url, region_name="eu-north-1",
+                aws_access_key_id="test", aws_secret_access_key="test",
+            )
+            s3.upload_fileobj(io.BytesIO(b"contenido"), "bucket", "blog/a.txt",
+                              ExtraArgs={"ContentType": "text/plain"})
+
+            self.assertEqual(s3.get_object(Bucket="bucket", Key="blog/a.txt")["Body"].read(), b"contenido")
+            listed = s3.list_objects_v2(Bucket="bucket", Prefix="blog/")
+            self.assertEqual([obj["Key"] for obj in listed["Contents"]], ["blog/a.txt"])
+
+    def test_telegram_counts_methods(self):
+        app = telegram_stub()
+        with StubServer(app) as server:
+            response = requests.post(f"{server.url}/bot123:abc/sendMessage", json={"chat_id": 7, "text": "hola"})
+
+        self.assertEqual(response.json()["result"]["chat"]["id"], 7)
+        self.assertEqual(app.config["calls"]["sendMessage"], 1)
+
+
+class TestDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _snapshot(self):
+        return [
+            (row.user_id, row.created_at, row.weight, row.waist, row.body_fat_percentage)
+            for row in BiometricAnalysis.query.order_by(BiometricAnalysis.id)
+        ]
+
+    def test_generates_plausible_deterministic_rows(self):
+        counts = generate(DatasetSpec(users=20, seed=7, posts=0))
+
+        self.assertEqual(counts["users"], 20)
+        self.assertEqual(counts["biometric_analyses"], BiometricAnalysis.query.count())
+        for analysis in BiometricAnalysis.query:
+            low, high = BODY_FAT_RANGE["h" if analysis.gender == "male" else "m"]
+            self.assertGreaterEqual(analysis.body_fat_percentage, low)
+            self.assertLessEqual(analysis.body_fat_percentage, high)
+
+        first = self._snapshot()
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        generate(DatasetSpec(users=20, seed=7, posts=0))
+        self.assertEqual([row[1:] for row in self._snapshot()], [row[1:] for row in first])
+
+    def test_refuses_to_generate_twice(self):
+        generate(DatasetSpec(users=1, posts=0))
+        with self.assertRaises(ValueError):
+            generate(DatasetSpec(users=1, posts=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
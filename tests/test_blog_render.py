@@ -0,0 +1,95 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from app import create_app, db
+from app.models import BlogPost, User
+from app.utils.markdown_utils import RENDERER_VERSION
+
+CONTENT = "## Introducción\n\nTexto con **negrita**.\n\n### Detalle\n\nMás texto."
+
+
+class TestBlogPreRender(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.admin = User(username="admin", email="admin@example.com", is_admin=True)
+        self.admin.password = "Secret123!"
+        db.session.add(self.admin)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _login(self):
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(self.admin.id)
+            session["_fresh"] = True
+
+    def _published_post(self, **kwargs):
+        post = BlogPost(
+            title="Post", slug="post", content=CONTENT, author_id=self.admin.id,
+            is_published=True, published_at=datetime.utcnow(), **kwargs
+        )
+        db.session.add(post)
+        db.session.commit()
+        return post
+
+    def test_admin_new_stores_rendered_content(self):
+        self._login()
+        response = self.client.post("/blog/admin/nuevo", data={
+            "title": "Guía de proteína",
+            "content": CONTENT,
+            "category": "nutricion",
+            "is_published": "y",
+        })
+        self.assertEqual(response.status_code, 302)
+
+        post = BlogPost.query.one()
+        self.assertIn('<h2 id="introduccion">Introducción</h2>', post.content_html)
+        self.assertIn('href="#detalle"', post.toc_html)
+        self.assertEqual(post.render_version, RENDERER_VERSION)
+        self.assertEqual(post.reading_time, 1)
+        self.assertTrue(post.excerpt)
+
+    def test_post_view_does_no_markdown_work(self):
+        post = self._published_post()
+        post.render_content()
+        db.session.commit()
+
+        with mock.patch("app.models.blog_post.render_post_content") as render:
+            response = self.client.get("/blog/post")
+
+        self.assertEqual(response.status_code, 200)
+        render.assert_not_called()
+        self.assertIn(b"<strong>negrita</strong>", response.data)
+
+    def test_stale_renderer_version_is_regenerated_lazily(self):
+        post = self._published_post(content_html="<p>viejo</p>", render_version="old")
+
+        response = self.client.get("/blog/post")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b"viejo", response.data)
+        self.assertEqual(db.session.get(BlogPost, post.id).render_version, RENDERER_VERSION)
+
+    def test_bulk_rerender_command(self):
+        self._published_post(content_html="<p>viejo</p>", render_version="old")
+
+        result = self.app.test_cli_runner().invoke(args=["blog-rerender"])
+
+        self.assertIn("Posts re-renderizados: 1", result.output)
+        post = BlogPost.query.one()
+        self.assertFalse(post.needs_render)
+        self.assertIn("<strong>negrita</strong>", post.content_html)
+
+
+if __name__ == "__main__":
+    unittest.main()
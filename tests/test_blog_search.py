@@ -0,0 +1,118 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models import BlogPost, User
+from app.services.blog_search import SQLiteSearchBackend, search_posts
+
+
+class TestBlogFullTextSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.author = User(username="autor", email="autor@example.com")
+        self.author.password = "Secret123!"
+        db.session.add(self.author)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _post(self, slug, title, content, published=True, **kwargs):
+        post = BlogPost(
+            title=title, slug=slug, content=content, author_id=self.author.id,
+            is_published=published, published_at=datetime.utcnow(), **kwargs
+        )
+        db.session.add(post)
+        db.session.commit()
+        return post
+
+    def test_title_matches_rank_above_body_matches(self):
+        self._post("cuerpo", "Rutina de piernas", "Añade proteína después de entrenar.")
+        self._post("titulo", "Guía de proteína", "Cuánto comer al día.")
+
+        results = search_posts("proteina")
+
+        self.assertEqual([hit.post.slug for hit in results.hits], ["titulo", "cuerpo"])
+        self.assertIn("<mark>proteína</mark>", results.hits[0].title_html)
+
+    def test_unpublished_and_edited_posts_stay_in_sync(self):
+        draft = self._post("borrador", "Creatina", "Texto", published=False)
+        self.assertEqual(search_posts("creatina").hits, [])
+
+        draft.is_published = True
+        db.session.commit()
+        self.assertEqual(len(search_posts("creatina").hits), 1)
+
+        draft.title = "Magnesio"
+        db.session.commit()
+        self.assertEqual(search_posts("creatina").hits, [])
+
+        db.session.delete(draft)
+        db.session.commit()
+        self.assertEqual(search_posts("magnesio").hits, [])
+
+    def test_index_failure_is_rolled_back_without_blocking_the_save(self):
+        self._post("previo", "Hidratación", "Agua")  # crea la tabla FTS
+
+        def failing_index(backend, connection, post_id):
+            connection.execute(
+                text("INSERT INTO blog_posts_fts (rowid, title, tags, excerpt, content) "
+                     "VALUES (:id, 'fantasma', '', '', '')"),
+                {"id": post_id},
+            )
+            raise RuntimeError("índice roto")
+
+        with mock.patch.object(SQLiteSearchBackend, "index", failing_index):
+            post = self._post("guardado", "Electrolitos", "Sodio y potasio")
+
+        self.assertIsNotNone(db.session.get(BlogPost, post.id))
+        self.assertEqual(search_posts("fantasma").hits, [])
+
+    def test_highlight_escapes_post_html(self):
+        self._post("xss", "<script>alert(1)</script> sentadilla", "Texto")
+
+        hit = search_posts("sentadilla").hits[0]
+
+        self.assertNotIn("<script>", hit.title_html)
+        self.assertIn("<mark>sentadilla</mark>", hit.title_html)
+
+    def test_keyset_pagination_without_count(self):
+        for i in range(3):
+            self._post(f"cardio-{i}", f"Cardio {i}", "Texto")
+
+        first = search_posts("cardio", per_page=2)
+        second = search_posts("cardio", cursor=first.next_cursor, per_page=2)
+
+        self.assertTrue(first.has_next)
+        self.assertEqual(len(first.hits), 2)
+        self.assertFalse(second.has_next)
+        self.assertEqual(len(second.hits), 1)
+        slugs = [hit.post.slug for hit in first.hits + second.hits]
+        self.assertEqual(sorted(slugs), ["cardio-0", "cardio-1", "cardio-2"])
+
+    def test_user_query_is_sanitized_for_fts(self):
+        self.assertEqual(SQLiteSearchBackend.build_match('dieta" OR *'), '"dieta"* "OR"*')
+        self.assertEqual(search_posts('"(').hits, [])
+
+    def test_search_page_renders(self):
+        self._post("hiit", "Entrenamiento HIIT", "Intervalos de alta intensidad.")
+
+        response = self.client.get("/blog/buscar?q=intervalos")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"<mark>Intervalos</mark>", response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from app import create_app, db
+from app.models import BlogPost, BlogPostDailyViews, User
+from app.services.view_counter import view_counter
+
+
+class TestWriteBehindViewCounter(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        author = User(username="autor", email="autor@example.com")
+        author.password = "Secret123!"
+        db.session.add(author)
+        db.session.commit()
+
+        self.posts = []
+        for slug in ("uno", "dos"):
+            post = BlogPost(
+                title=slug, slug=slug, content="Texto", author_id=author.id,
+                is_published=True, published_at=datetime.utcnow(), views_count=0,
+            )
+            post.render_content()
+            db.session.add(post)
+            self.posts.append(post)
+        db.session.commit()
+        self.post_ids = [p.id for p in self.posts]
+
+    def tearDown(self):
+        view_counter.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _views(self, post_id):
+        db.session.expire_all()
+        return db.session.get(BlogPost, post_id).views_count
+
+    def test_post_view_is_read_only(self):
+        with mock.patch.object(db.session, "commit") as commit:
+            response = self.client.get("/blog/uno")
+
+        self.assertEqual(response.status_code, 200)
+        commit.assert_not_called()
+        self.assertEqual(view_counter.pending(self.post_ids[0]), 1)
+        self.assertEqual(self._views(self.post_ids[0]), 0)
+
+    def test_flush_applies_all_increments_in_one_update(self):
+        for _ in range(3):
+            self.client.get("/blog/uno")
+        self.client.get("/blog/dos")
+
+        statements = []
+        engine = db.engine
+
+        def capture(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        from sqlalchemy import event
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            flushed = view_counter.flush()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        self.assertEqual(flushed, 4)
+        updates = [s for s in statements if s.startswith("UPDATE blog_posts")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self._views(self.post_ids[0]), 3)
+        self.assertEqual(self._views(self.post_ids[1]), 1)
+        self.assertEqual(view_counter.pending(self.post_ids[0]), 0)
+
+    def test_daily_views_accumulate_for_trending(self):
+        view_counter.record(self.post_ids[1], 5)
+        view_counter.flush()
+        view_counter.record(self.post_ids[1], 2)
+        view_counter.record(self.post_ids[0], 1)
+        view_counter.flush()
+
+        row = db.session.get(BlogPostDailyViews, (self.post_ids[1], datetime.utcnow().date()))
+        self.assertEqual(row.views, 7)
+        trending = BlogPostDailyViews.trending(days=1)
+        self.assertEqual([post.slug for post, _ in trending], ["dos", "uno"])
+
+    def test_failed_flush_keeps_increments(self):
+        view_counter.record(self.post_ids[0], 2)
+
+        with mock.patch.object(view_counter, "_write", side_effect=RuntimeError("db down")):
+            self.assertEqual(view_counter.flush(), 0)
+
+        self.assertEqual(view_counter.pending(self.post_ids[0]), 2)
+        view_counter.shutdown()
+        self.assertEqual(self._views(self.post_ids[0]), 2)
+
+    def test_exit_flush_is_off_in_tests(self):
+        view_counter.record(self.post_ids[0], 1)
+        with mock.patch.object(view_counter, "flush") as flush:
+            view_counter._at_exit()
+        flush.assert_not_called()
+
+    def test_views_of_deleted_posts_are_dropped(self):
+        view_counter.record(self.post_ids[0], 3)
+        view_counter.record(self.post_ids[1], 1)
+        db.session.delete(self.posts[0])
+        db.session.commit()
+
+        self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(view_counter.pending(self.post_ids[0]), 0)
+        self.assertIsNone(db.session.get(BlogPostDailyViews, (self.post_ids[0], datetime.utcnow().date())))
+        self.assertEqual(self._views(self.post_ids[1]), 1)
+
+        # Los volcados siguientes no arrastran el post borrado
+        view_counter.record(self.post_ids[1], 2)
+        self.assertEqual(view_counter.flush(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
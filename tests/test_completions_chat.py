@@ -0,0 +1,120 @@
+import json
+import unittest
+
+from openai import OpenAI
+
+from app import create_app, db
+from app.models import ConversationMessage, User, UserTelegramLink
+from app.services import fitmaster_service
+from app.services.completions_chat import completions_chat
+from app.services.fitmaster_service import FitMasterService
+from app.services.usage_recorder import usage_recorder
+from benchmarks.stubs import DEFAULT_CHAT_REPLY, StubServer, openai_stub
+
+CHAT_COMPLETIONS = "POST /v1/chat/completions"
+
+
+class TestCompletionsChat(unittest.TestCase):
+    """chat_query con el motor completions contra el stub de OpenAI."""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.users = []
+        for index, name in enumerate(("ana", "luis")):
+            user = User(username=name, email=f"{name}@example.com")
+            user.password = "Secret123!"
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(UserTelegramLink(user_id=user.id, telegram_user_id=str(40 + index)))
+            self.users.append(user)
+        db.session.commit()
+        self.user_id = self.users[0].id
+        completions_chat.completions_users = frozenset({self.user_id})
+        usage_recorder.clear()
+
+        self._client = fitmaster_service.client
+        self.server = None
+
+    def tearDown(self):
+        fitmaster_service.client = self._client
+        if self.server:
+            self.server.stop()
+        completions_chat.completions_users = frozenset()
+        usage_recorder.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _start_stub(self, **kwargs):
+        self.stub = openai_stub(**kwargs)
+        self.server = StubServer(self.stub).start()
+        fitmaster_service.client = OpenAI(api_key="sk-test", base_url=f"{self.server.url}/v1")
+
+    def _history(self, user_id):
+        return [(m.role, m.content) for m in ConversationMessage.query.filter_by(user_id=user_id).order_by(ConversationMessage.id)]
+
+    def test_engine_is_selected_per_user(self):
+        self.assertTrue(completions_chat.uses_completions(self.user_id))
+        self.assertFalse(completions_chat.uses_completions(self.users[1].id))
+
+    def test_turn_is_streamed_and_stored_without_threads(self):
+        self._start_stub()
+        chunks = []
+        reply = FitMasterService.chat_query("¿Cómo voy?", self.user_id, context={"weight": 70.0},
+                                            stream_callback=chunks.append)
+
+        self.assertEqual(reply, DEFAULT_CHAT_REPLY)
+        self.assertEqual("".join(chunks), DEFAULT_CHAT_REPLY)
+        self.assertEqual(self._history(self.user_id), [("user", "¿Cómo voy?"), ("assistant", DEFAULT_CHAT_REPLY)])
+        calls = self.stub.config["calls"]
+        self.assertEqual(calls[CHAT_COMPLETIONS], 1)
+        self.assertFalse(any("/threads" in endpoint for endpoint in calls))
+        self.assertEqual(usage_recorder.stats()["recorded"], 1)
+
+    def test_tool_calls_are_resolved_with_the_registry(self):
+        self._start_stub(agent_tool="get_user_history")
+        reply = FitMasterService.chat_query("¿Cómo ha ido mi progreso?", self.user_id)
+
+        self.assertEqual(reply, DEFAULT_CHAT_REPLY)
+        self.assertEqual(self.stub.config["calls"][CHAT_COMPLETIONS], 2)
+        self.assertEqual(usage_recorder.stats()["recorded"], 2)
+        self.assertEqual(len(self._history(self.user_id)), 2)  # solo pregunta y respuesta
+
+    def test_history_window_is_bounded(self):
+        for turn in range(15):
+            completions_chat.save_turn(self.user_id, f"pregunta {turn}", f"respuesta {turn}")
+        completions_chat.save_turn(self.users[1].id, "otra persona", "otra respuesta")
+
+        window = completions_chat.history(self.user_id)
+        self.assertEqual(len(window), completions_chat.history_messages)
+        self.assertEqual(window[0], {"role": "user", "content": "pregunta 5"})
+        self.assertEqual(window[-1], {"role": "assistant", "content": "respuesta 14"})
+
+        completions_chat.history_chars = 50
+        try:
+            window = completions_chat.history(self.user_id)
+        finally:
+            completions_chat.history_chars = 12_000
+        self.assertEqual([m["content"] for m in window], ["pregunta 13", "respuesta 13", "pregunta 14", "respuesta 14"])
+
+    def test_messages_carry_instructions_context_and_history(self):
+        completions_chat.save_turn(self.user_id, "hola", "¡Hola!")
+        messages = completions_chat.build_messages(self.user_id, "¿Y hoy?", {"weight": 70.0})
+        self.assertEqual([m["role"] for m in messages], ["system", "system", "user", "assistant", "user"])
+        self.assertIn("FitMaster", messages[0]["content"])
+        self.assertIn(json.dumps({"weight": 70.0}), messages[1]["content"])
+
+    def test_forget_clears_only_that_user(self):
+        completions_chat.save_turn(self.user_id, "hola", "¡Hola!")
+        completions_chat.save_turn(self.users[1].id, "hola", "¡Hola!")
+        completions_chat.forget(self.user_id)
+        db.session.commit()
+        self.assertEqual(self._history(self.user_id), [])
+        self.assertEqual(len(self._history(self.users[1].id)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from flask import session as flask_session
+from sqlalchemy.orm import Session
+
+from app import create_app, db
+from app.config import TestingConfig, config_by_name
+from app.models import BlogPost, User
+from app.services.db_router import db_router, use_primary
+
+
+class TestReadReplicaRouting(unittest.TestCase):
+    """Primaria y réplica son dos ficheros SQLite con datos distintos."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+        class ReplicaConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(self.tmpdir.name, 'primary.db')}"
+            SQLALCHEMY_REPLICA_URI = f"sqlite:///{os.path.join(self.tmpdir.name, 'replica.db')}"
+
+        with patch.dict(config_by_name, {"testing-replica": ReplicaConfig}):
+            self.app = create_app("testing-replica")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        replica = db.engines["replica"]
+        db.create_all()
+        db.metadata.create_all(bind=replica)
+
+        self._seed(Session(bind=db.engines[None]), "primaria")
+        self._seed(Session(bind=replica), "replica")
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.metadata.drop_all(bind=db.engines["replica"])
+        for engine in db.engines.values():
+            engine.dispose()
+        self.app_context.pop()
+        # Flask-SQLAlchemy registra un metadata por bind en el objeto global `db`
+        db.metadatas.pop("replica", None)
+        self.tmpdir.cleanup()
+
+    def _seed(self, session, name):
+        with session:
+            user = User(username="autor", email="autor@example.com")
+            user.password = "Secret123!"
+            session.add(user)
+            session.flush()
+            session.add(BlogPost(
+                title=f"Post {name}", slug=f"post-{name}", content="Texto", author_id=user.id,
+                is_published=True, published_at=datetime(2025, 1, 1),
+            ))
+            session.commit()
+
+    def _slugs(self, query=None):
+        # Columnas sueltas: el identity map no mezcla filas de ambas bases con el mismo id
+        query = query or db.session.query(BlogPost.slug)
+        return [slug for (slug,) in query.order_by(BlogPost.slug).all()]
+
+    def test_routes_by_request_method(self):
+        with self.app.test_request_context("/blog/", method="GET"):
+            self.assertEqual(self._slugs(), ["post-replica"])
+        db.session.remove()
+
+        with self.app.test_request_context("/blog/", method="POST"):
+            self.assertEqual(self._slugs(), ["post-primaria"])
+
+    def test_explicitly_marked_reads_outside_requests(self):
+        self.assertEqual(self._slugs(), ["post-primaria"])
+        marked = db.session.query(BlogPost.slug).execution_options(replica=True)
+        self.assertEqual(self._slugs(marked), ["post-replica"])
+
+        with db_router.replica():
+            self.assertEqual(self._slugs(), ["post-replica"])
+            with db_router.primary():
+                self.assertEqual(self._slugs(), ["post-primaria"])
+
+    def test_write_pins_request_and_browser_to_primary(self):
+        with self.app.test_request_context("/blog/", method="GET"):
+            self.app.preprocess_request()
+            self.assertEqual(self._slugs(), ["post-replica"])
+
+            post = BlogPost.query.filter_by(slug="post-replica").one()
+            db.session.add(BlogPost(
+                title="Nuevo", slug="nuevo", content="Texto", author_id=post.author_id, is_published=True,
+            ))
+            db.session.flush()
+
+            # La escritura fue a la primaria y las lecturas siguientes también
+            self.assertEqual(self._slugs(), ["nuevo", "post-primaria"])
+            self.assertGreater(flask_session["_db_primary_until"], time.time())
+            db.session.rollback()
+
+    def test_pinned_browser_reads_primary(self):
+        with self.client.session_transaction() as session:
+            session["_db_primary_until"] = time.time() + 60
+
+        response = self.client.get("/blog/")
+
+        self.assertIn(b"Post primaria", response.data)
+        self.assertNotIn(b"Post replica", response.data)
+
+    def test_read_only_page_is_served_from_replica(self):
+        response = self.client.get("/blog/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Post replica", response.data)
+        self.assertNotIn(b"Post primaria", response.data)
+
+    def test_use_primary_view(self):
+        @use_primary
+        def view():
+            return self._slugs()
+
+        with self.app.test_request_context("/", method="GET"):
+            self.assertEqual(view(), ["post-primaria"])
+
+
+class TestRoutingDisabledWithoutReplica(unittest.TestCase):
+
+    def test_everything_goes_to_primary(self):
+        app = create_app("testing")
+        with app.app_context(), app.test_request_context("/", method="GET"):
+            db.create_all()
+            self.assertFalse(db_router.enabled)
+            self.assertNotIn("replica", db.engines)
+            self.assertEqual(BlogPost.query.execution_options(replica=True).all(), [])
+            db.drop_all()
+
+
+if __name__ == "__main__":
+    unittest.main()
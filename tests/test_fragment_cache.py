@@ -0,0 +1,102 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from flask import render_template_string
+from markupsafe import Markup
+
+from app import create_app, db
+from app.models import BlogPost, User
+from app.services.fragment_cache import fragment_cache
+
+TEMPLATE = '{% cache "contador", key, tags=["BlogPost"] %}{{ render() }}{% endcache %}'
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.author = User(username="autor", email="autor@example.com")
+        self.author.password = "Secret123!"
+        db.session.add(self.author)
+        db.session.commit()
+
+        self.calls = 0
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _render(self, key="a"):
+        def render():
+            self.calls += 1
+            return Markup(f"<b>{self.calls}</b>")
+
+        with self.app.test_request_context():
+            return render_template_string(TEMPLATE, key=key, render=render)
+
+    def _post(self, slug):
+        post = BlogPost(
+            title=slug, slug=slug, content="Texto", author_id=self.author.id,
+            category="nutricion", is_published=True, published_at=datetime.utcnow(),
+        )
+        db.session.add(post)
+        db.session.commit()
+        return post
+
+    def test_fragment_is_cached_per_arguments(self):
+        self.assertEqual(self._render(), "<b>1</b>")
+        self.assertEqual(self._render(), "<b>1</b>")
+        self.assertEqual(self._render(key="b"), "<b>2</b>")
+
+        stats = fragment_cache.stats()["contador"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertEqual(stats["hit_rate"], 0.333)
+
+    def test_commit_invalidates_tagged_fragments(self):
+        self._render()
+        self._post("nuevo")
+
+        self.assertEqual(self._render(), "<b>2</b>")
+
+    def test_rollback_and_other_models_do_not_invalidate(self):
+        self._render()
+
+        db.session.add(BlogPost(title="x", slug="x", content="x", author_id=self.author.id))
+        db.session.flush()
+        db.session.rollback()
+        other = User(username="otro", email="otro@example.com")
+        other.password = "Secret123!"
+        db.session.add(other)
+        db.session.commit()
+
+        self.assertEqual(self._render(), "<b>1</b>")
+
+    def test_backend_failure_renders_uncached(self):
+        with mock.patch.object(fragment_cache.backend, "get_many", side_effect=ConnectionError):
+            self.assertEqual(self._render(), "<b>1</b>")
+            self.assertEqual(self._render(), "<b>2</b>")
+
+    def test_blog_sidebar_queries_run_once(self):
+        self._post("proteina")
+
+        with mock.patch(
+            "app.blueprints.blog.routes.categories_with_counts", return_value=[("nutricion", 1)]
+        ) as categories:
+            first = self.client.get("/blog/")
+            second = self.client.get("/blog/?page=2")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(categories.call_count, 1)
+        self.assertIn(b"Nutricion", second.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import unittest
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app, db
+from app.models import BiometricAnalysis, User
+from app.models.biometric_analysis import SERIALIZED_FIELDS
+from app.utils.json_provider import FastJSONProvider, orjson
+from app.utils.serialization import compile_serializer, isoformat
+
+PAYLOAD = {
+    "b": 1,
+    "a": [1.5, None, True, "ñandú"],
+    "fecha": datetime(2025, 1, 2, 3, 4, 5),
+    "dia": date(2025, 1, 2),
+    "importe": Decimal("9.95"),
+}
+
+
+class TestFastJSONProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.stdlib = DefaultJSONProvider(self.app)
+
+    def test_output_matches_flask_default(self):
+        for backend in ("auto", "stdlib"):
+            provider = FastJSONProvider(self.app, backend=backend)
+            self.assertEqual(json.loads(provider.dumps(PAYLOAD)), json.loads(self.stdlib.dumps(PAYLOAD)))
+            self.assertEqual(provider.loads('{"x": [1, 2]}'), {"x": [1, 2]})
+
+    def test_response_is_sorted_json_with_newline(self):
+        provider = FastJSONProvider(self.app)
+        with self.app.app_context():
+            response = provider.response({"b": 1, "a": 2})
+        self.assertEqual(response.mimetype, "application/json")
+        body = response.get_data(as_text=True)
+        self.assertTrue(body.endswith("\n"))
+        self.assertLess(body.index('"a"'), body.index('"b"'))
+
+    @unittest.skipIf(orjson is None, "orjson no instalado")
+    def test_falls_back_to_stdlib_for_unsupported_values(self):
+        provider = FastJSONProvider(self.app, backend="orjson")
+        self.assertEqual(json.loads(provider.dumps({"n": 2**70})), {"n": 2**70})
+
+    def test_rejects_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            FastJSONProvider(self.app, backend="simplejson")
+
+    def test_app_uses_configured_provider(self):
+        self.assertIsInstance(self.app.json, FastJSONProvider)
+
+
+class TestCompiledSerializer(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username="ana", email="ana@example.com")
+        user.password = "Secret123!"
+        db.session.add(user)
+        db.session.commit()
+        self.analysis = BiometricAnalysis(
+            user_id=user.id, weight=70.0, height=170.0, age=30, gender="female",
+            neck=32.0, waist=72.0, hip=96.0, bmi=24.2, fitmaster_data={"interpretation": "ok"},
+        )
+        db.session.add(self.analysis)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_expired_instance_is_reloaded(self):
+        # Tras el commit la instancia está expirada: __dict__ no tiene las columnas
+        data = self.analysis.to_dict()
+        self.assertEqual(tuple(data)[:len(SERIALIZED_FIELDS)], SERIALIZED_FIELDS)
+        self.assertEqual(data["weight"], 70.0)
+        self.assertEqual(data["created_at"], self.analysis.created_at.isoformat())
+        self.assertEqual(data["fitmaster_data"], {"interpretation": "ok"})
+        self.assertNotIn("fitmaster_data", self.analysis.to_dict(include_fitmaster=False))
+
+    def test_none_values_skip_converters(self):
+        serialize = compile_serializer(("id", "created_at"), converters={"created_at": isoformat})
+        self.assertEqual(serialize(BiometricAnalysis()), {"id": None, "created_at": None})
+
+    def test_history_endpoint_serializes_analyses(self):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(self.analysis.user_id)
+            session["_fresh"] = True
+        response = client.get("/api/v1/history")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["data"][0]["hip"], 96.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
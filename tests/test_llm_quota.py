@@ -0,0 +1,184 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from openai import OpenAI
+
+from app import create_app, db
+from app.models import BiometricAnalysis, LLMUsageLedger, Role, User, UserLLMQuota, UserTelegramLink
+from app.services import fitmaster_service
+from app.services.biometric_service import add_fitmaster_analysis
+from app.services.fitmaster_service import FitMasterService
+from app.services.llm_quota import QuotaExceededError, llm_quota
+from app.services.usage_recorder import usage_recorder
+from benchmarks.stubs import StubServer, openai_stub
+
+PLANS = {
+    "default": {"daily_tokens": 1_000, "monthly_tokens": 5_000, "daily_cost_usd": 1.0},
+    "pro": {"daily_tokens": 50_000},
+}
+
+
+def usage(tokens):
+    return {"prompt_tokens": tokens, "completion_tokens": 0, "total_tokens": tokens}
+
+
+class TestLLMQuota(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["LLM_QUOTA_PLANS"] = PLANS
+        llm_quota.init_app(self.app)
+        usage_recorder.clear()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = self._user("ana")
+        self.admin = self._user("admin", is_admin=True)
+        db.session.commit()
+
+    def tearDown(self):
+        llm_quota.init_app(create_app("testing"))
+        usage_recorder.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _user(self, name, **kwargs):
+        user = User(username=name, email=f"{name}@example.com", **kwargs)
+        user.password = "Secret123!"
+        db.session.add(user)
+        db.session.flush()
+        return user
+
+    def _ledger(self, user, tokens, created_at, cost=0.0):
+        db.session.add(LLMUsageLedger(user_id=user.id, model_name="gpt-4o-mini", total_tokens=tokens,
+                                      cost_usd=cost, created_at=created_at))
+        db.session.commit()
+
+    def test_plan_resolution(self):
+        self.assertEqual(llm_quota.status(self.user.id)["plan"], "default")
+        self.assertEqual(llm_quota.status(self.admin.id)["limits"]["daily_tokens"], None)
+
+        self.user.role = Role(name="pro")
+        db.session.commit()
+        status = llm_quota.status(self.user.id)
+        self.assertEqual((status["plan"], status["limits"]["daily_tokens"]), ("pro", 50_000))
+
+        db.session.add(UserLLMQuota(user_id=self.user.id, plan="default", monthly_tokens=9_000))
+        db.session.commit()
+        limits = llm_quota.status(self.user.id)["limits"]
+        self.assertEqual((limits["daily_tokens"], limits["monthly_tokens"]), (1_000, 9_000))
+
+    def test_checks_use_memory_counters_until_the_budget_runs_out(self):
+        llm_quota.check(self.user.id)  # primer recálculo desde el ledger
+        with mock.patch.object(db.session, "execute", side_effect=AssertionError("consulta al ledger")):
+            llm_quota.check(self.user.id)
+            FitMasterService._record_usage(self.user.id, "gpt-4o-mini", usage(600))
+            llm_quota.check(self.user.id)
+            FitMasterService._record_usage(self.user.id, "gpt-4o-mini", usage(400))
+            with self.assertRaises(QuotaExceededError) as raised:
+                llm_quota.check(self.user.id)
+        self.assertEqual(raised.exception.limit_key, "daily_tokens")
+        self.assertIn("límite diario", str(raised.exception))
+        self.assertEqual(llm_quota.stats()["rejected"], 1)
+
+    def test_reconciliation_reads_the_ledger_and_pending_rows(self):
+        now = datetime.utcnow()
+        self._ledger(self.user, 4_000, now.replace(day=1, hour=0) if now.day > 1 else now)
+        self._ledger(self.user, 9_999, now - timedelta(days=40))  # otro mes
+        usage_recorder.record(self.user.id, "gpt-4o-mini", usage(300))  # aún en el buffer
+
+        status = llm_quota.status(self.user.id)
+        self.assertEqual(status["used"]["monthly_tokens"], 4_300)
+        self.assertEqual(status["remaining"]["monthly_tokens"], 700)
+        self.assertEqual(usage_recorder.pending(), 0)
+
+        # Consumo de otro worker: se ve al recalcular, no antes
+        llm_quota.check(self.user.id)
+        self._ledger(self.user, 1_000, now)
+        llm_quota.check(self.user.id)
+        llm_quota.invalidate(self.user.id)
+        with self.assertRaises(QuotaExceededError):
+            llm_quota.check(self.user.id)
+
+    def test_usage_flushed_by_the_reconciliation_is_counted_once(self):
+        flush = usage_recorder.flush
+
+        def concurrent_flush():
+            # Otro hilo registra consumo justo antes de que se vuelque el buffer
+            FitMasterService._record_usage(self.user.id, "gpt-4o-mini", usage(300))
+            return flush()
+
+        with mock.patch.object(usage_recorder, "flush", side_effect=concurrent_flush):
+            status = llm_quota.status(self.user.id)
+        self.assertEqual(status["used"]["daily_tokens"], 300)
+
+    def test_failed_reconciliation_leaves_the_session_usable(self):
+        with mock.patch.object(db.session, "execute", side_effect=RuntimeError("BD caída")), \
+                mock.patch.object(db.session, "rollback", wraps=db.session.rollback) as rollback:
+            llm_quota.check(self.user.id)
+        rollback.assert_called_once()
+        self.assertEqual(llm_quota.stats()["failed_reconciliations"], 1)
+
+    def test_monthly_budget_reports_its_reset_date(self):
+        db.session.add(UserLLMQuota(user_id=self.user.id, daily_tokens=None, monthly_tokens=10))
+        db.session.commit()
+        FitMasterService._record_usage(self.user.id, "gpt-4o-mini", usage(10))
+        with self.assertRaises(QuotaExceededError) as raised:
+            llm_quota.check(self.user.id)
+        self.assertEqual(raised.exception.limit_key, "monthly_tokens")
+        self.assertEqual(raised.exception.resets_on.day, 1)
+
+    def test_disabled_quotas_never_reject(self):
+        llm_quota.enabled = False
+        self._ledger(self.user, 1_000_000, datetime.utcnow())
+        llm_quota.check(self.user.id)
+
+    def test_over_budget_requests_never_reach_openai(self):
+        db.session.add(UserTelegramLink(user_id=self.user.id, telegram_user_id="90"))
+        analysis = BiometricAnalysis(user_id=self.user.id, weight=60.0, height=170.0, age=30, gender="female",
+                                     neck=32.0, waist=72.0, fitmaster_data={"interpretation": "Vas bien."})
+        db.session.add(analysis)
+        db.session.commit()
+        self._ledger(self.user, 2_000, datetime.utcnow())
+
+        stub = openai_stub()
+        with StubServer(stub) as server:
+            previous = fitmaster_service.client
+            fitmaster_service.client = OpenAI(api_key="sk-test", base_url=f"{server.url}/v1")
+            try:
+                reply = FitMasterService.chat_query("¿Cómo voy?", self.user.id)
+                error = add_fitmaster_analysis(analysis.id, {"user_id": self.user.id})
+            finally:
+                fitmaster_service.client = previous
+
+        self.assertIn("límite diario", reply)
+        self.assertIn("límite diario", error)
+        self.assertEqual(sum(stub.config["calls"].values()), 0)
+        self.assertEqual(db.session.get(BiometricAnalysis, analysis.id).fitmaster_data["interpretation"], "Vas bien.")
+
+    def test_admin_sees_and_sets_the_budget(self):
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(self.admin.id)
+            session["_fresh"] = True
+        self._ledger(self.user, 250, datetime.utcnow(), cost=0.1)
+
+        status = self.client.get(f"/admin/users/{self.user.id}/llm-quota").get_json()
+        self.assertEqual(status["remaining"]["daily_tokens"], 750)
+        self.assertEqual(status["remaining"]["monthly_cost_usd"], None)
+
+        response = self.client.post(f"/admin/users/{self.user.id}/llm-quota",
+                                    json={"plan": "pro", "monthly_cost_usd": "2.5"})
+        status = response.get_json()
+        self.assertEqual((status["plan"], status["limits"]["daily_tokens"]), ("pro", 50_000))
+        self.assertEqual(status["remaining"]["monthly_cost_usd"], 2.4)
+
+        response = self.client.post(f"/admin/users/{self.user.id}/llm-quota", json={"plan": "gratis"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app import create_app, db
+from app.models import BiometricAnalysis, BlogPost, MediaFile, User
+from app.services.media_gc_service import MediaGarbageCollector, url_to_key
+from app.services.storage_service import StorageService
+
+BUCKET_URL = "https://bucket.s3.eu-north-1.amazonaws.com"
+
+
+class LocalS3StandIn:
+    """Cliente S3 en memoria con paginación y delete_objects como el real."""
+
+    def __init__(self, page_size=2):
+        self.objects = {}
+        self.page_size = page_size
+        self.delete_calls = []
+
+    def put(self, key, age=timedelta(days=7), size=10):
+        self.objects[key] = {
+            "Key": key,
+            "Size": size,
+            "LastModified": datetime.now(timezone.utc) - age,
+        }
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + self.page_size]
+        truncated = start + self.page_size < len(keys)
+        response = {"Contents": [self.objects[k] for k in page], "IsTruncated": truncated}
+        if truncated:
+            response["NextContinuationToken"] = str(start + self.page_size)
+        return response
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        self.delete_calls.append(keys)
+        for key in keys:
+            self.objects.pop(key, None)
+        return {}
+
+
+class TestMediaGarbageCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(username="gc", email="gc@example.com")
+        self.user.password = "Secret123!"
+        db.session.add(self.user)
+        db.session.commit()
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.s3 = LocalS3StandIn()
+        self.storage = StorageService()
+        self.storage.use_s3 = True
+        self.storage.s3_client = self.s3
+        self.storage.s3_bucket = "bucket"
+        self.storage.upload_folder = self.tmpdir.name
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.tmpdir.cleanup()
+
+    def _seed_references(self):
+        db.session.add(MediaFile(
+            filename="kept.webp", file_path="blog/kept.webp",
+            file_url=f"{BUCKET_URL}/blog/kept.webp", file_type="image",
+            uploaded_by=self.user.id,
+        ))
+        db.session.add(BiometricAnalysis(
+            user_id=self.user.id, weight=80, height=180, age=30, gender="male",
+            neck=38, waist=85, front_photo_url=f"{BUCKET_URL}/biometric_photos/front.jpg",
+        ))
+        db.session.add(BlogPost(
+            title="Post", slug="post", author_id=self.user.id,
+            content=f"Mira este vídeo ![video:demo]({BUCKET_URL}/media/demo.mp4)",
+        ))
+        db.session.commit()
+
+    def test_url_to_key(self):
+        self.assertEqual(url_to_key(f"{BUCKET_URL}/blog/a%20b.webp"), "blog/a b.webp")
+        self.assertEqual(url_to_key("https://cdn.example.com/media/x.mp4"), "media/x.mp4")
+        self.assertIsNone(url_to_key(None))
+
+    def test_dry_run_reports_without_deleting(self):
+        self._seed_references()
+        for key in ("blog/kept.webp", "biometric_photos/front.jpg", "media/demo.mp4",
+                    "blog/orphan.webp", "biometric_photos/orphan.jpg"):
+            self.s3.put(key)
+
+        report = MediaGarbageCollector(self.storage).run(dry_run=True, storages=("s3",))
+
+        self.assertEqual(
+            sorted(report["s3"]["orphans"]), ["biometric_photos/orphan.jpg", "blog/orphan.webp"]
+        )
+        self.assertEqual(self.s3.delete_calls, [])
+        self.assertEqual(len(self.s3.objects), 5)
+
+    def test_grace_period_protects_recent_uploads(self):
+        self.s3.put("media/just_uploaded.mp4", age=timedelta(minutes=5))
+        self.s3.put("media/old.mp4", age=timedelta(days=3))
+
+        gc = MediaGarbageCollector(self.storage, grace_period=timedelta(hours=1))
+        report = gc.run(dry_run=False, storages=("s3",))
+
+        self.assertEqual(report["s3"]["deleted"], ["media/old.mp4"])
+        self.assertIn("media/just_uploaded.mp4", self.s3.objects)
+
+    def test_deletes_in_batches_of_1000(self):
+        self.s3.page_size = 500
+        for i in range(2500):
+            self.s3.put(f"blog/orphan_{i:04d}.webp")
+
+        report = MediaGarbageCollector(self.storage).run(dry_run=False, storages=("s3",))
+
+        self.assertEqual(len(report["s3"]["deleted"]), 2500)
+        self.assertEqual([len(call) for call in self.s3.delete_calls], [1000, 1000, 500])
+        self.assertEqual(self.s3.objects, {})
+
+    def test_local_orphans(self):
+        images = os.path.join(self.tmpdir.name, "images")
+        os.makedirs(images)
+        kept = os.path.join(images, "kept.webp")
+        orphan = os.path.join(images, "orphan.webp")
+        old = time.time() - 3 * 86400
+        for path in (kept, orphan):
+            with open(path, "wb") as f:
+                f.write(b"x")
+            os.utime(path, (old, old))
+        db.session.add(BlogPost(
+            title="Local", slug="local", author_id=self.user.id,
+            content="![img](/uploads/images/kept.webp)",
+        ))
+        db.session.commit()
+
+        report = MediaGarbageCollector(self.storage).run(dry_run=False, storages=("local",))
+
+        self.assertEqual(report["local"]["deleted"], [orphan])
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(orphan))
+
+
+if __name__ == "__main__":
+    unittest.main()
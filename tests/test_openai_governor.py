@@ -0,0 +1,132 @@
+import threading
+import time
+import unittest
+
+from app.services.openai_governor import (
+    BACKGROUND,
+    INTERACTIVE,
+    OpenAIBusyError,
+    OpenAIGovernor,
+    TokenBucket,
+)
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_wait_time_and_refill(self):
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+        now = bucket.updated
+        self.assertEqual(bucket.wait_time(2, now), 0.0)
+        bucket.take(2)
+        self.assertAlmostEqual(bucket.wait_time(1, now), 1.0)
+        self.assertEqual(bucket.wait_time(1, now + 1.0), 0.0)
+
+    def test_oversized_request_waits_for_full_bucket(self):
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+        self.assertEqual(bucket.wait_time(50, bucket.updated), 0.0)
+
+
+class TestOpenAIGovernor(unittest.TestCase):
+
+    def setUp(self):
+        self.governor = OpenAIGovernor()
+        self.governor.configure(rpm=6000, tpm=1_000_000, max_in_flight=1)
+        self.order = []
+
+    def _queue_in_background(self, priority, key, label):
+        """Lanza un hilo que pide hueco y espera a que esté en la cola."""
+        queued = len(self.governor._queue)
+
+        def worker():
+            with self.governor.slot(priority, key=key, timeout=5):
+                self.order.append(label)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        while len(self.governor._queue) == queued:
+            time.sleep(0.001)
+        return thread
+
+    def _run_queued(self, entries):
+        threads = []
+        with self.governor.slot(BACKGROUND):
+            for priority, key, label in entries:
+                threads.append(self._queue_in_background(priority, key, label))
+        for thread in threads:
+            thread.join()
+
+    def test_interactive_goes_before_background(self):
+        self._run_queued([
+            (BACKGROUND, 1, "analysis-1"),
+            (BACKGROUND, 2, "analysis-2"),
+            (INTERACTIVE, 3, "telegram"),
+        ])
+        self.assertEqual(self.order, ["telegram", "analysis-1", "analysis-2"])
+
+    def test_keys_take_turns_within_a_class(self):
+        self._run_queued([
+            (BACKGROUND, "a", "a1"),
+            (BACKGROUND, "a", "a2"),
+            (BACKGROUND, "a", "a3"),
+            (BACKGROUND, "b", "b1"),
+        ])
+        self.assertEqual(self.order, ["a1", "b1", "a2", "a3"])
+
+    def test_deadline_rejects_and_is_counted(self):
+        with self.governor.slot(BACKGROUND):
+            with self.assertRaises(OpenAIBusyError) as ctx:
+                with self.governor.slot(INTERACTIVE, timeout=0.05):
+                    pass
+        self.assertEqual(ctx.exception.reason, "deadline")
+
+        stats = self.governor.stats()
+        self.assertEqual(stats["priorities"][INTERACTIVE]["rejected"], {"deadline": 1})
+        self.assertEqual(stats["priorities"][BACKGROUND]["admitted"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["queued"], 0)
+
+    def test_rejects_early_when_rate_cannot_recover_in_time(self):
+        self.governor.configure(rpm=6, tpm=1_000_000, burst_seconds=10)
+        with self.governor.slot(BACKGROUND):
+            pass
+        started = time.monotonic()
+        with self.assertRaises(OpenAIBusyError):
+            with self.governor.slot(BACKGROUND, timeout=2):
+                pass
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_queue_full(self):
+        self.governor.configure(max_in_flight=1, max_queue=0)
+        with self.assertRaises(OpenAIBusyError) as ctx:
+            with self.governor.slot(BACKGROUND):
+                pass
+        self.assertEqual(ctx.exception.reason, "queue_full")
+
+    def test_settle_returns_unused_estimate(self):
+        self.governor.configure(rpm=6000, tpm=6000, burst_seconds=60)
+        with self.governor.slot(BACKGROUND, tokens=5000):
+            self.governor.settle(1000)
+        self.assertGreaterEqual(self.governor.stats()["tokens_available"], 5000)
+
+    def test_settle_charges_every_call_of_the_slot(self):
+        self.governor.configure(rpm=6000, tpm=60_000, burst_seconds=60)
+        with self.governor.slot(BACKGROUND, tokens=1000):
+            self.governor.settle(300)
+            self.governor.settle(5000)  # segunda ronda de tools, mayor que lo estimado
+        # 60.000 - 5.300 (más lo recargado mientras tanto, que es despreciable)
+        self.assertLess(self.governor.stats()["tokens_available"], 54_800)
+
+    def test_settle_outside_a_slot_is_ignored(self):
+        available = self.governor.stats()["tokens_available"]
+        self.governor.settle(10_000)
+        self.assertEqual(self.governor.stats()["tokens_available"], available)
+
+    def test_disabled_governor_does_not_queue(self):
+        self.governor.configure(max_in_flight=0, enabled=False)
+        with self.governor.slot(INTERACTIVE):
+            pass
+        self.assertEqual(self.governor.stats()["priorities"][INTERACTIVE]["admitted"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+import time
+import unittest
+from datetime import datetime
+
+import httpx
+from openai import BadRequestError, InternalServerError, OpenAI
+
+from app import create_app, db
+from app.models import BiometricAnalysis, User, UserTelegramLink
+from app.services import fitmaster_service
+from app.services.fitmaster_service import FALLBACK_MODEL_VERSION, FitMasterService
+from app.services.openai_resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    hedged,
+    openai_breaker,
+)
+from app.services.usage_recorder import usage_recorder
+from benchmarks.stubs import StubServer, openai_stub
+
+CHAT_COMPLETIONS = "POST /v1/chat/completions"
+
+
+def api_error(cls, status):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return cls("error", response=httpx.Response(status, request=request), body=None)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker("test")
+        self.breaker.configure(failure_threshold=2, reset_timeout=0.05)
+
+    def _fail(self, exc):
+        with self.assertRaises(type(exc)):
+            with self.breaker.guard():
+                raise exc
+
+    def test_opens_after_consecutive_failures_and_short_circuits(self):
+        self._fail(TimeoutError("lento"))
+        self.assertEqual(self.breaker.state, CLOSED)
+        self._fail(api_error(InternalServerError, 503))
+        self.assertEqual(self.breaker.state, OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            with self.breaker.guard():
+                self.fail("no debería llamar a OpenAI con el circuito abierto")
+        stats = self.breaker.stats()
+        self.assertEqual((stats["trips"], stats["short_circuited"]), (1, 1))
+
+    def test_success_resets_the_failure_count(self):
+        self._fail(TimeoutError())
+        with self.breaker.guard():
+            pass
+        self._fail(TimeoutError())
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_client_errors_do_not_count(self):
+        for _ in range(3):
+            self._fail(api_error(BadRequestError, 400))
+            self._fail(ValueError("fallo propio"))
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.stats()["consecutive_failures"], 0)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        self._fail(TimeoutError())
+        self._fail(TimeoutError())
+        time.sleep(0.06)
+
+        self._fail(TimeoutError())  # la prueba falla: vuelve a abrirse
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.stats()["trips"], 2)
+
+        time.sleep(0.06)
+        with self.breaker.guard():
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            with self.assertRaises(CircuitOpenError):  # solo una prueba a la vez
+                with self.breaker.guard():
+                    pass
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+class TestHedged(unittest.TestCase):
+
+    def test_second_attempt_wins_when_first_is_slow(self):
+        attempts = []
+
+        def call(timeout):
+            attempts.append(timeout)
+            if len(attempts) == 1:
+                time.sleep(0.5)
+                return "lento"
+            return "rápido"
+
+        started = time.monotonic()
+        self.assertEqual(hedged(call, deadline=2, hedge_after=0.05), "rápido")
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(len(attempts), 2)
+        self.assertLess(attempts[1], 2)  # el segundo intento tiene el plazo restante
+
+    def test_losing_attempt_is_discarded(self):
+        attempts, discarded = [], []
+
+        def call(timeout):
+            attempts.append(timeout)
+            if len(attempts) == 1:
+                time.sleep(0.2)
+                return "lento"
+            return "rápido"
+
+        self.assertEqual(hedged(call, deadline=2, hedge_after=0.05, discard=discarded.append), "rápido")
+        for _ in range(50):
+            if discarded:
+                break
+            time.sleep(0.01)
+        self.assertEqual(discarded, ["lento"])
+
+    def test_fast_upstream_failure_is_retried(self):
+        attempts = []
+
+        def call(timeout):
+            attempts.append(timeout)
+            if len(attempts) == 1:
+                raise api_error(InternalServerError, 500)
+            return "ok"
+
+        self.assertEqual(hedged(call, deadline=2, hedge_after=1), "ok")
+
+    def test_client_errors_are_not_retried(self):
+        attempts = []
+
+        def call(timeout):
+            attempts.append(timeout)
+            raise api_error(BadRequestError, 400)
+
+        with self.assertRaises(BadRequestError):
+            hedged(call, deadline=2, hedge_after=0.01)
+        self.assertEqual(len(attempts), 1)
+
+    def test_deadline_bounds_the_whole_call(self):
+        with self.assertRaises(TimeoutError):
+            hedged(lambda timeout: time.sleep(0.5), deadline=0.1, hedge_after=0.02)
+
+
+class TestFitMasterDegradedMode(unittest.TestCase):
+    """analyze_bio_results y chat_query con OpenAI caído (stub respondiendo 503)."""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        openai_breaker.configure(failure_threshold=2, reset_timeout=60)
+        usage_recorder.clear()
+
+        self.user = User(username="ana", email="ana@example.com")
+        self.user.password = "Secret123!"
+        db.session.add(self.user)
+        db.session.flush()
+        db.session.add(UserTelegramLink(user_id=self.user.id, telegram_user_id="70"))
+        for day, data in ((1, {"interpretation": "Vas muy bien, sigue así.", "model_version": "fitmaster-v1.0"}),
+                          (2, {"interpretation": "No se pudo conectar con FitMaster AI. Error",
+                               "model_version": FALLBACK_MODEL_VERSION})):
+            db.session.add(BiometricAnalysis(
+                user_id=self.user.id, weight=60.0, height=170.0, age=30, gender="female",
+                neck=32.0, waist=72.0, hip=96.0, bmi=20.8, fitmaster_data=data,
+                created_at=datetime(2026, 1, day),
+            ))
+        db.session.commit()
+
+        self.stub = openai_stub()
+        self.server = StubServer(self.stub).start()
+        self._client = fitmaster_service.client
+        fitmaster_service.client = OpenAI(api_key="sk-test", base_url=f"{self.server.url}/v1", max_retries=0)
+
+    def tearDown(self):
+        fitmaster_service.client = self._client
+        self.server.stop()
+        openai_breaker.init_app(self.app)
+        usage_recorder.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _payload(self):
+        return {"user_id": self.user.id, "gender": "female", "age": 30, "bmi": 20.8, "waist_height_ratio": 0.42}
+
+    def test_breaker_opens_and_analysis_falls_back_without_calling_openai(self):
+        self.stub.config["fail_next"] = 100
+        for _ in range(3):
+            result = FitMasterService.analyze_bio_results(self._payload())
+
+        self.assertEqual(self.stub.config["calls"][CHAT_COMPLETIONS], 2)  # la tercera no llega a OpenAI
+        self.assertEqual(openai_breaker.stats()["state"], OPEN)
+        self.assertEqual(openai_breaker.stats()["short_circuited"], 1)
+        self.assertEqual(result["model_version"], FALLBACK_MODEL_VERSION)
+        self.assertIn("Vas muy bien, sigue así.", result["interpretation"])  # la última interpretación real
+        self.assertIn("IMC", result["interpretation"])  # interpretaciones locales del payload
+        self.assertNotIn("No se pudo conectar", result["interpretation"])
+
+    def test_analysis_recovers_once_openai_answers(self):
+        self.stub.config["fail_next"] = 1
+        self.assertEqual(FitMasterService.analyze_bio_results(self._payload())["model_version"], FALLBACK_MODEL_VERSION)
+        result = FitMasterService.analyze_bio_results(self._payload())
+        self.assertNotIn("model_version", result)
+        self.assertEqual(openai_breaker.stats()["consecutive_failures"], 0)
+
+    def test_chat_gets_cached_interpretation_while_open(self):
+        for _ in range(2):
+            openai_breaker.record_failure(TimeoutError())
+
+        reply = FitMasterService.chat_query("¿Cómo voy?", self.user.id)
+        self.assertIn("Vas muy bien, sigue así.", reply)
+        self.assertIn("01/01/2026", reply)
+        self.assertEqual(sum(self.stub.config["calls"].values()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from app import create_app, db
+from app.models import BlogPost, User
+from app.services.page_cache import page_cache
+from app.services.view_counter import view_counter
+
+
+class TestPublicPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.author = User(username="autor", email="autor@example.com")
+        self.author.password = "Secret123!"
+        db.session.add(self.author)
+        db.session.commit()
+
+        self.post = self._post("fuerza", "Entrenamiento de fuerza")
+
+    def tearDown(self):
+        view_counter.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _post(self, slug, title):
+        post = BlogPost(
+            title=title, slug=slug, content="Texto", author_id=self.author.id,
+            category="entrenamiento", is_published=True, published_at=datetime.utcnow(),
+        )
+        post.render_content()
+        db.session.add(post)
+        db.session.commit()
+        return post
+
+    def test_public_pages_send_validators(self):
+        for url in ("/", "/blog/", "/blog/fuerza", "/sitemap.xml"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertTrue(response.headers.get("ETag"), url)
+            self.assertIn("public", response.headers["Cache-Control"])
+            self.assertIsNotNone(response.last_modified, url)
+
+    def test_if_none_match_returns_304_without_rendering(self):
+        etag = self.client.get("/blog/").headers["ETag"]
+
+        with mock.patch("app.blueprints.blog.routes.render_template") as render:
+            response = self.client.get("/blog/", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        render.assert_not_called()
+
+    def test_error_pages_are_not_cached(self):
+        with mock.patch("app.blueprints.blog.routes.keyset_paginate", side_effect=RuntimeError("BD caída")):
+            failed = self.client.get("/blog/")
+
+        self.assertEqual(failed.status_code, 503)
+        self.assertIsNone(failed.headers.get("ETag"))
+        self.assertNotIn("BD caída", failed.get_data(as_text=True))
+        recovered = self.client.get("/blog/")
+        self.assertEqual(recovered.status_code, 200)
+        self.assertIn("Entrenamiento de fuerza", recovered.get_data(as_text=True))
+
+    def test_full_page_cache_serves_repeat_visits(self):
+        first = self.client.get("/blog/fuerza")
+
+        with mock.patch("app.blueprints.blog.routes.render_template") as render:
+            second = self.client.get("/blog/fuerza")
+
+        render.assert_not_called()
+        self.assertEqual(first.data, second.data)
+        # Las vistas se siguen contando aunque la página salga de caché
+        self.assertEqual(view_counter.pending(self.post.id), 2)
+
+    def test_publishing_changes_etag_and_clears_cache(self):
+        old_etag = self.client.get("/blog/").headers["ETag"]
+
+        self._post("movilidad", "Movilidad de cadera")
+        response = self.client.get("/blog/", headers={"If-None-Match": old_etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], old_etag)
+        self.assertIn("Movilidad de cadera".encode(), response.data)
+
+    def test_view_flush_does_not_invalidate(self):
+        etag = self.client.get("/blog/fuerza").headers["ETag"]
+        view_counter.flush()
+
+        response = self.client.get("/blog/fuerza", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_authenticated_users_bypass_cache(self):
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(self.author.id)
+            session["_fresh"] = True
+
+        response = self.client.get("/blog/")
+
+        self.assertIsNone(response.headers.get("ETag"))
+        self.assertNotIn("public", response.headers.get("Cache-Control", ""))
+
+    def test_cache_is_bounded(self):
+        page_cache.max_entries = 2
+        try:
+            for page in (1, 2, 3):
+                self.client.get(f"/blog/?page={page}")
+            self.assertEqual(len(page_cache._entries), 2)
+        finally:
+            page_cache.max_entries = self.app.config["PAGE_CACHE_MAX_ENTRIES"]
+
+
+if __name__ == "__main__":
+    unittest.main()
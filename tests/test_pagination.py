@@ -0,0 +1,102 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import BlogPost, User
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_paginate
+
+BASE = datetime(2025, 1, 1, 12, 0)
+
+
+class TestKeysetPagination(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.admin = User(username="admin", email="admin@example.com", is_admin=True)
+        self.admin.password = "Secret123!"
+        db.session.add(self.admin)
+        db.session.commit()
+
+        # Dos posts comparten published_at para comprobar el desempate por id
+        for i in range(7):
+            db.session.add(BlogPost(
+                title=f"Post {i}", slug=f"post-{i}", content="Texto", author_id=self.admin.id,
+                category="nutricion" if i % 2 else "entrenamiento", is_published=True,
+                published_at=BASE + timedelta(days=min(i, 5)), created_at=BASE + timedelta(days=i),
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _page(self, cursor=None):
+        query = BlogPost.query.filter_by(is_published=True)
+        return keyset_paginate(query, (BlogPost.published_at, BlogPost.id), cursor=cursor, per_page=3)
+
+    def test_walks_forward_and_back_without_gaps(self):
+        first = self._page()
+        second = self._page(first.next_cursor)
+        third = self._page(second.next_cursor)
+
+        slugs = [p.slug for page in (first, second, third) for p in page.items]
+        self.assertEqual(slugs, ["post-6", "post-5", "post-4", "post-3", "post-2", "post-1", "post-0"])
+        self.assertFalse(first.has_prev)
+        self.assertFalse(third.has_next)
+
+        back = self._page(third.prev_cursor)
+        self.assertEqual([p.slug for p in back.items], ["post-3", "post-2", "post-1"])
+        self.assertTrue(back.has_prev)
+        self.assertTrue(back.has_next)
+        self.assertFalse(self._page(back.prev_cursor).has_prev)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        self.assertEqual(decode_cursor("no-es-un-cursor", 2), (None, "next"))
+        self.assertEqual(decode_cursor(encode_cursor([1]), 2), (None, "next"))
+        self.assertEqual(self._page("%%%").items[0].slug, "post-6")
+
+    def test_deep_page_uses_seek_instead_of_offset_and_count(self):
+        cursor = self._page().next_cursor
+        statements = []
+
+        def capture(conn, cursor_, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            self._page(cursor)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+
+        sql = " ".join(statements)
+        self.assertIn("(blog_posts.published_at, blog_posts.id) <", sql)
+        self.assertNotIn("count(", sql.lower())
+
+    def test_blog_index_filters_by_category(self):
+        response = self.client.get("/blog/?category=nutricion")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'href="/blog/post-5"', response.data)
+        self.assertNotIn(b'href="/blog/post-6"', response.data)
+
+    def test_admin_dashboard_is_paginated(self):
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(self.admin.id)
+            session["_fresh"] = True
+
+        response = self.client.get("/blog/admin")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Post 6", response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
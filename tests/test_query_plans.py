@@ -0,0 +1,102 @@
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app, db
+from app.models import (
+    BiometricAnalysis,
+    BlogPost,
+    LLMUsageLedger,
+    Notification,
+    NutritionPlan,
+    TrainingPlan,
+    User,
+)
+from app.utils.query_plans import HOT_QUERIES, check_hot_queries, explain, plan_problems
+
+BASE = datetime(2025, 1, 1)
+
+
+class TestHotQueryPlans(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self._seed()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _seed(self):
+        users = []
+        for i in range(3):
+            user = User(username=f"user{i}", email=f"user{i}@example.com")
+            user.password = "Secret123!"
+            users.append(user)
+        db.session.add_all(users)
+        db.session.commit()
+
+        for user in users:
+            for day in range(10):
+                created = BASE + timedelta(days=day)
+                db.session.add(BiometricAnalysis(
+                    user_id=user.id, weight=80, height=180, age=30, gender="male", neck=38, waist=85,
+                    created_at=created,
+                ))
+                db.session.add(Notification(
+                    user_id=user.id, title="Aviso", message="Texto", is_read=day % 2 == 0, created_at=created,
+                ))
+                db.session.add(LLMUsageLedger(
+                    user_id=user.id, model_name="gpt-4o-mini", total_tokens=100, created_at=created,
+                ))
+                for plan_class in (NutritionPlan, TrainingPlan):
+                    db.session.add(plan_class(
+                        user_id=user.id, created_by=users[0].id, title="Plan",
+                        is_active=day == 9, created_at=created,
+                    ))
+                db.session.add(BlogPost(
+                    title=f"Post {user.id}-{day}", slug=f"post-{user.id}-{day}", content="Texto",
+                    author_id=user.id, is_published=day % 3 != 0, published_at=created,
+                ))
+        db.session.commit()
+
+    def test_hot_queries_use_indexes(self):
+        self.assertGreaterEqual(len(HOT_QUERIES), 8)
+        self.assertEqual(check_hot_queries(), {})
+
+    def test_plan_is_read_from_sqlite(self):
+        plan = explain(HOT_QUERIES["biometric.user_history"]())
+
+        self.assertTrue(any("ix_biometric_analyses_user_created" in line for line in plan), plan)
+
+    def test_detects_sequential_scan_and_sort(self):
+        query = BiometricAnalysis.query.filter(BiometricAnalysis.weight > 70).order_by(BiometricAnalysis.age)
+
+        problems = plan_problems(explain(query), "sqlite")
+
+        self.assertTrue(any(line.startswith("SCAN biometric_analyses") for line in problems), problems)
+        self.assertTrue(any("TEMP B-TREE" in line for line in problems), problems)
+
+    def test_postgres_plan_problems(self):
+        plan = [
+            "Limit  (cost=0.15..8.17 rows=1 width=4)",
+            "  ->  Sort  (cost=8.16..8.17 rows=1 width=4)",
+            "        Sort Key: created_at DESC",
+            "        ->  Seq Scan on notifications  (cost=0.00..8.15 rows=1 width=4)",
+            "  ->  Index Scan using ix_blog_posts_published_date on blog_posts  (cost=0.15..8.17 rows=1)",
+        ]
+
+        self.assertEqual(
+            plan_problems(plan, "postgresql"),
+            [
+                "->  Sort  (cost=8.16..8.17 rows=1 width=4)",
+                "->  Seq Scan on notifications  (cost=0.00..8.15 rows=1 width=4)",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
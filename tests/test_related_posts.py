@@ -0,0 +1,100 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from app import create_app, db
+from app.models import BlogPost, BlogPostRelated, User
+from app.services import related_posts
+from app.services.related_posts import RelatedPostsIndex, tokenize
+
+
+class TestRelatedPostsIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.author = User(username="autor", email="autor@example.com")
+        self.author.password = "Secret123!"
+        db.session.add(self.author)
+        db.session.commit()
+
+        self.index = RelatedPostsIndex(top_k=2)
+        self.posts = {}
+        self._post("creatina", "Creatina y fuerza", "suplementos", "La creatina mejora la fuerza máxima.")
+        self._post("creatina-dosis", "Dosis de creatina", "suplementos", "Cuánta creatina tomar al día.")
+        self._post("sentadilla", "Técnica de sentadilla", "piernas", "La sentadilla trabaja piernas y glúteos.")
+        self._post("piernas", "Rutina de piernas", "piernas", "Sentadilla, zancadas y prensa para piernas.")
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _post(self, slug, title, tags, content, category="nutricion", published=True):
+        post = BlogPost(
+            title=title, slug=slug, content=content, tags=tags, author_id=self.author.id,
+            category=category, is_published=published, published_at=datetime.utcnow(),
+        )
+        db.session.add(post)
+        db.session.commit()
+        self.posts[slug] = post
+        return post
+
+    def _related(self, slug):
+        return [p.slug for p in BlogPostRelated.for_post(self.posts[slug].id)]
+
+    def test_tokenize_folds_accents_and_drops_stopwords(self):
+        self.assertEqual(tokenize("La Técnica de [sentadilla](https://x.com)"), ["tecnica", "sentadilla"])
+
+    def test_rebuild_ranks_by_content_similarity(self):
+        self.assertEqual(self.index.rebuild(), 4)
+
+        self.assertEqual(self._related("creatina"), ["creatina-dosis"])
+        self.assertEqual(self._related("sentadilla"), ["piernas"])
+
+    def test_incremental_update_on_publish_and_unpublish(self):
+        self.index.rebuild()
+
+        new = self._post("creatina-mitos", "Mitos de la creatina", "suplementos", "La creatina no daña el riñón.")
+        rewritten = self.index.update_post(new.id)
+
+        self.assertIn("creatina-mitos", self._related("creatina"))
+        self.assertLess(rewritten, 5)
+        self.assertEqual(BlogPostRelated.query.filter_by(post_id=self.posts["sentadilla"].id).count(), 1)
+
+        new.is_published = False
+        db.session.commit()
+        self.index.update_post(new.id)
+
+        self.assertNotIn("creatina-mitos", self._related("creatina"))
+        self.assertEqual(BlogPostRelated.query.filter_by(related_id=new.id).count(), 0)
+
+    def test_update_only_vectorizes_the_changed_post(self):
+        self.index.rebuild()
+
+        self.posts["creatina-dosis"].content = "Cuánta creatina tomar al día y durante cuánto tiempo."
+        db.session.commit()
+        with mock.patch.object(related_posts, "REFIT_RATIO", 1.0), \
+                mock.patch.object(related_posts, "_document", wraps=related_posts._document) as document:
+            self.index.update_post(self.posts["creatina-dosis"].id)
+            self.index.update_post(self.posts["creatina-dosis"].id)
+
+        self.assertEqual(document.call_count, 1)
+        self.assertEqual(self._related("creatina"), ["creatina-dosis"])
+
+    def test_post_page_uses_index(self):
+        self.index.rebuild()
+
+        response = self.client.get("/blog/creatina")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'href="/blog/creatina-dosis"', response.data)
+        self.assertNotIn(b'href="/blog/piernas"', response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
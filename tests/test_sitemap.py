@@ -0,0 +1,90 @@
+import unittest
+from datetime import datetime
+
+from app import create_app, db
+from app.models import BlogPost, User
+from app.services.sitemap_service import sitemap_cache
+
+
+class TestSitemap(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        sitemap_cache.clear()
+
+        self.author = User(username="autor", email="autor@example.com")
+        self.author.password = "Secret123!"
+        db.session.add(self.author)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _post(self, slug, published=True, updated_at=None):
+        post = BlogPost(
+            title=slug, slug=slug, content="Texto", author_id=self.author.id,
+            is_published=published, published_at=datetime.utcnow(),
+            updated_at=updated_at or datetime.utcnow(),
+        )
+        db.session.add(post)
+        db.session.commit()
+        return post
+
+    def test_includes_published_posts_with_real_lastmod(self):
+        self._post("publicado", updated_at=datetime(2025, 3, 4, 10, 30))
+        self._post("borrador", published=False)
+
+        response = self.client.get("/sitemap.xml")
+        body = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/xml")
+        self.assertIn("https://localhost/blog/publicado</loc>", body)
+        self.assertIn("<lastmod>2025-03-04T10:30:00Z</lastmod>", body)
+        self.assertNotIn("borrador", body)
+        self.assertIn("https://localhost/sobre-nosotros</loc>", body)
+
+    def test_output_is_stable_and_regenerated_only_on_change(self):
+        self._post("uno")
+        builds = sitemap_cache.builds
+        first = self.client.get("/sitemap.xml").data
+        second = self.client.get("/sitemap.xml").data
+        self.assertEqual(first, second)
+        self.assertEqual(sitemap_cache.builds, builds + 1)
+
+        self._post("dos")
+        third = self.client.get("/sitemap.xml").data
+        self.assertEqual(sitemap_cache.builds, builds + 2)
+        self.assertIn(b"/blog/dos</loc>", third)
+
+    def test_splits_into_sitemap_index(self):
+        self.app.config["SITEMAP_MAX_URLS"] = 5
+        for i in range(6):
+            self._post(f"post-{i}")
+
+        index = self.client.get("/sitemap.xml").get_data(as_text=True)
+
+        # 8 páginas estáticas + 6 posts = 14 URLs -> 3 documentos
+        self.assertIn("<sitemapindex", index)
+        self.assertIn("https://localhost/sitemap-3.xml</loc>", index)
+        last = self.client.get("/sitemap-3.xml").get_data(as_text=True)
+        self.assertEqual(last.count("<url>"), 4)
+        self.assertEqual(self.client.get("/sitemap-4.xml").status_code, 404)
+
+    def test_conditional_request(self):
+        self._post("uno")
+        etag = self.client.get("/sitemap.xml").headers["ETag"]
+
+        response = self.client.get("/sitemap.xml", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == "__main__":
+    unittest.main()
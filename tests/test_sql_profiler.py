@@ -0,0 +1,197 @@
+import logging
+import unittest
+
+import pytest
+
+from app import create_app, db
+from app.models import (
+    BiometricAnalysis,
+    ContactMessage,
+    LLMUsageLedger,
+    Notification,
+    NutritionPlan,
+    TrainingPlan,
+    User,
+)
+from app.services.sql_profiler import (
+    QueryBudgetExceeded,
+    assert_query_budget,
+    capture_queries,
+    sql_profiler,
+    statement_shape,
+)
+
+
+def seed_users(count=5):
+    admin = User(username="admin", email="admin@example.com", is_admin=True, first_name="Ana", last_name="Admin")
+    admin.password = "Secret123!"
+    db.session.add(admin)
+    db.session.commit()
+
+    for i in range(count):
+        user = User(username=f"user{i}", email=f"user{i}@example.com", first_name="U", last_name=f"User{i}")
+        user.password = "Secret123!"
+        db.session.add(user)
+        db.session.flush()
+        for _ in range(2):
+            db.session.add(BiometricAnalysis(
+                user_id=user.id, weight=80, height=180, age=30, gender="male", neck=38, waist=85,
+            ))
+        db.session.flush()
+        analysis = BiometricAnalysis.query.filter_by(user_id=user.id).first()
+        db.session.add(NutritionPlan(
+            user_id=user.id, created_by=admin.id, title="Plan", analysis_id=analysis.id, is_active=i % 2 == 0,
+        ))
+        db.session.add(TrainingPlan(user_id=user.id, created_by=admin.id, title="Plan", is_active=True))
+        db.session.add(Notification(user_id=admin.id, title="Aviso", message="Texto"))
+        db.session.add(LLMUsageLedger(user_id=user.id, model_name="gpt-4o-mini", total_tokens=10))
+        db.session.add(ContactMessage(user_id=user.id, subject="Hola", message="Texto"))
+    db.session.commit()
+    return admin
+
+
+class TestSQLProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_statement_shape_ignores_values(self):
+        self.assertEqual(
+            statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'x'  LIMIT 10"),
+            "SELECT * FROM t WHERE id IN (?) AND name = ? LIMIT ?",
+        )
+
+    def test_capture_counts_and_repeats(self):
+        seed_users(3)
+        db.session.expunge_all()
+
+        with capture_queries() as stats:
+            for user in User.query.all():
+                BiometricAnalysis.query.filter_by(user_id=user.id).count()
+
+        self.assertEqual(stats.count, 5)
+        self.assertEqual(stats.max_repeats, 4)
+        self.assertEqual(len(stats.slowest()), 5)
+        self.assertIn("x4:", stats.report())
+
+    def test_budget_fails_on_repeated_statement(self):
+        seed_users(3)
+
+        with self.assertRaises(QueryBudgetExceeded) as ctx:
+            with assert_query_budget(max_repeats=2):
+                for user in User.query.all():
+                    BiometricAnalysis.query.filter_by(user_id=user.id).count()
+
+        self.assertIn("repetida 4 veces", str(ctx.exception))
+
+    def test_debug_response_carries_sql_headers(self):
+        response = self.client.get("/blog/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response.headers["X-SQL-Queries"]), 0)
+        self.assertIn("X-SQL-Time-Ms", response.headers)
+        self.assertIn("X-SQL-Max-Repeats", response.headers)
+
+    def test_notification_badge_is_a_single_count(self):
+        seed_users(1)
+        user = User.query.filter_by(username="user0").one()
+        for _ in range(5):
+            db.session.add(Notification(user_id=user.id, title="Aviso", message="Texto"))
+        db.session.commit()
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(user.id)
+            session["_fresh"] = True
+
+        with capture_queries() as stats:
+            response = self.client.get("/auth/profile")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"notificaciones no le", response.data)
+        notification_queries = [shape for shape in stats.shapes if "FROM notifications" in shape]
+        self.assertEqual(len(notification_queries), 1)
+        self.assertIn("count(", notification_queries[0].lower())
+
+    def test_slow_requests_are_logged_with_statements(self):
+        sql_profiler.slow_request_ms = 0.001
+        try:
+            with self.assertLogs("app.services.sql_profiler", level=logging.WARNING) as logs:
+                self.client.get("/blog/")
+        finally:
+            sql_profiler.slow_request_ms = 500
+
+        self.assertIn("Petición lenta GET /blog/", logs.output[0])
+        self.assertIn("blog_posts", logs.output[0])
+
+
+class TestAdminViewQueryBudgets(unittest.TestCase):
+    """Las vistas de admin no escalan en número de queries con los usuarios."""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.admin = seed_users(6)
+
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(self.admin.id)
+            session["_fresh"] = True
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_users_page(self):
+        with assert_query_budget(max_queries=12, max_repeats=2):
+            response = self.client.get("/admin/users")
+
+        self.assertEqual(response.status_code, 200)
+        # user0: 2 análisis, uno vinculado a un plan; planes activos de ambos tipos
+        self.assertIn(b"1 sin planes", response.data)
+
+    def test_usage_dashboard(self):
+        with assert_query_budget(max_queries=6, max_repeats=2):
+            response = self.client.get("/admin/usage")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"user1", response.data)
+
+    def test_admin_messages_loads_authors_eagerly(self):
+        with assert_query_budget(max_queries=7, max_repeats=2):
+            response = self.client.get("/contacto/admin/mensajes")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"user5@example.com", response.data)
+
+
+@pytest.fixture
+def app():
+    flask_app = create_app("testing")
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_query_budget_fixture_detects_n_plus_one(app, query_budget):
+    seed_users(4)
+
+    with pytest.raises(QueryBudgetExceeded):
+        with query_budget():
+            for user in User.query.all():
+                BiometricAnalysis.query.filter_by(user_id=user.id).count()
+
+    with query_budget(max_queries=2):
+        User.query.all()
@@ -0,0 +1,114 @@
+import json
+import unittest
+
+from openai import OpenAI
+
+from app import create_app, db
+from app.models import User
+from app.services import fitmaster_service
+from app.services.fitmaster_service import FitMasterService
+from app.services.usage_recorder import usage_recorder
+from app.utils.streaming_json import StreamingJSONParser
+from benchmarks.stubs import DEFAULT_ANALYSIS, StubServer, openai_stub
+
+ANALYSIS = {
+    "interpretation": 'Hola "Ana":\n{sin llaves} [ni corchetes] \\ ñ',
+    "nutrition_plan": {"calories": 2400, "meals": [{"name": "Desayuno", "items": ["Avena", "Yogur"]}]},
+    "training_plan": {"days_per_week": 4, "deload": False, "notes": None, "load": -1.5e3},
+    "version": 2,
+}
+
+
+def feed_in_chunks(text, size):
+    parser, emitted = StreamingJSONParser(), []
+    for start in range(0, len(text), size):
+        emitted += parser.feed(text[start:start + size])
+    return parser, emitted
+
+
+class TestStreamingJSONParser(unittest.TestCase):
+
+    def test_fields_are_emitted_as_they_close_for_any_chunking(self):
+        text = "```json\n" + json.dumps(ANALYSIS, ensure_ascii=False, indent=2) + "\n```\n¡Suerte!"
+        for size in (1, 2, 7, 64, len(text)):
+            parser, emitted = feed_in_chunks(text, size)
+            self.assertTrue(parser.complete)
+            self.assertEqual(emitted, list(ANALYSIS.items()))
+            self.assertEqual(parser.close(), ANALYSIS)
+
+    def test_interpretation_is_available_before_the_plans_arrive(self):
+        text = json.dumps(ANALYSIS)
+        cut = text.index('"nutrition_plan"') + 5
+        parser, emitted = feed_in_chunks(text[:cut], 3)
+        self.assertEqual(emitted, [("interpretation", ANALYSIS["interpretation"])])
+        self.assertFalse(parser.complete)
+
+    def test_truncated_output_keeps_partial_structure(self):
+        text = json.dumps(ANALYSIS, ensure_ascii=False)
+        parser, _ = feed_in_chunks(text[:text.index('"Yogur"') + 4], 5)
+        self.assertEqual(parser.close(), {
+            "interpretation": ANALYSIS["interpretation"],
+            "nutrition_plan": {"calories": 2400, "meals": [{"name": "Desayuno", "items": ["Avena"]}]},
+        })
+
+        parser, _ = feed_in_chunks('Aquí tienes: {"interpretation": "Tu composición es buena y \\u00', 4)
+        self.assertEqual(parser.close(), {"interpretation": "Tu composición es buena y "})
+
+        for cut in range(len(text)):  # cualquier corte da un dict, nunca una excepción
+            parser, _ = feed_in_chunks(text[:cut], 11)
+            self.assertIsInstance(parser.close(), dict)
+
+    def test_malformed_output_stops_parsing_but_keeps_what_closed(self):
+        parser, emitted = feed_in_chunks('{"interpretation": "Bien", "training_plan": {"days": 4, focus: "fuerza"}}', 6)
+        self.assertTrue(parser.broken)
+        self.assertEqual(emitted, [("interpretation", "Bien")])
+        self.assertEqual(parser.close(), {"interpretation": "Bien", "training_plan": {"days": 4}})
+
+    def test_raw_newlines_in_strings_are_accepted(self):
+        parser, emitted = feed_in_chunks('{"interpretation": "línea 1\nlínea 2"}', 4)
+        self.assertEqual(emitted, [("interpretation", "línea 1\nlínea 2")])
+
+    def test_text_without_json_yields_no_fields(self):
+        parser, emitted = feed_in_chunks("Lo siento, no puedo generar el análisis.", 8)
+        self.assertEqual((emitted, parser.close()), ([], {}))
+        self.assertEqual(parser.text, "Lo siento, no puedo generar el análisis.")
+
+
+class TestStreamedAnalysis(unittest.TestCase):
+    """analyze_bio_results consume el análisis en streaming contra el stub de OpenAI."""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.user = User(username="ana", email="ana@example.com")
+        self.user.password = "Secret123!"
+        db.session.add(self.user)
+        db.session.commit()
+        usage_recorder.clear()
+
+        self.server = StubServer(openai_stub(tokens_per_second=2000)).start()
+        self._client = fitmaster_service.client
+        fitmaster_service.client = OpenAI(api_key="sk-test", base_url=f"{self.server.url}/v1", max_retries=0)
+
+    def tearDown(self):
+        fitmaster_service.client = self._client
+        self.server.stop()
+        usage_recorder.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_fields_reach_the_callback_in_order_and_usage_is_recorded(self):
+        fields = []
+        result = FitMasterService.analyze_bio_results(
+            {"user_id": self.user.id, "bmi": 22.0}, on_field=lambda name, value: fields.append(name),
+        )
+        self.assertEqual(fields, ["interpretation", "nutrition_plan", "training_plan"])
+        self.assertEqual(result, {"interpretation": DEFAULT_ANALYSIS["interpretation"]})
+        self.assertEqual(usage_recorder.stats()["recorded"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
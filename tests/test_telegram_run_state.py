@@ -0,0 +1,114 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from openai import OpenAI
+
+from app import create_app, db
+from app.models import User, UserTelegramLink
+from app.services import fitmaster_service
+from app.services.fitmaster_service import FitMasterService
+from app.services.usage_recorder import usage_recorder
+from benchmarks.stubs import DEFAULT_CHAT_REPLY, StubServer, openai_stub
+
+RUNS_LIST = "GET /v1/threads/<thread_id>/runs"
+RUNS_CANCEL = "POST /v1/threads/<thread_id>/runs/<run_id>/cancel"
+RUNS_RETRIEVE = "GET /v1/threads/<thread_id>/runs/<run_id>"
+
+
+class TestRunStateTracking(unittest.TestCase):
+    """chat_query contra el stub de OpenAI con el SDK real."""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username="ana", email="ana@example.com")
+        user.password = "Secret123!"
+        db.session.add(user)
+        db.session.commit()
+        self.link = UserTelegramLink(user_id=user.id, telegram_user_id="42", telegram_chat_id="42")
+        db.session.add(self.link)
+        db.session.commit()
+
+        self.stub = openai_stub()
+        self.server = StubServer(self.stub).start()
+        self._client = fitmaster_service.client
+        fitmaster_service.client = OpenAI(api_key="sk-test", base_url=f"{self.server.url}/v1")
+
+    def tearDown(self):
+        fitmaster_service.client = self._client
+        self.server.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _ask(self, stream=True):
+        chunks = []
+        reply = FitMasterService.chat_query("¿Cómo voy?", self.link.user_id,
+                                            stream_callback=chunks.append if stream else None)
+        return reply, chunks
+
+    def test_streamed_turns_skip_runs_list(self):
+        for _ in range(2):
+            reply, chunks = self._ask()
+            self.assertEqual(reply, DEFAULT_CHAT_REPLY)
+            self.assertEqual("".join(chunks), DEFAULT_CHAT_REPLY)
+
+        calls = self.stub.config["calls"]
+        self.assertEqual(calls[RUNS_LIST], 0)
+        self.assertEqual(calls[RUNS_CANCEL], 0)
+        self.assertEqual(self.link.openai_run_status, "completed")
+        self.assertFalse(self.link.has_live_run)
+
+    def test_streamed_usage_comes_from_the_completed_event(self):
+        usage_recorder.clear()
+        self._ask()
+
+        self.assertEqual(self.stub.config["calls"][RUNS_RETRIEVE], 0)
+        self.assertEqual(usage_recorder.pending(), 1)
+        self.assertGreater(self.link.openai_thread_prompt_tokens, 0)
+        usage_recorder.clear()
+
+    def test_polling_turn_records_run(self):
+        reply, _ = self._ask(stream=False)
+        self.assertEqual(reply, DEFAULT_CHAT_REPLY)
+        self.assertTrue(self.link.openai_run_id.startswith("run_"))
+        self.assertEqual(self.link.openai_run_status, "completed")
+
+    def test_known_live_run_is_cancelled_once(self):
+        self._ask()
+        self.link.record_run("run_stuck", "in_progress")
+        db.session.commit()
+
+        self._ask()
+        calls = self.stub.config["calls"]
+        self.assertEqual(calls[RUNS_CANCEL], 1)
+        self.assertEqual(calls[RUNS_LIST], 0)
+
+    def test_run_already_cancelling_is_not_cancelled_again(self):
+        self._ask()
+        self.link.record_run("run_stuck", "cancelling")
+        db.session.commit()
+        self.assertTrue(self.link.has_live_run)
+
+        self._ask()
+        self.assertEqual(self.stub.config["calls"][RUNS_CANCEL], 0)
+
+    def test_run_state_is_committed_once_at_the_end_of_the_turn(self):
+        self._ask()  # crea el thread
+        with mock.patch.object(db.session, "commit", wraps=db.session.commit) as commit:
+            self._ask()
+        self.assertEqual(commit.call_count, 1)
+        db.session.expire_all()
+        self.assertEqual(self.link.openai_run_status, "completed")
+
+    def test_expired_live_run_is_not_cancelled(self):
+        self.link.record_run("run_old", "in_progress")
+        self.link.openai_run_updated_at = datetime.utcnow() - timedelta(minutes=11)
+        self.assertFalse(self.link.has_live_run)
+
+
+if __name__ == "__main__":
+    unittest.main()
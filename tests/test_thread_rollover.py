@@ -0,0 +1,117 @@
+import unittest
+from unittest import mock
+
+from openai import OpenAI
+
+from app import create_app, db
+from app.models import User, UserTelegramLink
+from app.services import fitmaster_service
+from app.services.fitmaster_service import FitMasterService
+from app.services.openai_governor import _current_slot, openai_governor
+from app.services.thread_lifecycle import CONTEXT_HEADER, SUMMARY_HEADER, thread_lifecycle
+from benchmarks.stubs import StubServer, openai_stub
+
+CHAT_COMPLETIONS = "POST /v1/chat/completions"
+SUMMARY = {"resumen": "Quiere perder grasa sin perder fuerza."}
+
+
+class TestThreadRollover(unittest.TestCase):
+    """Conversaciones largas contra el stub, cuyos runs leen el thread entero."""
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["TELEGRAM_THREAD_PROMPT_BUDGET"] = 200
+        thread_lifecycle.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(username="ana", email="ana@example.com")
+        user.password = "Secret123!"
+        db.session.add(user)
+        db.session.commit()
+        self.link = UserTelegramLink(user_id=user.id, telegram_user_id="42", telegram_chat_id="42")
+        db.session.add(self.link)
+        db.session.commit()
+
+        self.stub = openai_stub(analysis=SUMMARY)
+        self.server = StubServer(self.stub).start()
+        self._client = fitmaster_service.client
+        fitmaster_service.client = OpenAI(api_key="sk-test", base_url=f"{self.server.url}/v1")
+
+    def tearDown(self):
+        fitmaster_service.client = self._client
+        self.server.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _chat(self, turns, context=None):
+        """prompt_tokens del run de cada turno."""
+        prompt_tokens = []
+        for turn in range(turns):
+            FitMasterService.chat_query(f"Pregunta {turn}", self.link.user_id, context=context,
+                                        stream_callback=lambda chunk: None)
+            prompt_tokens.append(self.link.openai_thread_prompt_tokens)
+        return prompt_tokens
+
+    def test_prompt_tokens_stay_bounded(self):
+        prompt_tokens = self._chat(12)
+        stats = thread_lifecycle.stats()
+        self.assertGreaterEqual(stats["rollovers"], 2)
+        self.assertEqual(stats["summary_failures"], 0)
+        self.assertEqual(self.stub.config["calls"][CHAT_COMPLETIONS], stats["rollovers"])
+        # Como mucho un turno por encima del presupuesto antes de rotar
+        self.assertLess(max(prompt_tokens), 200 + 60)
+
+    def test_without_budget_thread_keeps_growing(self):
+        thread_lifecycle.prompt_budget = 0
+        prompt_tokens = self._chat(12)
+        self.assertEqual(prompt_tokens, sorted(prompt_tokens))
+        self.assertGreater(prompt_tokens[-1], 2 * 200)
+        self.assertEqual(thread_lifecycle.stats()["rollovers"], 0)
+
+    def test_new_thread_is_seeded_with_context_and_summary(self):
+        context = {"weight": 70.0, "body_fat_percentage": 21.5}
+        self._chat(1, context)
+        first_thread = self.link.openai_thread_id
+        self.link.openai_thread_prompt_tokens = 10_000
+
+        self._chat(1, context)
+        self.assertNotEqual(self.link.openai_thread_id, first_thread)
+        seed = self.stub.config["threads"][self.link.openai_thread_id]
+        self.assertTrue(seed[0].startswith(CONTEXT_HEADER))
+        self.assertIn('"body_fat_percentage": 21.5', seed[0])
+        self.assertTrue(seed[1].startswith(SUMMARY_HEADER))
+        self.assertIn(SUMMARY["resumen"], seed[1])
+        self.assertLess(self.link.openai_thread_prompt_tokens, 200)
+
+    def test_summary_and_run_are_both_settled_in_the_turn_slot(self):
+        self._chat(1)
+        self.link.openai_thread_prompt_tokens = 10_000
+        settled = []
+        settle = openai_governor.settle
+
+        def record(tokens):
+            settled.append((_current_slot.get(), tokens))
+            settle(tokens)
+
+        with mock.patch.object(openai_governor, "settle", side_effect=record):
+            self._chat(1)
+
+        # Resumen + run del mismo hueco: el bucket cobra los dos
+        self.assertEqual(len(settled), 2)
+        slot = settled[0][0]
+        self.assertIs(settled[1][0], slot)
+        self.assertEqual(slot.used, sum(tokens for _, tokens in settled))
+        self.assertEqual(slot.charged, slot.used)
+
+    def test_reset_forgets_thread_usage(self):
+        self.link.openai_thread_id = "thread_old"
+        self.link.openai_thread_prompt_tokens = 10_000
+        self.link.reset_thread()
+        self.assertIsNone(self.link.openai_thread_prompt_tokens)
+        self.assertFalse(thread_lifecycle.should_roll_over(self.link))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import time
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.models import LLMUsageLedger, User
+from app.services.usage_recorder import usage_recorder
+
+
+def usage(prompt, completion):
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+class TestUsageRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app("testing")
+        self.app.config["LLM_PRICING"] = {"modelo-propio": (1.0, 2.0)}
+        usage_recorder.init_app(self.app)
+        usage_recorder.clear()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.user = User(username="ana", email="ana@example.com")
+        self.user.password = "Secret123!"
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        usage_recorder.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _rows(self):
+        return db.session.execute(db.select(LLMUsageLedger).order_by(LLMUsageLedger.id)).scalars().all()
+
+    def test_record_does_not_touch_the_request_session(self):
+        with mock.patch.object(db.session, "commit") as commit:
+            usage_recorder.record(self.user.id, "gpt-4o-mini", usage(100, 50))
+        commit.assert_not_called()
+        self.assertEqual(usage_recorder.pending(), 1)
+        self.assertEqual(self._rows(), [])
+
+    def test_flush_inserts_rows_with_table_prices(self):
+        usage_recorder.record(self.user.id, "gpt-4o-mini", usage(1_000_000, 0), channel="web")
+        usage_recorder.record(self.user.id, "gpt-4o-mini-2024-07-18", usage(0, 1_000_000))
+        usage_recorder.record(self.user.id, "modelo-propio", usage(500_000, 500_000))
+        usage_recorder.record(self.user.id, "desconocido", usage(10, 10))
+
+        self.assertEqual(usage_recorder.flush(), 4)
+        rows = self._rows()
+        self.assertEqual([round(r.cost_usd, 4) for r in rows], [0.15, 0.60, 1.5, 0.0])
+        self.assertEqual(rows[0].channel, "web")
+        self.assertEqual(rows[1].total_tokens, 1_000_000)
+        self.assertEqual(usage_recorder.stats()["flushed"], 4)
+        self.assertEqual(usage_recorder.pending(), 0)
+
+    def test_flush_uses_its_own_session(self):
+        usage_recorder.record(self.user.id, "gpt-4o-mini", usage(10, 10))
+        with mock.patch.object(db.session, "commit") as commit, \
+                mock.patch.object(db.session, "flush") as flush:
+            self.assertEqual(usage_recorder.flush(), 1)
+        commit.assert_not_called()
+        flush.assert_not_called()
+        self.assertEqual(len(self._rows()), 1)
+
+    def test_failed_flush_keeps_rows_in_order(self):
+        usage_recorder.record(self.user.id, "gpt-4o-mini", usage(1, 1))
+        with mock.patch("app.services.usage_recorder.Session.execute", side_effect=RuntimeError("BD caída")):
+            self.assertEqual(usage_recorder.flush(), 0)
+        usage_recorder.record(self.user.id, "gpt-4o-mini", usage(2, 2))
+
+        self.assertEqual(usage_recorder.flush(), 2)
+        self.assertEqual([r.prompt_tokens for r in self._rows()], [1, 2])
+        self.assertEqual(usage_recorder.stats()["failed_flushes"], 1)
+
+    def test_buffer_is_bounded(self):
+        usage_recorder.max_pending = 3
+        try:
+            for prompt in range(5):
+                usage_recorder.record(self.user.id, "gpt-4o-mini", usage(prompt, 0))
+        finally:
+            usage_recorder.max_pending = 10_000
+        self.assertEqual(usage_recorder.stats()["dropped"], 2)
+        usage_recorder.flush()
+        self.assertEqual([r.prompt_tokens for r in self._rows()], [2, 3, 4])
+
+    def test_shutdown_flushes_pending_rows(self):
+        usage_recorder.record(self.user.id, "gpt-4o-mini", usage(10, 10))
+        usage_recorder.shutdown()
+        self.assertEqual(len(self._rows()), 1)
+
+    def test_background_thread_flushes_full_batches(self):
+        usage_recorder.interval, usage_recorder.batch_size = 30, 2
+        try:
+            usage_recorder.record(self.user.id, "gpt-4o-mini", usage(1, 1))
+            usage_recorder.record(self.user.id, "gpt-4o-mini", usage(2, 2))
+            for _ in range(200):
+                if usage_recorder.stats()["flushed"] == 2:
+                    break
+                time.sleep(0.01)
+        finally:
+            usage_recorder.shutdown()
+            usage_recorder.interval, usage_recorder.batch_size = 0, 200
+        self.assertEqual(len(self._rows()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()